@@ -1,7 +1,5 @@
-from app.agents.news_collector import NewsCollectorAgent
-from app.agents.news_analyzer import NewsAnalyzerAgent
-from app.agents.chat_agent import ChatAgent
-from app.agents.coordinator import MultiAgentCoordinator
+# Agent模块按需导入（LangChain Agent导入耗时较长，应用启动时不加载）
+from app.utils.lazy_import import lazy_exports
 
 __all__ = [
     "NewsCollectorAgent",
@@ -9,3 +7,10 @@ __all__ = [
     "ChatAgent",
     "MultiAgentCoordinator"
 ]
+
+__getattr__ = lazy_exports(__name__, {
+    "NewsCollectorAgent": "app.agents.news_collector",
+    "NewsAnalyzerAgent": "app.agents.news_analyzer",
+    "ChatAgent": "app.agents.chat_agent",
+    "MultiAgentCoordinator": "app.agents.coordinator"
+})
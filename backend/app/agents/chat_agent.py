@@ -1,14 +1,22 @@
 """
 聊天助手Agent - 使用原生DashScope SDK的enable_search功能
-完全移除自定义爬取逻辑，仅依赖模型内置联网能力
+完全移除自定义爬取逻辑，依赖模型内置联网能力，
+并优先检索用户本地的新闻/报告资料（本地资料足够相关时跳过联网搜索）
 支持用户数据隔离
 """
+import asyncio
+import logging
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.config import settings
 from app.utils.llm_config import acall_llm_native
+from app.utils.model_router import TASK_CHAT
+from app.utils.llm_resilience import LLMError
 from app.models.chat_record import ChatRecord
+from app.services import vector_index
+
+logger = logging.getLogger(__name__)
 
 
 class ChatAgent:
@@ -48,6 +56,31 @@ class ChatAgent:
 
 请友好、专业地回答用户的问题。"""
     
+    async def _retrieve_context(self, user_input: str) -> Tuple[Optional[str], float]:
+        """
+        从用户本地向量索引中检索相关资料
+        
+        Args:
+            user_input: 用户输入的问题
+        
+        Returns:
+            (本地资料提示文本, 最高相似度)，没有相关资料时返回(None, 0.0)
+        """
+        try:
+            # 向量计算为CPU/网络阻塞操作，放到线程中执行
+            passages = await asyncio.to_thread(vector_index.retrieve, self.user_id, user_input)
+        except Exception as e:
+            logger.warning("本地资料检索失败: %s", e)
+            return None, 0.0
+        if not passages:
+            return None, 0.0
+        
+        lines = ["以下是从用户已采集的新闻和分析报告中检索到的本地资料，回答时请优先参考："]
+        for i, passage in enumerate(passages, 1):
+            source = "新闻" if passage["doc_type"] == vector_index.DOC_NEWS else "报告"
+            lines.append(f"[{i}]（{source}，相关度{passage['score']:.2f}）{passage['text']}")
+        return "\n".join(lines), passages[0]["score"]
+    
     async def chat(self, user_input: str, user_preferences: Optional[Dict] = None) -> str:
         """
         处理用户对话 - 仅使用原生SDK的enable_search功能
@@ -68,17 +101,28 @@ class ChatAgent:
                 preference_text = f"用户偏好信息：{user_preferences}"
                 messages.append(SystemMessage(content=preference_text))
             
+            # 检索本地资料（核心隔离：只检索当前用户的数据）
+            local_context, top_score = await self._retrieve_context(user_input)
+            if local_context:
+                messages.append(SystemMessage(content=local_context))
+            
             # 添加对话历史
             messages.extend(self.chat_history)
             
             # 添加当前用户输入
             messages.append(HumanMessage(content=user_input))
             
-            # 直接调用原生SDK（enable_search=True，让模型自己决定是否联网）
+            # 本地资料高度相关时不再联网搜索，减少延迟；否则让模型自己决定是否联网
+            enable_search = top_score < settings.CHAT_SKIP_SEARCH_SCORE
             response = await acall_llm_native(
                 messages=messages,
                 temperature=self.temperature,
-                enable_search=True  # 核心：启用模型内置联网功能
+                enable_search=enable_search,  # 核心：启用模型内置联网功能
+                caller="ChatAgent",
+                task=TASK_CHAT,
+                # 聊天对延迟敏感：期限较短，迟迟未返回时发起对冲请求
+                deadline=settings.LLM_CHAT_DEADLINE,
+                hedge_delay=settings.LLM_CHAT_HEDGE_DELAY
             )
             response_text = response.content
             
@@ -101,16 +145,16 @@ class ChatAgent:
                 self.db.commit()
             except Exception as e:
                 # 如果保存失败，记录错误但不影响返回结果
-                print(f"保存聊天记录失败: {str(e)}")
+                logger.warning("保存聊天记录失败: %s", e)
                 self.db.rollback()
             
             return response_text
             
+        except LLMError as e:
+            logger.error("聊天调用模型失败: %s", e)
+            return f"抱歉，{e.user_message}"
         except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            print(f"❌ 聊天处理出错: {str(e)}")
-            print(f"错误详情: {error_detail}")
+            logger.exception("聊天处理出错: %s", e)
             return f"抱歉，处理您的请求时出现了错误：{str(e)}。请稍后重试。"
     
     def reset_history(self):
@@ -136,5 +180,5 @@ class ChatAgent:
                 self.chat_history.append(HumanMessage(content=record.message))
                 self.chat_history.append(AIMessage(content=record.response))
         except Exception as e:
-            print(f"加载聊天历史失败: {str(e)}")
+            logger.warning("加载聊天历史失败: %s", e)
             self.chat_history = []
@@ -1,24 +1,29 @@
-from langchain.prompts import ChatPromptTemplate
-from langchain_core.messages import SystemMessage
-from typing import Dict, List
+from typing import Dict, List, Optional
 from app.config import settings
-from app.utils.llm_config import NativeDashScopeLLM
-from app.agents.news_collector import NewsCollectorAgent
-from app.agents.news_analyzer import NewsAnalyzerAgent
+from app.services.news_collection import collect_with_agent, scrape_news
+from app.services.news_analysis import analyze_articles
+from app.tools.dedup import filter_near_duplicates
+from app.utils.task_graph import TaskGraph
+
+# 类别代码及任务描述中的识别关键词（类别代码与虎扑栏目、digest.DIGEST_CATEGORIES一致）
+CATEGORY_KEYWORDS = {
+    'nba': ['nba'],
+    'cba': ['cba'],
+    'soccer': ['足球', 'soccer', '英超', '西甲', '欧冠', '中超'],
+    'esports': ['电竞', 'esports', 'lol', '英雄联盟'],
+}
+DEFAULT_CATEGORIES = ['nba']
 
 class MultiAgentCoordinator:
-    def __init__(self):
-        # 使用原生SDK包装类（虽然当前未使用，但保留以备将来扩展）
-        self.llm = NativeDashScopeLLM(
-            model=settings.LLM_MODEL,
-            temperature=0.3,
-            enable_search=True
-        )
-        
-        # 初始化子Agent
-        self.collector_agent = NewsCollectorAgent()
-        self.analyzer_agent = NewsAnalyzerAgent()
-        
+    def __init__(self, max_parallel: Optional[int] = None, node_timeout: Optional[float] = None):
+        """
+        Args:
+            max_parallel: 同时执行的子任务数上限（默认Settings.COORDINATOR_MAX_PARALLEL）
+            node_timeout: 单个子任务超时时间（秒，默认Settings.COORDINATOR_NODE_TIMEOUT）
+        """
+        self.max_parallel = max_parallel or settings.COORDINATOR_MAX_PARALLEL
+        self.node_timeout = node_timeout or settings.COORDINATOR_NODE_TIMEOUT
+
         system_prompt = """你是一个多Agent协调器。你的任务是：
 1. 接收用户的复杂请求
 2. 将任务拆分为子任务
@@ -32,71 +37,220 @@ class MultiAgentCoordinator:
 - 推送Agent：负责结果推送
 
 请根据任务需求，合理分配和协调这些Agent。"""
-        
+
         self.system_prompt = system_prompt
-    
-    async def execute_task(self, task_description: str, news_sources: List[Dict] = None) -> Dict:
-        """执行复杂任务"""
+
+    async def execute_task(
+        self,
+        task_description: str,
+        news_sources: List[Dict] = None,
+        categories: Optional[List[str]] = None,
+        limit_per_category: int = 5,
+        news: Optional[List[Dict]] = None,
+        analysis_type: str = "daily"
+    ) -> Dict:
+        """
+        执行复杂任务：分解为子任务依赖图，互不依赖的子任务并发执行
+
+        Args:
+            task_description: 任务描述
+            news_sources: 额外使用采集Agent采集的新闻源
+            categories: 类别代码列表（nba/cba/soccer/esports），为空时从任务描述中识别
+            limit_per_category: 每个类别采集的新闻条数
+            news: 直接提供的待分析新闻（提供时不再采集）
+            analysis_type: 分析类型
+
+        Returns:
+            {"status": success/partial/failed, "results": {"collection", "analysis"},
+             "errors": {子任务: 错误}, "trace": 子任务耗时, "summary"}
+        """
         # 任务分解
-        subtasks = await self._decompose_task(task_description)
-        
-        results = {}
-        
-        # 执行子任务
+        subtasks = await self._decompose_task(task_description, news_sources, categories, news)
+
+        graph = TaskGraph(max_parallel=self.max_parallel, default_timeout=self.node_timeout)
         for subtask in subtasks:
-            agent_type = subtask.get('agent')
-            task = subtask.get('task')
-            
-            try:
-                if agent_type == 'collector':
-                    results['collection'] = await self.collector_agent.collect_news(news_sources)
-                elif agent_type == 'analyzer':
-                    news_list = task.get('news', results.get('collection', []))
-                    analysis_type = task.get('analysis_type', 'daily')
-                    results['analysis'] = await self.analyzer_agent.analyze_news(news_list, analysis_type)
-            except Exception as e:
-                print(f"执行{agent_type}任务时出错: {str(e)}")
-                results[agent_type] = {"error": str(e)}
-        
+            graph.add(
+                subtask['name'],
+                self._make_runner(subtask, limit_per_category, news_sources, news, analysis_type),
+                deps=subtask.get('deps', []),
+                allow_partial=subtask.get('allow_partial', False)
+            )
+
+        run = await graph.run()
+
         # 汇总结果
-        final_result = await self._aggregate_results(results)
-        
-        return final_result
-    
-    async def _decompose_task(self, task: str) -> List[Dict]:
-        """分解任务为子任务"""
-        # 简化版本：根据关键词判断任务类型
-        task_lower = task.lower()
-        
+        return await self._aggregate_results(run)
+
+    def _make_runner(self, subtask: Dict, limit: int, news_sources, news, analysis_type: str):
+        """为子任务生成执行函数（参数为依赖子任务的结果）"""
+        agent_type = subtask.get('agent')
+        task = subtask.get('task', {})
+
+        if agent_type == 'collector':
+            async def run(inputs: Dict):
+                if task.get('category'):
+                    return await scrape_news(task['category'], limit)
+                return await collect_with_agent(news_sources)
+            return run
+
+        if agent_type == 'merge':
+            async def run(inputs: Dict):
+                # 部分采集失败时只合并成功的结果；近似去重（同一新闻可能出现在多个栏目）
+                from app.services.digest import classify_news
+
+                categories = task.get('categories') or []
+                merged: List[Dict] = []
+                by_category: Dict[str, List[Dict]] = {}
+                for category in categories:
+                    kept = filter_near_duplicates(inputs.get(f"collect:{category}") or [], existing=merged)
+                    merged.extend(kept)
+                    by_category[category] = kept
+                # 采集Agent的新闻没有对应的分析子任务：按内容归入各类别，识别不出或类别未请求的归入第一个类别
+                extra = filter_near_duplicates(inputs.get('collect:agent') or [], existing=merged)
+                merged.extend(extra)
+                for code, items in classify_news(extra, categories[0]).items():
+                    by_category[code if code in categories else categories[0]].extend(items)
+                return {"articles": merged, "by_category": by_category}
+            return run
+
+        if agent_type == 'analyzer':
+            async def run(inputs: Dict):
+                if news is not None:
+                    articles = news
+                else:
+                    merged = inputs.get('merge') or {}
+                    category = task.get('category')
+                    articles = merged.get('by_category', {}).get(category) if category else merged.get('articles')
+                if not articles:
+                    raise ValueError("没有可分析的新闻")
+                return await self._analyze(articles, analysis_type)
+            return run
+
+        if agent_type == 'aggregate':
+            async def run(inputs: Dict):
+                analyses = {name.split(':', 1)[1]: value for name, value in inputs.items() if name.startswith('analyze:')}
+                return {"analysis": analyses, "categories": sorted(analyses)}
+            return run
+
+        raise ValueError(f"未知的Agent类型: {agent_type}")
+
+    async def _analyze(self, articles: List[Dict], analysis_type: str) -> Dict:
+        """分析一组新闻（相同文章集合的分析只执行一次，与日报共享结果）"""
+        return await analyze_articles(articles, analysis_type)
+
+    async def _decompose_task(
+        self,
+        task: str,
+        news_sources: List[Dict] = None,
+        categories: Optional[List[str]] = None,
+        news: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """
+        分解任务为子任务依赖图
+        - 每个类别一个采集子任务（并发），额外新闻源一个采集Agent子任务
+        - merge：合并去重（依赖全部采集子任务，部分失败时合并成功的部分），采集Agent的新闻按内容归入各类别
+        - 每个类别一个分析子任务（并发，依赖merge）
+        - aggregate：汇总各类别分析结果（部分失败时汇总成功的部分）
+        """
+        task_lower = (task or '').lower()
+
+        need_collect = news is None and any(keyword in task_lower for keyword in ['采集', '收集', '获取', '生成日报', '日报'])
+        need_analyze = any(keyword in task_lower for keyword in ['分析', '报告', '总结', '日报'])
+        if news is None and not need_collect and not need_analyze:
+            # 如果都没有，默认执行采集和分析
+            need_collect = need_analyze = True
+        if news is not None:
+            need_analyze = True
+        elif need_analyze:
+            need_collect = True  # 没有提供新闻时，分析依赖采集
+
+        if not categories:
+            categories = [
+                code for code, keywords in CATEGORY_KEYWORDS.items()
+                if any(keyword in task_lower for keyword in keywords)
+            ] or list(DEFAULT_CATEGORIES)
+        categories = list(dict.fromkeys(categories))
+
         subtasks = []
-        
-        # 如果需要采集新闻
-        if any(keyword in task_lower for keyword in ['采集', '收集', '获取', '生成日报']):
+
+        if need_collect:
+            collect_names = []
+            for category in categories:
+                subtasks.append({
+                    "name": f"collect:{category}",
+                    "agent": "collector",
+                    "task": {"category": category}
+                })
+                collect_names.append(f"collect:{category}")
+            if news_sources:
+                subtasks.append({
+                    "name": "collect:agent",
+                    "agent": "collector",
+                    "task": {"sources": news_sources}
+                })
+                collect_names.append("collect:agent")
             subtasks.append({
-                "agent": "collector",
-                "task": {"sources": []}
+                "name": "merge",
+                "agent": "merge",
+                "task": {"categories": categories},
+                "deps": collect_names,
+                "allow_partial": True
             })
-        
-        # 如果需要分析
-        if any(keyword in task_lower for keyword in ['分析', '报告', '总结']):
+
+        if need_analyze:
+            analyze_names = []
+            targets = categories if news is None else ['all']
+            for category in targets:
+                subtasks.append({
+                    "name": f"analyze:{category}",
+                    "agent": "analyzer",
+                    "task": {"category": category if news is None else None},
+                    "deps": ["merge"] if need_collect else []
+                })
+                analyze_names.append(f"analyze:{category}")
             subtasks.append({
-                "agent": "analyzer",
-                "task": {"news": [], "analysis_type": "daily"}
+                "name": "aggregate",
+                "agent": "aggregate",
+                "deps": analyze_names,
+                "allow_partial": True
             })
-        
-        # 如果都没有，默认执行采集和分析
-        if not subtasks:
-            subtasks = [
-                {"agent": "collector", "task": {"sources": []}},
-                {"agent": "analyzer", "task": {"news": [], "analysis_type": "daily"}}
-            ]
-        
+
         return subtasks
-    
-    async def _aggregate_results(self, results: Dict) -> Dict:
-        """汇总结果"""
+
+    async def _aggregate_results(self, run: Dict) -> Dict:
+        """汇总结果（部分子任务失败时返回已完成部分）"""
+        results = run["results"]
+        errors = run["errors"]
+
+        merged = results.get('merge') or {}
+        aggregated = results.get('aggregate') or {}
+        analyses = aggregated.get('analysis', {})
+        collection = merged.get('articles', [])
+
+        if not errors:
+            status = "success"
+        elif results:
+            status = "partial"
+        else:
+            status = "failed"
+
+        summary_parts = []
+        if merged:
+            counts = {category: len(items) for category, items in merged.get('by_category', {}).items()}
+            summary_parts.append("采集 " + "，".join(f"{category} {count}条" for category, count in counts.items()))
+        if analyses:
+            summary_parts.append(f"完成 {len(analyses)} 个类别的分析")
+        if errors:
+            summary_parts.append(f"{len(errors)} 个子任务未完成")
+
         return {
-            "status": "success",
-            "results": results,
-            "summary": "任务执行完成"
+            "status": status,
+            "results": {
+                "collection": collection,
+                "collection_by_category": merged.get('by_category', {}),
+                "analysis": analyses
+            },
+            "errors": errors,
+            "trace": run["trace"],
+            "summary": "；".join(summary_parts) or "任务执行完成"
         }
@@ -1,19 +1,27 @@
+import logging
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import SystemMessage
 from typing import List, Dict, Optional
-from app.config import settings
 from app.utils.llm_config import NativeDashScopeLLM
+from app.utils.llm_resilience import LLMError
+from app.utils.model_router import TASK_REPORT
+from app.utils.tracing import span
 from app.tools.text_processor import extract_entities_tool
 from app.tools.data_fetcher import fetch_sports_data_api
+from app.tools.sentiment import score_articles, aggregate_sentiment
+
+logger = logging.getLogger(__name__)
 
 class NewsAnalyzerAgent:
     def __init__(self):
         # 使用原生SDK包装类，保留LangChain Agent的对话管理和上下文处理逻辑
+        # 分析报告是最终点评，使用report任务的模型（大模型）
         self.llm = NativeDashScopeLLM(
-            model=settings.LLM_MODEL,
+            task=TASK_REPORT,
             temperature=0.5,
-            enable_search=True
+            enable_search=True,
+            caller="NewsAnalyzerAgent"
         )
         
         self.tools = [
@@ -138,17 +146,21 @@ class NewsAnalyzerAgent:
                 if progress_callback:
                     await progress_callback(50, "AI模型正在分析新闻内容，请稍候...")
                 
-                result = await self.agent_executor.ainvoke({
-                    "input": instruction,
-                    "chat_history": []
-                })
+                with span("agent.execute", {"agent": "NewsAnalyzerAgent", "agent.articles": len(news_articles)}):
+                    result = await self.agent_executor.ainvoke({
+                        "input": instruction,
+                        "chat_history": []
+                    })
                 output = result.get("output", "")
                 
                 if progress_callback:
                     await progress_callback(70, "AI分析完成，正在处理结果...")
             except Exception as agent_error:
-                # 如果Agent执行失败，直接调用原生SDK生成内容
-                print(f"Agent执行失败，直接调用原生SDK: {str(agent_error)}")
+                # 模型调用本身失败（已按策略重试或已熔断）时再调用一次也不会成功，直接抛出
+                if isinstance(agent_error, LLMError):
+                    raise
+                # Agent执行失败（如工具调用或输出解析出错），直接调用模型生成内容
+                logger.warning("Agent执行失败，直接调用模型: %s", agent_error)
                 if progress_callback:
                     await progress_callback(50, "生成分析报告中...")
                 
@@ -157,7 +169,8 @@ class NewsAnalyzerAgent:
                     SystemMessage(content=self.system_prompt),
                     HumanMessage(content=instruction)
                 ]
-                response = await self.llm.ainvoke(messages)
+                with span("agent.fallback", {"agent": "NewsAnalyzerAgent"}):
+                    response = await self.llm.ainvoke(messages)
                 output = response.content if hasattr(response, 'content') else str(response)
                 
                 if progress_callback:
@@ -166,7 +179,7 @@ class NewsAnalyzerAgent:
             if not output or len(output.strip()) < 100:
                 raise ValueError("LLM返回内容为空或过短")
             
-            print(f"✓ LLM生成内容长度: {len(output)} 字符")
+            logger.info("LLM生成内容长度: %d 字符", len(output))
             
             if progress_callback:
                 await progress_callback(75, "正在解析分析结果...")
@@ -180,8 +193,8 @@ class NewsAnalyzerAgent:
             # 提取更详细的统计信息
             statistics = self._extract_statistics(news_articles)
             
-            # 进行情感分析
-            sentiment_analysis = parsed_result.get("sentiment_analysis", self._analyze_sentiment(output))
+            # 情感分析：汇总每篇文章的词典情感分（不依赖LLM输出）
+            sentiment_analysis = self._analyze_sentiment(news_articles)
             
             if progress_callback:
                 await progress_callback(90, "分析报告生成完成！")
@@ -194,19 +207,13 @@ class NewsAnalyzerAgent:
                 "statistics": statistics,
                 "sentiment_analysis": sentiment_analysis
             }
+        except LLMError as e:
+            # 保留错误类型（额度用完、熔断等），由上层转换为用户提示
+            logger.error("分析新闻时模型调用失败: %s", e)
+            raise
         except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
             error_msg = str(e)
-            
-            # 检查是否是API额度或认证问题
-            if "AllocationQuota" in error_msg or "free tier" in error_msg.lower() or "quota" in error_msg.lower():
-                error_msg = f"API免费额度已用完: {error_msg}"
-            elif "403" in error_msg or "401" in error_msg:
-                error_msg = f"API认证失败: {error_msg}"
-            
-            print(f"✗ 分析新闻时出错: {error_msg}")
-            print(f"错误详情: {error_detail}")
+            logger.exception("分析新闻时出错: %s", error_msg)
             # 抛出异常，让上层处理，而不是返回默认消息
             raise Exception(f"生成分析报告失败: {error_msg}")
     
@@ -261,33 +268,29 @@ class NewsAnalyzerAgent:
             "players": list(players)
         }
     
-    def _analyze_sentiment(self, text: str) -> Dict:
-        """简单的情感分析"""
-        positive_words = ['胜利', '夺冠', '出色', '优秀', '精彩', '成功', '突破', '创造', '刷新', '领先', '优势']
-        negative_words = ['失败', '失利', '伤病', '争议', '问题', '落后', '失误', '遗憾', '困难', '挑战']
-        
-        positive_count = sum(1 for word in positive_words if word in text)
-        negative_count = sum(1 for word in negative_words if word in text)
+    def _analyze_sentiment(self, articles: List[Dict]) -> Dict:
+        """汇总文章情感分（优先使用入库时已计算的分数，缺失的批量补算）"""
+        scores = []
+        missing = []
+        for article in articles:
+            metadata = article.get('metadata') or {}
+            stored = metadata.get('sentiment') if isinstance(metadata, dict) else None
+            scores.append(stored)
+            if not stored:
+                missing.append(len(scores) - 1)
         
-        if positive_count > negative_count:
-            sentiment = "正面"
-        elif negative_count > positive_count:
-            sentiment = "负面"
-        else:
-            sentiment = "中性"
+        if missing:
+            computed = score_articles([articles[i] for i in missing])
+            for index, score in zip(missing, computed):
+                scores[index] = score
         
-        return {
-            "sentiment": sentiment,
-            "positive_score": positive_count,
-            "negative_score": negative_count
-        }
+        return aggregate_sentiment(scores)
     
     def _parse_analysis_output(self, output: str, articles: List[Dict]) -> Dict:
         """解析分析输出，提取结构化内容"""
         result = {
             "summary": "",
-            "content": output,
-            "sentiment_analysis": self._analyze_sentiment(output)
+            "content": output
         }
         
         # 提取摘要：优先提取"今日新闻综述"部分，如果没有则提取前几段
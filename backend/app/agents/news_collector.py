@@ -1,22 +1,29 @@
+import logging
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import SystemMessage
 from typing import List, Dict
 import json
 import re
-from app.config import settings
 from app.utils.llm_config import NativeDashScopeLLM
+from app.utils.model_router import TASK_EXTRACT
+from app.utils.tracing import span
 from app.tools.web_scraper import requests_get_tool, beautifulsoup_parse_tool, check_url_accessible
 from app.tools.text_processor import text_clean_tool, extract_entities_tool
 from app.tools.hupu_scraper import scrape_hupu_news
+from app.tools.dedup import filter_near_duplicates
+
+logger = logging.getLogger(__name__)
 
 class NewsCollectorAgent:
     def __init__(self):
         # 使用原生SDK包装类，保留LangChain Agent的对话管理和上下文处理逻辑
+        # 采集以工具调用和要素提取为主，使用extract任务的模型（较小较快）
         self.llm = NativeDashScopeLLM(
-            model=settings.LLM_MODEL,
+            task=TASK_EXTRACT,
             temperature=0.3,
-            enable_search=True
+            enable_search=True,
+            caller="NewsCollectorAgent"
         )
         
         # 定义工具
@@ -74,10 +81,10 @@ class NewsCollectorAgent:
         try:
             hupu_news = scrape_hupu_news(category="nba", limit=5)
             if hupu_news and len(hupu_news) >= 3:  # 如果成功采集到至少3条，直接返回
-                print(f"✓ 从虎扑成功采集 {len(hupu_news)} 条新闻")
+                logger.info("从虎扑成功采集 %d 条新闻", len(hupu_news))
                 return hupu_news[:5]
         except Exception as e:
-            print(f"虎扑采集失败，尝试使用Agent: {str(e)}")
+            logger.warning("虎扑采集失败，尝试使用Agent: %s", e)
         
         # 如果虎扑采集失败或数量不足，使用Agent作为备用
         if news_sources is None:
@@ -103,26 +110,23 @@ class NewsCollectorAgent:
 """
         
         try:
-            result = await self.agent_executor.ainvoke({
-                "input": instruction,
-                "chat_history": []
-            })
+            with span("agent.execute", {"agent": "NewsCollectorAgent", "agent.sources": len(news_sources or [])}):
+                result = await self.agent_executor.ainvoke({
+                    "input": instruction,
+                    "chat_history": []
+                })
             
             agent_news = self._parse_collection_result(result)
             
-            # 合并虎扑采集和Agent采集的结果
+            # 合并虎扑采集和Agent采集的结果（近似去重）
             if agent_news:
-                seen_titles = {item.get('title', '') for item in hupu_news}
-                for news in agent_news:
-                    if news.get('title') and news.get('title') not in seen_titles:
-                        hupu_news.append(news)
-                        seen_titles.add(news.get('title'))
+                hupu_news = hupu_news + filter_near_duplicates(agent_news, existing=hupu_news)
                 return hupu_news[:5] if hupu_news else agent_news[:5]
             
             # 如果都没有，返回模拟数据
             return self._generate_mock_news()
         except Exception as e:
-            print(f"采集新闻时出错: {str(e)}")
+            logger.warning("采集新闻时出错: %s", e)
             # 如果虎扑有数据，返回虎扑数据，否则返回模拟数据
             return hupu_news[:5] if hupu_news else self._generate_mock_news()
     
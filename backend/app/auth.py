@@ -2,12 +2,13 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.config import settings
-from app.database import get_db
+from app.database import get_read_db
 from app.models.user import User
+from app.utils.logging_config import bind_context
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -83,10 +84,14 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    read_db: Session = Depends(get_read_db)
 ) -> User:
-    """获取当前登录用户"""
+    """
+    获取当前登录用户（在只读会话中查询，不占用主库连接）
+    同时为本次请求的会话标记用户，用于读写分离的读己之写；返回的用户对象属于只读会话，需要修改时在主库会话中重新读取
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
@@ -101,7 +106,10 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    # 同一请求的主库会话和只读会话都从request.state读取粘滞键：主库会话提交写入时记录用户，只读会话据此判断是否回退主库
+    # （在查询用户之前写入，用户刚写入过时这次查询也走主库）
+    request.state.db_sticky_key = username
+    user = read_db.query(User).filter(User.username == username).first()
     if user is None:
         raise credentials_exception
     
@@ -111,6 +119,9 @@ async def get_current_user(
             detail="用户已被禁用"
         )
     
+    # 本次请求后续的日志附带user_id
+    bind_context(user_id=user.id)
+    
     return user
 
 async def get_current_active_user(
@@ -0,0 +1,11 @@
+"""
+离线基准测试
+不访问网络和真实LLM：虎扑采集回放录制的HTML/JSON（fixtures目录），LLM使用确定性的假实现，
+接口通过进程内ASGI客户端访问临时SQLite数据库。输出吞吐量和延迟分位数，可保存为基线并与基线比较。
+
+用法（在backend目录下）：
+    python -m app.bench                                  # 运行全部用例
+    python -m app.bench --suite text --suite scraper     # 只运行指定套件
+    python -m app.bench --save data/bench_baseline.json  # 保存为基线
+    python -m app.bench --baseline data/bench_baseline.json --threshold 0.2  # 与基线比较，退化超过阈值时返回非0
+"""
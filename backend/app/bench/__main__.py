@@ -0,0 +1,102 @@
+"""
+基准测试命令行入口：python -m app.bench
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from typing import List, Optional
+
+
+def prepare_environment(workdir: str):
+    """
+    基准测试使用独立的环境（必须在导入app模块之前设置，配置在导入时读取）
+    临时SQLite数据库、进程内合并（不复用结果文件）、不导出追踪、只输出错误日志、哈希向量化（不下载模型）
+    """
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DB_READ_REPLICA_URLS": "",
+        "VECTOR_INDEX_DIR": os.path.join(workdir, "vector_index"),
+        "EMBEDDING_PROVIDER": "hash",
+        "SINGLE_FLIGHT_DIR": "",
+        "TRACING_EXPORTER": "",
+        "LOG_LEVEL": "ERROR",
+        "LOG_LEVELS": "",
+        "DB_SLOW_QUERY_MS": "0",
+        "AUTO_MIGRATE": "true",
+        "JOB_WORKER_ENABLED": "true",
+        "JOB_POLL_INTERVAL": "0.05",
+        "STARTUP_WARMUP": "false",
+        "LLM_API_KEY": os.environ.get("LLM_API_KEY") or "bench",
+    })
+
+
+async def run(args) -> dict:
+    from app.bench.harness import run_case
+    from app.bench.suites import SUITES
+
+    options = {"llm_latency_ms": args.llm_latency_ms}
+    results = {}
+    for name in args.suite or list(SUITES):
+        async with SUITES[name](options) as cases:
+            for case in cases:
+                if args.case and not any(pattern in case.name for pattern in args.case):
+                    continue
+                results[case.name] = await run_case(case, args.iterations, args.warmup)
+                if not args.json:
+                    print(f"  {case.name} 完成", file=sys.stderr)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="离线基准测试（录制的虎扑响应 + 假LLM + 临时SQLite）")
+    parser.add_argument("--suite", action="append", choices=["scraper", "text", "report", "api"],
+                        help="只运行指定套件（可重复，默认全部）")
+    parser.add_argument("--case", action="append", help="只运行名称包含该字符串的用例（可重复）")
+    parser.add_argument("--iterations", type=int, default=30, help="每个用例的计时次数")
+    parser.add_argument("--warmup", type=int, default=3, help="每个用例的预热次数（不计时）")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="假LLM每次调用的固定延迟（毫秒）")
+    parser.add_argument("--save", help="保存结果到JSON文件（可作为基线）")
+    parser.add_argument("--baseline", help="与基线结果文件比较")
+    parser.add_argument("--threshold", type=float, default=0.25, help="p50延迟超过基线该比例视为退化（默认0.25）")
+    parser.add_argument("--json", action="store_true", help="输出JSON结果")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    prepare_environment(workdir)
+
+    from app.bench.harness import compare, format_results, load_results, save_results
+    from app.utils.logging_config import setup_logging
+
+    setup_logging()
+    # Agent的verbose输出写到标准输出，运行期间转到标准错误（标准输出只保留结果）
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args))
+
+    comparisons = {}
+    if args.baseline:
+        comparisons = compare(results, load_results(args.baseline), args.threshold)
+    if args.save:
+        save_results(args.save, results, {
+            "iterations": args.iterations, "warmup": args.warmup, "llm_latency_ms": args.llm_latency_ms
+        })
+
+    if args.json:
+        print(json.dumps({"cases": results, "comparison": comparisons}, ensure_ascii=False, indent=2))
+    else:
+        print(format_results(results, comparisons))
+        if args.save:
+            print(f"结果已保存: {args.save}")
+
+    regressed = sorted(name for name, item in comparisons.items() if item["regressed"])
+    failed = sorted(name for name, result in results.items() if "error" in result)
+    if regressed:
+        print(f"性能退化（p50超过基线{args.threshold:.0%}）: {', '.join(regressed)}", file=sys.stderr)
+    return 1 if regressed or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""
+基准测试使用的假LLM
+直接使用llm_config中的FakeLLMProvider（确定性输出），调用仍经过call_llm_native，指标和追踪与线上路径一致
+"""
+from contextlib import contextmanager
+
+
+@contextmanager
+def fake_llm(latency_ms: float = 0):
+    """在代码块内使用FakeLLMProvider（不出错、无抖动、直接返回文本），退出后恢复原提供方"""
+    from app.utils import llm_config
+
+    provider = llm_config.FakeLLMProvider(latency_ms=latency_ms, jitter_ms=0, mode="text", error="")
+    previous = llm_config._llm_provider
+    llm_config.set_llm_provider(provider)
+    try:
+        yield provider
+    finally:
+        llm_config.set_llm_provider(previous)
@@ -0,0 +1,77 @@
+"""
+录制的虎扑响应回放
+- fixtures/hupu_api_{类别}.json：API接口（{api_base_url}/news/{类别}）的响应
+- fixtures/hupu_list.html：新闻列表页；fixtures/hupu_detail.html：新闻详情页
+回放期间采集器的HTTP请求直接返回录制内容（不经过网络），用于测量解析和归类本身的耗时
+"""
+import json
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List
+from urllib.parse import urlsplit
+import requests
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_CATEGORIES = ("nba", "cba", "soccer", "esports")
+
+
+@lru_cache(maxsize=None)
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as handle:
+        return handle.read()
+
+
+def fixture_articles() -> List[Dict]:
+    """全部录制的API新闻（title/content/source/category），用于文本处理和分析用例"""
+    articles = []
+    for category in FIXTURE_CATEGORIES:
+        for item in json.loads(load_fixture(f"hupu_api_{category}.json"))["data"]:
+            articles.append({
+                "title": item["title"],
+                "content": item["summary"],
+                "source": item["author"],
+                "category": category,
+                "url": item["url"]
+            })
+    return articles
+
+
+def fixture_name(url: str) -> str:
+    """请求地址对应的录制文件（没有对应文件时返回空字符串，回放为404）"""
+    path = urlsplit(url).path.rstrip("/")
+    if "/news/" in path:
+        name = f"hupu_api_{path.rsplit('/', 1)[-1]}.json"
+        return name if os.path.exists(os.path.join(FIXTURE_DIR, name)) else ""
+    if path.endswith(".html"):
+        return "hupu_detail.html"
+    return "hupu_list.html"
+
+
+def replay_request(method: str, url: str, **kwargs) -> requests.Response:
+    """与http_fetch.timed_request参数一致，返回录制的响应"""
+    response = requests.Response()
+    response.url = url
+    name = fixture_name(url)
+    if not name:
+        response.status_code = 404
+        response._content = b""
+        return response
+    response.status_code = 200
+    response._content = load_fixture(name)
+    response.encoding = "utf-8"
+    response.headers["Content-Type"] = "application/json" if name.endswith(".json") else "text/html; charset=utf-8"
+    return response
+
+
+@contextmanager
+def replay_hupu():
+    """在代码块内让虎扑采集器回放录制的响应"""
+    from app.tools import hupu_scraper
+
+    original = hupu_scraper.timed_request
+    hupu_scraper.timed_request = replay_request
+    try:
+        yield
+    finally:
+        hupu_scraper.timed_request = original
@@ -0,0 +1,149 @@
+"""
+基准测试执行与结果比较
+每个用例先预热再计时，记录每次操作的耗时，汇总吞吐量（ops/s、items/s）和延迟分位数（p50/p90/p99）
+"""
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class BenchCase:
+    """
+    基准用例
+
+    Args:
+        name: 用例名称（套件.用例）
+        func: 被测函数（同步或异步，无参数），每次调用计为一次操作
+        setup: 每次调用前执行的准备函数（同步或异步，不计时）
+        items: 每次操作处理的条目数（用于计算items/s）
+        iterations: 计时次数（默认使用命令行参数）
+    """
+
+    def __init__(self, name: str, func: Callable, setup: Optional[Callable] = None,
+                 items: int = 1, iterations: Optional[int] = None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.items = items
+        self.iterations = iterations
+
+
+async def _call(func: Callable):
+    result = func()
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """线性插值分位数（sorted_values已排序，q取0-100）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(case: BenchCase, timings: List[float]) -> Dict:
+    """耗时列表（秒）汇总为结果（毫秒）"""
+    values = sorted(timings)
+    total = sum(values)
+    return {
+        "iterations": len(values),
+        "items": case.items,
+        "ops_per_s": round(len(values) / total, 2) if total else 0.0,
+        "items_per_s": round(len(values) * case.items / total, 2) if total else 0.0,
+        "mean_ms": round(total / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0
+    }
+
+
+async def run_case(case: BenchCase, iterations: int, warmup: int) -> Dict:
+    """执行一个用例（失败时结果中带error，不中断其他用例）"""
+    iterations = case.iterations or iterations
+    timings = []
+    try:
+        for index in range(warmup + iterations):
+            if case.setup is not None:
+                await _call(case.setup)
+            started = time.perf_counter()
+            await _call(case.func)
+            elapsed = time.perf_counter() - started
+            if index >= warmup:
+                timings.append(elapsed)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", **(summarize(case, timings) if timings else {})}
+    return summarize(case, timings)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> Dict[str, Dict]:
+    """
+    与基线比较（按p50延迟和吞吐量）
+
+    Returns:
+        用例名称 -> {"p50_change", "ops_change", "regressed"}（变化为相对基线的比例，正数表示变慢/变快）
+    """
+    comparisons = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "error" in result or "error" in base or not base.get("p50_ms") or not base.get("ops_per_s"):
+            continue
+        p50_change = result["p50_ms"] / base["p50_ms"] - 1
+        ops_change = result["ops_per_s"] / base["ops_per_s"] - 1
+        comparisons[name] = {
+            "p50_change": round(p50_change, 4),
+            "ops_change": round(ops_change, 4),
+            "regressed": p50_change > threshold
+        }
+    return comparisons
+
+
+def format_results(results: Dict[str, Dict], comparisons: Optional[Dict[str, Dict]] = None) -> str:
+    """生成结果表格"""
+    comparisons = comparisons or {}
+    header = f"{'用例':<34}{'次数':>6}{'ops/s':>11}{'items/s':>11}{'p50(ms)':>11}{'p90(ms)':>11}{'p99(ms)':>11}  对比基线"
+    lines = [header, "-" * len(header)]
+    for name, result in results.items():
+        if "error" in result:
+            lines.append(f"{name:<34}  失败: {result['error']}")
+            continue
+        note = ""
+        if name in comparisons:
+            item = comparisons[name]
+            note = f"p50 {item['p50_change']:+.1%}" + ("  ✗ 退化" if item["regressed"] else "")
+        lines.append(
+            f"{name:<34}{result['iterations']:>6}{result['ops_per_s']:>11.1f}{result['items_per_s']:>11.1f}"
+            f"{result['p50_ms']:>11.2f}{result['p90_ms']:>11.2f}{result['p99_ms']:>11.2f}  {note}"
+        )
+    return "\n".join(lines)
+
+
+def save_results(path: str, results: Dict[str, Dict], options: Dict):
+    """保存结果（可作为之后比较的基线）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "options": options,
+        "cases": results
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Dict]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle).get("cases", {})
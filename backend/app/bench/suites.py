@@ -0,0 +1,149 @@
+"""
+基准套件
+每个套件是一个异步上下文管理器：进入时完成准备（回放、假LLM、测试数据库等），产出用例列表，退出时清理
+- scraper：虎扑API/网页解析、详情页解析、采集便捷函数（回放录制响应）
+- text：内容归类、实体提取、新闻格式化、摘要提取
+- report：分析Agent生成报告、多类别日报流程（假LLM）
+- api：进程内ASGI客户端访问主要接口（临时SQLite数据库 + 进程内任务worker）
+"""
+import json
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, List
+from app.bench.fake_llm import fake_llm
+from app.bench.fixtures import FIXTURE_CATEGORIES, fixture_articles, replay_hupu
+from app.bench.harness import BenchCase
+
+DETAIL_URL = "https://bbs.hupu.com/60000001.html"
+
+
+@asynccontextmanager
+async def scraper_suite(options: Dict) -> AsyncIterator[List[BenchCase]]:
+    from app.tools.hupu_scraper import HupuScraper, scrape_hupu_news
+
+    scraper = HupuScraper()
+    with replay_hupu():
+        yield [
+            BenchCase("scraper.api_parse", lambda: [scraper.get_news_from_api(category, limit=20) for category in FIXTURE_CATEGORIES],
+                      items=20 * len(FIXTURE_CATEGORIES)),
+            BenchCase("scraper.html_list_parse", lambda: scraper.get_news_list("nba", limit=40, use_api=False), items=40),
+            BenchCase("scraper.html_detail_parse", lambda: scraper.get_news_detail(DETAIL_URL)),
+            BenchCase("scraper.scrape_hupu_news", lambda: scrape_hupu_news("nba", limit=10), items=10),
+        ]
+
+
+@asynccontextmanager
+async def text_suite(options: Dict) -> AsyncIterator[List[BenchCase]]:
+    from app.tools.hupu_scraper import detect_category_from_content
+    from app.tools.text_processor import extract_entities_tool
+    from app.agents.news_analyzer import NewsAnalyzerAgent
+    from app.utils.llm_config import FakeLLMProvider
+
+    articles = fixture_articles()
+    analyzer = NewsAnalyzerAgent()
+    report = FakeLLMProvider.report([article["title"] for article in articles[:10]])
+    yield [
+        BenchCase("text.detect_category",
+                  lambda: [detect_category_from_content(article["title"], article["content"]) for article in articles],
+                  items=len(articles)),
+        BenchCase("text.extract_entities",
+                  lambda: [extract_entities_tool.invoke(article["title"] + "\n" + article["content"]) for article in articles],
+                  items=len(articles)),
+        BenchCase("text.format_news", lambda: analyzer._format_news(articles), items=len(articles)),
+        BenchCase("text.extract_summary", lambda: analyzer._extract_summary(report)),
+    ]
+
+
+@asynccontextmanager
+async def report_suite(options: Dict) -> AsyncIterator[List[BenchCase]]:
+    from app.agents.news_analyzer import NewsAnalyzerAgent
+    from app.services.digest import analyze_sections, build_digest_content, collect_digest_news
+
+    articles = fixture_articles()[:10]
+    category_limits = {"nba": 5, "soccer": 5}
+
+    async def digest():
+        sections = await collect_digest_news(category_limits)
+        result = await analyze_sections(sections)
+        return build_digest_content(sections, result["analysis"], result["errors"])
+
+    with replay_hupu(), fake_llm(options["llm_latency_ms"]):
+        yield [
+            BenchCase("report.analyze_news", lambda: NewsAnalyzerAgent().analyze_news(articles, "daily"), items=len(articles)),
+            BenchCase("report.digest_pipeline", digest, items=sum(category_limits.values())),
+        ]
+
+
+@asynccontextmanager
+async def api_suite(options: Dict) -> AsyncIterator[List[BenchCase]]:
+    import httpx
+    from app.main import app
+
+    async with AsyncExitStack() as stack:
+        stack.enter_context(replay_hupu())
+        stack.enter_context(fake_llm(options["llm_latency_ms"]))
+        # 启动事件：自动迁移临时数据库并启动进程内任务worker
+        await stack.enter_async_context(app.router.lifespan_context(app))
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        )
+
+        account = {"username": "bench", "email": "bench@example.com", "password": "bench-password"}
+        response = await client.post("/api/auth/register", json=account)
+        if response.status_code not in (200, 201, 400):
+            response.raise_for_status()
+        response = await client.post("/api/auth/login", json={"username": account["username"], "password": account["password"]})
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        # 准备数据：先生成一次多类别日报，列表/详情/检索用例使用这些新闻
+        response = await client.post("/api/news/generate-daily", json={"categories": {"nba": 10, "soccer": 10}})
+        response.raise_for_status()
+        news_id = response.json()[0]["id"]
+
+        async def request(method: str, url: str, **kwargs):
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+
+        async def analyze():
+            """分析请求的SSE流读到成功/失败事件为止（任务完成即结束）"""
+            async with client.stream("POST", "/api/report/analyze") as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    if event.get("status") == "error":
+                        raise RuntimeError(event.get("error") or event.get("message"))
+                    if event.get("status") == "success":
+                        return event
+
+        async def reset_processed():
+            """分析只处理未分析过的新闻：每次分析前重置标记（不计时）"""
+            from sqlalchemy import update
+            from app.database import SessionLocal
+            from app.models.news import NewsArticle
+
+            with SessionLocal() as db:
+                db.execute(update(NewsArticle).values(processed=0))
+                db.commit()
+
+        yield [
+            BenchCase("api.generate_daily",
+                      lambda: request("POST", "/api/news/generate-daily", json={"categories": {"nba": 5, "soccer": 5}}), items=10),
+            BenchCase("api.news_list", lambda: request("GET", "/api/news/list")),
+            BenchCase("api.news_detail", lambda: request("GET", f"/api/news/{news_id}")),
+            BenchCase("api.report_analyze", analyze, setup=reset_processed),
+            BenchCase("api.report_list", lambda: request("GET", "/api/report/list")),
+            BenchCase("api.dashboard_stats", lambda: request("GET", "/api/dashboard/stats")),
+            BenchCase("api.search", lambda: request("GET", "/api/search", params={"q": "湖人"})),
+            BenchCase("api.chat_message", lambda: request("POST", "/api/chat/message", json={"message": "湖人最近状态怎么样？"})),
+        ]
+
+
+SUITES = {
+    "scraper": scraper_suite,
+    "text": text_suite,
+    "report": report_suite,
+    "api": api_suite,
+}
@@ -8,6 +8,19 @@ class Settings(BaseSettings):
     MYSQL_USER: str = "root"
     MYSQL_PASSWORD: str = ""  # 从环境变量读取，不要硬编码
     MYSQL_DATABASE: str = "sports_analysis"
+    DATABASE_URL: str = ""  # 完整连接URL，设置后覆盖上面的MySQL配置（如sqlite:///./dev.db）
+    DB_READ_REPLICA_URLS: str = ""  # 只读从库连接URL，多个用逗号分隔
+    DB_REPLICA_HEALTH_INTERVAL: int = 10  # 从库健康检查间隔（秒）
+    DB_REPLICA_STICKY_SECONDS: int = 5  # 用户写入后该时间内读请求仍走主库（应大于主从复制延迟）
+    
+    # 数据库连接池配置
+    DB_POOL_SIZE: int = 10  # 常驻连接数（每个worker进程）
+    DB_MAX_OVERFLOW: int = 20  # 高峰期允许额外创建的连接数
+    DB_POOL_TIMEOUT: int = 30  # 等待空闲连接的超时时间（秒）
+    DB_POOL_RECYCLE: int = 3600  # 连接最长使用时间（秒），需小于MySQL wait_timeout
+    DB_ECHO: bool = False  # 是否记录全部SQL（sqlalchemy.engine日志设为INFO，仅调试时开启）
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 语句超时（毫秒，0表示不限制；MySQL仅对SELECT生效）
+    DB_SLOW_QUERY_MS: int = 500  # 慢查询阈值（毫秒，0表示不记录）
     
     # LLM配置
     # 注意：LangChain会自动在base_url后添加/chat/completions
@@ -16,11 +29,106 @@ class Settings(BaseSettings):
     LLM_API_URL: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
     LLM_API_KEY: str = ""  # 从环境变量读取，不要硬编码
     LLM_MODEL: str = "qwen3-max"
+    LLM_PROVIDER: str = "dashscope"  # dashscope：DashScope原生SDK；dashscope_http：OpenAI兼容接口（LLM_API_URL，异步调用不占用线程，需显式开启）；fake：本地确定性假模型（压测和CI使用，不访问网络、不消耗额度）
+    LLM_HTTP_MAX_CONNECTIONS: int = 200  # dashscope_http连接池的最大连接数（即同时进行的LLM调用上限）
+    LLM_HTTP_MAX_KEEPALIVE: int = 20  # 空闲时保持的连接数
+    LLM_CONNECT_TIMEOUT: float = 10  # 建立连接超时（秒）
+    LLM_READ_TIMEOUT: float = 120  # 等待响应数据超时（秒；非流式调用为整个生成耗时，流式调用为分片间隔）
+    LLM_TASK_MODELS: str = "chat=qwen-plus,extract=qwen-turbo|qwen-plus"  # 按任务选择模型（逗号分隔的 任务=模型，|后为备选模型；任务：chat聊天、extract采集和要素提取、report分析报告；未配置的任务使用LLM_MODEL，LLM_MODEL也是所有任务最后的备选）
+    LLM_MODEL_PRICES: str = "qwen3-max=0.006/0.024,qwen-plus=0.0008/0.002,qwen-turbo=0.0003/0.0006"  # 估算费用用的单价（元/千token，输入/输出，以控制台价格为准；未配置的模型不统计费用）
+    LLM_CALL_DEADLINE: float = 300  # 一次LLM调用（含重试）的总期限（秒）
+    LLM_MAX_RETRIES: int = 2  # 限流、服务端错误、超时、连接失败的最多重试次数
+    LLM_RETRY_BASE_DELAY: float = 1.0  # 重试退避的基准等待（秒，每次翻倍，实际等待在0到该值之间随机）
+    LLM_RETRY_MAX_DELAY: float = 10.0  # 单次重试的最长等待（秒）
+    LLM_BREAKER_FAILURES: int = 5  # 连续失败多少次后熔断（按提供方和模型）
+    LLM_BREAKER_RESET_SECONDS: float = 30  # 熔断持续时间（秒），到期后放行一个试探请求
+    LLM_QUOTA_COOLDOWN: float = 300  # 额度用完时的熔断持续时间（秒，可通过内部接口手动恢复）
+    LLM_CHAT_DEADLINE: float = 90  # 聊天调用的期限（秒）
+    LLM_CHAT_HEDGE_DELAY: float = 20  # 聊天调用超过该时间未返回时发起对冲请求（秒，0表示不对冲；对冲会增加调用量）
+    LLM_FAKE_LATENCY_MS: float = 0  # fake模式每次调用的延迟（毫秒）
+    LLM_FAKE_JITTER_MS: float = 0  # fake模式的延迟抖动上限（毫秒，按输入内容确定）
+    LLM_FAKE_MODE: str = "text"  # text：直接返回文本；tool_call：绑定了工具时第一轮先返回工具调用
+    LLM_FAKE_ERROR: str = ""  # 模拟错误：quota（额度用完）、throttle（限流）、server（服务端错误）、timeout（超时），为空时不出错
+    LLM_FAKE_ERROR_RATE: float = 1.0  # 配置LLM_FAKE_ERROR时出错的调用比例（按LLM_FAKE_SEED生成的确定序列）
+    LLM_FAKE_STREAM_CHUNK: int = 20  # 流式输出每个分片的字符数
+    LLM_FAKE_SEED: int = 0
     
     # 应用配置
     SECRET_KEY: str = ""  # 从环境变量读取，不要硬编码
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    INTERNAL_API_TOKEN: str = ""  # 内部监控接口的访问令牌（请求头X-Internal-Token），为空时关闭内部接口
+    METRICS_ENABLED: bool = True  # 记录请求级指标（Prometheus格式，GET /api/internal/metrics）
+    TRACING_EXPORTER: str = ""  # 链路追踪导出：空=只生成trace_id不记录span，console，file，otlp（需安装opentelemetry-sdk）
+    TRACING_FILE: str = "data/traces.jsonl"  # TRACING_EXPORTER=file时的输出文件（每行一个span）
+    TRACING_SAMPLE_RATE: float = 1.0  # 采样比例（按请求/任务整条链路采样）
+    PROFILING_ENABLED: bool = False  # 按请求剖析（请求头X-Profile携带INTERNAL_API_TOKEN，或按比例采样），结果通过/api/internal/profiles下载
+    PROFILING_MODE: str = "cprofile"  # cprofile：确定性剖析（事件循环线程）；sampling：定时采样全部线程的调用栈
+    PROFILING_SAMPLE_RATE: float = 0.0  # 随机剖析的请求比例（0表示只剖析携带请求头的请求）
+    PROFILING_ROUTES: str = ""  # 随机剖析只针对这些路由模板（逗号分隔，如 /api/report/analyze），为空时不限
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5  # sampling模式的采样间隔（毫秒）
+    PROFILING_TRACEMALLOC: bool = True  # 同时记录请求期间的内存分配（tracemalloc）
+    PROFILING_TRACEMALLOC_FRAMES: int = 1  # 每次分配记录的调用栈深度（按代码行汇总只需1层，越深开销越大）
+    PROFILING_TOP_ALLOCATIONS: int = 30  # 分配报告中列出的代码行数
+    PROFILING_DIR: str = "data/profiles"  # 剖析结果目录
+    PROFILING_MAX_PROFILES: int = 100  # 最多保留的剖析结果数（超过时删除最旧的）
+    
+    # 日志配置
+    LOG_LEVEL: str = "INFO"  # 根日志级别
+    LOG_LEVELS: str = ""  # 按模块设置级别（逗号分隔，如 app.tools.hupu_scraper=WARNING,sqlalchemy.engine=INFO）
+    LOG_FORMAT: str = "json"  # json（每行一个JSON对象）或text（本地调试）
+    LOG_QUEUE_SIZE: int = 10000  # 日志队列长度（由后台线程写出，队列满时丢弃）
+    LOG_SAMPLE_BURST: int = 5  # 高频日志（如逐条解析失败）每个窗口内最多输出的条数
+    LOG_SAMPLE_INTERVAL: float = 60  # 高频日志采样窗口（秒）
+    
+    # 虎扑采集地址（压测时指向本地录制数据服务：python -m app.loadtest.fixture_server）
+    HUPU_BASE_URL: str = "https://www.hupu.com"  # 网页版（新闻列表页）
+    HUPU_MOBILE_BASE_URL: str = "https://m.hupu.com"  # 网页版不可用时使用的移动版
+    HUPU_API_BASE_URL: str = "https://bbs.hupu.com/v1"  # API接口
+    
+    # 新闻去重配置
+    DEDUP_SIMILARITY_THRESHOLD: float = 0.5  # 估计Jaccard相似度不低于该值视为近似重复
+    DEDUP_WINDOW_DAYS: int = 7  # 只与最近N天入库的文章比较
+    
+    # 全文检索配置
+    SEARCH_MAX_INDEX_CHARS: int = 5000  # 每个文档最多索引的正文字符数
+    SEARCH_TITLE_WEIGHT: int = 3  # 标题词频权重
+    
+    # 向量检索配置
+    EMBEDDING_PROVIDER: str = "hash"  # hash：本地确定性向量化；dashscope：DashScope向量模型
+    EMBEDDING_MODEL: str = "text-embedding-v2"  # dashscope模式使用的模型
+    EMBEDDING_DIM: int = 256  # hash模式的向量维度
+    VECTOR_INDEX_DIR: str = "data/vector_index"  # 向量索引存储目录
+    CHAT_RETRIEVAL_TOP_K: int = 4  # 对话时注入的本地资料条数
+    CHAT_RETRIEVAL_MIN_SCORE: float = 0.3  # 低于该相似度的资料不注入
+    CHAT_SKIP_SEARCH_SCORE: float = 0.6  # 最高相似度达到该值时跳过联网搜索
+    
+    # 后台任务配置
+    JOB_WORKER_ENABLED: bool = True  # API进程内运行任务worker（单独部署python -m app.services.job_worker时关闭）
+    JOB_WORKER_CONCURRENCY: int = 2  # 每个worker并发执行的任务数
+    JOB_POLL_INTERVAL: float = 2.0  # worker没有任务时的轮询间隔（秒）
+    JOB_LEASE_SECONDS: int = 60  # 任务租约时长（秒），worker中断后超过该时间任务可被重新认领
+    JOB_MAX_ATTEMPTS: int = 2  # worker中断后任务最多执行次数
+    JOB_STREAM_POLL_INTERVAL: float = 1.0  # 任务由其他进程的worker执行时，SSE接口读取任务状态的间隔（秒，每个任务一个读取协程）
+    
+    # 进度推送（SSE）配置
+    SSE_HEARTBEAT_SECONDS: float = 15  # 没有新进度时发送心跳的间隔（秒）
+    PROGRESS_BUFFER_SIZE: int = 64  # 每个操作保留的最近进度事件数（用于Last-Event-ID断线续传）
+    PROGRESS_RETENTION_SECONDS: float = 300  # 操作结束或无人订阅后进度通道的保留时间（秒）
+    
+    # 相同请求合并配置（并发的相同采集/分析只执行一次）
+    SINGLE_FLIGHT_DIR: str = "data/single_flight"  # 跨进程合并使用的锁文件和结果文件目录（为空时只在进程内合并）
+    SINGLE_FLIGHT_RESULT_TTL: float = 30  # 刚完成的结果在该时间内（秒）直接复用
+    SINGLE_FLIGHT_WAIT_TIMEOUT: float = 900  # 等待其他进程执行的最长时间（秒），超时后自行执行
+    ANALYSIS_RESULT_TTL: float = 1800  # 相同文章集合的LLM分析结果复用时间（秒，需配置SINGLE_FLIGHT_DIR）
+    
+    # 多Agent协作配置
+    COORDINATOR_MAX_PARALLEL: int = 4  # 同时执行的子任务数上限
+    COORDINATOR_NODE_TIMEOUT: float = 180  # 单个子任务超时时间（秒），超时的子任务记为失败，其余结果照常返回
+    
+    # 启动配置
+    STARTUP_WARMUP: bool = True  # 启动后在后台线程预先导入Agent等耗时模块
+    AUTO_MIGRATE: bool = False  # 启动时自动执行数据库迁移（仅建议开发环境开启，生产环境使用python -m app.migrations）
     
     class Config:
         env_file = ".env"
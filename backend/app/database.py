@@ -1,23 +1,267 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
+from app.utils.db_metrics import InstrumentedQueuePool, instrument_engine
+from app.utils.tracing import instrument_engine_tracing, instrument_session_tracing
 
-# MySQL连接URL
-DATABASE_URL = f"mysql+pymysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}?charset=utf8mb4"
+logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=True
+# 数据库连接URL（设置DATABASE_URL时优先使用，便于切换测试库）
+DATABASE_URL = settings.DATABASE_URL or (
+    f"mysql+pymysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}?charset=utf8mb4"
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def create_db_engine(url: str, name: str) -> Engine:
+    """
+    按配置创建数据库引擎（带连接池统计和慢查询日志）
+
+    Args:
+        url: 数据库连接URL
+        name: 引擎名称（用于监控接口区分主库/从库）
+    """
+    # DB_ECHO通过日志配置开启sqlalchemy.engine日志（不使用echo参数自带的同步输出）
+    kwargs = {"pool_pre_ping": True}
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    if is_sqlite and parsed.database in (None, "", ":memory:"):
+        # 内存SQLite使用默认的单连接池
+        pass
+    else:
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE
+        )
+        if is_sqlite:
+            kwargs["connect_args"] = {"check_same_thread": False}
+    engine = create_engine(url, **kwargs)
+    instrument_engine_tracing(engine, name)
+    return instrument_engine(
+        engine,
+        name,
+        slow_query_ms=settings.DB_SLOW_QUERY_MS,
+        statement_timeout_ms=settings.DB_STATEMENT_TIMEOUT_MS
+    )
+
+
+class ReplicaRouter:
+    """
+    只读从库路由
+    - 多个从库轮询分配；健康检查由后台线程每health_interval秒执行一次（请求路径上只读取缓存的结果），
+      连接断开时立即摘除，全部不可用时回退主库
+    - 读己之写：用户写入主库后的一段时间内（覆盖主从复制延迟），该用户的读请求仍走主库
+      （写入记录保存在进程内，多worker部署时只对同一进程内的后续请求生效，见README"读写分离"）
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine],
+                 health_interval: float = 10.0, sticky_seconds: float = 5.0):
+        self.primary = primary
+        self.replicas = replicas
+        self.health_interval = health_interval
+        self.sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        # 从库健康状态：下标 -> (是否可用, 检查时间)
+        self._health: Dict[int, tuple] = {}
+        # 最近写入时间：粘滞键（用户名） -> 时间
+        self._last_write: Dict[object, float] = {}
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        for index, replica in enumerate(replicas):
+            self._watch_disconnects(index, replica)
+
+    def _watch_disconnects(self, index: int, replica: Engine):
+        """从库连接断开时立即标记为不可用（等待下次健康检查恢复）"""
+        @event.listens_for(replica, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.mark_unhealthy(index)
+
+    def mark_unhealthy(self, index: int):
+        with self._lock:
+            self._health[index] = (False, time.monotonic())
+
+    def probe(self, index: int) -> bool:
+        """连接从库检查是否可用并缓存结果（后台线程调用，不在请求路径上执行）"""
+        try:
+            with self.replicas[index].connect() as conn:
+                conn.execute(text("SELECT 1"))
+            healthy = True
+        except Exception as e:
+            logger.warning("从库 replica-%s 不可用: %s", index, e)
+            healthy = False
+        with self._lock:
+            self._health[index] = (healthy, time.monotonic())
+        return healthy
+
+    def probe_all(self):
+        for index in range(len(self.replicas)):
+            self.probe(index)
+
+    def start_monitor(self, probe_now: bool = True):
+        """
+        启动后台健康检查线程（应用启动时调用；probe_now为True时先在当前线程检查一次）
+        未启动时首次选择从库会自动启动（不等待检查结果）
+        """
+        with self._lock:
+            if not self.replicas or self._monitor is not None:
+                return
+            self._stop.clear()
+            self._monitor = threading.Thread(target=self._run_monitor, name="replica-health", daemon=True)
+        if probe_now:
+            self.probe_all()
+        self._monitor.start()
+
+    def stop_monitor(self):
+        with self._lock:
+            monitor, self._monitor = self._monitor, None
+        if monitor is not None:
+            self._stop.set()
+            monitor.join(timeout=5)
+
+    def _run_monitor(self):
+        while not self._stop.wait(self.health_interval):
+            self.probe_all()
+
+    def _check(self, index: int) -> bool:
+        """从库是否可用（读取后台检查缓存的结果；还没有检查过的从库视为可用，连接失败时会立即摘除）"""
+        with self._lock:
+            healthy, _ = self._health.get(index, (None, 0.0))
+        return healthy is not False
+
+    def mark_write(self, key):
+        """记录用户写入主库的时间"""
+        if key is None or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[key] = now
+            # 顺带清理过期记录，避免字典无限增长
+            if len(self._last_write) > 10000:
+                self._last_write = {
+                    k: t for k, t in self._last_write.items() if now - t < self.sticky_seconds
+                }
+
+    def is_sticky(self, key) -> bool:
+        """该用户是否刚写入过主库（读请求需要走主库）"""
+        if key is None:
+            return False
+        with self._lock:
+            written_at = self._last_write.get(key)
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+    def read_engine(self, sticky_key=None) -> Engine:
+        """选择读请求使用的引擎"""
+        if not self.replicas or self.is_sticky(sticky_key):
+            return self.primary
+        if self._monitor is None:
+            self.start_monitor(probe_now=False)
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                index = next(self._cycle)
+            if self._check(index):
+                return self.replicas[index]
+        return self.primary
+
+    def status(self) -> List[Dict]:
+        """从库健康状态（监控使用）"""
+        with self._lock:
+            return [
+                {"name": f"replica-{index}", "healthy": self._health.get(index, (None, 0.0))[0]}
+                for index in range(len(self.replicas))
+            ]
+
+
+def _sticky_key(session: Session):
+    """
+    会话的读己之写粘滞键（用户名）：info["sticky_key"]，或请求依赖创建的会话从request.state.db_sticky_key读取
+    （认证依赖在查询用户前写入，依赖的解析顺序与此无关）
+    """
+    key = session.info.get("sticky_key")
+    if key is None and session.info.get("request_state") is not None:
+        key = getattr(session.info["request_state"], "db_sticky_key", None)
+    return key
+
+
+class RoutingSession(Session):
+    """
+    支持读写分离的会话
+    info["read_only"]为True时查询路由到从库（会话内固定使用同一个引擎，保证读一致性）；
+    刷新写入时始终使用主库
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("read_only") and not self._flushing:
+            bind = self.info.get("read_bind")
+            if bind is None:
+                bind = replica_router.read_engine(_sticky_key(self))
+                self.info["read_bind"] = bind
+            return bind
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+engine = create_db_engine(DATABASE_URL, "primary")
+
+replica_router = ReplicaRouter(
+    engine,
+    [
+        create_db_engine(url.strip(), f"replica-{index}")
+        for index, url in enumerate(u for u in settings.DB_READ_REPLICA_URLS.split(",") if u.strip())
+    ],
+    health_interval=settings.DB_REPLICA_HEALTH_INTERVAL,
+    sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS
+)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+instrument_session_tracing(RoutingSession)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_writes(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_sticky(session):
+    """提交了写入的会话，记录该用户的写入时间（读己之写）"""
+    if session.info.pop("has_writes", False):
+        replica_router.mark_write(_sticky_key(session))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _clear_writes(session):
+    session.info.pop("has_writes", None)
+
+
+def get_db(request: Request):
+    """主库会话（读写），只在需要写入的接口中使用；提交写入时记录当前用户（读己之写）"""
+    db = SessionLocal(info={"request_state": request.state})
+    try:
+        yield db
+    finally:
+        db.close()
+
 
-def get_db():
-    db = SessionLocal()
+def get_read_db(request: Request):
+    """
+    只读会话（配置了从库时路由到从库）
+    用于只读接口和认证依赖的用户查询；用户刚写入过时自动回退主库
+    （会话在首次查询时才选择引擎，未查询的只读会话不会占用连接）
+    """
+    db = SessionLocal(info={"read_only": True, "request_state": request.state})
     try:
         yield db
     finally:
@@ -0,0 +1,12 @@
+"""
+HTTP接口压测
+按场景模拟多个用户（登录、仪表板、新闻列表/详情、检索、聊天、生成日报、SSE分析报告），
+默认在本地启动应用（假LLM、临时SQLite）和虎扑录制数据服务，输出每个接口的延迟分位数、错误率和吞吐量。
+
+用法（在backend目录下）：
+    python -m app.loadtest --users 20 --duration 60                 # 启动本地应用并压测
+    python -m app.loadtest --scenario llm --llm-latency-ms 3000     # 以聊天和报告生成为主
+    python -m app.loadtest --mix dashboard=50,chat=50 --max-p95-ms 2000
+    python -m app.loadtest --base-url http://127.0.0.1:8000         # 压测已启动的应用
+    python -m app.loadtest --in-process --users 5 --duration 10     # 不需要uvicorn（CI）
+"""
@@ -0,0 +1,229 @@
+"""
+压测命令行入口：python -m app.loadtest
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def app_environment(workdir: str, fixture_env: Dict[str, str], args) -> Dict[str, str]:
+    """被测应用的配置：假LLM、虎扑地址指向录制数据服务、独立的数据库和数据目录"""
+    env = {
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "DB_READ_REPLICA_URLS": "",
+        "AUTO_MIGRATE": "true",
+        "VECTOR_INDEX_DIR": os.path.join(workdir, "vector_index"),
+        "SINGLE_FLIGHT_DIR": os.path.join(workdir, "single_flight"),
+        "EMBEDDING_PROVIDER": "hash",
+        "LLM_PROVIDER": "fake",
+        "LLM_FAKE_LATENCY_MS": str(args.llm_latency_ms),
+        "LLM_FAKE_JITTER_MS": str(args.llm_jitter_ms),
+        "LLM_FAKE_ERROR": args.llm_error,
+        "LLM_FAKE_ERROR_RATE": str(args.llm_error_rate),
+        "JOB_WORKER_ENABLED": "true",
+        "JOB_POLL_INTERVAL": "0.2",
+        "STARTUP_WARMUP": "true",
+        "LOG_LEVEL": "WARNING",
+        "SECRET_KEY": os.environ.get("SECRET_KEY") or "loadtest-secret-key",
+        **fixture_env,
+    }
+    return env
+
+
+def _setup_logging():
+    from app.utils.logging_config import setup_logging
+    setup_logging()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_healthy(client, timeout: float, process: subprocess.Popen, log_path: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(log_path, encoding="utf-8", errors="replace") as handle:
+                output = handle.read()[-2000:]
+            raise RuntimeError(f"应用启动失败（退出码 {process.returncode}）:\n{output}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("等待应用启动超时")
+
+
+async def run(args) -> Dict:
+    import httpx
+    from app.loadtest.fixture_server import FixtureServer
+    from app.loadtest.scenarios import SCENARIOS, LoadStats, VirtualUser, parse_mix
+
+    mix = parse_mix(args.mix) if args.mix else SCENARIOS[args.scenario]
+    limits = httpx.Limits(max_connections=args.users * 2 + 10, max_keepalive_connections=args.users * 2 + 10)
+
+    async with AsyncExitStack() as stack:
+        if not args.in_process or args.base_url:
+            _setup_logging()
+        if args.base_url:
+            # 使用已启动的应用（应用需自行配置LLM_PROVIDER=fake和HUPU_*地址）
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits)
+            )
+        else:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="loadtest_"))
+            fixtures = stack.enter_context(FixtureServer(delay_ms=args.scrape_delay_ms))
+            env = app_environment(workdir, fixtures.environment(), args)
+            if args.in_process:
+                # 进程内ASGI（无需uvicorn，客户端与应用共用事件循环，延迟偏乐观）
+                # 配置在导入时读取：先设置环境变量再导入应用
+                os.environ.update(env)
+                _setup_logging()
+                from app.main import app
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                transport = httpx.ASGITransport(app=app)
+                client = await stack.enter_async_context(
+                    httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+                )
+            else:
+                port = _free_port()
+                log_path = os.path.join(workdir, "app.log")
+                log = stack.enter_context(open(log_path, "wb"))
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                     "--workers", str(args.app_workers), "--log-level", "warning"],
+                    cwd=BACKEND_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT
+                )
+                stack.callback(_stop_process, process)
+                client = await stack.enter_async_context(
+                    httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits)
+                )
+                await _wait_healthy(client, 60, process, log_path)
+
+        stats = LoadStats()
+        run_id = uuid.uuid4().hex[:6]
+        deadline = time.perf_counter() + args.ramp_up + args.duration
+        users = [
+            VirtualUser(client, stats, index, mix, args.think_time, args.actions_per_session, run_id, args.seed)
+            for index in range(args.users)
+        ]
+
+        async def start_user(user: VirtualUser, delay: float):
+            await asyncio.sleep(delay)
+            await user.run(deadline)
+
+        # 用户在ramp_up时间内均匀启动；到达deadline后不再发起新操作，进行中的请求最多等待timeout
+        tasks = [
+            asyncio.create_task(start_user(user, args.ramp_up * index / max(1, args.users)))
+            for index, user in enumerate(users)
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=args.ramp_up + args.duration + args.timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        stats.stop()
+
+    return {
+        "options": {
+            "users": args.users, "duration": args.duration, "ramp_up": args.ramp_up, "think_time": args.think_time,
+            "mix": mix, "llm_latency_ms": args.llm_latency_ms, "target": args.base_url or ("in-process" if args.in_process else "uvicorn")
+        },
+        "duration": round(stats.duration, 2),
+        "endpoints": stats.summary()
+    }
+
+
+def _stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.loadtest.scenarios import ACTIONS, SCENARIOS
+
+    parser = argparse.ArgumentParser(description="HTTP接口压测（假LLM + 本地虎扑录制数据服务）")
+    parser.add_argument("--users", type=int, default=10, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=60, help="全部用户启动后的持续时间（秒）")
+    parser.add_argument("--ramp-up", type=float, default=5, help="用户逐步启动的时间（秒）")
+    parser.add_argument("--think-time", type=float, default=1.0, help="操作之间的平均思考时间（秒）")
+    parser.add_argument("--actions-per-session", type=int, default=10, help="每次登录后执行的操作数")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed", help="预设的操作权重")
+    parser.add_argument("--mix", help=f"自定义操作权重，如 dashboard=30,chat=10（可选操作: {', '.join(ACTIONS)}）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（相同种子产生相同的操作序列）")
+    parser.add_argument("--timeout", type=float, default=120, help="单个请求超时（秒）")
+    parser.add_argument("--base-url", help="压测已启动的应用（不启动本地应用和录制数据服务）")
+    parser.add_argument("--in-process", action="store_true", help="在本进程内通过ASGI调用应用（不需要uvicorn）")
+    parser.add_argument("--app-workers", type=int, default=1, help="本地启动的uvicorn worker进程数")
+    parser.add_argument("--database-url", help="本地应用使用的数据库（默认临时SQLite）")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="假LLM每次调用的延迟（毫秒）")
+    parser.add_argument("--llm-jitter-ms", type=float, default=400, help="假LLM延迟抖动（毫秒）")
+    parser.add_argument("--llm-error", default="", choices=["", "quota", "throttle", "server", "timeout"], help="假LLM模拟的错误")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="假LLM出错的调用比例")
+    parser.add_argument("--scrape-delay-ms", type=float, default=50, help="录制数据服务的响应延迟（毫秒）")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="总错误率超过该值时返回非0")
+    parser.add_argument("--max-p95-ms", type=float, help="总p95延迟超过该值（毫秒）时返回非0")
+    parser.add_argument("--output", help="结果保存为JSON文件")
+    parser.add_argument("--json", action="store_true", help="输出JSON结果")
+    args = parser.parse_args(argv)
+    if args.mix:
+        from app.loadtest.scenarios import parse_mix
+        try:
+            parse_mix(args.mix)
+        except ValueError as e:
+            parser.error(str(e))
+
+    from app.loadtest.scenarios import format_summary
+
+    if args.in_process:
+        # 进程内运行时Agent的verbose输出写到标准输出，转到标准错误（标准输出只保留结果）
+        with contextlib.redirect_stdout(sys.stderr):
+            result = asyncio.run(run(args))
+    else:
+        result = asyncio.run(run(args))
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_summary(result["endpoints"], result["duration"]))
+
+    total = result["endpoints"].get("全部")
+    if not total:
+        print("没有完成任何请求", file=sys.stderr)
+        return 1
+    failed = []
+    if total["error_rate"] > args.max_error_rate:
+        failed.append(f"错误率 {total['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    if args.max_p95_ms is not None and total["p95_ms"] > args.max_p95_ms:
+        failed.append(f"p95 {total['p95_ms']:.0f}ms > {args.max_p95_ms:.0f}ms")
+    if failed:
+        print("未通过: " + "；".join(failed), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
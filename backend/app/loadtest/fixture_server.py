@@ -0,0 +1,109 @@
+"""
+本地虎扑录制数据服务
+按请求路径返回app/bench/fixtures中录制的响应（与基准测试回放规则相同）：
+/news/{类别} 返回API JSON，*.html 返回详情页，其他路径返回新闻列表页
+应用通过HUPU_BASE_URL / HUPU_MOBILE_BASE_URL / HUPU_API_BASE_URL指向该服务后，采集走真实HTTP但不访问外网
+
+用法（在backend目录下）：
+    python -m app.loadtest.fixture_server --port 8901 --delay-ms 50
+"""
+import argparse
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from app.bench.fixtures import fixture_name, load_fixture
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureServer:
+    """
+    在后台线程中运行的录制数据服务
+
+    Args:
+        host / port: 监听地址（port为0时自动分配）
+        delay_ms: 每个响应前的固定延迟（模拟上游耗时）
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay_ms: float = 0):
+        delay = delay_ms / 1000
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if delay:
+                    time.sleep(delay)
+                name = fixture_name(self.path.split("?", 1)[0])
+                body = load_fixture(name) if name else b""
+                self.send_response(200 if name else 404)
+                content_type = "application/json" if name.endswith(".json") else "text/html; charset=utf-8"
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("fixture %s", format % args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environment(self) -> Dict[str, str]:
+        """应用使用该服务时需要的环境变量"""
+        return {
+            "HUPU_BASE_URL": self.url,
+            "HUPU_MOBILE_BASE_URL": self.url,
+            "HUPU_API_BASE_URL": f"{self.url}/v1",
+        }
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令行入口：前台运行录制数据服务"""
+    parser = argparse.ArgumentParser(description="本地虎扑录制数据服务（压测时代替虎扑网站）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--delay-ms", type=float, default=0, help="每个响应前的固定延迟（毫秒）")
+    args = parser.parse_args(argv)
+
+    from app.utils.logging_config import setup_logging
+
+    setup_logging()
+    server = FixtureServer(args.host, args.port, args.delay_ms)
+    logger.info("录制数据服务已启动: %s", server.url)
+    # 启动应用时使用的配置
+    for key, value in server.environment().items():
+        print(f"{key}={value}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+压测场景
+每个虚拟用户按会话循环：注册并登录一个新账号，打开仪表板，然后按权重随机执行若干操作（每次操作之间等待思考时间）。
+新账号没有历史数据，生成日报和分析报告在每个会话中都会实际执行（与真实用户"生成日报 -> 分析"的流程一致）。
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+from app.bench.harness import percentile
+
+# 场景：操作 -> 权重
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    # 以浏览为主（默认）
+    "mixed": {"dashboard": 25, "news_list": 25, "news_detail": 10, "report_list": 10, "search": 5,
+              "chat": 15, "generate": 5, "analyze": 5},
+    # 只读接口
+    "browse": {"dashboard": 35, "news_list": 35, "news_detail": 15, "report_list": 10, "search": 5},
+    # 以聊天和报告生成为主（LLM路径）
+    "llm": {"dashboard": 10, "news_list": 10, "chat": 40, "generate": 20, "analyze": 20},
+}
+ACTIONS = ("dashboard", "news_list", "news_detail", "report_list", "search", "chat", "generate", "analyze")
+
+CHAT_MESSAGES = ["湖人最近状态怎么样？", "今天有哪些重要比赛？", "帮我总结一下今天的NBA新闻", "足球有什么新消息？"]
+SEARCH_QUERIES = ["湖人", "詹姆斯", "季后赛", "转会"]
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """
+    解析操作权重（如 dashboard=30,chat=10）
+
+    Raises:
+        ValueError: 操作不存在或权重不合法
+    """
+    mix = {}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise ValueError(f"不支持的操作: {name}（可选: {', '.join(ACTIONS)}）")
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise ValueError(f"操作权重必须是整数: {item}")
+        if mix[name] < 0:
+            raise ValueError(f"操作权重不能为负数: {item}")
+    if not any(mix.values()):
+        raise ValueError("至少需要一个权重大于0的操作")
+    return mix
+
+
+class LoadStats:
+    """按接口汇总的延迟、错误和吞吐量"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, name: str, elapsed: float, error: Optional[str] = None):
+        self.latencies.setdefault(name, []).append(elapsed)
+        if error:
+            counts = self.errors.setdefault(name, {})
+            counts[error] = counts.get(error, 0) + 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> Dict[str, Dict]:
+        """接口 -> {requests, errors, error_rate, rps, p50_ms, p90_ms, p95_ms, p99_ms, max_ms, error_types}"""
+        duration = self.duration or 1.0
+        result = {}
+        names = sorted(self.latencies)
+        all_values = sorted(value for name in names for value in self.latencies[name])
+        for name, values in [(name, sorted(self.latencies[name])) for name in names] + [("全部", all_values)]:
+            if not values:
+                continue
+            if name == "全部":
+                errors = sum(sum(counts.values()) for counts in self.errors.values())
+                error_types = {}
+            else:
+                errors = sum(self.errors.get(name, {}).values())
+                error_types = dict(sorted(self.errors.get(name, {}).items(), key=lambda item: -item[1])[:5])
+            result[name] = {
+                "requests": len(values),
+                "errors": errors,
+                "error_rate": round(errors / len(values), 4),
+                "rps": round(len(values) / duration, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p90_ms": round(percentile(values, 90) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+                "error_types": error_types
+            }
+        return result
+
+
+def format_summary(summary: Dict[str, Dict], duration: float) -> str:
+    """生成结果表格"""
+    header = f"{'接口':<22}{'请求数':>8}{'错误率':>9}{'req/s':>9}{'p50(ms)':>10}{'p90(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}"
+    lines = [f"持续时间 {duration:.1f}s", header, "-" * len(header)]
+    for name, item in summary.items():
+        lines.append(
+            f"{name:<22}{item['requests']:>8}{item['error_rate']:>9.2%}{item['rps']:>9.2f}{item['p50_ms']:>10.1f}"
+            f"{item['p90_ms']:>10.1f}{item['p95_ms']:>10.1f}{item['p99_ms']:>10.1f}{item['max_ms']:>10.1f}"
+        )
+    errors = [(name, item["error_types"]) for name, item in summary.items() if item["error_types"]]
+    if errors:
+        lines.append("")
+        lines.append("错误：")
+        for name, types in errors:
+            for error, count in types.items():
+                lines.append(f"  {name}: {error} ×{count}")
+    return "\n".join(lines)
+
+
+class VirtualUser:
+    """
+    虚拟用户
+
+    Args:
+        client: httpx.AsyncClient（base_url指向被测应用）
+        stats: 结果汇总
+        index: 用户编号（与run_id一起生成不重复的账号名，并作为随机种子）
+        mix: 操作权重
+        think_time: 平均思考时间（秒，实际在0.5-1.5倍之间随机）
+        actions_per_session: 每个会话登录后执行的操作数
+        run_id: 本次压测的标识
+        seed: 随机种子（相同种子产生相同的操作序列）
+    """
+
+    def __init__(self, client, stats: LoadStats, index: int, mix: Dict[str, int], think_time: float,
+                 actions_per_session: int, run_id: str, seed: int = 0):
+        self.client = client
+        self.stats = stats
+        self.index = index
+        self.actions = [name for name in mix if mix[name] > 0]
+        self.weights = [mix[name] for name in self.actions]
+        self.think_time = think_time
+        self.actions_per_session = actions_per_session
+        self.run_id = run_id
+        self.random = random.Random(seed * 100003 + index)
+        self.sessions = 0
+        self._reset_session()
+
+    def _reset_session(self):
+        self.headers: Dict[str, str] = {}
+        self.news_ids: List[int] = []
+        self.pending_news = False  # 有未分析的新闻
+        self.generated = False
+
+    async def _request(self, name: str, method: str, url: str, **kwargs):
+        """发送请求并记录耗时（HTTP错误和异常计为错误，返回None）"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except Exception as e:
+            self.stats.record(name, time.perf_counter() - started, type(e).__name__)
+            return None
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            self.stats.record(name, elapsed, f"HTTP {response.status_code}")
+            return None
+        self.stats.record(name, elapsed)
+        return response
+
+    async def _think(self):
+        if self.think_time > 0:
+            await asyncio.sleep(self.think_time * self.random.uniform(0.5, 1.5))
+
+    async def login(self) -> bool:
+        self._reset_session()
+        self.sessions += 1
+        username = f"load_{self.run_id}_{self.index}_{self.sessions}"
+        account = {"username": username, "email": f"{username}@example.com", "password": "load-test-password"}
+        if await self._request("register", "POST", "/api/auth/register", json=account) is None:
+            return False
+        response = await self._request("login", "POST", "/api/auth/login",
+                                       json={"username": username, "password": account["password"]})
+        if response is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def run_action(self, name: str):
+        if name == "analyze" and not self.pending_news:
+            # 分析前需要有未分析的新闻：本会话还没生成过日报时先生成，已经分析过时改为查看报告列表
+            name = "report_list" if self.generated else "generate"
+        if name == "news_detail" and not self.news_ids:
+            name = "news_list"
+
+        if name == "dashboard":
+            await self._request(name, "GET", "/api/dashboard/stats")
+        elif name == "news_list":
+            response = await self._request(name, "GET", "/api/news/list")
+            if response is not None:
+                self.news_ids = [item["id"] for item in response.json()] or self.news_ids
+        elif name == "news_detail":
+            await self._request(name, "GET", f"/api/news/{self.random.choice(self.news_ids)}")
+        elif name == "report_list":
+            await self._request(name, "GET", "/api/report/list")
+        elif name == "search":
+            await self._request(name, "GET", "/api/search", params={"q": self.random.choice(SEARCH_QUERIES)})
+        elif name == "chat":
+            await self._request(name, "POST", "/api/chat/message", json={"message": self.random.choice(CHAT_MESSAGES)})
+        elif name == "generate":
+            response = await self._request(name, "POST", "/api/news/generate-daily")
+            self.generated = True
+            if response is not None and response.json():
+                self.news_ids.extend(item["id"] for item in response.json())
+                self.pending_news = True
+        elif name == "analyze":
+            await self.analyze()
+
+    async def analyze(self):
+        """
+        分析报告（SSE）：读取进度事件直到成功或失败
+        记录analyze（整个流程）和analyze.first_event（首个事件的等待时间）
+        """
+        started = time.perf_counter()
+        first_event = None
+        error = "stream_closed"
+        try:
+            async with self.client.stream("POST", "/api/report/analyze", headers=self.headers) as response:
+                if response.status_code >= 400:
+                    error = f"HTTP {response.status_code}"
+                else:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        if first_event is None:
+                            first_event = time.perf_counter() - started
+                        event = json.loads(line[5:])
+                        if event.get("status") == "success":
+                            error = None
+                            break
+                        if event.get("status") == "error":
+                            error = f"job_error: {(event.get('error') or event.get('message') or '')[:60]}"
+                            break
+        except Exception as e:
+            error = type(e).__name__
+        if first_event is not None:
+            self.stats.record("analyze.first_event", first_event)
+        self.stats.record("analyze", time.perf_counter() - started, error)
+        self.pending_news = False
+
+    async def run(self, deadline: float):
+        """循环执行会话直到deadline（time.perf_counter()）"""
+        while time.perf_counter() < deadline:
+            if not await self.login():
+                await self._think()
+                continue
+            await self.run_action("dashboard")
+            for _ in range(self.actions_per_session):
+                if time.perf_counter() >= deadline:
+                    return
+                await self._think()
+                await self.run_action(self.random.choices(self.actions, weights=self.weights)[0])
@@ -1,65 +1,56 @@
+import asyncio
+import logging
+import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import news, report, chat, dashboard, auth
-from app.models import User, NewsArticle, AnalysisReport
-
-# 创建数据库表
-try:
-    Base.metadata.create_all(bind=engine)
-    print("✓ 数据库表创建成功")
-    
-    # 检查并修复users表结构
+from sqlalchemy.exc import OperationalError
+from app.config import settings
+from app.database import engine, replica_router
+from app.routers import news, report, chat, dashboard, auth, search, internal, jobs, agents
+from app.migrations import SchemaVersionError, migrate, verify_schema
+from app.services.job_worker import start_embedded_worker, stop_embedded_worker
+from app.utils.lazy_import import warm_up
+from app.utils.metrics import MetricsMiddleware
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.tracing import TracingMiddleware, shutdown_tracing
+from app.utils.logging_config import RequestContextMiddleware, setup_logging, shutdown_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# 启动后在后台预先导入的耗时模块（LangChain Agent、dashscope、BeautifulSoup等）
+WARMUP_MODULES = [
+    "app.agents.chat_agent",
+    "app.agents.news_collector",
+    "app.agents.news_analyzer",
+    "app.tools.hupu_scraper",
+    "app.services.vector_index",
+    "bs4",
+    "dashscope",
+]
+
+
+def check_database_schema():
+    """
+    校验数据库结构版本（启动时只读取版本号，不执行DDL）
+    建表和结构变更由迁移命令完成：python -m app.migrations upgrade
+
+    Raises:
+        SchemaVersionError: 数据库版本落后于代码（中止启动，避免在旧表结构上运行）
+    """
     try:
-        from sqlalchemy import inspect, text
-        inspector = inspect(engine)
-        if 'users' in inspector.get_table_names():
-            columns = inspector.get_columns('users')
-            column_names = [col['name'] for col in columns]
-            
-            # 修复hashed_password字段
-            if 'hashed_password' not in column_names:
-                print("⚠ 检测到users表缺少hashed_password字段，正在修复...")
-                with engine.connect() as conn:
-                    try:
-                        conn.execute(text("ALTER TABLE users ADD COLUMN hashed_password VARCHAR(255) NOT NULL DEFAULT ''"))
-                        conn.commit()
-                        print("✓ hashed_password字段已添加")
-                    except Exception as e:
-                        print(f"   添加hashed_password字段时: {str(e)}")
-                        conn.rollback()
-            
-            # 修复is_active字段
-            if 'is_active' not in column_names:
-                print("⚠ 检测到users表缺少is_active字段，正在修复...")
-                with engine.connect() as conn:
-                    try:
-                        conn.execute(text("ALTER TABLE users ADD COLUMN is_active BOOLEAN DEFAULT TRUE"))
-                        conn.commit()
-                        print("✓ is_active字段已添加")
-                    except Exception as e:
-                        print(f"   添加is_active字段时: {str(e)}")
-                        conn.rollback()
-            
-            # 确保hashed_password不能为NULL
-            if 'hashed_password' in column_names:
-                with engine.connect() as conn:
-                    try:
-                        conn.execute(text("ALTER TABLE users MODIFY COLUMN hashed_password VARCHAR(255) NOT NULL"))
-                        conn.commit()
-                    except Exception as e:
-                        pass  # 如果已经是NOT NULL，忽略错误
-                        
-            print("✓ users表结构检查完成")
-        else:
-            print("⚠ users表不存在，已自动创建")
-    except Exception as e:
-        print(f"⚠ 检查users表时出错: {str(e)}")
-        print("   可以手动运行: python fix_users_table.py")
-except Exception as e:
-    print(f"✗ 数据库表创建失败: {str(e)}")
-    import traceback
-    traceback.print_exc()
+        if settings.AUTO_MIGRATE:
+            # 开发环境可自动迁移（迁移持有数据库咨询锁，多进程同时启动也只会执行一次）
+            migrate(engine)
+        version = verify_schema(engine)
+        logger.info("数据库结构版本 %s", version)
+    except SchemaVersionError as e:
+        logger.error("%s", e)
+        raise
+    except OperationalError as e:
+        # 数据库暂时无法连接时继续启动（连接恢复后请求可正常处理）
+        logger.error("数据库结构校验失败: %s", e)
+
 
 app = FastAPI(
     title="体育日报智能分析平台",
@@ -76,12 +67,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 按请求剖析（CPU剖析 + 内存分配），通过/api/internal/profiles列出和下载
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# 请求指标（延迟、进行中请求数、每个请求的SQL条数），通过/api/internal/metrics抓取
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# 链路追踪：每个请求一个trace（可由请求头traceparent延续），响应头X-Trace-Id
+app.add_middleware(TracingMiddleware)
+
+# 请求日志上下文：request_id（请求头/响应头X-Request-ID）附加到该请求的全部日志
+app.add_middleware(RequestContextMiddleware)
+
 # 注册路由（认证路由不需要保护）
 app.include_router(auth.router)
 app.include_router(dashboard.router)
 app.include_router(news.router)
 app.include_router(report.router)
 app.include_router(chat.router)
+app.include_router(search.router)
+app.include_router(internal.router)
+app.include_router(jobs.router)
+app.include_router(agents.router)
+
+@app.on_event("startup")
+async def on_startup():
+    """启动事件：校验数据库结构版本，启动从库健康检查和进程内任务worker，并在后台线程预热耗时模块"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, check_database_schema)
+    # 从库健康检查在后台线程定期执行（首次检查在启动时完成，请求路径上不再连接从库检查）
+    await loop.run_in_executor(None, replica_router.start_monitor)
+    if settings.JOB_WORKER_ENABLED:
+        await start_embedded_worker()
+    if settings.STARTUP_WARMUP:
+        loop.run_in_executor(None, _warm_up_modules)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """关闭事件：停止进程内任务worker（执行中的任务归还队列，由其他worker继续执行），关闭LLM连接池，写出剩余的追踪数据和日志"""
+    await stop_embedded_worker()
+    replica_router.stop_monitor()
+    # 只在调用过LLM时才有连接池（避免关闭时才导入LLM模块）
+    if "app.utils.llm_config" in sys.modules:
+        from app.utils.llm_config import aclose_llm_provider
+        await aclose_llm_provider()
+    shutdown_tracing()
+    shutdown_logging()
+
+
+def _warm_up_modules():
+    """后台预热：提前导入Agent等耗时模块，避免首个请求承担导入开销"""
+    results = warm_up(WARMUP_MODULES)
+    total = sum(item["ms"] for item in results)
+    failed = [item["module"] for item in results if item["error"]]
+    logger.info("后台预热完成，耗时 %.0fms%s", total, f"（导入失败: {', '.join(failed)}）" if failed else "")
 
 @app.get("/")
 async def root():
@@ -0,0 +1,27 @@
+"""
+数据库迁移模块
+用法：
+    python -m app.migrations upgrade     # 执行全部未应用的迁移
+    python -m app.migrations status      # 查看迁移状态
+"""
+from app.migrations.runner import (
+    MigrationError,
+    SchemaVersionError,
+    current_version,
+    latest_version,
+    load_migrations,
+    migrate,
+    status,
+    verify_schema
+)
+
+__all__ = [
+    "MigrationError",
+    "SchemaVersionError",
+    "current_version",
+    "latest_version",
+    "load_migrations",
+    "migrate",
+    "status",
+    "verify_schema"
+]
@@ -0,0 +1,50 @@
+"""
+数据库迁移命令行入口
+
+用法：
+    python -m app.migrations upgrade [--target N]
+    python -m app.migrations status
+    python -m app.migrations verify
+"""
+import argparse
+import sys
+from typing import List, Optional
+from app.migrations.runner import MigrationError, SchemaVersionError, migrate, status, verify_schema
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="数据库结构迁移")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status", "verify"],
+                        help="upgrade：执行迁移；status：查看状态；verify：校验版本（落后时返回非0）")
+    parser.add_argument("--target", type=int, default=None, help="迁移到指定版本（默认最新）")
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+    from app.utils.logging_config import setup_logging
+
+    setup_logging()
+
+    try:
+        if args.command == "upgrade":
+            applied = migrate(engine, target=args.target)
+            info = status(engine)
+            if applied:
+                print(f"✓ 已执行 {len(applied)} 个迁移，当前版本 {info['current']}")
+            else:
+                print(f"✓ 数据库已是最新版本（{info['current']}）")
+        elif args.command == "status":
+            info = status(engine)
+            print(f"当前版本: {info['current']}，最新版本: {info['latest']}")
+            for version, description in info["pending"]:
+                print(f"  待执行 {version:04d}: {description}")
+        else:
+            version = verify_schema(engine)
+            print(f"✓ 数据库结构版本 {version} 与代码一致")
+    except (MigrationError, SchemaVersionError) as e:
+        print(f"✗ {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""
+基线：用户、新闻、分析报告、聊天记录表
+（已有数据库中这些表通常已存在，create会跳过已存在的表）
+"""
+from app.migrations.runner import create_tables
+
+VERSION = 1
+DESCRIPTION = "baseline tables"
+
+
+def upgrade(conn):
+    create_tables(conn, "users", "news_articles", "analysis_reports", "chat_records")
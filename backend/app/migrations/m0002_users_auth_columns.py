@@ -0,0 +1,20 @@
+"""
+users表补充认证字段
+早期版本的users表缺少hashed_password和is_active字段（原先在应用启动时检查并修复）
+"""
+from sqlalchemy import text
+from app.migrations.runner import column_names
+
+VERSION = 2
+DESCRIPTION = "users: add hashed_password and is_active"
+
+
+def upgrade(conn):
+    columns = column_names(conn, "users")
+    if "hashed_password" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN hashed_password VARCHAR(255) NOT NULL DEFAULT ''"))
+    if "is_active" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN is_active BOOLEAN DEFAULT TRUE"))
+    if conn.dialect.name == "mysql":
+        # 确保hashed_password不能为NULL
+        conn.execute(text("ALTER TABLE users MODIFY COLUMN hashed_password VARCHAR(255) NOT NULL"))
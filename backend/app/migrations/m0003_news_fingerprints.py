@@ -0,0 +1,11 @@
+"""
+新闻去重签名表（MinHash签名及LSH分段）
+"""
+from app.migrations.runner import create_tables
+
+VERSION = 3
+DESCRIPTION = "news fingerprint tables"
+
+
+def upgrade(conn):
+    create_tables(conn, "news_fingerprints", "news_fingerprint_bands")
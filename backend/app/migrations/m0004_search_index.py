@@ -0,0 +1,11 @@
+"""
+全文检索倒排索引表
+"""
+from app.migrations.runner import create_tables
+
+VERSION = 4
+DESCRIPTION = "full-text search index tables"
+
+
+def upgrade(conn):
+    create_tables(conn, "search_documents", "search_postings")
@@ -0,0 +1,18 @@
+"""
+news_articles增加去重键及(user_id, dedup_key)唯一索引，用于批量入库时跳过重复文章
+"""
+from sqlalchemy import inspect, text
+from app.migrations.runner import column_names
+
+VERSION = 5
+DESCRIPTION = "news_articles: add dedup_key with unique index"
+
+INDEX_NAME = "uq_news_articles_user_dedup_key"
+
+
+def upgrade(conn):
+    if "dedup_key" not in column_names(conn, "news_articles"):
+        conn.execute(text("ALTER TABLE news_articles ADD COLUMN dedup_key VARCHAR(40) NULL"))
+    indexes = {index["name"] for index in inspect(conn).get_indexes("news_articles")}
+    if INDEX_NAME not in indexes:
+        conn.execute(text(f"CREATE UNIQUE INDEX {INDEX_NAME} ON news_articles (user_id, dedup_key)"))
@@ -0,0 +1,11 @@
+"""
+后台任务表（报告生成、新闻采集等耗时任务的状态和进度）
+"""
+from app.migrations.runner import create_tables
+
+VERSION = 6
+DESCRIPTION = "background jobs table"
+
+
+def upgrade(conn):
+    create_tables(conn, "jobs")
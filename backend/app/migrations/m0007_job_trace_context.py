@@ -0,0 +1,14 @@
+"""
+jobs表增加trace_context字段
+创建任务时保存请求的链路上下文（W3C traceparent），worker执行任务时继续同一条链路
+"""
+from sqlalchemy import text
+from app.migrations.runner import column_names
+
+VERSION = 7
+DESCRIPTION = "jobs: add trace_context"
+
+
+def upgrade(conn):
+    if "trace_context" not in column_names(conn, "jobs"):
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN trace_context VARCHAR(64)"))
@@ -0,0 +1,213 @@
+"""
+版本化数据库迁移执行器
+- 迁移脚本位于app/migrations/mNNNN_*.py，每个脚本定义VERSION、DESCRIPTION和upgrade(conn)
+- schema_version表记录已执行的迁移版本
+- 执行迁移前获取数据库咨询锁（MySQL GET_LOCK / PostgreSQL pg_advisory_lock），
+  多个进程同时启动迁移时只有一个会真正执行，其余等待后发现已是最新版本
+- 应用进程启动时只校验版本（verify_schema），不执行任何DDL
+"""
+import importlib
+import logging
+import pkgutil
+import re
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# 咨询锁名称与等待时间（秒）
+LOCK_NAME = "sports_analysis_schema_migration"
+LOCK_TIMEOUT = 300
+
+_MIGRATION_MODULE_RE = re.compile(r'^m(\d{4})_\w+$')
+
+_metadata = MetaData()
+
+# 版本表（不属于业务模型，不使用Base，避免被create_all或业务代码误用）
+schema_version_table = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True, comment="迁移版本号"),
+    Column("description", String(255), nullable=False, comment="迁移说明"),
+    Column("applied_at", DateTime, default=datetime.now, comment="执行时间"),
+    Column("duration_ms", Integer, comment="执行耗时（毫秒）"),
+)
+
+
+class MigrationError(Exception):
+    """迁移执行失败或无法获取迁移锁"""
+
+
+class SchemaVersionError(Exception):
+    """数据库结构版本落后于代码（需要执行迁移）"""
+
+
+class Migration:
+    """单个迁移脚本"""
+
+    def __init__(self, module):
+        self.module = module
+        self.version: int = module.VERSION
+        self.description: str = module.DESCRIPTION
+        self.upgrade = module.upgrade
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d} {self.description}>"
+
+
+def load_migrations() -> List[Migration]:
+    """按版本号顺序加载全部迁移脚本（版本号必须与文件名一致且不重复）"""
+    package = importlib.import_module("app.migrations")
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        match = _MIGRATION_MODULE_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"app.migrations.{info.name}")
+        if module.VERSION != int(match.group(1)):
+            raise MigrationError(f"迁移脚本 {info.name} 的VERSION({module.VERSION})与文件名不一致")
+        migrations.append(Migration(module))
+
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"迁移版本号重复: {versions}")
+    return migrations
+
+
+def latest_version() -> int:
+    """代码中最新的迁移版本号"""
+    migrations = load_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(conn: Connection) -> int:
+    """数据库当前版本号（没有版本表时为0）"""
+    if not inspect(conn).has_table(schema_version_table.name):
+        return 0
+    value = conn.execute(select(schema_version_table.c.version).order_by(
+        schema_version_table.c.version.desc()
+    ).limit(1)).scalar()
+    return value or 0
+
+
+@contextmanager
+def advisory_lock(conn: Connection, name: str = LOCK_NAME, timeout: int = LOCK_TIMEOUT):
+    """
+    获取数据库级咨询锁（连接级别，连接关闭时自动释放）
+    SQLite等不支持咨询锁的数据库直接执行（SQLite写操作本身是串行的）
+    """
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout}).scalar()
+        if acquired != 1:
+            raise MigrationError(f"等待迁移锁超时（{timeout}秒），可能有其他进程正在执行迁移")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+    elif dialect == "postgresql":
+        # 锁键需要跨进程稳定，不能使用受PYTHONHASHSEED影响的hash()
+        key = zlib.crc32(name.encode('utf-8'))
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+    else:
+        yield
+
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    执行未应用的迁移
+
+    Args:
+        engine: 数据库引擎
+        target: 迁移到的目标版本（None表示最新）
+
+    Returns:
+        本次执行的迁移版本号列表
+    """
+    migrations = load_migrations()
+    applied = []
+    with engine.connect() as conn:
+        with advisory_lock(conn):
+            # 提交获取锁时隐式开启的事务，之后每个迁移单独开启事务
+            conn.commit()
+            with conn.begin():
+                schema_version_table.create(conn, checkfirst=True)
+            # 持有锁之后再读取版本（等待期间其他进程可能已完成迁移）
+            version = current_version(conn)
+            conn.commit()
+            for migration in migrations:
+                if migration.version <= version or (target is not None and migration.version > target):
+                    continue
+                logger.info("执行迁移 %04d: %s ...", migration.version, migration.description)
+                started = time.perf_counter()
+                try:
+                    # MySQL的DDL会隐式提交，迁移脚本需要保证可重复执行
+                    with conn.begin():
+                        migration.upgrade(conn)
+                        conn.execute(schema_version_table.insert().values(
+                            version=migration.version,
+                            description=migration.description,
+                            applied_at=datetime.now(),
+                            duration_ms=int((time.perf_counter() - started) * 1000)
+                        ))
+                except Exception as e:
+                    raise MigrationError(f"迁移 {migration.version:04d} 执行失败: {str(e)}") from e
+                applied.append(migration.version)
+                logger.info("迁移 %04d 完成", migration.version)
+    return applied
+
+
+def status(engine: Engine) -> Dict:
+    """迁移状态 {"current", "latest", "pending": [(version, description)]}"""
+    migrations = load_migrations()
+    with engine.connect() as conn:
+        version = current_version(conn)
+    return {
+        "current": version,
+        "latest": migrations[-1].version if migrations else 0,
+        "pending": [(m.version, m.description) for m in migrations if m.version > version]
+    }
+
+
+def verify_schema(engine: Engine) -> int:
+    """
+    校验数据库版本（应用启动时调用，只读一次版本号，不执行DDL）
+
+    Returns:
+        数据库当前版本号
+
+    Raises:
+        SchemaVersionError: 数据库版本落后于代码
+    """
+    latest = latest_version()
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < latest:
+        raise SchemaVersionError(
+            f"数据库结构版本为 {version}，代码需要版本 {latest}，请先执行: python -m app.migrations upgrade"
+        )
+    return version
+
+
+def create_tables(conn: Connection, *table_names: str):
+    """创建业务表（已存在则跳过），供迁移脚本使用"""
+    import app.models  # noqa: F401  注册全部模型
+    from app.database import Base
+
+    for name in table_names:
+        Base.metadata.tables[name].create(conn, checkfirst=True)
+
+
+def column_names(conn: Connection, table_name: str) -> List[str]:
+    """表的现有字段名，供迁移脚本判断是否需要变更"""
+    return [column["name"] for column in inspect(conn).get_columns(table_name)]
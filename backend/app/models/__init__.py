@@ -2,5 +2,18 @@ from app.models.news import NewsArticle
 from app.models.report import AnalysisReport
 from app.models.user import User
 from app.models.chat_record import ChatRecord
+from app.models.news_fingerprint import NewsFingerprint, NewsFingerprintBand
+from app.models.search import SearchDocument, SearchPosting
+from app.models.job import Job
 
-__all__ = ["NewsArticle", "AnalysisReport", "User", "ChatRecord"]
+__all__ = [
+    "NewsArticle",
+    "AnalysisReport",
+    "User",
+    "ChatRecord",
+    "NewsFingerprint",
+    "NewsFingerprintBand",
+    "SearchDocument",
+    "SearchPosting",
+    "Job"
+]
@@ -0,0 +1,40 @@
+"""
+后台任务
+报告生成、新闻采集等耗时操作写入jobs表，由worker认领执行，状态和进度持久化，
+请求断开或服务重启都不会丢失任务
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True, comment="关联用户ID")
+    job_type = Column(String(50), nullable=False, comment="任务类型：report.daily、news.collect等")
+    status = Column(String(20), nullable=False, default="pending", comment="状态：pending/running/succeeded/failed/cancelled")
+    progress = Column(Integer, nullable=False, default=0, comment="进度（0-100）")
+    message = Column(String(500), comment="当前进度说明")
+    payload = Column(JSON, comment="任务参数")
+    result = Column(JSON, comment="任务结果")
+    error = Column(Text, comment="失败原因")
+    idempotency_key = Column(String(64), nullable=False, comment="幂等键（客户端提供或由任务类型+参数生成）")
+    active_key = Column(String(64), comment="未结束时等于幂等键，结束后置空；与user_id组成唯一索引，保证相同任务同时只有一个")
+    attempts = Column(Integer, nullable=False, default=0, comment="已执行次数")
+    max_attempts = Column(Integer, nullable=False, default=1, comment="最多执行次数（worker中断后可重新认领）")
+    worker_id = Column(String(100), comment="执行该任务的worker")
+    lease_until = Column(DateTime, comment="租约到期时间（worker定期续约，过期视为worker已中断）")
+    trace_context = Column(String(64), comment="创建任务时的链路上下文（W3C traceparent），worker执行时继续同一条链路")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    started_at = Column(DateTime, comment="开始执行时间")
+    finished_at = Column(DateTime, comment="结束时间")
+    updated_at = Column(DateTime, server_default=func.now(), comment="最近更新时间")
+    
+    __table_args__ = (
+        # worker认领：按状态查找最早的任务
+        Index("ix_jobs_status_id", "status", "id"),
+        # 核心隔离 + 幂等：同一用户的相同任务同时只能有一个未结束（结束后active_key为NULL，不受约束）
+        Index("uq_jobs_user_active_key", "user_id", "active_key", unique=True),
+        Index("ix_jobs_user_idempotency_key", "user_id", "idempotency_key"),
+    )
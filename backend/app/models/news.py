@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -17,6 +17,12 @@ class NewsArticle(Base):
     collected_at = Column(DateTime, server_default=func.now())
     article_metadata = Column(JSON)  # 存储额外信息（球员、球队等）- 重命名避免与SQLAlchemy保留字冲突
     processed = Column(Integer, default=0)  # 0:未处理, 1:已处理
+    dedup_key = Column(String(40), comment="去重键（来源URL或标题的SHA1），同一用户内唯一，批量入库时重复文章自动跳过")
     
     # 关联关系
     user = relationship("User", backref="news_articles")
+    
+    __table_args__ = (
+        # 批量入库去重（历史数据dedup_key为NULL，不受唯一约束限制）
+        Index("uq_news_articles_user_dedup_key", "user_id", "dedup_key", unique=True),
+    )
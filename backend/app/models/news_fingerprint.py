@@ -0,0 +1,30 @@
+"""
+新闻近似重复检测签名
+每篇文章一条签名记录，另按LSH分段存储分段键，用于按索引快速查找候选重复文章
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class NewsFingerprint(Base):
+    __tablename__ = "news_fingerprints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    article_id = Column(Integer, ForeignKey("news_articles.id", ondelete="CASCADE"), nullable=False, unique=True, comment="关联新闻ID")
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True, comment="关联用户ID")
+    signature = Column(String(512), nullable=False, comment="MinHash签名（十六进制）")
+    created_at = Column(DateTime, server_default=func.now(), index=True, comment="创建时间")
+
+class NewsFingerprintBand(Base):
+    __tablename__ = "news_fingerprint_bands"
+    
+    id = Column(Integer, primary_key=True)
+    article_id = Column(Integer, ForeignKey("news_articles.id", ondelete="CASCADE"), nullable=False, index=True, comment="关联新闻ID")
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="关联用户ID")
+    band_key = Column(BigInteger, nullable=False, comment="LSH分段键")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    
+    __table_args__ = (
+        # 查找候选：按用户+分段键精确匹配
+        Index("ix_news_fingerprint_bands_user_band", "user_id", "band_key"),
+    )
@@ -0,0 +1,40 @@
+"""
+全文检索倒排索引
+search_documents记录每个被索引的文档（新闻/报告）及其长度，
+search_postings记录词项到文档的倒排列表，均按用户隔离
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class SearchDocument(Base):
+    __tablename__ = "search_documents"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="关联用户ID")
+    doc_type = Column(String(20), nullable=False, comment="文档类型：news/report")
+    doc_id = Column(Integer, nullable=False, comment="文档ID")
+    length = Column(Integer, nullable=False, default=0, comment="文档词项数（BM25长度归一化）")
+    indexed_at = Column(DateTime, server_default=func.now(), comment="索引时间")
+    
+    __table_args__ = (
+        Index("ux_search_documents_doc", "doc_type", "doc_id", unique=True),
+        Index("ix_search_documents_user_type", "user_id", "doc_type"),
+    )
+
+class SearchPosting(Base):
+    __tablename__ = "search_postings"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="关联用户ID")
+    doc_type = Column(String(20), nullable=False, comment="文档类型：news/report")
+    doc_id = Column(Integer, nullable=False, comment="文档ID")
+    term = Column(String(64), nullable=False, comment="词项")
+    tf = Column(Integer, nullable=False, default=1, comment="加权词频")
+    
+    __table_args__ = (
+        # 检索：按用户+词项查倒排列表
+        Index("ix_search_postings_user_term", "user_id", "term"),
+        # 删除/重建：按文档删除
+        Index("ix_search_postings_doc", "doc_type", "doc_id"),
+    )
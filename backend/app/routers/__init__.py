@@ -1,4 +1,4 @@
 # API routers
-from app.routers import dashboard, news, report, chat, auth
+from app.routers import dashboard, news, report, chat, auth, search, internal, jobs, agents
 
-__all__ = ["dashboard", "news", "report", "chat", "auth"]
+__all__ = ["dashboard", "news", "report", "chat", "auth", "search", "internal", "jobs", "agents"]
@@ -0,0 +1,41 @@
+"""
+多Agent协作接口：任务分解为子任务依赖图并发执行，返回各子任务结果和耗时
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from app.config import settings
+from app.models.user import User
+from app.schemas.agent import AgentTaskRequest
+from app.auth import get_current_active_user
+
+router = APIRouter(prefix="/api/agents", tags=["agents"])
+
+# 单次请求采集条数上限（与采集任务一致）
+MAX_LIMIT_PER_CATEGORY = 50
+
+
+@router.post("/execute")
+async def execute_agent_task(
+    request: AgentTaskRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """执行多Agent协作任务（部分子任务失败时status为partial，返回已完成部分和trace耗时信息）"""
+    if not 1 <= request.limit_per_category <= MAX_LIMIT_PER_CATEGORY:
+        raise HTTPException(status_code=400, detail=f"limit_per_category需在1到{MAX_LIMIT_PER_CATEGORY}之间")
+
+    # Agent依赖较重，首次调用时才导入
+    from app.agents.coordinator import MultiAgentCoordinator
+
+    max_parallel = settings.COORDINATOR_MAX_PARALLEL
+    if request.max_parallel:
+        max_parallel = max(1, min(request.max_parallel, max_parallel))
+
+    coordinator = MultiAgentCoordinator(max_parallel=max_parallel)
+    result = await coordinator.execute_task(
+        request.task,
+        news_sources=request.news_sources,
+        categories=request.categories,
+        limit_per_category=request.limit_per_category
+    )
+    if result["status"] == "failed":
+        raise HTTPException(status_code=502, detail={"message": "任务执行失败", "errors": result["errors"], "trace": result["trace"]})
+    return result
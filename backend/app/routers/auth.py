@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import get_db
@@ -12,6 +13,8 @@ from app.schemas.auth import UserRegister, UserLogin, Token, UserResponse, Chang
 from datetime import timedelta
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -55,7 +58,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         try:
             db.commit()
             db.refresh(db_user)
-            print(f"✓ 用户注册成功: {db_user.username} (ID: {db_user.id})")
+            logger.info("用户注册成功: %s (ID: %s)", db_user.username, db_user.id)
             # 确保返回的数据符合 UserResponse schema
             return UserResponse(
                 id=db_user.id,
@@ -66,9 +69,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
             )
         except Exception as commit_error:
             db.rollback()
-            print(f"✗ 数据库提交失败: {str(commit_error)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("数据库提交失败: %s", commit_error)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"保存用户数据失败: {str(commit_error)}"
@@ -80,11 +81,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         # 回滚事务
         db.rollback()
         # 记录详细错误信息到日志
-        import traceback
-        error_detail = traceback.format_exc()
-        import logging
-        logging.error(f"注册失败错误: {str(e)}")
-        logging.error(f"错误详情: {error_detail}")
+        logger.exception("注册失败错误: %s", e)
         # 返回更友好的错误信息
         error_msg = str(e)
         if "hashed_password" in error_msg or "Column" in error_msg:
@@ -177,10 +174,10 @@ async def change_password(
                 detail="新密码不能与原密码相同"
             )
         
-        # 更新密码
-        current_user.hashed_password = get_password_hash(password_data.new_password)
+        # 更新密码（当前用户对象来自只读会话，在主库会话中重新读取后修改）
+        user = db.get(User, current_user.id)
+        user.hashed_password = get_password_hash(password_data.new_password)
         db.commit()
-        db.refresh(current_user)
         
         return {"message": "密码修改成功"}
     except HTTPException:
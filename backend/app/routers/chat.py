@@ -1,11 +1,13 @@
+import logging
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
-from app.agents.chat_agent import ChatAgent
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.auth import get_current_active_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 @router.post("/message", response_model=ChatResponse)
@@ -16,6 +18,9 @@ async def chat_message(
 ):
     """处理用户对话（数据隔离：每个用户独立的聊天记录）"""
     try:
+        # Agent依赖较重，首次调用时才导入（启动后由后台预热任务提前加载）
+        from app.agents.chat_agent import ChatAgent
+        
         # 核心隔离：初始化ChatAgent时传入当前用户ID和数据库会话
         chat_agent = ChatAgent(user_id=current_user.id, db=db)
         
@@ -29,6 +34,5 @@ async def chat_message(
         
         return ChatResponse(response=response)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("聊天请求处理失败: %s", e)
         return ChatResponse(response=f"抱歉，处理您的请求时出现了错误：{str(e)}。请稍后重试。")
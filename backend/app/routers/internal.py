@@ -0,0 +1,130 @@
+"""
+内部运维接口（连接池监控、相同请求合并统计、LLM熔断状态和模型路由、Prometheus指标、请求剖析结果等）
+需要在请求头X-Internal-Token（或Authorization: Bearer，便于Prometheus抓取）中携带Settings.INTERNAL_API_TOKEN；未配置令牌时接口关闭（返回404）
+"""
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from app.config import settings
+from app.database import replica_router
+from app.utils.db_metrics import all_pool_status, recent_slow_queries, reset_metrics
+from app.utils.llm_resilience import all_breaker_status, reset_breakers
+from app.utils.model_router import route_table
+from app.utils.metrics import render_metrics
+from app.utils.profiling import PROFILE_FILES, get_profile, list_profiles, profile_file_path
+from app.utils.single_flight import all_flight_status
+
+
+def verify_internal_token(
+    x_internal_token: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None)
+):
+    """校验内部接口令牌"""
+    if not settings.INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token and authorization and authorization.lower().startswith("bearer "):
+        x_internal_token = authorization[7:].strip()
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, settings.INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail="内部接口令牌无效")
+
+
+router = APIRouter(prefix="/api/internal", tags=["internal"], dependencies=[Depends(verify_internal_token)])
+
+
+@router.get("/db/pool")
+async def get_pool_status():
+    """各数据库引擎的连接池状态（借出/等待/溢出/超时）和SQL执行统计"""
+    return {
+        "config": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS,
+            "slow_query_ms": settings.DB_SLOW_QUERY_MS
+        },
+        "engines": all_pool_status(),
+        "replicas": replica_router.status()
+    }
+
+
+@router.get("/db/slow-queries")
+async def get_slow_queries(limit: int = Query(50, ge=1, le=100)):
+    """最近的慢查询（新的在前）"""
+    return recent_slow_queries(limit)
+
+
+@router.post("/db/reset")
+async def reset_pool_metrics(engine: Optional[str] = None):
+    """重置统计计数（不影响连接池本身）"""
+    reset_metrics(engine)
+    return {"message": "统计已重置"}
+
+
+@router.get("/single-flight")
+async def get_single_flight_status():
+    """相同请求合并统计：executed为实际执行次数，shared_local/shared_remote为共享本进程/其他进程结果的次数"""
+    return all_flight_status()
+
+
+@router.get("/llm/circuits")
+async def get_llm_circuits():
+    """LLM熔断状态（按提供方:模型）：state为closed/open/half_open，retry_in为距离放行试探请求的秒数"""
+    return {
+        "config": {
+            "failure_threshold": settings.LLM_BREAKER_FAILURES,
+            "reset_seconds": settings.LLM_BREAKER_RESET_SECONDS,
+            "quota_cooldown": settings.LLM_QUOTA_COOLDOWN,
+            "max_retries": settings.LLM_MAX_RETRIES,
+            "call_deadline": settings.LLM_CALL_DEADLINE
+        },
+        "circuits": all_breaker_status()
+    }
+
+
+@router.post("/llm/circuits/reset")
+async def reset_llm_circuits(name: Optional[str] = None):
+    """手动恢复熔断（如充值后不必等待冷却结束）；不指定name时恢复全部"""
+    reset_breakers(name)
+    return {"message": "熔断已恢复", "circuits": all_breaker_status()}
+
+
+@router.get("/llm/routes")
+async def get_llm_routes():
+    """按任务的模型路由（模型链按顺序尝试，最后一个为LLM_MODEL）和估算费用用的单价"""
+    return route_table()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus文本格式指标（请求延迟、LLM调用、采集请求、SQL、缓存命中）"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/profiles")
+async def get_profiles(limit: int = Query(50, ge=1, le=200), route: Optional[str] = None):
+    """已保存的请求剖析（新的在前）：路由、耗时、状态码、触发原因和可下载的文件"""
+    return {"enabled": settings.PROFILING_ENABLED, "mode": settings.PROFILING_MODE, "profiles": list_profiles(limit, route)}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile_detail(profile_id: str):
+    """单个请求剖析的元数据"""
+    meta = get_profile(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="剖析结果不存在")
+    return meta
+
+
+@router.get("/profiles/{profile_id}/{kind}")
+async def download_profile(profile_id: str, kind: str):
+    """
+    下载剖析文件
+    kind：cpu（pstats，cprofile模式）、stacks（折叠栈，sampling模式）、alloc（内存分配报告）、snapshot（tracemalloc快照）
+    """
+    path = profile_file_path(profile_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="剖析文件不存在")
+    media_type = "text/plain; charset=utf-8" if kind in ("stacks", "alloc") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=profile_id + PROFILE_FILES[kind])
@@ -0,0 +1,209 @@
+"""
+后台任务接口：提交任务、查询状态（轮询）、SSE进度推送、取消
+任务在worker中执行，与请求生命周期无关：客户端断开后任务继续执行，重新连接（携带Last-Event-ID）即可继续获取进度
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, get_db, get_read_db
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.job import JobCreate, JobResponse
+from app.services import jobs
+from app.services import report_jobs  # noqa: F401  注册任务处理函数
+from app.auth import get_current_active_user
+from app.utils.progress import ProgressChannel, broker, parse_last_event_id, sse_stream
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# SSE响应头（禁用代理缓冲）
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def _load_job_event(job_id: int, user_id: int) -> Optional[Tuple[dict, bool]]:
+    """读取任务当前进度（使用主库短会话，从库复制延迟会导致进度滞后）"""
+    db = SessionLocal()
+    try:
+        job = jobs.get_job(db, user_id, job_id)
+        if job is None:
+            return None
+        return jobs.job_event(job), job.status in jobs.FINISHED_STATUSES
+    finally:
+        db.close()
+
+
+# 任务ID -> 读取任务记录的协程（任务由其他进程执行时使用，每个任务只有一个，与连接数无关）
+_db_feeds: Dict[int, asyncio.Task] = {}
+
+
+def _ensure_db_feed(job_id: int, user_id: int, channel: ProgressChannel):
+    if channel.closed or job_id in _db_feeds:
+        return
+    _db_feeds[job_id] = asyncio.create_task(_db_feed(job_id, user_id, channel))
+
+
+async def _db_feed(job_id: int, user_id: int, channel: ProgressChannel):
+    """
+    将任务记录的变化发布到进度通道
+    本进程执行的任务由worker直接发布，这里只在任务由其他进程执行（或等待认领）时读取数据库
+    """
+    try:
+        while not channel.closed:
+            await asyncio.sleep(settings.JOB_STREAM_POLL_INTERVAL)
+            if channel.subscribers == 0:
+                return
+            if jobs.is_local_job(job_id):
+                continue
+            state = await asyncio.to_thread(_load_job_event, job_id, user_id)
+            if state is None:
+                channel.close({'progress': 0, 'message': '任务不存在', 'status': 'error', 'error': '任务不存在'})
+                return
+            event, finished = state
+            if finished:
+                channel.close(event)
+            else:
+                channel.publish(event)
+    except Exception as e:
+        logger.warning("读取任务 %s 进度失败: %s", job_id, e)
+    finally:
+        _db_feeds.pop(job_id, None)
+
+
+def job_event_stream(
+    job: Job,
+    request: Optional[Request] = None,
+    last_event_id: Optional[int] = None,
+    initial_event: Optional[dict] = None,
+    cancel_on_disconnect: bool = False
+):
+    """
+    订阅任务进度，生成SSE消息流（数据格式见jobs.job_event），任务结束后关闭
+
+    Args:
+        job: 任务（调用方已校验归属）
+        request: 当前请求（用于检测客户端断开）
+        last_event_id: 请求头Last-Event-ID（断线续传）
+        initial_event: 连接建立后首先发送的事件
+        cancel_on_disconnect: 客户端断开时取消任务（默认断开后任务在后台继续执行）
+    """
+    job_id, user_id = job.id, job.user_id
+    channel = broker.channel(jobs.job_channel_key(job_id))
+    if channel.latest() is None:
+        # 进程内还没有该任务的事件（任务由其他进程创建或执行），以任务记录作为初始状态
+        jobs.publish_job(job)
+    _ensure_db_feed(job_id, user_id, channel)
+
+    on_disconnect = None
+    if cancel_on_disconnect:
+        async def on_disconnect():
+            await asyncio.to_thread(_cancel_job, job_id, user_id)
+
+    return sse_stream(
+        channel,
+        request=request,
+        last_event_id=last_event_id,
+        initial=[{**initial_event, 'trace_id': jobs.job_trace_id(job)}] if initial_event else None,
+        on_disconnect=on_disconnect
+    )
+
+
+def _cancel_job(job_id: int, user_id: int):
+    db = SessionLocal()
+    try:
+        # 条件UPDATE：断开时任务可能刚好完成，已结束的任务不受影响
+        if jobs.cancel_job_by_id(db, user_id, job_id):
+            logger.info("客户端断开，已取消任务 %s", job_id)
+    finally:
+        db.close()
+
+
+@router.post("", response_model=JobResponse, status_code=202)
+async def create_job(
+    request: JobCreate,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """提交后台任务（请求头Idempotency-Key相同的重复提交返回同一任务）"""
+    if request.job_type not in jobs.registered_job_types():
+        raise HTTPException(status_code=400, detail=f"未知的任务类型: {request.job_type}")
+    try:
+        job, _ = jobs.enqueue_job(db, current_user.id, request.job_type, request.payload, idempotency_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job
+
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_read_db),  # 只读接口：可路由到从库
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取当前用户的任务列表（数据隔离：只返回当前用户的任务）"""
+    # 核心隔离：只查询当前用户的任务
+    query = db.query(Job).filter(Job.user_id == current_user.id)
+    if status:
+        query = query.filter(Job.status == status)
+    return query.order_by(Job.id.desc()).offset(skip).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job_detail(
+    job_id: int,
+    db: Session = Depends(get_read_db),  # 只读接口：可路由到从库
+    current_user: User = Depends(get_current_active_user)
+):
+    """查询任务状态和进度（轮询接口）"""
+    job = jobs.get_job(db, current_user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在或无权限访问")
+    return job
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: int,
+    request: Request,
+    cancel_on_disconnect: bool = False,
+    last_event_id: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),  # 只读接口：可路由到从库
+    current_user: User = Depends(get_current_active_user)
+):
+    """SSE推送任务进度（断开后可携带Last-Event-ID重新连接；cancel_on_disconnect=true时断开即取消任务）"""
+    job = jobs.get_job(db, current_user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在或无权限访问")
+    return StreamingResponse(
+        job_event_stream(job, request, parse_last_event_id(last_event_id), cancel_on_disconnect=cancel_on_disconnect),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """取消任务（执行中的任务会中止并回滚，不会保存部分结果）"""
+    job = jobs.get_job(db, current_user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在或无权限访问")
+    if not jobs.cancel_job(db, job):
+        raise HTTPException(status_code=409, detail="任务已结束，无法取消")
+    db.refresh(job)
+    return job
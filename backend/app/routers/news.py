@@ -1,88 +1,64 @@
+import asyncio
+import logging
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.agents.news_collector import NewsCollectorAgent
-from app.tools.hupu_scraper import scrape_hupu_news
+from typing import List, Optional
+from app.database import get_db, get_read_db
+from app.services.digest import collect_digest_news, normalize_category_limits
+from app.services.news_collection import collect_latest_news
+from app.services.news_ingest import index_vectors, ingest_news
+from app.services.search_index import remove_document, DOC_NEWS
 from app.models.news import NewsArticle
 from app.models.user import User
-from app.schemas.news import NewsArticleResponse
+from app.schemas.news import DailyNewsRequest, NewsArticleResponse
 from app.auth import get_current_active_user
-from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/news", tags=["news"])
 
 @router.post("/generate-daily", response_model=List[NewsArticleResponse])
 async def generate_daily_news(
+    request: Optional[DailyNewsRequest] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """生成今日体育新闻日报（5条）- 从虎扑网站采集"""
+    """
+    生成今日体育新闻日报 - 从虎扑网站采集
+    默认采集5条NBA新闻；请求体传入categories（如{"nba": 5, "soccer": 3}）时一次并发采集多个类别，按内容归类后入库
+    """
+    categories = request.categories if request else None
+    if categories:
+        try:
+            category_limits = normalize_category_limits(categories)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
-        # 从虎扑网站采集新闻
-        news_list = scrape_hupu_news(category="nba", limit=5)
-        
-        # 如果虎扑采集失败或数量不足，使用Agent作为备用方案
-        if len(news_list) < 5:
-            collector = NewsCollectorAgent()
-            news_sources = [
-                {"name": "虎扑NBA", "url": "https://www.hupu.com/nba"},
-                {"name": "虎扑足球", "url": "https://www.hupu.com/soccer"}
-            ]
-            agent_news = await collector.collect_news(news_sources)
-            # 合并结果，去重
-            seen_titles = {item.get('title', '') for item in news_list}
-            for news in agent_news:
-                if news.get('title') and news.get('title') not in seen_titles:
-                    news_list.append(news)
-                    seen_titles.add(news.get('title'))
-        
-        # 保存到数据库（只保存5条，绑定当前用户ID）
-        saved_articles = []
-        for news in news_list[:5]:
-            # 处理发布时间
-            publish_time = news.get('publish_time')
-            if isinstance(publish_time, str):
-                try:
-                    publish_time = datetime.fromisoformat(publish_time.replace('Z', '+00:00'))
-                except:
-                    publish_time = datetime.now()
-            elif not isinstance(publish_time, datetime):
-                publish_time = datetime.now()
+        if categories:
+            # 各类别并发采集，按内容重新归类（每类最多limit条，跨类别去重）
+            sections = await collect_digest_news(category_limits)
+            news_list = [news for articles in sections.values() for news in articles]
+            saved_articles = ingest_news(db, current_user.id, news_list)
+        else:
+            # 从虎扑网站采集新闻，数量不足时使用Agent作为备用方案（并发的相同采集只执行一次）
+            news_list = await collect_latest_news(category="nba", limit=5)
             
-            article = NewsArticle(
-                user_id=current_user.id,  # 核心隔离：写入时绑定用户ID
-                title=news.get('title', ''),
-                content=news.get('content', '')[:5000] if news.get('content') else '',  # 限制内容长度
-                source=news.get('source', '虎扑'),
-                source_url=news.get('url', ''),
-                category=news.get('category', '体育'),
-                article_metadata=news.get('metadata', {}),
-                publish_time=publish_time
-            )
-            db.add(article)
-            saved_articles.append(article)
-        
-        db.commit()
-        
-        # 刷新以获取ID
-        for article in saved_articles:
-            db.refresh(article)
+            # 近似去重后批量入库（只保存5条，绑定当前用户ID），一次多行INSERT返回ID，无需逐条refresh
+            saved_articles = ingest_news(db, current_user.id, news_list, limit=5)
         
+        # 向量索引在线程中写入，不阻塞事件循环
+        await asyncio.to_thread(index_vectors, saved_articles)
         return saved_articles
     except Exception as e:
         db.rollback()
-        import traceback
-        error_detail = traceback.format_exc()
-        print(f"生成日报失败: {str(e)}")
-        print(f"错误详情: {error_detail}")
+        logger.exception("生成日报失败: %s", e)
         raise HTTPException(status_code=500, detail=f"生成日报失败: {str(e)}")
 
 @router.get("/list", response_model=List[NewsArticleResponse])
 async def get_news_list(
     skip: int = 0,
     limit: int = 20,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),  # 只读接口：可路由到从库
     current_user: User = Depends(get_current_active_user)
 ):
     """获取当前用户的新闻列表（数据隔离：只返回当前用户的新闻）"""
@@ -98,7 +74,7 @@ async def get_news_list(
 @router.get("/{news_id}", response_model=NewsArticleResponse)
 async def get_news_detail(
     news_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),  # 只读接口：可路由到从库
     current_user: User = Depends(get_current_active_user)
 ):
     """获取新闻详情（数据隔离：只能查看自己的新闻）"""
@@ -128,7 +104,13 @@ async def delete_news(
     
     try:
         db.delete(news)
+        remove_document(db, DOC_NEWS, news_id)
         db.commit()
+        # 向量索引依赖numpy，首次使用时才导入（应用启动时不加载）
+        from app.services import vector_index
+        await asyncio.to_thread(
+            vector_index.safe_index, vector_index.remove_document, current_user.id, vector_index.DOC_NEWS, news_id
+        )
         return {"message": "新闻删除成功", "id": news_id}
     except Exception as e:
         db.rollback()
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import time
+from app.database import get_read_db
+from app.models.user import User
+from app.schemas.search import SearchResponse
+from app.services.search_index import search, DOC_TYPES
+from app.auth import get_current_active_user
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+@router.get("", response_model=SearchResponse)
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=200, description="查询文本"),
+    type: Optional[str] = Query(None, description="文档类型：news/report，为空时检索全部"),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),  # 只读接口：可路由到从库
+    current_user: User = Depends(get_current_active_user)
+):
+    """全文检索新闻和报告（数据隔离：只检索当前用户的数据）"""
+    if type and type not in DOC_TYPES:
+        raise HTTPException(status_code=400, detail=f"不支持的文档类型: {type}")
+    
+    started = time.perf_counter()
+    result = search(db, current_user.id, q, doc_type=type, limit=limit, offset=skip)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    
+    return SearchResponse(query=q, total=result["total"], took_ms=took_ms, results=result["results"])
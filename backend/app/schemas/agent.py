@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict
+from app.services.digest import DIGEST_CATEGORIES, normalize_categories
+
+class AgentTaskRequest(BaseModel):
+    task: str  # 任务描述，如"采集NBA和足球新闻并生成日报"
+    # 类别代码（nba/cba/soccer/esports），为空时从任务描述中识别；类别代码会拼入采集地址，只接受已知类别
+    categories: Optional[List[str]] = Field(None, max_length=len(DIGEST_CATEGORIES))
+    limit_per_category: int = 5
+    news_sources: Optional[List[Dict]] = None  # 额外使用采集Agent采集的新闻源
+    max_parallel: Optional[int] = None  # 同时执行的子任务数上限（不超过服务端配置）
+
+    @field_validator('categories')
+    @classmethod
+    def validate_categories(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """校验类别代码（与日报类别一致）"""
+        return normalize_categories(v) or None
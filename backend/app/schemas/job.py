@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Optional, Dict
+from datetime import datetime
+
+class JobCreate(BaseModel):
+    job_type: str  # report.daily、report.digest、news.collect
+    payload: Optional[Dict] = None
+
+class JobResponse(BaseModel):
+    id: int
+    job_type: str
+    status: str
+    progress: int
+    message: Optional[str]
+    payload: Optional[Dict]
+    result: Optional[Dict]
+    error: Optional[str]
+    attempts: int
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
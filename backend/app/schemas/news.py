@@ -20,4 +20,7 @@ class NewsArticleResponse(NewsArticleBase):
     
     class Config:
         from_attributes = True
-        populate_by_name = True  # 允许使用字段名或别名
\ No newline at end of file
+        populate_by_name = True  # 允许使用字段名或别名
+
+class DailyNewsRequest(BaseModel):
+    categories: Optional[Dict[str, int]] = None  # 类别代码 -> 条数，如{"nba": 5, "soccer": 3}，为空时采集5条NBA新闻
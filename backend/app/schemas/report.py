@@ -16,3 +16,6 @@ class AnalysisReportResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class DigestRequest(BaseModel):
+    categories: Optional[Dict[str, int]] = None  # 类别代码 -> 条数，如{"nba": 5, "soccer": 3}，为空时为{"nba": 5}
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class SearchResult(BaseModel):
+    doc_type: str  # news/report
+    id: int
+    title: str
+    snippet: str
+    score: float
+    created_at: Optional[datetime] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    took_ms: float
+    results: List[SearchResult]
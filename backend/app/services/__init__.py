@@ -0,0 +1,3 @@
+"""
+业务服务模块（依赖数据库的领域逻辑）
+"""
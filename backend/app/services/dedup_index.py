@@ -0,0 +1,105 @@
+"""
+持久化的新闻近似重复索引
+签名与LSH分段键随文章一起入库，新文章只需按分段键索引查找最近窗口内的候选文章
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.news_fingerprint import NewsFingerprint, NewsFingerprintBand
+from app.tools.dedup import (
+    NearDuplicateIndex,
+    article_signature,
+    band_keys,
+    decode_signature,
+    encode_signature
+)
+
+logger = logging.getLogger(__name__)
+
+
+def filter_new_articles(
+    db: Session,
+    user_id: int,
+    news_list: List[Dict],
+    threshold: Optional[float] = None,
+    window_days: Optional[int] = None
+) -> List[Tuple[Dict, Tuple[int, ...]]]:
+    """
+    过滤与批次内或该用户最近入库文章近似重复的新闻
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID（去重范围按用户隔离）
+        news_list: 待入库的新闻列表
+        threshold: 相似度阈值（默认读取配置）
+        window_days: 比较窗口天数（默认读取配置）
+
+    Returns:
+        [(新闻, 签名)]，签名供入库后调用record_fingerprints保存
+    """
+    threshold = settings.DEDUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    window_days = settings.DEDUP_WINDOW_DAYS if window_days is None else window_days
+    if not news_list:
+        return []
+
+    signed = [(news, article_signature(news)) for news in news_list]
+    keys = {key for _, signature in signed for key in band_keys(signature)}
+
+    # 一次查询取出所有分段键命中的候选文章
+    since = datetime.now() - timedelta(days=window_days)
+    candidate_ids = {
+        row.article_id
+        for row in db.query(NewsFingerprintBand.article_id).filter(
+            NewsFingerprintBand.user_id == user_id,
+            NewsFingerprintBand.band_key.in_(keys),
+            NewsFingerprintBand.created_at >= since
+        )
+    }
+
+    index = NearDuplicateIndex(threshold)
+    if candidate_ids:
+        for row in db.query(NewsFingerprint.article_id, NewsFingerprint.signature).filter(
+            NewsFingerprint.article_id.in_(candidate_ids)
+        ):
+            index.add(decode_signature(row.signature), row.article_id)
+
+    kept = []
+    seen_titles = set()
+    for news, signature in signed:
+        title = news.get('title')
+        if not title or title in seen_titles:
+            continue
+        match = index.find(signature)
+        if match is not None:
+            logger.info("跳过近似重复新闻: %s（相似文章ID: %s）", title, match[1], extra={"sample": "dedup.near_duplicate"})
+            continue
+        index.add(signature, title)
+        seen_titles.add(title)
+        kept.append((news, signature))
+    return kept
+
+
+def record_fingerprints(db: Session, user_id: int, articles: List[Tuple[object, Sequence[int]]]):
+    """
+    保存文章签名与分段键（文章需已获得ID，随调用方事务一起提交）
+    签名和分段键各一次executemany写入
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        articles: [(NewsArticle, 签名)]
+    """
+    if not articles:
+        return
+    db.execute(insert(NewsFingerprint), [
+        {"article_id": article.id, "user_id": user_id, "signature": encode_signature(signature)}
+        for article, signature in articles
+    ])
+    db.execute(insert(NewsFingerprintBand), [
+        {"article_id": article.id, "user_id": user_id, "band_key": key}
+        for article, signature in articles
+        for key in band_keys(signature)
+    ])
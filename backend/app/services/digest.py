@@ -0,0 +1,160 @@
+"""
+多类别日报：一次采集多个类别，按内容重新归类，每个类别一节
+- 各类别并发采集（相同类别/条数的并发采集只执行一次）
+- 虎扑栏目新闻不足时会补充其他栏目，因此按标题和内容（detect_category_from_content）重新归类，
+  识别不出类别的新闻归入采集时的栏目
+- 每个类别的分析结果按文章集合共享（见news_analysis），关注相同类别的用户不会重复调用LLM
+"""
+from typing import Dict, List, Optional
+from app.config import settings
+from app.services.news_collection import collect_latest_news
+from app.services.news_analysis import analyze_articles
+from app.tools.dedup import filter_near_duplicates
+from app.utils.task_graph import TaskGraph
+
+# 支持的类别：虎扑栏目代码 -> 类别名称（与detect_category_from_content的返回值一致）
+DIGEST_CATEGORIES = {
+    'nba': 'NBA',
+    'cba': 'CBA',
+    'soccer': '足球',
+    'esports': '电竞',
+}
+DEFAULT_CATEGORY_LIMITS = {'nba': 5}
+MAX_CATEGORY_LIMIT = 20
+
+
+def normalize_category_limits(category_limits: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """
+    校验类别和条数（为空时使用默认值nba:5）
+
+    Raises:
+        ValueError: 类别不支持或条数不合法
+    """
+    if not category_limits:
+        return dict(DEFAULT_CATEGORY_LIMITS)
+    result = {}
+    for code, limit in category_limits.items():
+        code = str(code).lower()
+        if code not in DIGEST_CATEGORIES:
+            raise ValueError(f"不支持的类别: {code}（可选: {', '.join(DIGEST_CATEGORIES)}）")
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValueError(f"类别 {code} 的条数必须是整数")
+        if not 1 <= limit <= MAX_CATEGORY_LIMIT:
+            raise ValueError(f"类别 {code} 的条数需在1到{MAX_CATEGORY_LIMIT}之间")
+        result[code] = limit
+    return result
+
+
+def normalize_categories(categories: Optional[List[str]]) -> List[str]:
+    """
+    校验类别代码列表（统一小写、去重，为空时返回空列表）
+
+    Raises:
+        ValueError: 类别不支持或数量超过类别总数
+    """
+    if not categories:
+        return []
+    if len(categories) > len(DIGEST_CATEGORIES):
+        raise ValueError(f"类别最多{len(DIGEST_CATEGORIES)}个")
+    result = []
+    for code in categories:
+        code = str(code).strip().lower()
+        if code not in DIGEST_CATEGORIES:
+            raise ValueError(f"不支持的类别: {code}（可选: {', '.join(DIGEST_CATEGORIES)}）")
+        if code not in result:
+            result.append(code)
+    return result
+
+
+def classify_news(news_list: List[Dict], source_code: str) -> Dict[str, List[Dict]]:
+    """按标题和内容归类（返回 类别代码 -> 新闻），识别不出的归入采集栏目source_code"""
+    # 采集模块依赖requests，首次使用时才导入（不计入启动耗时）
+    from app.tools.hupu_scraper import detect_category_from_content
+
+    name_to_code = {name: code for code, name in DIGEST_CATEGORIES.items()}
+    groups: Dict[str, List[Dict]] = {}
+    for news in news_list:
+        detected = detect_category_from_content(news.get('title', ''), news.get('content', ''))
+        code = name_to_code.get(detected, source_code)
+        groups.setdefault(code, []).append({**news, 'category': DIGEST_CATEGORIES[code]})
+    return groups
+
+
+async def collect_digest_news(category_limits: Dict[str, int]) -> Dict[str, List[Dict]]:
+    """
+    并发采集多个类别并按内容归类
+
+    Args:
+        category_limits: 类别代码 -> 条数（已校验）
+
+    Returns:
+        类别代码 -> 新闻列表（按category_limits顺序，每类最多limit条，跨类别近似去重；采集失败的类别为空列表）
+    """
+    graph = TaskGraph(max_parallel=settings.COORDINATOR_MAX_PARALLEL, default_timeout=settings.COORDINATOR_NODE_TIMEOUT)
+    for code, limit in category_limits.items():
+        graph.add(code, lambda inputs, code=code, limit=limit: collect_latest_news(code, limit))
+    run = await graph.run()
+
+    # 按内容归类：其他栏目采集到的同类新闻也计入该类别（请求顺序靠前的类别优先）
+    pools: Dict[str, List[Dict]] = {code: [] for code in category_limits}
+    for source_code in category_limits:
+        for code, items in classify_news(run["results"].get(source_code) or [], source_code).items():
+            if code in pools:
+                pools[code].extend(items)
+
+    sections: Dict[str, List[Dict]] = {}
+    selected: List[Dict] = []
+    for code, limit in category_limits.items():
+        kept = filter_near_duplicates(pools[code], existing=selected)[:limit]
+        selected.extend(kept)
+        sections[code] = kept
+    return sections
+
+
+async def analyze_sections(sections: Dict[str, List[Dict]], analysis_type: str = "daily") -> Dict:
+    """
+    并发分析各类别（部分类别失败时返回成功的部分）
+
+    Returns:
+        {"analysis": {类别代码: 分析结果}, "errors": {类别代码: 错误信息}}
+    """
+    graph = TaskGraph(max_parallel=settings.COORDINATOR_MAX_PARALLEL, default_timeout=settings.COORDINATOR_NODE_TIMEOUT)
+    for code, articles in sections.items():
+        if articles:
+            graph.add(code, lambda inputs, articles=articles: analyze_articles(articles, analysis_type))
+    run = await graph.run()
+    return {"analysis": run["results"], "errors": run["errors"]}
+
+
+def build_digest_content(sections: Dict[str, List[Dict]], analysis: Dict[str, Dict], errors: Dict[str, str]) -> Dict:
+    """
+    合并各类别分析结果为一份报告
+
+    Returns:
+        {"title_suffix", "summary", "content"}
+    """
+    names = [DIGEST_CATEGORIES[code] for code in sections]
+    summary_parts = []
+    content_parts = []
+    for code, articles in sections.items():
+        name = DIGEST_CATEGORIES[code]
+        content_parts.append(f"# {name}（{len(articles)}条）\n")
+        if code in analysis:
+            summary = analysis[code].get('summary', '')
+            if summary:
+                summary_parts.append(f"【{name}】{summary}")
+            content_parts.append(analysis[code].get('content', ''))
+        elif not articles:
+            content_parts.append("今日没有采集到该类别的新闻。")
+        else:
+            content_parts.append(f"该类别分析失败：{errors.get(code, '未知错误')}")
+            content_parts.append('\n'.join(f"- {news.get('title')}" for news in articles))
+        content_parts.append('')
+
+    return {
+        "title_suffix": '/'.join(names),
+        "summary": '\n'.join(summary_parts),
+        "content": '\n'.join(content_parts).strip()
+    }
@@ -0,0 +1,274 @@
+"""
+后台任务worker
+- 默认随API进程启动（JOB_WORKER_ENABLED），也可以关闭后单独部署，按负载独立扩容：
+      python -m app.services.job_worker --concurrency 4
+- 每个执行槽位循环认领并执行任务；新任务在本进程入队时立即唤醒，其他进程入队的任务按JOB_POLL_INTERVAL轮询
+- 执行期间定期续约；续约失败（任务被取消或租约过期被接管）时中止执行并回滚
+- 停止时归还未完成的任务，由其他worker继续执行
+"""
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import signal
+import socket
+import uuid
+from contextlib import ExitStack
+from typing import List, Optional
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job
+from app.models.user import User
+from app.services import jobs
+from app.utils.logging_config import log_context, setup_logging
+from app.utils.tracing import KIND_CONSUMER, shutdown_tracing, span
+
+logger = logging.getLogger(__name__)
+
+# 注册任务处理函数的模块（worker启动时导入）
+JOB_MODULES = [
+    "app.services.report_jobs",
+]
+
+
+def load_job_handlers():
+    for module in JOB_MODULES:
+        importlib.import_module(module)
+
+
+class JobWorker:
+    """异步任务worker（一个事件循环内运行多个执行槽位）"""
+
+    def __init__(
+        self,
+        concurrency: int = None,
+        poll_interval: float = None,
+        lease_seconds: int = None,
+        job_types: Optional[List[str]] = None
+    ):
+        """
+        Args:
+            concurrency: 并发执行的任务数
+            poll_interval: 没有任务时的轮询间隔（秒）
+            lease_seconds: 任务租约时长（秒），每1/3租约时长续约一次
+            job_types: 只执行这些类型的任务（None表示全部）
+        """
+        self.concurrency = max(1, concurrency or settings.JOB_WORKER_CONCURRENCY)
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.lease_seconds = max(3, lease_seconds or settings.JOB_LEASE_SECONDS)
+        self.job_types = job_types
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: List[asyncio.Task] = []
+        self._running = {}  # job_id -> 执行中的处理函数Task
+        self._stopping = False
+
+    def notify(self):
+        """唤醒空闲槽位（线程安全，新任务入队时调用）"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self):
+        """启动worker（在当前事件循环中创建执行槽位）"""
+        load_job_handlers()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        jobs.add_listener(self.notify)
+        self._slots = [asyncio.create_task(self._slot_loop()) for _ in range(self.concurrency)]
+        logger.info("任务worker已启动（%s，并发 %d）", self.worker_id, self.concurrency)
+
+    async def stop(self, timeout: float = 10.0):
+        """停止worker：中止执行中的任务并归还，等待槽位退出"""
+        self._stopping = True
+        jobs.remove_listener(self.notify)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        for task in list(self._running.values()):
+            task.cancel()
+        if self._slots:
+            done, pending = await asyncio.wait(self._slots, timeout=timeout)
+            for slot in pending:
+                slot.cancel()
+        self._slots = []
+        logger.info("任务worker已停止（%s）", self.worker_id)
+
+    async def run_forever(self):
+        """命令行模式：启动后一直运行，收到SIGINT/SIGTERM时归还执行中的任务后退出"""
+        loop = asyncio.get_running_loop()
+        current = asyncio.current_task()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, current.cancel)
+            except (NotImplementedError, RuntimeError):
+                pass
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.stop()
+
+    async def _slot_loop(self):
+        while not self._stopping:
+            try:
+                job_id = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.warning("认领任务失败: %s", e)
+                job_id = None
+
+            if job_id is not None and self._stopping:
+                # 停止过程中认领到的任务直接归还
+                await asyncio.to_thread(jobs.release_job, job_id, self.worker_id)
+                break
+
+            if job_id is None:
+                # 没有任务：等待入队通知或轮询间隔
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.execute(job_id)
+
+    def _claim(self) -> Optional[int]:
+        db = SessionLocal()
+        try:
+            job = jobs.claim_job(db, self.worker_id, self.lease_seconds, self.job_types)
+            return job.id if job else None
+        finally:
+            db.close()
+
+    async def execute(self, job_id: int):
+        """执行一个已认领的任务（任务span继续创建任务的请求链路）"""
+        db = SessionLocal()
+        heartbeat = None
+        job_span = None
+        trace_scope = ExitStack()
+        try:
+            job = db.get(Job, job_id)
+            if job is None:
+                return
+            # 任务执行期间的日志附带job_id（处理函数中的日志同样带有）
+            trace_scope.enter_context(log_context(job_id=job_id, job_type=job.job_type, user_id=job.user_id))
+            job_span = trace_scope.enter_context(span(f"job {job.job_type}", {
+                "job.id": job_id,
+                "job.type": job.job_type,
+                "job.attempt": job.attempts,
+                "worker.id": self.worker_id
+            }, kind=KIND_CONSUMER, parent=job.trace_context))
+            if not job.trace_context:
+                # 不是由请求创建的任务：记录任务自己的链路，进度事件中的trace_id与之一致
+                job.trace_context = job_span.traceparent
+            handler = jobs.get_handler(job.job_type)
+            if handler is None:
+                raise jobs.JobError(f"未知的任务类型: {job.job_type}")
+            ctx = jobs.JobContext(job, db, self.worker_id)
+            # 读己之写：任务提交后该用户的读请求暂时走主库（读写分离时生效）
+            # 粘滞键与认证依赖一致，使用用户名（见auth.get_current_user）
+            db.info["sticky_key"] = db.query(User.username).filter(User.id == job.user_id).scalar()
+            # 认领时写入的状态属于已提交的事务，处理函数从新事务开始
+            db.commit()
+
+            jobs.mark_local(job_id)
+            task = asyncio.create_task(handler(ctx))
+            self._running[job_id] = task
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, task))
+            result = await task
+
+            if jobs.complete_job(db, job_id, self.worker_id, result):
+                db.commit()
+                jobs.publish_job(db.get(Job, job_id))
+                await ctx.run_after_commit()
+            else:
+                # 执行期间任务被取消或被接管，业务数据不提交
+                db.rollback()
+        except asyncio.CancelledError:
+            db.rollback()
+            if job_span is not None:
+                job_span.set_attribute("job.cancelled", True)
+            if self._stopping:
+                await asyncio.to_thread(jobs.release_job, job_id, self.worker_id)
+            # 任务被取消（或租约丢失）时状态已由取消方写入
+        except jobs.JobError as e:
+            db.rollback()
+            if job_span is not None:
+                job_span.record_exception(e)
+            await asyncio.to_thread(jobs.fail_job, job_id, self.worker_id, e.message)
+        except Exception as e:
+            db.rollback()
+            if job_span is not None:
+                job_span.record_exception(e)
+            logger.exception("任务 %s 执行失败: %s", job_id, e)
+            await asyncio.to_thread(jobs.fail_job, job_id, self.worker_id, str(e) or type(e).__name__)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            self._running.pop(job_id, None)
+            jobs.unmark_local(job_id)
+            db.close()
+            trace_scope.close()
+
+    async def _heartbeat(self, job_id: int, task: asyncio.Task):
+        """定期续约；任务被取消或被其他worker接管时中止执行"""
+        interval = self.lease_seconds / 3
+        while not task.done():
+            await asyncio.sleep(interval)
+            try:
+                owned = await asyncio.to_thread(jobs.renew_lease, job_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning("任务 %s 续约失败: %s", job_id, e)
+                continue
+            if not owned:
+                logger.warning("任务 %s 已取消或被其他worker接管，中止执行", job_id)
+                task.cancel()
+                return
+
+
+# API进程内的worker（JOB_WORKER_ENABLED时随应用启动）
+_embedded_worker: Optional[JobWorker] = None
+
+
+async def start_embedded_worker():
+    global _embedded_worker
+    if _embedded_worker is None:
+        _embedded_worker = JobWorker()
+        await _embedded_worker.start()
+
+
+async def stop_embedded_worker():
+    global _embedded_worker
+    if _embedded_worker is not None:
+        await _embedded_worker.stop()
+        _embedded_worker = None
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令行入口：独立运行任务worker"""
+    parser = argparse.ArgumentParser(description="运行后台任务worker（报告生成、新闻采集）")
+    parser.add_argument("--concurrency", type=int, default=None, help="并发执行的任务数（默认JOB_WORKER_CONCURRENCY）")
+    parser.add_argument("--poll-interval", type=float, default=None, help="轮询间隔（秒）")
+    parser.add_argument("--job-type", action="append", default=None, help="只执行指定类型的任务（可重复）")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    worker = JobWorker(
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        job_types=args.job_type
+    )
+    try:
+        asyncio.run(worker.run_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    main()
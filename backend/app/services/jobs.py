@@ -0,0 +1,505 @@
+"""
+后台任务队列（基于jobs表）
+- enqueue_job写入任务；相同用户的相同任务（幂等键相同）未结束时直接返回已有任务，重复点击不会重复执行
+- worker通过条件UPDATE原子认领任务并持有租约，执行期间定期续约；租约过期说明worker已中断，任务可被其他worker重新认领
+- 任务处理函数在worker的数据库会话中执行且不自行提交，任务结果与业务数据在同一事务中提交，不会出现半提交
+- 进度使用独立的短事务写入（轮询接口和其他进程读取），同时发布到进程内进度通道，SSE接口订阅通道实时推送
+- 任务记录保存创建请求的链路上下文，worker执行时继续同一条链路，进度事件带trace_id
+任务处理函数通过@job_handler注册，worker见app/services/job_worker.py
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job
+from app.utils.progress import broker
+from app.utils.tracing import current_trace_id, current_traceparent, parse_traceparent
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+# 幂等键最大长度（与jobs.idempotency_key字段一致）
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+# 每次认领时查看的候选任务数（并发认领冲突时依次尝试）
+CLAIM_BATCH_SIZE = 10
+
+
+class JobError(Exception):
+    """任务执行失败（message直接展示给用户，不记录堆栈）"""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class JobContext:
+    """任务执行上下文（传给任务处理函数）"""
+
+    def __init__(self, job: Job, db: Session, worker_id: str):
+        self.job_id = job.id
+        self.user_id = job.user_id
+        self.job_type = job.job_type
+        self.payload = dict(job.payload or {})
+        self.attempt = job.attempts
+        self.db = db
+        self.worker_id = worker_id
+        self._after_commit: List[Tuple[Callable, tuple]] = []
+
+    async def progress(self, progress: int, message: str):
+        """更新任务进度：立即发布到进度通道，并写入任务记录（写入失败不影响任务执行）"""
+        progress = max(0, min(100, int(progress)))
+        broker.publish(job_channel_key(self.job_id), {
+            'progress': progress, 'message': message or '', 'status': 'loading', 'job_id': self.job_id,
+            'trace_id': current_trace_id()
+        })
+        await asyncio.to_thread(update_progress, self.job_id, self.worker_id, progress, message)
+
+    def after_commit(self, func: Callable, *args):
+        """注册提交成功后执行的操作（如写入本地向量索引等非事务性副作用，同步函数，在线程中执行）"""
+        self._after_commit.append((func, args))
+
+    async def run_after_commit(self):
+        """在线程中依次执行提交后操作（文件读写、向量计算不阻塞事件循环）"""
+        if self._after_commit:
+            await asyncio.to_thread(self._run_after_commit)
+
+    def _run_after_commit(self):
+        for func, args in self._after_commit:
+            try:
+                func(*args)
+            except Exception as e:
+                logger.warning("任务 %s 提交后操作失败: %s", self.job_id, e)
+
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[Dict]]]
+
+# 任务类型 -> (处理函数, 最多执行次数)
+_handlers: Dict[str, Tuple[JobHandler, int]] = {}
+# 进程内worker的唤醒回调（新任务入队时立即认领，不必等待下一次轮询）
+_listeners: List[Callable[[], None]] = []
+# 本进程正在执行的任务（进度直接发布到进度通道，SSE接口无需读取数据库）
+_local_jobs = set()
+
+
+def job_handler(job_type: str, max_attempts: Optional[int] = None):
+    """
+    注册任务处理函数
+
+    处理函数签名：async def handler(ctx: JobContext) -> Optional[Dict]
+    - 通过ctx.db读写业务数据，不要提交事务（由worker与任务状态一起提交）
+    - 通过ctx.progress(progress, message)上报进度
+    - 返回值作为任务结果保存；抛出JobError表示可预期的失败
+
+    Args:
+        job_type: 任务类型
+        max_attempts: worker中断后最多执行次数（默认Settings.JOB_MAX_ATTEMPTS）
+    """
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[job_type] = (func, max_attempts or settings.JOB_MAX_ATTEMPTS)
+        return func
+    return decorator
+
+
+def get_handler(job_type: str) -> Optional[JobHandler]:
+    entry = _handlers.get(job_type)
+    return entry[0] if entry else None
+
+
+def registered_job_types() -> List[str]:
+    return sorted(_handlers)
+
+
+def add_listener(callback: Callable[[], None]):
+    """注册新任务入队时的回调（回调需线程安全）"""
+    _listeners.append(callback)
+
+
+def remove_listener(callback: Callable[[], None]):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def notify_workers():
+    for callback in list(_listeners):
+        try:
+            callback()
+        except Exception:
+            pass
+
+
+def job_channel_key(job_id: int) -> str:
+    """任务的进度通道名"""
+    return f"job:{job_id}"
+
+
+def publish_job(job: Job):
+    """将任务当前状态发布到进度通道（任务已结束时关闭通道）"""
+    key = job_channel_key(job.id)
+    if job.status in FINISHED_STATUSES:
+        broker.close(key, job_event(job))
+    else:
+        broker.publish(key, job_event(job))
+
+
+def mark_local(job_id: int):
+    _local_jobs.add(job_id)
+
+
+def unmark_local(job_id: int):
+    _local_jobs.discard(job_id)
+
+
+def is_local_job(job_id: int) -> bool:
+    """任务是否正由本进程的worker执行"""
+    return job_id in _local_jobs
+
+
+def make_idempotency_key(job_type: str, payload: Optional[Dict] = None) -> str:
+    """由任务类型和参数生成幂等键（参数相同的任务视为同一任务）"""
+    raw = json.dumps([job_type, payload or {}], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def enqueue_job(
+    db: Session,
+    user_id: int,
+    job_type: str,
+    payload: Optional[Dict] = None,
+    idempotency_key: Optional[str] = None
+) -> Tuple[Job, bool]:
+    """
+    提交任务（幂等）
+
+    - 客户端提供幂等键时，该用户已有相同键的任务（无论是否结束）直接返回
+    - 未提供时由任务类型+参数生成，只与未结束的任务合并（结束后可再次提交）
+    并发提交时由(user_id, active_key)唯一索引保证只有一个任务写入成功
+
+    Args:
+        db: 数据库会话（会提交事务）
+        user_id: 所属用户ID
+        job_type: 任务类型（需已注册）
+        payload: 任务参数（需可JSON序列化）
+        idempotency_key: 客户端提供的幂等键
+
+    Returns:
+        (任务, 是否新创建)
+    """
+    if job_type not in _handlers:
+        raise ValueError(f"未知的任务类型: {job_type}")
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise ValueError(f"幂等键长度需在1-{MAX_IDEMPOTENCY_KEY_LENGTH}之间")
+
+    payload = payload or {}
+    key = idempotency_key or make_idempotency_key(job_type, payload)
+
+    # 核心隔离：幂等键只在当前用户范围内生效
+    if idempotency_key is not None:
+        existing = db.query(Job).filter(
+            Job.user_id == user_id,
+            Job.idempotency_key == key
+        ).order_by(Job.id.desc()).first()
+    else:
+        existing = _active_job(db, user_id, key)
+    if existing:
+        return existing, False
+
+    job = Job(
+        user_id=user_id,
+        job_type=job_type,
+        status=STATUS_PENDING,
+        progress=0,
+        message="等待执行",
+        payload=payload,
+        idempotency_key=key,
+        active_key=key,
+        attempts=0,
+        max_attempts=_handlers[job_type][1],
+        trace_context=current_traceparent(),
+        updated_at=datetime.now()
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 并发提交了相同任务，返回先写入的那一个
+        db.rollback()
+        existing = _active_job(db, user_id, key)
+        if existing:
+            return existing, False
+        raise
+    db.refresh(job)
+    publish_job(job)
+    notify_workers()
+    return job, True
+
+
+def _active_job(db: Session, user_id: int, key: str) -> Optional[Job]:
+    return db.query(Job).filter(Job.user_id == user_id, Job.active_key == key).first()
+
+
+def get_job(db: Session, user_id: int, job_id: int) -> Optional[Job]:
+    """获取任务（核心隔离：只能获取当前用户的任务）"""
+    return db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+
+
+def _claimable(now: datetime):
+    """可认领的任务：等待中，或执行中但租约已过期（worker中断）"""
+    return or_(
+        Job.status == STATUS_PENDING,
+        and_(Job.status == STATUS_RUNNING, Job.lease_until < now)
+    )
+
+
+def claim_job(
+    db: Session,
+    worker_id: str,
+    lease_seconds: int,
+    job_types: Optional[List[str]] = None
+) -> Optional[Job]:
+    """
+    认领一个任务（多个worker并发认领时，条件UPDATE保证同一任务只被一个worker认领）
+
+    Args:
+        db: 数据库会话（会提交事务）
+        worker_id: worker标识
+        lease_seconds: 租约时长
+        job_types: 只认领这些类型的任务（None表示全部已注册类型）
+
+    Returns:
+        认领到的任务，没有可执行任务时返回None
+    """
+    job_types = job_types or registered_job_types()
+    if not job_types:
+        return None
+
+    now = datetime.now()
+    candidates = [
+        row.id for row in db.query(Job.id).filter(
+            _claimable(now),
+            Job.job_type.in_(job_types)
+        ).order_by(Job.id).limit(CLAIM_BATCH_SIZE).all()
+    ]
+
+    for job_id in candidates:
+        claimed = db.query(Job).filter(Job.id == job_id, _claimable(now)).update({
+            Job.status: STATUS_RUNNING,
+            Job.worker_id: worker_id,
+            Job.lease_until: now + timedelta(seconds=lease_seconds),
+            Job.started_at: now,
+            Job.attempts: Job.attempts + 1,
+            Job.updated_at: now
+        }, synchronize_session=False)
+        db.commit()
+        if claimed != 1:
+            continue  # 已被其他worker认领
+
+        job = db.get(Job, job_id)
+        db.refresh(job)
+        if job.attempts > job.max_attempts:
+            # 多次执行都因worker中断而未完成，不再重试
+            _finish(job, STATUS_FAILED, error="任务执行中断（worker异常退出），请重新提交")
+            db.commit()
+            publish_job(job)
+            continue
+        return job
+    return None
+
+
+def renew_lease(job_id: int, worker_id: str, lease_seconds: int) -> bool:
+    """
+    续约（独立短事务）
+
+    Returns:
+        任务是否仍由该worker执行（已被取消或被其他worker接管时返回False）
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        renewed = db.query(Job).filter(
+            Job.id == job_id,
+            Job.worker_id == worker_id,
+            Job.status == STATUS_RUNNING
+        ).update({
+            Job.lease_until: now + timedelta(seconds=lease_seconds),
+            Job.updated_at: now
+        }, synchronize_session=False)
+        db.commit()
+        return renewed == 1
+    finally:
+        db.close()
+
+
+def update_progress(job_id: int, worker_id: str, progress: int, message: str):
+    """写入任务进度（独立短事务，失败只打印警告）"""
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(
+            Job.id == job_id,
+            Job.worker_id == worker_id,
+            Job.status == STATUS_RUNNING
+        ).update({
+            Job.progress: max(0, min(100, int(progress))),
+            Job.message: (message or "")[:500],
+            Job.updated_at: datetime.now()
+        }, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("任务 %s 进度写入失败: %s", job_id, e)
+    finally:
+        db.close()
+
+
+def _finish(job: Job, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+    now = datetime.now()
+    job.status = status
+    job.active_key = None  # 释放幂等键，相同任务可再次提交
+    job.lease_until = None
+    job.finished_at = now
+    job.updated_at = now
+    if status == STATUS_SUCCEEDED:
+        job.progress = 100
+        job.message = "任务完成"
+        job.result = result or {}
+    else:
+        job.error = error
+        job.message = (error or "任务失败")[:500]
+
+
+def complete_job(db: Session, job_id: int, worker_id: str, result: Optional[Dict]) -> bool:
+    """
+    在任务处理函数的会话中标记任务成功（调用方随后提交，结果与业务数据在同一事务中）
+
+    Returns:
+        任务是否仍由该worker执行（False时调用方应回滚，业务数据不会写入）
+    """
+    job = db.query(Job).filter(
+        Job.id == job_id,
+        Job.worker_id == worker_id,
+        Job.status == STATUS_RUNNING
+    ).with_for_update().first()
+    if job is None:
+        return False
+    _finish(job, STATUS_SUCCEEDED, result=result)
+    return True
+
+
+def fail_job(job_id: int, worker_id: str, error: str):
+    """标记任务失败（独立短事务）"""
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(
+            Job.id == job_id,
+            Job.worker_id == worker_id,
+            Job.status == STATUS_RUNNING
+        ).first()
+        if job is not None:
+            _finish(job, STATUS_FAILED, error=error)
+            db.commit()
+            publish_job(job)
+    finally:
+        db.close()
+
+
+def release_job(job_id: int, worker_id: str):
+    """worker停止时归还未完成的任务（回到等待状态，由其他worker继续执行）"""
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(
+            Job.id == job_id,
+            Job.worker_id == worker_id,
+            Job.status == STATUS_RUNNING
+        ).update({
+            Job.status: STATUS_PENDING,
+            Job.worker_id: None,
+            Job.lease_until: None,
+            Job.attempts: Job.attempts - 1,
+            Job.message: "等待执行",
+            Job.updated_at: datetime.now()
+        }, synchronize_session=False)
+        db.commit()
+        job = db.get(Job, job_id)
+        if job is not None:
+            publish_job(job)
+    finally:
+        db.close()
+
+
+def cancel_job(db: Session, job: Job) -> bool:
+    """
+    取消任务（等待中的任务直接取消；执行中的任务由worker在下次续约时中止并回滚）
+
+    Returns:
+        是否取消成功（已结束的任务返回False）
+    """
+    return cancel_job_by_id(db, job.user_id, job.id)
+
+
+def cancel_job_by_id(db: Session, user_id: int, job_id: int) -> bool:
+    """
+    按ID取消任务（核心隔离：只能取消当前用户的任务），无需先读取任务
+
+    Returns:
+        是否取消成功（任务不存在或已结束时返回False）
+    """
+    # 条件UPDATE：读取任务后worker可能已完成或认领该任务，只取消此刻仍未结束的任务（不覆盖已写入的结果）
+    now = datetime.now()
+    cancelled = db.query(Job).filter(
+        Job.id == job_id,
+        Job.user_id == user_id,
+        Job.status.in_(ACTIVE_STATUSES)
+    ).update({
+        Job.status: STATUS_CANCELLED,
+        Job.active_key: None,  # 释放幂等键，相同任务可再次提交
+        Job.lease_until: None,
+        Job.finished_at: now,
+        Job.updated_at: now,
+        Job.error: "任务已取消",
+        Job.message: "任务已取消"
+    }, synchronize_session=False)
+    db.commit()
+    if cancelled != 1:
+        return False
+    publish_job(get_job(db, user_id, job_id))
+    return True
+
+
+def job_event(job: Job) -> Dict:
+    """
+    任务状态转换为进度事件（与/api/report/analyze原有的SSE数据格式一致）
+    {"progress", "message", "status": loading/success/error, "job_id", "trace_id", 成功时附带任务结果字段, 失败时"error"}
+    """
+    if job.status == STATUS_SUCCEEDED:
+        event = {'progress': 100, 'message': job.message or '任务完成', 'status': 'success'}
+        # 任务结果字段（如report、message）直接合并到事件中
+        event.update(job.result or {})
+    elif job.status in (STATUS_FAILED, STATUS_CANCELLED):
+        error = job.error or job.message or '任务失败'
+        event = {'progress': 0, 'message': error, 'status': 'error', 'error': error}
+    else:
+        event = {'progress': job.progress or 0, 'message': job.message or '', 'status': 'loading'}
+    event['job_id'] = job.id
+    event['trace_id'] = job_trace_id(job)
+    return event
+
+
+def job_trace_id(job: Job) -> Optional[str]:
+    """任务所属链路的trace_id（创建任务的请求或worker执行时记录）"""
+    parsed = parse_traceparent(job.trace_context)
+    return parsed[0] if parsed else None
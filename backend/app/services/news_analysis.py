@@ -0,0 +1,63 @@
+"""
+新闻分析（LLM调用）
+相同文章集合的分析只执行一次，结果在日报、分类日报、多Agent协作之间共享（与所属用户无关）
+"""
+import hashlib
+from typing import Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+from app.utils.llm_resilience import LLMError
+from app.utils.model_router import TASK_REPORT, primary_model
+from app.utils.single_flight import SingleFlight, flight_key
+
+# 相同文章集合的分析只执行一次；刚完成的分析结果在ANALYSIS_RESULT_TTL内直接复用
+analysis_flight = SingleFlight("analysis", result_ttl=settings.ANALYSIS_RESULT_TTL)
+
+
+def describe_llm_error(error: Exception) -> str:
+    """将LLM调用异常转换为用户可读的提示"""
+    if isinstance(error, LLMError):
+        return error.user_message
+    error_msg = str(error)
+    # 检查是否是API额度问题
+    if "AllocationQuota" in error_msg or "free tier" in error_msg.lower() or "quota" in error_msg.lower():
+        return "API免费额度已用完。请在DashScope管理控制台关闭'仅使用免费额度'模式，或充值后继续使用。"
+    if "403" in error_msg or "401" in error_msg:
+        return "API认证失败，请检查API密钥是否正确。"
+    if "timeout" in error_msg.lower():
+        return "请求超时，请稍后重试。"
+    return error_msg
+
+
+def analysis_key(news_list: List[Dict], analysis_type: str) -> str:
+    """分析合并键：文章集合（与顺序、所属用户无关）+ 分析类型 + 分析报告的首选模型"""
+    article_hashes = sorted(
+        hashlib.sha1(f"{news.get('title') or ''}\n{news.get('content') or ''}".encode('utf-8')).hexdigest()
+        for news in news_list
+    )
+    return flight_key(analysis_type, primary_model(TASK_REPORT), article_hashes)
+
+
+async def analyze_articles(
+    news_list: List[Dict],
+    analysis_type: str = "daily",
+    progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+    on_wait: Optional[Callable[[], Awaitable[None]]] = None
+) -> Dict:
+    """
+    分析一组新闻（NewsAnalyzerAgent.analyze_news），相同文章集合共享结果
+
+    Args:
+        news_list: 新闻字典列表
+        analysis_type: 分析类型
+        progress_callback: 进度回调（只有实际执行分析时调用）
+        on_wait: 等待其他请求的分析结果时调用
+
+    Returns:
+        分析结果（summary/content/statistics/sentiment_analysis等）
+    """
+    async def analyze():
+        # Agent依赖较重，首次执行时才导入（启动后由后台预热任务提前加载）
+        from app.agents.news_analyzer import NewsAnalyzerAgent
+        return await NewsAnalyzerAgent().analyze_news(news_list, analysis_type, progress_callback=progress_callback)
+
+    return await analysis_flight.do(analysis_key(news_list, analysis_type), analyze, on_wait=on_wait)
@@ -0,0 +1,64 @@
+"""
+新闻采集（虎扑采集 + 采集Agent补充）
+相同参数的并发采集只执行一次：多个用户同时生成日报时共享同一次抓取和LLM调用，各自入库
+"""
+import asyncio
+from typing import Dict, List, Optional
+from app.tools.dedup import filter_near_duplicates
+from app.utils.model_router import TASK_EXTRACT, primary_model
+from app.utils.single_flight import SingleFlight, flight_key
+from app.utils.tracing import span
+
+DEFAULT_NEWS_SOURCES = [
+    {"name": "虎扑NBA", "url": "https://www.hupu.com/nba"},
+    {"name": "虎扑足球", "url": "https://www.hupu.com/soccer"}
+]
+
+scrape_flight = SingleFlight("scrape")
+agent_collect_flight = SingleFlight("agent_collect")
+
+
+async def scrape_news(category: str, limit: int) -> List[Dict]:
+    """采集虎扑新闻（采集器使用同步HTTP请求，放到线程中执行）"""
+    from app.tools.hupu_scraper import scrape_hupu_news
+
+    with span("scrape.hupu", {"scrape.category": category, "scrape.limit": limit}) as item:
+        news = await scrape_flight.do(
+            flight_key("hupu", category, limit),
+            lambda: asyncio.to_thread(scrape_hupu_news, category=category, limit=limit)
+        )
+        item.set_attribute("scrape.items", len(news or []))
+        return news
+
+
+async def collect_with_agent(news_sources: Optional[List[Dict]] = None) -> List[Dict]:
+    """使用采集Agent采集新闻（按新闻源和采集任务的首选模型合并）"""
+    news_sources = news_sources or DEFAULT_NEWS_SOURCES
+
+    async def run():
+        from app.agents.news_collector import NewsCollectorAgent
+        return await NewsCollectorAgent().collect_news(news_sources)
+
+    return await agent_collect_flight.do(flight_key("agent", news_sources, primary_model(TASK_EXTRACT)), run)
+
+
+async def collect_latest_news(category: str = "nba", limit: int = 5, on_fallback=None) -> List[Dict]:
+    """
+    采集最新新闻：先从虎扑采集，数量不足时使用采集Agent补充（近似去重后合并）
+
+    Args:
+        category: 虎扑分类
+        limit: 需要的新闻条数
+        on_fallback: 使用Agent补充前的异步回调，参数为已采集条数（用于上报进度）
+
+    Returns:
+        新闻字典列表（可能多于limit，入库时截取）
+    """
+    news_list = await scrape_news(category, limit)
+    if len(news_list) < limit:
+        if on_fallback:
+            await on_fallback(len(news_list))
+        agent_news = await collect_with_agent()
+        # 合并结果，近似去重（标题略有不同的转载也会被过滤）
+        news_list = news_list + filter_near_duplicates(agent_news, existing=news_list)
+    return news_list
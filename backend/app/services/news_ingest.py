@@ -0,0 +1,278 @@
+"""
+新闻批量入库
+- 多行INSERT按块写入：SQLite 3.35+、PostgreSQL使用INSERT ... ON CONFLICT DO NOTHING RETURNING，一次往返拿回ID；
+  MySQL/MariaDB使用INSERT ... ON DUPLICATE KEY UPDATE，按本块第一个自增ID（lastrowid）取回新插入行的ID；
+  其他数据库（及不支持RETURNING的旧版SQLite）先查出已存在的去重键，其余逐行插入（每行一个SAVEPOINT，并发写入的重复行跳过）
+- 按(user_id, dedup_key)唯一索引去重，重复文章（同一来源URL或同标题）自动跳过
+- 入库后批量写入去重签名和全文检索索引，无需逐条refresh
+- 本地向量索引是文件读写和向量计算，提交后由调用方通过index_vectors在线程中写入（不阻塞事件循环）
+路由、采集Agent和后台任务统一使用ingest_news入库
+"""
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.news import NewsArticle
+from app.services.dedup_index import filter_new_articles, record_fingerprints
+from app.services.search_index import index_news_many
+from app.tools.sentiment import score_articles
+
+logger = logging.getLogger(__name__)
+
+# 每块插入的行数
+INSERT_CHUNK_SIZE = 500
+# SQLite单条语句的绑定参数上限（3.32+）
+SQLITE_MAX_VARIABLES = 32766
+# 正文最大长度
+MAX_CONTENT_LENGTH = 5000
+
+_INSERT_COLUMNS = (
+    "user_id", "title", "content", "source", "source_url", "category",
+    "publish_time", "collected_at", "article_metadata", "processed", "dedup_key"
+)
+
+
+def dedup_key(news: Dict) -> str:
+    """文章去重键：优先使用来源URL，没有URL时使用标题"""
+    basis = (news.get('url') or news.get('source_url') or '').strip() or (news.get('title') or '').strip()
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+
+def _parse_publish_time(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            pass
+    return datetime.now()
+
+
+def build_article_row(news: Dict, user_id: int, sentiment: Optional[Dict] = None) -> Dict:
+    """
+    将采集到的新闻字典转换为news_articles的一行
+
+    Args:
+        news: 采集结果（title、content、url、source、category、publish_time、metadata）
+        user_id: 所属用户ID
+        sentiment: 情感分（写入metadata，报告生成时直接汇总）
+    """
+    metadata = news.get('metadata')
+    metadata = dict(metadata) if isinstance(metadata, dict) else {}
+    if sentiment is not None:
+        metadata['sentiment'] = sentiment
+    return {
+        "user_id": user_id,  # 核心隔离：写入时绑定用户ID
+        "title": news.get('title', ''),
+        "content": (news.get('content') or '')[:MAX_CONTENT_LENGTH],
+        "source": news.get('source', '虎扑'),
+        "source_url": news.get('url', ''),
+        "category": news.get('category', '体育'),
+        "publish_time": _parse_publish_time(news.get('publish_time')),
+        # 显式写入入库时间，返回结果无需再查询数据库默认值
+        "collected_at": datetime.now(),
+        "article_metadata": metadata,
+        "processed": 0,
+        "dedup_key": news.get('dedup_key') or dedup_key(news)
+    }
+
+
+def _chunk_size(dialect_name: str, chunk_size: int) -> int:
+    if dialect_name == "sqlite":
+        return max(1, min(chunk_size, SQLITE_MAX_VARIABLES // len(_INSERT_COLUMNS)))
+    return chunk_size
+
+
+def _insert_returning(db: Session, dialect_name: str, chunk: List[Dict]) -> Dict[tuple, int]:
+    """单条多行INSERT ... RETURNING，冲突行跳过"""
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+    stmt = dialect_insert(NewsArticle).values(chunk).on_conflict_do_nothing(
+        index_elements=["user_id", "dedup_key"]
+    ).returning(NewsArticle.id, NewsArticle.user_id, NewsArticle.dedup_key)
+    return {(row.user_id, row.dedup_key): row.id for row in db.execute(stmt)}
+
+
+def _insert_mysql(db: Session, chunk: List[Dict]) -> Dict[tuple, int]:
+    """
+    MySQL：多行INSERT ... ON DUPLICATE KEY UPDATE（重复行不修改），
+    lastrowid为本语句第一条新插入行的ID，再按去重键取回ID >= lastrowid的新行
+    （新行ID一定大于已存在的重复行；不依赖innodb_autoinc_lock_mode下ID是否连续）
+    """
+    from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+    stmt = mysql_insert(NewsArticle).values(chunk)
+    stmt = stmt.on_duplicate_key_update(dedup_key=stmt.inserted.dedup_key)
+    first_id = db.execute(stmt).lastrowid
+    if not first_id:
+        return {}
+    rows = db.execute(
+        select(NewsArticle.id, NewsArticle.user_id, NewsArticle.dedup_key).where(
+            NewsArticle.dedup_key.in_({row["dedup_key"] for row in chunk}),
+            NewsArticle.id >= first_id
+        )
+    )
+    return {(row.user_id, row.dedup_key): row.id for row in rows}
+
+
+def _insert_each(db: Session, chunk: List[Dict]) -> Dict[tuple, int]:
+    """
+    通用方式：查出本块中已存在的去重键，其余逐行INSERT（inserted_primary_key取回ID）
+    查询与插入之间其他请求写入的重复行触发唯一索引冲突，回滚该行的SAVEPOINT后跳过
+    """
+    existing = {
+        (row.user_id, row.dedup_key) for row in db.execute(
+            select(NewsArticle.user_id, NewsArticle.dedup_key).where(
+                NewsArticle.user_id.in_({row["user_id"] for row in chunk}),
+                NewsArticle.dedup_key.in_({row["dedup_key"] for row in chunk})
+            )
+        )
+    }
+    inserted = {}
+    for row in chunk:
+        key = (row["user_id"], row["dedup_key"])
+        if key in existing:
+            continue
+        try:
+            with db.begin_nested():
+                result = db.execute(insert(NewsArticle).values(row))
+        except IntegrityError:
+            continue
+        inserted[key] = result.inserted_primary_key[0]
+    return inserted
+
+
+def bulk_insert_articles(db: Session, rows: List[Dict], chunk_size: int = INSERT_CHUNK_SIZE) -> List[Optional[int]]:
+    """
+    批量插入文章（随调用方事务提交）
+
+    Args:
+        db: 数据库会话
+        rows: build_article_row生成的行
+        chunk_size: 每条INSERT语句的行数
+
+    Returns:
+        与rows一一对应的新文章ID；重复（已存在或本批次内重复）的行为None
+    """
+    bind = db.get_bind(NewsArticle)
+    dialect_name = bind.dialect.name
+    use_returning = dialect_name in ("sqlite", "postgresql") and bind.dialect.insert_returning
+    chunk_size = _chunk_size(dialect_name, chunk_size)
+
+    ids: List[Optional[int]] = [None] * len(rows)
+    seen = set()
+    pending = []  # (原始下标, 行)
+    for position, row in enumerate(rows):
+        key = (row["user_id"], row["dedup_key"])
+        if key in seen:
+            continue  # 本批次内重复，保留第一条
+        seen.add(key)
+        pending.append((position, {column: row.get(column) for column in _INSERT_COLUMNS}))
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        values = [row for _, row in chunk]
+        if use_returning:
+            inserted = _insert_returning(db, dialect_name, values)
+        elif dialect_name == "mysql":
+            inserted = _insert_mysql(db, values)
+        else:
+            inserted = _insert_each(db, values)
+        for position, row in chunk:
+            ids[position] = inserted.get((row["user_id"], row["dedup_key"]))
+    return ids
+
+
+def stored_article_ids(db: Session, user_id: int, news_list: List[Dict]) -> List[int]:
+    """
+    按去重键查询新闻对应的已入库文章ID（包括本次新入库和之前已入库的重复文章，按news_list顺序去重）
+    用于记录报告引用的全部新闻；近似重复被过滤、未入库的新闻没有对应文章
+    """
+    keys = list(dict.fromkeys(news.get('dedup_key') or dedup_key(news) for news in news_list))
+    if not keys:
+        return []
+    found = {}
+    for start in range(0, len(keys), INSERT_CHUNK_SIZE):
+        for row in db.execute(
+            select(NewsArticle.id, NewsArticle.dedup_key).where(
+                NewsArticle.user_id == user_id,  # 核心隔离：只查询当前用户的文章
+                NewsArticle.dedup_key.in_(keys[start:start + INSERT_CHUNK_SIZE])
+            )
+        ):
+            found[row.dedup_key] = row.id
+    return [found[key] for key in keys if key in found]
+
+
+def ingest_news(
+    db: Session,
+    user_id: int,
+    news_list: List[Dict],
+    limit: Optional[int] = None,
+    commit: bool = True
+) -> List[NewsArticle]:
+    """
+    新闻入库完整流程：近似去重 -> 批量情感打分 -> 批量插入 -> 去重签名 -> 全文检索索引
+    （向量索引不在这里写入：提交后调用 await asyncio.to_thread(index_vectors, articles)）
+
+    Args:
+        db: 数据库会话
+        user_id: 所属用户ID
+        news_list: 采集到的新闻列表
+        limit: 最多入库条数（去重后截取）
+        commit: 是否提交事务（为False时由调用方提交）
+
+    Returns:
+        新入库的文章对象（已带ID，未绑定会话，可直接序列化返回）
+    """
+    # 与该用户最近入库的文章比较，过滤近似重复（避免重复分析）
+    candidates = filter_new_articles(db, user_id, news_list)
+    if limit is not None:
+        candidates = candidates[:limit]
+    if not candidates:
+        return []
+
+    # 批量计算情感分，报告生成时直接汇总
+    sentiments = score_articles([news for news, _ in candidates])
+    rows = [
+        build_article_row(news, user_id, sentiment)
+        for (news, _), sentiment in zip(candidates, sentiments)
+    ]
+    ids = bulk_insert_articles(db, rows)
+
+    articles = []
+    fingerprints = []
+    for row, article_id, (_, signature) in zip(rows, ids, candidates):
+        if article_id is None:
+            logger.info("跳过已入库的新闻: %s", row['title'], extra={"sample": "ingest.existing"})
+            continue
+        article = NewsArticle(id=article_id, **row)
+        articles.append(article)
+        fingerprints.append((article, signature))
+
+    # 去重签名和检索索引与文章在同一事务中提交
+    record_fingerprints(db, user_id, fingerprints)
+    index_news_many(db, articles)
+
+    if commit:
+        db.commit()
+    return articles
+
+
+def index_vectors(articles: List[NewsArticle]):
+    """
+    将已提交的文章写入本地向量索引（失败不影响入库，可通过命令行重建）
+    同步执行文件读写和向量计算，异步代码中通过asyncio.to_thread调用
+    """
+    if not articles:
+        return
+    # 向量索引依赖numpy，首次使用时才导入（应用启动时不加载）
+    from app.services import vector_index
+    for article in articles:
+        vector_index.safe_index(vector_index.index_news, article)
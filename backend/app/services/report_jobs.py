@@ -0,0 +1,213 @@
+"""
+报告生成、多类别日报、新闻采集的后台任务处理函数
+由worker在独立的数据库会话中执行（不自行提交，任务结果与业务数据在同一事务中提交）
+"""
+from datetime import datetime
+from typing import Dict
+from app.models.news import NewsArticle
+from app.models.report import AnalysisReport
+from app.services.digest import DIGEST_CATEGORIES, analyze_sections, build_digest_content, collect_digest_news, normalize_category_limits
+from app.services.jobs import JobContext, JobError, job_handler
+from app.services.news_collection import collect_latest_news
+from app.services.news_analysis import analyze_articles, describe_llm_error
+from app.services.news_ingest import ingest_news, stored_article_ids
+from app.services.search_index import index_report
+from app.tools.sentiment import aggregate_sentiment, score_articles
+
+# 任务类型
+REPORT_DAILY = "report.daily"
+REPORT_DIGEST = "report.digest"
+NEWS_COLLECT = "news.collect"
+
+# 采集任务默认参数（与/api/news/generate-daily一致）
+DEFAULT_COLLECT_CATEGORY = "nba"
+DEFAULT_COLLECT_LIMIT = 5
+MAX_COLLECT_LIMIT = 50
+
+@job_handler(REPORT_DAILY)
+async def run_daily_report(ctx: JobContext) -> Dict:
+    """分析当前用户未处理的新闻并生成日报"""
+    # 向量索引依赖numpy，在任务中才导入（应用启动时不加载）
+    from app.services import vector_index
+    db = ctx.db
+    await ctx.progress(10, '正在获取新闻数据...')
+
+    today_news = db.query(NewsArticle).filter(
+        NewsArticle.user_id == ctx.user_id,  # 核心隔离：只查询当前用户的新闻
+        NewsArticle.processed == 0
+    ).all()
+    if not today_news:
+        raise JobError('没有需要分析的新闻')
+
+    # 补算并保存缺失的文章情感分（历史数据可能没有）
+    unscored = [news for news in today_news if not (news.article_metadata or {}).get('sentiment')]
+    if unscored:
+        sentiments = score_articles([{"title": news.title, "content": news.content} for news in unscored])
+        for news, sentiment in zip(unscored, sentiments):
+            news.article_metadata = {**(news.article_metadata or {}), 'sentiment': sentiment}
+
+    # 转换为字典格式
+    news_list = [
+        {
+            "title": news.title,
+            "content": news.content,
+            "source": news.source,
+            "category": news.category,
+            "id": news.id,
+            "metadata": news.article_metadata or {}
+        }
+        for news in today_news
+    ]
+
+    await ctx.progress(20, f'已获取 {len(news_list)} 条新闻，开始分析...')
+
+    async def on_wait():
+        await ctx.progress(30, '相同新闻的分析正在进行，等待结果...')
+
+    try:
+        analysis_result = await analyze_articles(news_list, "daily", progress_callback=ctx.progress, on_wait=on_wait)
+    except Exception as e:
+        raise JobError(describe_llm_error(e)) from e
+
+    await ctx.progress(80, '分析完成，正在保存报告...')
+
+    # 保存分析报告（绑定当前用户ID）
+    report = AnalysisReport(
+        user_id=ctx.user_id,  # 核心隔离：写入时绑定用户ID
+        report_date=datetime.now(),
+        title=f"今日体育新闻分析报告 - {datetime.now().strftime('%Y-%m-%d')}",
+        summary=analysis_result.get('summary', ''),
+        content=analysis_result.get('content', ''),
+        analysis_type="daily",
+        news_ids=[news['id'] for news in news_list],
+        statistics=analysis_result.get('statistics', {}),
+        sentiment_analysis=analysis_result.get('sentiment_analysis', {})
+    )
+    db.add(report)
+
+    # 标记新闻为已处理
+    for news in today_news:
+        news.processed = 1
+
+    # 同步写入全文检索索引（与报告、任务状态同一事务提交）
+    db.flush()
+    index_report(db, report)
+
+    # 写入本地向量索引（提交后执行，失败不影响报告生成）
+    ctx.after_commit(vector_index.safe_index, vector_index.index_report, report)
+
+    return {'message': '报告生成完成！', 'report': {'id': report.id, 'title': report.title}}
+
+
+@job_handler(REPORT_DIGEST)
+async def run_digest_report(ctx: JobContext) -> Dict:
+    """
+    多类别日报：并发采集各类别新闻、入库，按类别分节分析并生成一份报告
+
+    payload: {"categories": {类别代码: 条数}}（类别见digest.DIGEST_CATEGORIES，默认{"nba": 5}）
+    """
+    # 向量索引依赖numpy，在任务中才导入（应用启动时不加载）
+    from app.services import vector_index
+    db = ctx.db
+    try:
+        category_limits = normalize_category_limits(ctx.payload.get('categories'))
+    except ValueError as e:
+        raise JobError(str(e))
+    names = '、'.join(DIGEST_CATEGORIES[code] for code in category_limits)
+
+    await ctx.progress(10, f'正在采集{names}新闻...')
+    try:
+        sections = await collect_digest_news(category_limits)
+    except Exception as e:
+        raise JobError(describe_llm_error(e)) from e
+    news_list = [news for articles in sections.values() for news in articles]
+    if not news_list:
+        raise JobError('没有采集到新闻')
+
+    # 先分析后入库：LLM调用期间不持有写事务
+    await ctx.progress(30, f'已采集 {len(news_list)} 条新闻，正在分析...')
+    analyzed = await analyze_sections(sections)
+    if not analyzed['analysis']:
+        error = next(iter(analyzed['errors'].values()), '分析失败')
+        raise JobError(describe_llm_error(Exception(error)))
+
+    await ctx.progress(80, '分析完成，正在保存新闻和报告...')
+    # 已入库过的新闻不会重复保存，但仍参与本次日报分析
+    articles = ingest_news(db, ctx.user_id, news_list, commit=False)
+    # 报告引用本次分析的全部新闻（包括之前已入库的重复新闻，不只是新入库的）
+    article_ids = stored_article_ids(db, ctx.user_id, news_list)
+    if article_ids:
+        # 这些新闻已包含在本报告中，标记为已处理
+        db.query(NewsArticle).filter(
+            NewsArticle.user_id == ctx.user_id,  # 核心隔离：只更新当前用户的新闻
+            NewsArticle.id.in_(article_ids)
+        ).update({NewsArticle.processed: 1}, synchronize_session=False)
+
+    digest = build_digest_content(sections, analyzed['analysis'], analyzed['errors'])
+    report = AnalysisReport(
+        user_id=ctx.user_id,  # 核心隔离：写入时绑定用户ID
+        report_date=datetime.now(),
+        title=f"今日体育新闻分析报告（{digest['title_suffix']}） - {datetime.now().strftime('%Y-%m-%d')}",
+        summary=digest['summary'],
+        content=digest['content'],
+        analysis_type="digest",
+        news_ids=article_ids,
+        statistics={
+            "total_news": len(news_list),
+            "categories": {DIGEST_CATEGORIES[code]: len(items) for code, items in sections.items()},
+            "sections": {
+                code: result.get('statistics', {}) for code, result in analyzed['analysis'].items()
+            },
+            "failed_sections": analyzed['errors']
+        },
+        sentiment_analysis=aggregate_sentiment(score_articles(news_list))
+    )
+    db.add(report)
+
+    # 同步写入全文检索索引（与报告、任务状态同一事务提交）
+    db.flush()
+    index_report(db, report)
+
+    # 写入本地向量索引（提交后执行，失败不影响报告生成）
+    ctx.after_commit(vector_index.safe_index, vector_index.index_report, report)
+    for article in articles:
+        ctx.after_commit(vector_index.safe_index, vector_index.index_news, article)
+
+    return {'message': '报告生成完成！', 'report': {'id': report.id, 'title': report.title}}
+
+
+@job_handler(NEWS_COLLECT)
+async def run_news_collect(ctx: JobContext) -> Dict:
+    """
+    采集新闻并批量入库
+
+    payload: {"category": 虎扑分类（默认nba）, "limit": 入库条数（默认5）}
+    """
+    # 向量索引依赖numpy，在任务中才导入（应用启动时不加载）
+    from app.services import vector_index
+    category = str(ctx.payload.get('category') or DEFAULT_COLLECT_CATEGORY)
+    try:
+        limit = max(1, min(int(ctx.payload.get('limit') or DEFAULT_COLLECT_LIMIT), MAX_COLLECT_LIMIT))
+    except (TypeError, ValueError):
+        raise JobError('limit参数必须是整数')
+
+    async def on_fallback(count: int):
+        await ctx.progress(40, f'已采集 {count} 条，使用采集Agent补充...')
+
+    await ctx.progress(10, '正在采集新闻...')
+    try:
+        news_list = await collect_latest_news(category, limit, on_fallback=on_fallback)
+    except Exception as e:
+        raise JobError(describe_llm_error(e)) from e
+
+    await ctx.progress(80, '正在保存新闻...')
+    articles = ingest_news(ctx.db, ctx.user_id, news_list, limit=limit, commit=False)
+
+    # 写入本地向量索引（提交后执行，失败不影响入库）
+    for article in articles:
+        ctx.after_commit(vector_index.safe_index, vector_index.index_news, article)
+
+    return {
+        'message': f'已入库 {len(articles)} 条新闻',
+        'articles': [{'id': article.id, 'title': article.title} for article in articles]
+    }
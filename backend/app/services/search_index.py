@@ -0,0 +1,349 @@
+"""
+全文检索服务
+基于数据库的倒排索引（中文二元组分词），新闻/报告写入和删除时同步维护，
+检索时按BM25打分并结合查询词覆盖率排序，所有查询均按用户隔离
+
+用法（重建索引）：
+    python -m app.services.search_index --rebuild
+    python -m app.services.search_index --rebuild --user-id 1
+"""
+import argparse
+import logging
+import math
+from typing import Dict, List, Optional
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.news import NewsArticle
+from app.models.report import AnalysisReport
+from app.models.search import SearchDocument, SearchPosting
+from app.tools.search_tokenizer import term_frequencies, query_terms, is_single_char
+
+logger = logging.getLogger(__name__)
+
+DOC_NEWS = "news"
+DOC_REPORT = "report"
+DOC_TYPES = (DOC_NEWS, DOC_REPORT)
+
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 多词查询时，文档至少需要命中的查询词比例
+MIN_COVERAGE = 0.5
+# 摘要片段长度
+SNIPPET_LENGTH = 120
+
+
+def remove_document(db: Session, doc_type: str, doc_id: int):
+    """从索引中删除文档（随调用方事务提交）"""
+    db.query(SearchPosting).filter(
+        SearchPosting.doc_type == doc_type,
+        SearchPosting.doc_id == doc_id
+    ).delete(synchronize_session=False)
+    db.query(SearchDocument).filter(
+        SearchDocument.doc_type == doc_type,
+        SearchDocument.doc_id == doc_id
+    ).delete(synchronize_session=False)
+
+
+def _document_frequencies(title: str, content: str) -> Dict[str, int]:
+    """文档的词频（标题加权）"""
+    frequencies = term_frequencies(title or '', weight=settings.SEARCH_TITLE_WEIGHT)
+    for term, count in term_frequencies((content or '')[:settings.SEARCH_MAX_INDEX_CHARS]).items():
+        frequencies[term] = frequencies.get(term, 0) + count
+    return frequencies
+
+
+def index_document(db: Session, user_id: int, doc_type: str, doc_id: int, title: str, content: str):
+    """
+    索引（或重新索引）一个文档，随调用方事务提交
+
+    Args:
+        db: 数据库会话
+        user_id: 文档所属用户ID
+        doc_type: 文档类型（news/report）
+        doc_id: 文档ID（需已flush获得）
+        title: 标题
+        content: 正文
+    """
+    remove_document(db, doc_type, doc_id)
+    index_new_documents(db, doc_type, [(user_id, doc_id, title, content)])
+
+
+def index_new_documents(db: Session, doc_type: str, documents: List[tuple]):
+    """
+    批量索引新文档（不检查旧索引，用于刚入库的文档），随调用方事务提交
+    文档记录和倒排记录各一次executemany写入
+
+    Args:
+        db: 数据库会话
+        doc_type: 文档类型（news/report）
+        documents: [(user_id, doc_id, title, content)]
+    """
+    document_rows = []
+    posting_rows = []
+    for user_id, doc_id, title, content in documents:
+        frequencies = _document_frequencies(title, content)
+        document_rows.append({
+            "user_id": user_id,
+            "doc_type": doc_type,
+            "doc_id": doc_id,
+            "length": sum(frequencies.values())
+        })
+        posting_rows.extend(
+            {"user_id": user_id, "doc_type": doc_type, "doc_id": doc_id, "term": term, "tf": count}
+            for term, count in frequencies.items()
+        )
+    if document_rows:
+        db.execute(insert(SearchDocument), document_rows)
+    if posting_rows:
+        db.execute(insert(SearchPosting), posting_rows)
+
+
+def index_news(db: Session, article: NewsArticle):
+    """索引新闻"""
+    index_document(db, article.user_id, DOC_NEWS, article.id, article.title, article.content)
+
+
+def index_news_many(db: Session, articles: List[NewsArticle]):
+    """批量索引新入库的新闻"""
+    index_new_documents(db, DOC_NEWS, [
+        (article.user_id, article.id, article.title, article.content) for article in articles
+    ])
+
+
+def index_report(db: Session, report: AnalysisReport):
+    """索引分析报告（标题+摘要+正文）"""
+    content = f"{report.summary or ''}\n{report.content or ''}"
+    index_document(db, report.user_id, DOC_REPORT, report.id, report.title, content)
+
+
+def _snippet(text: str, query: str, terms: List[str]) -> str:
+    """截取包含查询词的摘要片段"""
+    text = (text or '').replace('\n', ' ')
+    lowered = text.lower()
+    position = lowered.find(query.lower().strip())
+    if position < 0:
+        for term in terms:
+            position = lowered.find(term)
+            if position >= 0:
+                break
+    start = max(0, position - SNIPPET_LENGTH // 3) if position >= 0 else 0
+    snippet = text[start:start + SNIPPET_LENGTH]
+    return ("..." if start > 0 else "") + snippet + ("..." if start + SNIPPET_LENGTH < len(text) else "")
+
+
+def _existing_documents(db: Session, user_id: int, keys: List[tuple]) -> set:
+    """索引命中的文档中实际存在且属于该用户的（只查询ID）"""
+    existing = set()
+    for doc_type, model in ((DOC_NEWS, NewsArticle), (DOC_REPORT, AnalysisReport)):
+        ids = {doc_id for kind, doc_id in keys if kind == doc_type}
+        if ids:
+            existing.update(
+                (doc_type, row.id)
+                for row in db.query(model.id).filter(model.id.in_(ids), model.user_id == user_id)
+            )
+    return existing
+
+
+def search(
+    db: Session,
+    user_id: int,
+    query: str,
+    doc_type: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict:
+    """
+    检索当前用户的新闻和报告
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID（只检索该用户的文档）
+        query: 查询文本
+        doc_type: 文档类型过滤（news/report，None表示全部）
+        limit: 返回数量
+        offset: 偏移量
+
+    Returns:
+        {"total": 命中总数, "results": [{"doc_type", "id", "title", "snippet", "score", "created_at"}]}
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {"total": 0, "results": []}
+
+    doc_filters = [SearchDocument.user_id == user_id]
+    posting_filters = [SearchPosting.user_id == user_id]
+    if doc_type:
+        doc_filters.append(SearchDocument.doc_type == doc_type)
+        posting_filters.append(SearchPosting.doc_type == doc_type)
+
+    # 文档总数和平均长度（BM25需要）
+    doc_count, avg_length = db.query(
+        func.count(SearchDocument.id), func.avg(SearchDocument.length)
+    ).filter(*doc_filters).one()
+    if not doc_count:
+        return {"total": 0, "results": []}
+    avg_length = float(avg_length or 1.0)
+
+    # 单个汉字在索引中只存在于二元组中（单独成段时为单字词项）：按前缀或后缀匹配，
+    # 只按前缀会漏掉位于词尾的字（"人"匹配不到"湖人"）
+    single_chars = [t for t in terms if is_single_char(t)]
+    term_conditions = [SearchPosting.term.in_([t for t in terms if not is_single_char(t)])]
+    for char in single_chars:
+        term_conditions += [SearchPosting.term.like(f"{char}%"), SearchPosting.term.like(f"%{char}")]
+
+    postings = db.query(
+        SearchPosting.doc_type, SearchPosting.doc_id, SearchPosting.term, SearchPosting.tf
+    ).filter(*posting_filters, or_(*term_conditions)).all()
+    if not postings:
+        return {"total": 0, "results": []}
+
+    # 每篇文档每个查询词的词频
+    # 单字：词中的字同时出现在以它开头和以它结尾的两个二元组中，前缀、后缀分别累计后取较大值，避免重复计数
+    term_set = set(terms) - set(single_chars)
+    doc_terms: Dict[tuple, Dict[str, int]] = {}
+    char_counts: Dict[tuple, Dict[str, List[int]]] = {}
+    for row in postings:
+        key = (row.doc_type, row.doc_id)
+        if row.term in term_set:
+            matched = doc_terms.setdefault(key, {})
+            matched[row.term] = matched.get(row.term, 0) + row.tf
+            continue
+        for char in single_chars:
+            counts = char_counts.setdefault(key, {}).setdefault(char, [0, 0])
+            if row.term[0] == char:
+                counts[0] += row.tf
+            if row.term[-1] == char and len(row.term) > 1:
+                counts[1] += row.tf
+    for key, chars in char_counts.items():
+        matched = doc_terms.setdefault(key, {})
+        for char, (prefix, suffix) in chars.items():
+            if prefix or suffix:
+                matched[char] = max(prefix, suffix)
+
+    keys = list(doc_terms)
+    lengths = {
+        (row.doc_type, row.doc_id): row.length
+        for row in db.query(SearchDocument.doc_type, SearchDocument.doc_id, SearchDocument.length).filter(
+            *doc_filters,
+            SearchDocument.doc_id.in_({doc_id for _, doc_id in keys})
+        )
+    }
+
+    document_frequency: Dict[str, int] = {}
+    for matched in doc_terms.values():
+        for term in matched:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    scored = []
+    for key, matched in doc_terms.items():
+        if key not in lengths:
+            continue
+        coverage = len(matched) / len(terms)
+        if len(terms) > 1 and coverage < MIN_COVERAGE:
+            continue
+        length_norm = 1 - BM25_B + BM25_B * (lengths[key] or 1) / avg_length
+        score = 0.0
+        for term, tf in matched.items():
+            df = document_frequency[term]
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+        # 覆盖率越高越靠前（二元组分词下，命中全部词项近似于短语命中）
+        scored.append((score * coverage * coverage, key))
+
+    # 去掉索引残留（文档已删除或不属于该用户）后再分页，命中总数与可返回的结果一致
+    existing = _existing_documents(db, user_id, [key for _, key in scored])
+    scored = [item for item in scored if item[1] in existing]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    page = scored[offset:offset + limit]
+
+    # 加载当前页文档（再次按用户过滤，防止索引残留导致越权）
+    news_ids = [doc_id for _, (kind, doc_id) in page if kind == DOC_NEWS]
+    report_ids = [doc_id for _, (kind, doc_id) in page if kind == DOC_REPORT]
+    documents = {}
+    if news_ids:
+        for news in db.query(NewsArticle).filter(NewsArticle.id.in_(news_ids), NewsArticle.user_id == user_id):
+            documents[(DOC_NEWS, news.id)] = (news.title, news.content, news.collected_at)
+    if report_ids:
+        for report in db.query(AnalysisReport).filter(AnalysisReport.id.in_(report_ids), AnalysisReport.user_id == user_id):
+            documents[(DOC_REPORT, report.id)] = (report.title, report.summary or report.content, report.created_at)
+
+    results = []
+    for score, key in page:
+        if key not in documents:
+            continue
+        title, content, created_at = documents[key]
+        results.append({
+            "doc_type": key[0],
+            "id": key[1],
+            "title": title or "",
+            "snippet": _snippet(content, query, terms),
+            "score": round(score, 4),
+            "created_at": created_at
+        })
+
+    return {"total": len(scored), "results": results}
+
+
+def rebuild_index(db: Session, user_id: Optional[int] = None, chunk_size: int = 200) -> Dict:
+    """
+    重建索引（按ID分块处理，每块提交一次）
+
+    Args:
+        db: 数据库会话
+        user_id: 只重建指定用户的索引（None表示全部）
+        chunk_size: 每块文档数量
+
+    Returns:
+        {"news": 新闻数量, "report": 报告数量}
+    """
+    stats = {DOC_NEWS: 0, DOC_REPORT: 0}
+    for model, doc_type, indexer in (
+        (NewsArticle, DOC_NEWS, index_news),
+        (AnalysisReport, DOC_REPORT, index_report)
+    ):
+        last_id = 0
+        while True:
+            query = db.query(model).filter(model.id > last_id)
+            if user_id is not None:
+                query = query.filter(model.user_id == user_id)
+            rows = query.order_by(model.id).limit(chunk_size).all()
+            if not rows:
+                break
+            for row in rows:
+                indexer(db, row)
+            db.commit()
+            db.expunge_all()
+            last_id = rows[-1].id
+            stats[doc_type] += len(rows)
+            logger.info("已索引%s至ID %s（共 %d 条）", doc_type, last_id, stats[doc_type])
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令行入口：重建全文检索索引"""
+    parser = argparse.ArgumentParser(description="维护新闻/报告全文检索索引")
+    parser.add_argument("--rebuild", action="store_true", help="重建索引")
+    parser.add_argument("--user-id", type=int, default=None, help="只处理指定用户")
+    parser.add_argument("--chunk-size", type=int, default=200, help="每块处理的文档数量")
+    args = parser.parse_args(argv)
+
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    from app.database import SessionLocal
+    from app.utils.logging_config import setup_logging
+
+    setup_logging()
+    db = SessionLocal()
+    try:
+        stats = rebuild_index(db, user_id=args.user_id, chunk_size=args.chunk_size)
+        print(f"✓ 索引重建完成：新闻 {stats[DOC_NEWS]} 条，报告 {stats[DOC_REPORT]} 条")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
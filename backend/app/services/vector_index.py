@@ -0,0 +1,436 @@
+"""
+本地向量索引服务
+将新闻和报告切块向量化后存储到本地磁盘（每个用户一个目录），检索时使用
+随机超平面LSH做近似最近邻召回，再精确重排；数据量较小时直接暴力检索
+存储格式（追加写入，多进程写入时加文件锁）：
+- vectors.f32：float32向量，按行顺序存储
+- meta.jsonl：与向量一一对应的元数据（文档类型、ID、文本）
+- deleted.jsonl：已删除向量的行号（墓碑），重建索引时清理
+
+用法（重建索引）：
+    python -m app.services.vector_index --rebuild
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import numpy as np
+from app.config import settings
+from app.utils.embeddings import get_embedding_function
+from app.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，退化为仅进程内加锁
+    fcntl = None
+
+DOC_NEWS = "news"
+DOC_REPORT = "report"
+
+# 切块参数（字符数）
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 50
+
+# 向量数量达到该值后启用LSH近似检索，否则暴力检索
+ANN_MIN_SIZE = 2000
+# LSH参数：表数量、每表哈希位数
+LSH_TABLES = 6
+LSH_BITS = 10
+# 近似召回的候选数不足top_k的该倍数时，退化为暴力检索
+ANN_CANDIDATE_FACTOR = 4
+
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path: str):
+    """跨进程文件锁（不支持fcntl的平台仅进程内加锁）"""
+    with _process_lock:
+        with open(path, 'a+') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """按段落切块，过长段落按固定长度（带重叠）切分"""
+    chunks = []
+    current = ""
+    for paragraph in (text or "").split('\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(current) + len(paragraph) + 1 <= size:
+            current = f"{current}\n{paragraph}" if current else paragraph
+            continue
+        if current:
+            chunks.append(current)
+            current = ""
+        while len(paragraph) > size:
+            chunks.append(paragraph[:size])
+            paragraph = paragraph[size - overlap:]
+        current = paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class VectorStore:
+    """单个用户的磁盘向量存储 + 内存LSH索引"""
+
+    def __init__(self, directory: str, dim: int, model_name: str):
+        self.directory = directory
+        self.dim = dim
+        self.model_name = model_name
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "meta.jsonl")
+        self.deleted_path = os.path.join(directory, "deleted.jsonl")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.lock_path = os.path.join(directory, ".lock")
+        self._cache = None
+        self._cache_key = None
+        os.makedirs(directory, exist_ok=True)
+        self._check_manifest()
+
+    def _check_manifest(self):
+        """向量模型或维度变化时清空旧索引（旧向量不可比较，需要重建）"""
+        manifest = {"model": self.model_name, "dim": self.dim}
+        with _file_lock(self.lock_path):
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, encoding='utf-8') as handle:
+                    if json.load(handle) == manifest:
+                        return
+                logger.warning("向量模型已变更，清空旧索引: %s", self.directory)
+            for path in (self.vectors_path, self.meta_path, self.deleted_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            with open(self.manifest_path, 'w', encoding='utf-8') as handle:
+                json.dump(manifest, handle)
+
+    def add(self, vectors: np.ndarray, metas: List[Dict]):
+        """追加向量及元数据"""
+        if len(metas) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(metas), self.dim)
+        with _file_lock(self.lock_path):
+            self._align()
+            with open(self.vectors_path, 'ab') as handle:
+                handle.write(vectors.tobytes())
+            with open(self.meta_path, 'a', encoding='utf-8') as handle:
+                for meta in metas:
+                    handle.write(json.dumps(meta, ensure_ascii=False) + '\n')
+
+    def _align(self):
+        """写入前对齐向量文件与元数据（进程异常退出可能留下不完整的记录）"""
+        metas = self._read_metas()
+        row_bytes = self.dim * 4
+        vector_rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        rows = min(len(metas), vector_rows)
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) != rows * row_bytes:
+            with open(self.vectors_path, 'r+b') as handle:
+                handle.truncate(rows * row_bytes)
+        if len(metas) != rows or self._meta_has_partial_line():
+            with open(self.meta_path, 'w', encoding='utf-8') as handle:
+                for meta in metas[:rows]:
+                    handle.write(json.dumps(meta, ensure_ascii=False) + '\n')
+
+    def _meta_has_partial_line(self) -> bool:
+        if not os.path.exists(self.meta_path) or os.path.getsize(self.meta_path) == 0:
+            return False
+        with open(self.meta_path, 'rb') as handle:
+            handle.seek(-1, os.SEEK_END)
+            return handle.read(1) != b'\n'
+
+    def delete(self, doc_type: str, doc_id: int) -> int:
+        """删除文档的全部向量（写入墓碑），返回删除数量"""
+        data = self._load()
+        rows = [
+            row for row, meta in enumerate(data["metas"])
+            if meta.get("doc_type") == doc_type and meta.get("doc_id") == doc_id and row not in data["deleted"]
+        ]
+        if rows:
+            with _file_lock(self.lock_path):
+                with open(self.deleted_path, 'a', encoding='utf-8') as handle:
+                    for row in rows:
+                        handle.write(f"{row}\n")
+        return len(rows)
+
+    def clear(self):
+        """清空存储"""
+        with _file_lock(self.lock_path):
+            for path in (self.vectors_path, self.meta_path, self.deleted_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        self._cache = None
+        self._cache_key = None
+
+    def _read_metas(self) -> List[Dict]:
+        metas = []
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding='utf-8') as handle:
+                for line in handle:
+                    try:
+                        metas.append(json.loads(line))
+                    except ValueError:
+                        break  # 不完整的最后一行
+        return metas
+
+    def _load(self) -> Dict:
+        """加载（或复用缓存的）向量、元数据和LSH索引；文件变化后自动重新加载"""
+        key = tuple(
+            os.path.getsize(path) if os.path.exists(path) else -1
+            for path in (self.vectors_path, self.meta_path, self.deleted_path)
+        )
+        if self._cache is not None and self._cache_key == key:
+            record_cache("vector_index", True)
+            return self._cache
+        record_cache("vector_index", False)
+
+        metas = self._read_metas()
+        if os.path.exists(self.vectors_path):
+            vectors = np.fromfile(self.vectors_path, dtype=np.float32)
+            vectors = vectors[:len(vectors) // self.dim * self.dim].reshape(-1, self.dim)
+        else:
+            vectors = np.zeros((0, self.dim), dtype=np.float32)
+        rows = min(len(metas), len(vectors))
+        metas, vectors = metas[:rows], vectors[:rows]
+
+        deleted = set()
+        if os.path.exists(self.deleted_path):
+            with open(self.deleted_path, encoding='utf-8') as handle:
+                deleted = {int(line) for line in handle if line.strip().isdigit()}
+
+        self._cache = {
+            "vectors": vectors,
+            "metas": metas,
+            "deleted": deleted,
+            "lsh": self._build_lsh(vectors) if rows >= ANN_MIN_SIZE else None
+        }
+        self._cache_key = key
+        return self._cache
+
+    def _planes(self) -> np.ndarray:
+        """固定种子的随机超平面（同一维度下跨进程一致）"""
+        rng = np.random.default_rng(self.dim)
+        return rng.standard_normal((LSH_TABLES, LSH_BITS, self.dim)).astype(np.float32)
+
+    def _codes(self, vectors: np.ndarray, planes: np.ndarray) -> np.ndarray:
+        """计算每个向量在每张表中的桶编号，形状(表数, 向量数)"""
+        weights = (1 << np.arange(LSH_BITS)).astype(np.int64)
+        bits = np.einsum('tbd,nd->tnb', planes, vectors) > 0
+        return (bits * weights).sum(axis=2)
+
+    def _build_lsh(self, vectors: np.ndarray) -> Dict:
+        planes = self._planes()
+        codes = self._codes(vectors, planes)
+        tables = []
+        for table_codes in codes:
+            order = np.argsort(table_codes, kind='stable')
+            sorted_codes = table_codes[order]
+            unique, starts = np.unique(sorted_codes, return_index=True)
+            ends = np.append(starts[1:], len(sorted_codes))
+            tables.append({
+                int(code): order[start:end]
+                for code, start, end in zip(unique, starts, ends)
+            })
+        return {"planes": planes, "tables": tables}
+
+    def _candidates(self, lsh: Dict, query: np.ndarray) -> np.ndarray:
+        """多探针LSH：查询所在桶及汉明距离为1的相邻桶"""
+        codes = self._codes(query.reshape(1, -1), lsh["planes"])[:, 0]
+        found = []
+        for table, code in zip(lsh["tables"], codes):
+            code = int(code)
+            for probe in [code] + [code ^ (1 << bit) for bit in range(LSH_BITS)]:
+                bucket = table.get(probe)
+                if bucket is not None:
+                    found.append(bucket)
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def search(self, query: np.ndarray, top_k: int = 5, doc_type: Optional[str] = None) -> List[Dict]:
+        """
+        检索最相似的向量
+
+        Args:
+            query: L2归一化的查询向量
+            top_k: 返回数量
+            doc_type: 只检索指定类型文档
+
+        Returns:
+            [{"score", "doc_type", "doc_id", "title", "text"}]，按相似度降序
+        """
+        data = self._load()
+        vectors, metas, deleted = data["vectors"], data["metas"], data["deleted"]
+        if len(metas) == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+
+        candidates = None
+        if data["lsh"] is not None:
+            candidates = self._candidates(data["lsh"], query)
+            if len(candidates) < top_k * ANN_CANDIDATE_FACTOR:
+                candidates = None
+        if candidates is None:
+            candidates = np.arange(len(metas))
+
+        scores = vectors[candidates] @ query
+        order = np.argsort(-scores)
+        results = []
+        for position in order:
+            row = int(candidates[position])
+            if row in deleted:
+                continue
+            meta = metas[row]
+            if doc_type and meta.get("doc_type") != doc_type:
+                continue
+            results.append({**meta, "score": float(scores[position])})
+            if len(results) >= top_k:
+                break
+        return results
+
+    def count(self) -> int:
+        data = self._load()
+        return len(data["metas"]) - len(data["deleted"])
+
+
+_stores: Dict[int, VectorStore] = {}
+
+
+def get_store(user_id: int) -> VectorStore:
+    """获取用户的向量存储（进程内缓存）"""
+    store = _stores.get(user_id)
+    embed = get_embedding_function()
+    if store is None or store.model_name != embed.name:
+        dim = getattr(embed, "dim", None) or int(embed(["维度"]).shape[1])
+        store = VectorStore(os.path.join(settings.VECTOR_INDEX_DIR, f"user_{user_id}"), dim, embed.name)
+        _stores[user_id] = store
+    return store
+
+
+def _index_chunks(user_id: int, doc_type: str, doc_id: int, title: str, texts: List[str]):
+    chunks = [f"{title}\n{chunk}" if title else chunk for chunk in texts]
+    if not chunks:
+        return
+    store = get_store(user_id)
+    store.delete(doc_type, doc_id)
+    vectors = get_embedding_function()(chunks)
+    store.add(vectors, [
+        {"doc_type": doc_type, "doc_id": doc_id, "title": title or "", "text": chunk}
+        for chunk in chunks
+    ])
+
+
+def index_news(article):
+    """索引新闻（标题+正文切块）"""
+    _index_chunks(article.user_id, DOC_NEWS, article.id, article.title, chunk_text(article.content) or [article.title])
+
+
+def index_report(report):
+    """索引分析报告（摘要+正文切块）"""
+    text = f"{report.summary or ''}\n{report.content or ''}"
+    _index_chunks(report.user_id, DOC_REPORT, report.id, report.title, chunk_text(text))
+
+
+def remove_document(user_id: int, doc_type: str, doc_id: int):
+    """删除文档的向量"""
+    get_store(user_id).delete(doc_type, doc_id)
+
+
+def safe_index(indexer, *args):
+    """索引失败不影响主流程（向量索引可随时重建）"""
+    try:
+        indexer(*args)
+    except Exception as e:
+        logger.warning("向量索引更新失败: %s", e)
+
+
+def retrieve(user_id: int, query: str, top_k: Optional[int] = None, min_score: Optional[float] = None) -> List[Dict]:
+    """
+    检索与问题最相关的本地资料
+
+    Args:
+        user_id: 用户ID（只检索该用户的数据）
+        query: 问题文本
+        top_k: 返回数量（默认读取配置）
+        min_score: 最低相似度（默认读取配置）
+
+    Returns:
+        [{"score", "doc_type", "doc_id", "title", "text"}]，同一文档只保留最相关的片段
+    """
+    top_k = settings.CHAT_RETRIEVAL_TOP_K if top_k is None else top_k
+    min_score = settings.CHAT_RETRIEVAL_MIN_SCORE if min_score is None else min_score
+
+    store = get_store(user_id)
+    query_vector = get_embedding_function()([query])[0]
+    results = []
+    seen = set()
+    for item in store.search(query_vector, top_k=top_k * 3):
+        key = (item["doc_type"], item["doc_id"])
+        if item["score"] < min_score or key in seen:
+            continue
+        seen.add(key)
+        results.append(item)
+        if len(results) >= top_k:
+            break
+    return results
+
+
+def rebuild_index(db, user_id: Optional[int] = None) -> Dict:
+    """重建向量索引（清空后重新索引全部新闻和报告）"""
+    from app.models.news import NewsArticle
+    from app.models.report import AnalysisReport
+
+    stats = {DOC_NEWS: 0, DOC_REPORT: 0}
+    user_ids = [user_id] if user_id is not None else sorted(
+        {row[0] for row in db.query(NewsArticle.user_id).distinct()}
+        | {row[0] for row in db.query(AnalysisReport.user_id).distinct()}
+    )
+    for uid in user_ids:
+        get_store(uid).clear()
+        for article in db.query(NewsArticle).filter(NewsArticle.user_id == uid).yield_per(200):
+            index_news(article)
+            stats[DOC_NEWS] += 1
+        for report in db.query(AnalysisReport).filter(AnalysisReport.user_id == uid).yield_per(50):
+            index_report(report)
+            stats[DOC_REPORT] += 1
+        logger.info("用户 %s 向量索引重建完成（%d 个片段）", uid, get_store(uid).count())
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令行入口：重建向量索引"""
+    parser = argparse.ArgumentParser(description="维护本地向量索引")
+    parser.add_argument("--rebuild", action="store_true", help="重建索引")
+    parser.add_argument("--user-id", type=int, default=None, help="只处理指定用户")
+    args = parser.parse_args(argv)
+
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    from app.database import SessionLocal
+    from app.utils.logging_config import setup_logging
+
+    setup_logging()
+    db = SessionLocal()
+    try:
+        stats = rebuild_index(db, user_id=args.user_id)
+        print(f"✓ 向量索引重建完成：新闻 {stats[DOC_NEWS]} 条，报告 {stats[DOC_REPORT]} 条")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
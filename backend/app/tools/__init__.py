@@ -1,6 +1,5 @@
-from app.tools.web_scraper import requests_get_tool, beautifulsoup_parse_tool, check_url_accessible
-from app.tools.text_processor import text_clean_tool, extract_entities_tool
-from app.tools.data_fetcher import fetch_sports_data_api
+# LangChain工具按需导入（避免导入app.tools子模块时加载LangChain和BeautifulSoup）
+from app.utils.lazy_import import lazy_exports
 
 __all__ = [
     "requests_get_tool",
@@ -10,3 +9,12 @@ __all__ = [
     "extract_entities_tool",
     "fetch_sports_data_api"
 ]
+
+__getattr__ = lazy_exports(__name__, {
+    "requests_get_tool": "app.tools.web_scraper",
+    "beautifulsoup_parse_tool": "app.tools.web_scraper",
+    "check_url_accessible": "app.tools.web_scraper",
+    "text_clean_tool": "app.tools.text_processor",
+    "extract_entities_tool": "app.tools.text_processor",
+    "fetch_sports_data_api": "app.tools.data_fetcher"
+})
@@ -0,0 +1,227 @@
+"""
+文章批量处理工具
+一次遍历完成文本清洗、实体提取、类别识别和情感打分，支持多进程执行，
+并提供按块重新处理news_articles表的命令行入口（词典变化后重新标注历史数据）
+
+用法：
+    python -m app.tools.batch_processor --chunk-size 500 --workers 4
+    python -m app.tools.batch_processor --user-id 1 --all --dry-run
+"""
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.tools.text_processor import clean_text, extract_entities, DICTIONARY_VERSION
+from app.tools.hupu_scraper import detect_category_from_content
+from app.tools.sentiment import score_articles, LEXICON_VERSION
+
+logger = logging.getLogger(__name__)
+
+# 处理版本：实体词典或情感词典任一变化，历史文章都需要重新处理
+PROCESSING_VERSION = f"{DICTIONARY_VERSION}-{LEXICON_VERSION}"
+
+
+def process_article(article: Dict, sentiment: Optional[Dict] = None) -> Dict:
+    """
+    处理单篇文章：清洗文本、提取实体、识别类别、情感打分
+
+    Args:
+        article: 文章字典（至少包含title、content，可选id、category）
+        sentiment: 已批量计算好的情感分（为None时单独计算）
+
+    Returns:
+        处理结果字典 {"id", "cleaned_text", "entities", "category", "sentiment", "dictionary_version"}
+    """
+    title = article.get('title') or ''
+    content = article.get('content') or ''
+
+    # 实体提取基于原始文本（清洗会去掉日期中的"-"和比分中的":"）
+    entities = extract_entities(f"{title}\n{content}")
+
+    # 识别不出类别时保留原有类别
+    detected = detect_category_from_content(title, content)
+    category = detected if detected != '体育' else (article.get('category') or detected)
+
+    return {
+        "id": article.get('id'),
+        "cleaned_text": clean_text(content),
+        "entities": entities,
+        "category": category,
+        "sentiment": sentiment if sentiment is not None else score_articles([article])[0],
+        "dictionary_version": PROCESSING_VERSION
+    }
+
+
+def _process_chunk(chunk: List[Dict]) -> List[Dict]:
+    """处理一个分块（多进程时按块提交，降低进程间通信开销；情感分整块一次扫描）"""
+    sentiments = score_articles(chunk)
+    return [process_article(article, sentiment) for article, sentiment in zip(chunk, sentiments)]
+
+
+def _chunked(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """将可迭代对象切分为固定大小的分块"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_articles(
+    articles: Iterable[Dict],
+    workers: int = 1,
+    chunk_size: int = 200
+) -> Iterator[Dict]:
+    """
+    批量处理文章，按输入顺序流式返回处理结果
+
+    Args:
+        articles: 文章可迭代对象（可以是生成器，不会一次性读入内存）
+        workers: 进程数，<=1时在当前进程中处理
+        chunk_size: 每个分块的文章数量
+
+    Yields:
+        每篇文章的处理结果（格式同process_article）
+    """
+    if workers <= 1:
+        for chunk in _chunked(articles, chunk_size):
+            yield from _process_chunk(chunk)
+        return
+
+    # 多进程：最多保留workers*2个未完成的分块，避免大批量回填时占用过多内存
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for chunk in _chunked(articles, chunk_size):
+            pending.append(executor.submit(_process_chunk, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+
+def _apply_result(article, result: Dict) -> bool:
+    """将处理结果写回NewsArticle对象，返回是否有变化"""
+    metadata = dict(article.article_metadata or {})
+    entities = result['entities']
+
+    # 合并已有的球队/球员信息（可能来自采集阶段），供统计使用
+    metadata['teams'] = list(dict.fromkeys(list(metadata.get('teams') or []) + entities['teams']))
+    metadata['players'] = list(dict.fromkeys(list(metadata.get('players') or []) + entities['players']))
+    metadata['entities'] = entities
+    metadata['sentiment'] = result['sentiment']
+    metadata['dictionary_version'] = result['dictionary_version']
+
+    changed = metadata != (article.article_metadata or {}) or article.category != result['category']
+    if changed:
+        # JSON字段需要重新赋值新对象，SQLAlchemy才能检测到变化
+        article.article_metadata = metadata
+        article.category = result['category']
+    return changed
+
+
+def reprocess_news_table(
+    db,
+    chunk_size: int = 500,
+    workers: int = 1,
+    user_id: Optional[int] = None,
+    only_stale: bool = True,
+    dry_run: bool = False
+) -> Dict:
+    """
+    按块重新处理news_articles表（按ID分页，每块提交一次）
+
+    Args:
+        db: 数据库会话
+        chunk_size: 每块读取的文章数量
+        workers: 进程数
+        user_id: 只处理指定用户的文章（None表示全部用户）
+        only_stale: 只处理词典版本与当前不一致的文章
+        dry_run: 只统计不写回
+
+    Returns:
+        统计信息 {"scanned", "processed", "updated", "elapsed"}
+    """
+    from app.models.news import NewsArticle
+
+    stats = {"scanned": 0, "processed": 0, "updated": 0, "elapsed": 0.0}
+    started = time.perf_counter()
+    last_id = 0
+
+    while True:
+        query = db.query(NewsArticle).filter(NewsArticle.id > last_id)
+        if user_id is not None:
+            query = query.filter(NewsArticle.user_id == user_id)
+        rows = query.order_by(NewsArticle.id).limit(chunk_size).all()
+        if not rows:
+            break
+
+        last_id = rows[-1].id
+        stats["scanned"] += len(rows)
+
+        if only_stale:
+            rows = [
+                row for row in rows
+                if (row.article_metadata or {}).get('dictionary_version') != PROCESSING_VERSION
+            ]
+
+        by_id = {row.id: row for row in rows}
+        articles = [
+            {"id": row.id, "title": row.title, "content": row.content, "category": row.category}
+            for row in rows
+        ]
+
+        for result in process_articles(articles, workers=workers, chunk_size=max(1, chunk_size // max(workers, 1))):
+            stats["processed"] += 1
+            if _apply_result(by_id[result["id"]], result):
+                stats["updated"] += 1
+
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        # 释放已处理的对象，避免长时间回填时会话占用内存持续增长
+        db.expunge_all()
+        logger.info("已处理至ID %s（扫描 %d，更新 %d）", last_id, stats['scanned'], stats['updated'])
+
+    stats["elapsed"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令行入口：按块重新处理news_articles表"""
+    parser = argparse.ArgumentParser(description="批量重新清洗/标注news_articles表中的文章")
+    parser.add_argument("--chunk-size", type=int, default=500, help="每块处理的文章数量")
+    parser.add_argument("--workers", type=int, default=1, help="进程数（大批量回填时可调大）")
+    parser.add_argument("--user-id", type=int, default=None, help="只处理指定用户的文章")
+    parser.add_argument("--all", action="store_true", help="处理全部文章（默认只处理词典版本过期的文章）")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不写回数据库")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+    from app.utils.logging_config import setup_logging
+
+    setup_logging()
+    db = SessionLocal()
+    try:
+        print(f"开始重新处理文章（词典版本 {PROCESSING_VERSION}）...")
+        stats = reprocess_news_table(
+            db,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            user_id=args.user_id,
+            only_stale=not args.all,
+            dry_run=args.dry_run
+        )
+        print(f"✓ 完成：扫描 {stats['scanned']} 条，处理 {stats['processed']} 条，"
+              f"更新 {stats['updated']} 条，耗时 {stats['elapsed']} 秒")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
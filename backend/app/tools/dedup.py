@@ -0,0 +1,180 @@
+"""
+新闻近似重复检测工具
+- 对标题+内容的字符2-gram集合计算MinHash签名（估计Jaccard相似度）
+- 签名按行切分为若干段（LSH分桶），相似文章大概率至少有一段完全相同，
+  只需按分段精确匹配找候选，再用签名估计相似度确认，查找为亚线性复杂度
+（新闻标题和摘要很短，SimHash在短文本上汉明距离波动大，因此使用MinHash）
+"""
+import hashlib
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# MinHash签名长度与LSH分段（BAND_COUNT * BAND_ROWS == NUM_PERM）
+NUM_PERM = 32
+BAND_COUNT = 8
+BAND_ROWS = NUM_PERM // BAND_COUNT
+
+# 默认判定阈值：估计Jaccard相似度不低于该值视为近似重复
+DEFAULT_SIMILARITY_THRESHOLD = 0.5
+
+# 字符n-gram长度
+SHINGLE_SIZE = 2
+# 参与计算的最大文本长度（转载通常在开头部分就高度相似）
+MAX_TEXT_LENGTH = 1000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 固定种子生成排列参数，保证签名跨进程、跨版本可比较（签名会持久化）
+_rng = random.Random(20240601)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_NORMALIZE_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    """归一化文本：小写并去掉空白和标点"""
+    return _NORMALIZE_RE.sub('', (text or '').lower())
+
+
+def _hash64(token: str) -> int:
+    """稳定的64位哈希（不受PYTHONHASHSEED影响，可持久化）"""
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _shingles(text: str) -> set:
+    """字符n-gram集合"""
+    normalized = _normalize(text)[:MAX_TEXT_LENGTH]
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """
+    计算文本的MinHash签名
+
+    Args:
+        text: 待计算文本
+
+    Returns:
+        长度为NUM_PERM的签名（空文本返回全最大值签名）
+    """
+    hashes = [_hash64(shingle) for shingle in _shingles(text)]
+    if not hashes:
+        return tuple([_MAX_HASH] * NUM_PERM)
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def article_text(article: Dict) -> str:
+    """文章参与签名计算的文本（标题+内容）"""
+    title = article.get('title') or ''
+    content = article.get('content') or ''
+    # 内容为空时采集器会用标题填充，避免标题被重复计入
+    if content == title:
+        content = ''
+    return f"{title} {content}"
+
+
+def article_signature(article: Dict) -> Tuple[int, ...]:
+    """计算文章签名（标题+内容）"""
+    return minhash(article_text(article))
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """由两个签名估计Jaccard相似度"""
+    if not a or not b:
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def band_keys(signature: Sequence[int]) -> List[int]:
+    """
+    将签名切分为LSH分段，每段哈希为一个有符号64位整数（可直接存入BIGINT索引列）
+    """
+    keys = []
+    for band in range(BAND_COUNT):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        raw = f"{band}:" + ','.join(str(value) for value in rows)
+        value = _hash64(raw)
+        keys.append(value - (1 << 64) if value >= (1 << 63) else value)
+    return keys
+
+
+def encode_signature(signature: Sequence[int]) -> str:
+    """签名编码为十六进制字符串（用于持久化）"""
+    return ''.join(f"{value:08x}" for value in signature)
+
+
+def decode_signature(encoded: str) -> Tuple[int, ...]:
+    """从十六进制字符串还原签名"""
+    return tuple(int(encoded[i:i + 8], 16) for i in range(0, len(encoded or ''), 8))
+
+
+class NearDuplicateIndex:
+    """内存中的MinHash LSH索引（用于单批次内去重）"""
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.buckets: Dict[int, List[Tuple[Tuple[int, ...], object]]] = {}
+
+    def add(self, signature: Sequence[int], key: object = None):
+        """加入一个签名（key为关联对象，如文章ID或标题）"""
+        entry = (tuple(signature), key)
+        for band_key in band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(entry)
+
+    def find(self, signature: Sequence[int]) -> Optional[Tuple[Tuple[int, ...], object]]:
+        """查找近似重复项，返回(签名, key)，没有则返回None"""
+        for band_key in band_keys(signature):
+            for entry in self.buckets.get(band_key, ()):
+                if similarity(signature, entry[0]) >= self.threshold:
+                    return entry
+        return None
+
+    def contains(self, signature: Sequence[int]) -> bool:
+        """是否存在近似重复项"""
+        return self.find(signature) is not None
+
+
+def filter_near_duplicates(
+    news_list: Iterable[Dict],
+    existing: Optional[Iterable[Dict]] = None,
+    threshold: float = DEFAULT_SIMILARITY_THRESHOLD
+) -> List[Dict]:
+    """
+    过滤近似重复的新闻（保留先出现的一条）
+
+    Args:
+        news_list: 待过滤的新闻列表
+        existing: 已有新闻（只参与比较，不出现在结果中）
+        threshold: 相似度阈值
+
+    Returns:
+        去重后的新闻列表（保持原顺序）
+    """
+    index = NearDuplicateIndex(threshold)
+    seen_titles = set()
+    for item in existing or []:
+        index.add(article_signature(item))
+        seen_titles.add(item.get('title'))
+
+    result = []
+    for item in news_list:
+        title = item.get('title')
+        if not title or title in seen_titles:
+            continue
+        signature = article_signature(item)
+        if index.contains(signature):
+            continue
+        index.add(signature)
+        seen_titles.add(title)
+        result.append(item)
+    return result
@@ -0,0 +1,38 @@
+"""
+采集HTTP请求（记录按域名、状态码统计的耗时指标和http.fetch追踪span）
+"""
+import time
+from urllib.parse import urlsplit
+import requests
+from app.utils.metrics import record_fetch
+from app.utils.tracing import KIND_CLIENT, span
+
+
+def timed_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    发送HTTP请求并记录耗时（参数与requests.request一致，异常原样抛出）
+
+    Args:
+        method: 请求方法（GET/HEAD等）
+        url: 请求地址
+
+    Returns:
+        requests.Response
+    """
+    with span("http.fetch", {
+        "http.method": method.upper(),
+        "http.url": url,
+        "net.peer.name": urlsplit(url).hostname or ""
+    }, kind=KIND_CLIENT) as item:
+        started = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.exceptions.Timeout:
+            record_fetch(url, time.perf_counter() - started, "timeout")
+            raise
+        except requests.exceptions.RequestException:
+            record_fetch(url, time.perf_counter() - started, "error")
+            raise
+        record_fetch(url, time.perf_counter() - started, response.status_code)
+        item.set_attribute("http.status_code", response.status_code)
+        return response
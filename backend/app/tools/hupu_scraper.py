@@ -1,19 +1,109 @@
 """
 虎扑网站新闻采集工具
 """
+import logging
 import requests
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
 from datetime import datetime
 import re
 import time
+from app.config import settings
+from app.tools.dedup import filter_near_duplicates
+from app.tools.http_fetch import timed_request
+
+logger = logging.getLogger(__name__)
+
+# 类别关键词（模块级常量，避免每次识别都重新构建列表）
+# 电竞关键词（高优先级，避免误判）
+ESPORTS_KEYWORDS = [
+    'lol', '英雄联盟', '王者荣耀', 'kpl', 'lpl', 'dota', 'csgo', 'pubg', 
+    '和平精英', '穿越火线', 'cf', 'valorant', '无畏契约', 'apex', 
+    'gala', 'tes', 'jdg', 'rng', 'edg', 'fpx', 'ig', 'we', 'omg', 'blg',
+    '电竞', '职业联赛', 'moba', 'fps', 'rts', 'moba游戏', '女枪', 'bo3',
+    '流言板', '一图流', 'jrs', '神评', 'wcba', 'wcba今日', 'wcba常规赛'
+]
+
+# 足球关键词
+SOCCER_KEYWORDS = [
+    '足球', '英超', '西甲', '意甲', '德甲', '法甲', '中超', '世界杯', 
+    '欧洲杯', '欧冠', '亚冠', '国足', '男足', '女足', '梅西', 'c罗', 
+    '内马尔', '姆巴佩', '哈兰德', '皇马', '巴萨', '曼联', '利物浦', 
+    '切尔西', '曼城', '阿森纳', '拜仁', '多特', '尤文', 'ac米兰', 
+    '国际米兰', '巴黎', '大巴黎', 'fifa', 'u23', 'u20', 'u17', '亚洲杯',
+    '世预赛', '预选赛', '门将', '进球', '助攻', '点球', '任意球'
+]
+
+# NBA关键词
+NBA_KEYWORDS = [
+    'nba', '湖人', '勇士', '凯尔特人', '热火', '篮网', '76人', 
+    '雄鹿', '太阳', '独行侠', '快船', '掘金', '灰熊', '爵士', 
+    '詹姆斯', '库里', '杜兰特', '字母哥', '东契奇', '约基奇', 
+    '恩比德', '塔图姆', '布克', '莫兰特', '季后赛', '常规赛', 
+    '总决赛', 'mvp', '得分王', '篮板王', '助攻王', '三分', '扣篮',
+    'nba常规赛', 'nba季后赛', 'nba总决赛'
+]
+
+# CBA关键词
+CBA_KEYWORDS = [
+    'cba', 'cba联赛', '中国男篮', '中国女篮', 'wcba', '易建联', 
+    '郭艾伦', '周琦', '王哲林', '赵继伟', '广东宏远', '辽宁', 
+    '北京首钢', '新疆', '广厦', '上海', '浙江', '深圳', '山东',
+    'cba常规赛', 'cba季后赛', '杨珂菁', '准绝杀', '女篮'
+]
+
+# 按优先级排列（得分相同时靠前的类别胜出）
+CATEGORY_KEYWORDS = [
+    ('电竞', ESPORTS_KEYWORDS),
+    ('足球', SOCCER_KEYWORDS),
+    ('NBA', NBA_KEYWORDS),
+    ('CBA', CBA_KEYWORDS)
+]
+
+
+def detect_category_from_content(title: str, content: str) -> str:
+    """
+    根据标题和内容智能识别新闻类别（不依赖HupuScraper实例，便于批量处理复用）
+    
+    Args:
+        title: 新闻标题
+        content: 新闻内容
+    
+    Returns:
+        类别名称（电竞/足球/NBA/CBA），无法识别时返回"体育"
+    """
+    # 计算每个类别的匹配度（标题中的关键词权重更高）
+    title_lower = (title or "").lower()
+    content_lower = (content or "").lower()
+    
+    best_category = '体育'
+    max_score = 0
+    for category, keywords in CATEGORY_KEYWORDS:
+        score = 0
+        for keyword in keywords:
+            # 标题中的关键词权重为2，内容中的权重为1
+            if keyword in title_lower:
+                score += 2
+            if keyword in content_lower:
+                score += 1
+        if score > max_score:
+            best_category = category
+            max_score = score
+    
+    # 至少需要2分（标题中有一个关键词）才认为匹配
+    if max_score >= 2:
+        return best_category
+    
+    # 如果没有匹配，返回默认类别
+    return '体育'
+
 
 class HupuScraper:
     """虎扑新闻采集器 - 支持API接口和网页爬取"""
     
     def __init__(self):
-        self.base_url = "https://www.hupu.com"
-        self.api_base_url = "https://bbs.hupu.com/v1"
+        self.base_url = settings.HUPU_BASE_URL.rstrip('/')
+        self.mobile_base_url = settings.HUPU_MOBILE_BASE_URL.rstrip('/')
+        self.api_base_url = settings.HUPU_API_BASE_URL.rstrip('/')
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -42,14 +132,14 @@ class HupuScraper:
                 'limit': limit
             }
             
-            print(f"📡 尝试使用虎扑API获取数据: {api_url}")
+            logger.debug("尝试使用虎扑API获取数据: %s", api_url)
             
-            response = requests.get(api_url, headers=self.headers, params=params, timeout=15)
+            response = timed_request("GET", api_url, headers=self.headers, params=params, timeout=15)
             
             if response.status_code == 200:
                 try:
                     data = response.json()
-                    print(f"✓ 虎扑API返回数据: {type(data)}")
+                    logger.debug("虎扑API返回数据: %s", type(data).__name__)
                     
                     # 解析API返回的数据结构
                     news_list = []
@@ -61,14 +151,14 @@ class HupuScraper:
                     elif isinstance(data, list):
                         items = data
                     else:
-                        print(f"⚠️ 未知的API数据结构: {type(data)}")
+                        logger.warning("未知的API数据结构: %s", type(data).__name__)
                         return None
                     
                     if not items:
-                        print(f"⚠️ API返回数据为空")
+                        logger.warning("API返回数据为空")
                         return None
                     
-                    print(f"✓ 从API获取到 {len(items)} 条数据")
+                    logger.debug("从API获取到 %d 条数据", len(items))
                     
                     # 解析每条新闻
                     for item in items[:limit]:
@@ -98,35 +188,32 @@ class HupuScraper:
                                 if news['title']:
                                     news_list.append(news)
                         except Exception as e:
-                            print(f"⚠️ 解析API新闻项失败: {str(e)}")
+                            logger.warning("解析API新闻项失败: %s", e, extra={"sample": "hupu.parse_api_item"})
                             continue
                     
                     if news_list:
-                        print(f"✓ 成功从虎扑API获取 {len(news_list)} 条新闻")
+                        logger.info("成功从虎扑API获取 %d 条新闻", len(news_list))
                         return news_list
                     else:
-                        print(f"⚠️ API数据解析后为空")
+                        logger.warning("API数据解析后为空")
                         return None
                         
                 except ValueError as e:
                     # JSON解析错误
-                    print(f"⚠️ API返回非JSON数据: {str(e)}")
-                    print(f"   响应内容前100字符: {response.text[:100]}")
+                    logger.warning("API返回非JSON数据: %s", e, extra={"body_prefix": response.text[:100]})
                     return None
             else:
-                print(f"⚠️ 虎扑API请求失败，状态码: {response.status_code}")
+                logger.warning("虎扑API请求失败，状态码: %s", response.status_code)
                 return None
                 
         except requests.exceptions.Timeout:
-            print(f"⚠️ 虎扑API请求超时")
+            logger.warning("虎扑API请求超时")
             return None
         except requests.exceptions.ConnectionError as e:
-            print(f"⚠️ 虎扑API连接失败: {str(e)}")
+            logger.warning("虎扑API连接失败: %s", e)
             return None
         except Exception as e:
-            print(f"⚠️ 虎扑API调用失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("虎扑API调用失败: %s", e)
             return None
     
     def _parse_api_time(self, time_value) -> datetime:
@@ -185,22 +272,23 @@ class HupuScraper:
             if api_news and len(api_news) > 0:
                 return api_news[:limit]
             else:
-                print("⚠️ 虎扑API不可用，降级到网页爬取")
+                logger.warning("虎扑API不可用，降级到网页爬取")
         
         # 2. 备用方案：网页爬取
         try:
             # 虎扑新闻列表页URL
             url = f"{self.base_url}/{category}"
             
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = timed_request("GET", url, headers=self.headers, timeout=10)
             response.encoding = 'utf-8'
             
             if response.status_code != 200:
                 # 如果主站不可用，尝试移动端
-                url = f"https://m.hupu.com/{category}"
-                response = requests.get(url, headers=self.headers, timeout=10)
+                url = f"{self.mobile_base_url}/{category}"
+                response = timed_request("GET", url, headers=self.headers, timeout=10)
                 response.encoding = 'utf-8'
             
+            from bs4 import BeautifulSoup  # 延迟导入，仅解析HTML时加载
             soup = BeautifulSoup(response.text, 'html.parser')
             
             news_list = []
@@ -233,13 +321,13 @@ class HupuScraper:
                     if news and news.get('title'):
                         news_list.append(news)
                 except Exception as e:
-                    print(f"解析新闻项失败: {str(e)}")
+                    logger.warning("解析新闻项失败: %s", e, extra={"sample": "hupu.parse_item"})
                     continue
             
             return news_list[:limit]
             
         except Exception as e:
-            print(f"获取虎扑新闻列表失败: {str(e)}")
+            logger.warning("获取虎扑新闻列表失败: %s", e)
             return []
     
     def _parse_news_item(self, item, category: str) -> Optional[Dict]:
@@ -298,7 +386,7 @@ class HupuScraper:
                 }
             }
         except Exception as e:
-            print(f"解析新闻项出错: {str(e)}")
+            logger.warning("解析新闻项出错: %s", e, extra={"sample": "hupu.parse_item"})
             return None
     
     def _parse_time(self, time_text: str) -> Optional[datetime]:
@@ -346,82 +434,7 @@ class HupuScraper:
     
     def _detect_category_from_content(self, title: str, content: str) -> str:
         """根据标题和内容智能识别新闻类别"""
-        # 合并标题和内容，标题权重更高
-        text = (title + " " + title + " " + content).lower()  # 标题重复一次增加权重
-        
-        # 电竞关键词（高优先级，避免误判）
-        esports_keywords = [
-            'lol', '英雄联盟', '王者荣耀', 'kpl', 'lpl', 'dota', 'csgo', 'pubg', 
-            '和平精英', '穿越火线', 'cf', 'valorant', '无畏契约', 'apex', 
-            'gala', 'tes', 'jdg', 'rng', 'edg', 'fpx', 'ig', 'we', 'omg', 'blg',
-            '电竞', '职业联赛', 'moba', 'fps', 'rts', 'moba游戏', '女枪', 'bo3',
-            '流言板', '一图流', 'jrs', '神评', 'wcba', 'wcba今日', 'wcba常规赛'
-        ]
-        
-        # 足球关键词
-        soccer_keywords = [
-            '足球', '英超', '西甲', '意甲', '德甲', '法甲', '中超', '世界杯', 
-            '欧洲杯', '欧冠', '亚冠', '国足', '男足', '女足', '梅西', 'c罗', 
-            '内马尔', '姆巴佩', '哈兰德', '皇马', '巴萨', '曼联', '利物浦', 
-            '切尔西', '曼城', '阿森纳', '拜仁', '多特', '尤文', 'ac米兰', 
-            '国际米兰', '巴黎', '大巴黎', 'fifa', 'u23', 'u20', 'u17', '亚洲杯',
-            '世预赛', '预选赛', '门将', '进球', '助攻', '点球', '任意球'
-        ]
-        
-        # NBA关键词
-        nba_keywords = [
-            'nba', '湖人', '勇士', '凯尔特人', '热火', '篮网', '76人', 
-            '雄鹿', '太阳', '独行侠', '快船', '掘金', '灰熊', '爵士', 
-            '詹姆斯', '库里', '杜兰特', '字母哥', '东契奇', '约基奇', 
-            '恩比德', '塔图姆', '布克', '莫兰特', '季后赛', '常规赛', 
-            '总决赛', 'mvp', '得分王', '篮板王', '助攻王', '三分', '扣篮',
-            'nba常规赛', 'nba季后赛', 'nba总决赛'
-        ]
-        
-        # CBA关键词
-        cba_keywords = [
-            'cba', 'cba联赛', '中国男篮', '中国女篮', 'wcba', '易建联', 
-            '郭艾伦', '周琦', '王哲林', '赵继伟', '广东宏远', '辽宁', 
-            '北京首钢', '新疆', '广厦', '上海', '浙江', '深圳', '山东',
-            'cba常规赛', 'cba季后赛', '杨珂菁', '准绝杀', '女篮'
-        ]
-        
-        # 计算每个类别的匹配度（标题中的关键词权重更高）
-        title_lower = title.lower()
-        content_lower = (content or "").lower()
-        
-        def calculate_score(keywords, text, title_text):
-            score = 0
-            for keyword in keywords:
-                # 标题中的关键词权重为2，内容中的权重为1
-                if keyword in title_text:
-                    score += 2
-                if keyword in text:
-                    score += 1
-            return score
-        
-        esports_score = calculate_score(esports_keywords, content_lower, title_lower)
-        soccer_score = calculate_score(soccer_keywords, content_lower, title_lower)
-        nba_score = calculate_score(nba_keywords, content_lower, title_lower)
-        cba_score = calculate_score(cba_keywords, content_lower, title_lower)
-        
-        # 返回得分最高的类别
-        scores = {
-            '电竞': esports_score,
-            '足球': soccer_score,
-            'NBA': nba_score,
-            'CBA': cba_score
-        }
-        
-        max_score = max(scores.values())
-        if max_score >= 2:  # 至少需要2分（标题中有一个关键词）才认为匹配
-            # 返回得分最高的类别
-            for category, score in scores.items():
-                if score == max_score:
-                    return category
-        
-        # 如果没有匹配，返回默认类别
-        return '体育'
+        return detect_category_from_content(title, content)
     
     def get_hot_topics(self, category: str = "nba", limit: int = 10) -> List[Dict]:
         """
@@ -442,7 +455,7 @@ class HupuScraper:
                 'limit': limit
             }
             
-            response = requests.get(api_url, headers=self.headers, params=params, timeout=15)
+            response = timed_request("GET", api_url, headers=self.headers, params=params, timeout=15)
             
             if response.status_code == 200:
                 try:
@@ -477,7 +490,7 @@ class HupuScraper:
                                 topics.append(topic)
                     
                     if topics:
-                        print(f"✓ 从虎扑API获取 {len(topics)} 条热门话题")
+                        logger.info("从虎扑API获取 %d 条热门话题", len(topics))
                         return topics
                 except:
                     pass
@@ -485,18 +498,19 @@ class HupuScraper:
             # 如果API失败，返回空列表
             return []
         except Exception as e:
-            print(f"⚠️ 获取热门话题失败: {str(e)}")
+            logger.warning("获取热门话题失败: %s", e)
             return []
     
     def get_news_detail(self, url: str) -> Optional[Dict]:
         """获取新闻详情"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = timed_request("GET", url, headers=self.headers, timeout=10)
             response.encoding = 'utf-8'
             
             if response.status_code != 200:
                 return None
             
+            from bs4 import BeautifulSoup  # 延迟导入，仅解析HTML时加载
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # 提取标题
@@ -529,7 +543,7 @@ class HupuScraper:
                 "url": url
             }
         except Exception as e:
-            print(f"获取新闻详情失败: {str(e)}")
+            logger.warning("获取新闻详情失败: %s", e)
             return None
 
 def scrape_hupu_news(category: str = "nba", limit: int = 5, use_api: bool = True) -> List[Dict]:
@@ -562,12 +576,8 @@ def scrape_hupu_news(category: str = "nba", limit: int = 5, use_api: bool = True
             break
         
         news = scraper.get_news_list(cat, limit=limit, use_api=False)  # 网页爬取不使用API
-        # 去重
-        seen_titles = {item['title'] for item in all_news}
-        for item in news:
-            if item['title'] not in seen_titles:
-                all_news.append(item)
-                seen_titles.add(item['title'])
+        # 近似去重（同一新闻可能以略有不同的标题出现在多个类别下）
+        all_news.extend(filter_near_duplicates(news, existing=all_news))
         
         time.sleep(0.5)  # 避免请求过快
     
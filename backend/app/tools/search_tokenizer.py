@@ -0,0 +1,57 @@
+"""
+搜索分词工具
+中文按字二元组（bigram）切分，英文/数字按单词切分，
+无需外部分词词典即可支持中文全文检索
+"""
+import re
+from typing import Dict, List
+
+# 英文单词/数字串，或连续的中文字符串
+_SEGMENT_RE = re.compile(r'[a-z0-9]+|[\u4e00-\u9fff]+')
+
+# 词项最大长度（与数据库字段长度一致）
+MAX_TERM_LENGTH = 64
+
+
+def _is_cjk(segment: str) -> bool:
+    return '\u4e00' <= segment[0] <= '\u9fff'
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为检索词项
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词项列表（按出现顺序，可能重复）
+    """
+    tokens = []
+    for match in _SEGMENT_RE.finditer((text or '').lower()):
+        segment = match.group()
+        if not _is_cjk(segment):
+            tokens.append(segment[:MAX_TERM_LENGTH])
+        elif len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+def term_frequencies(text: str, weight: int = 1) -> Dict[str, int]:
+    """统计词频（weight用于提高标题等字段的权重）"""
+    frequencies: Dict[str, int] = {}
+    for token in tokenize(text):
+        frequencies[token] = frequencies.get(token, 0) + weight
+    return frequencies
+
+
+def query_terms(query: str) -> List[str]:
+    """查询词项（去重并保持顺序）"""
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def is_single_char(term: str) -> bool:
+    """是否为单个汉字（索引中只有二元组，需按前缀或后缀匹配）"""
+    return len(term) == 1 and _is_cjk(term)
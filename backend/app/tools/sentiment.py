@@ -0,0 +1,301 @@
+"""
+基于词典的情感分析引擎
+- 带权重的正/负面词典，支持否定词（"未能夺冠"）和程度副词（"非常出色"）
+- 全部词条编译为一个正则，一次扫描完成匹配
+- 批量处理时将多篇文章以分隔符拼接后一次扫描，按分隔符归属到各篇文章
+- 同时按分句给文中提到的球队/球员打分
+无需调用LLM，可对每篇入库文章计算情感分
+"""
+import hashlib
+import json
+import math
+import re
+from typing import Dict, Iterable, List, Optional
+
+from app.tools.text_processor import TEAM_DICTIONARY, PLAYER_DICTIONARY
+
+# 情感词及权重（正数为正面，负数为负面）
+SENTIMENT_WORDS = {
+    # 正面
+    '胜利': 2.0, '获胜': 2.0, '取胜': 2.0, '大胜': 2.5, '完胜': 2.5, '赢球': 2.0, '夺冠': 3.0, '冠军': 1.5,
+    '出色': 2.0, '优秀': 2.0, '精彩': 2.0, '成功': 1.5, '突破': 1.5, '创造': 1.0, '刷新': 1.5,
+    '领先': 1.0, '优势': 1.0, '绝杀': 2.0, '逆转': 2.0, '连胜': 2.0, '晋级': 2.0, '复出': 1.5,
+    '亮眼': 2.0, '神勇': 2.0, '高效': 1.5, '统治': 1.5, '不错': 1.5, '稳定': 1.0, '回暖': 1.0,
+    # 负面
+    '失败': -2.0, '失利': -2.0, '输球': -2.0, '惨败': -3.0, '不敌': -2.0, '连败': -2.5,
+    '伤病': -2.0, '受伤': -2.0, '伤停': -2.0, '争议': -1.5, '问题': -1.0, '落后': -1.0,
+    '失误': -1.5, '遗憾': -1.5, '困难': -1.0, '挑战': -0.5, '出局': -2.0, '淘汰': -2.0,
+    '低迷': -2.0, '停赛': -2.0, '禁赛': -2.5, '罚款': -1.5, '崩盘': -2.5, '下滑': -1.5, '糟糕': -2.0
+}
+
+# 否定词：翻转其后（同一分句内）第一个情感词的极性
+NEGATION_WORDS = ['不', '没', '没有', '未', '未能', '无', '无法', '并非', '不是', '难以']
+
+# 以否定字开头但不表示否定的词（"不断取得胜利"、"不仅赢球"），整体匹配后忽略
+NON_NEGATION_WORDS = [
+    '不断', '不仅', '不只', '不少', '不过', '不久', '不同', '不管', '不得不', '不禁',
+    '没想到', '未来', '无论', '无数', '无疑'
+]
+
+# 程度副词：放大或减弱其后第一个情感词的权重
+INTENSIFIER_WORDS = {
+    '非常': 1.5, '极其': 1.8, '十分': 1.5, '特别': 1.5, '太': 1.3, '很': 1.3,
+    '最': 1.5, '大幅': 1.5, '严重': 1.6, '略': 0.6, '稍': 0.6, '有点': 0.7
+}
+
+# 分句边界：否定/程度修饰不跨越分句，实体得分也按分句归属
+CLAUSE_BREAKS = '，。！？；,.!?;\n'
+# 需要上下文判断的分句边界：数字之间的"."是小数点（"3.5分"），不断句
+_BREAK_PATTERNS = {'.': r'(?<!\d)\.|\.(?!\d)'}
+
+# 否定后的权重衰减（"不算出色"通常弱于"糟糕"）
+NEGATION_FACTOR = -0.8
+# 否定词/程度副词与情感词之间允许的最大字符距离
+MODIFIER_WINDOW = 6
+# 分数归一化常数：score = total / sqrt(total^2 + alpha)，映射到(-1, 1)
+NORMALIZE_ALPHA = 15.0
+# 判定正面/负面的阈值
+LABEL_THRESHOLD = 0.05
+
+# 词典版本号：词典或参数变化后，批量重新处理时可据此识别过期的情感分
+LEXICON_VERSION = hashlib.sha1(json.dumps(
+    [SENTIMENT_WORDS, NEGATION_WORDS, NON_NEGATION_WORDS, INTENSIFIER_WORDS, NEGATION_FACTOR, MODIFIER_WINDOW,
+     NORMALIZE_ALPHA, CLAUSE_BREAKS, _BREAK_PATTERNS],
+    sort_keys=True, ensure_ascii=False
+).encode('utf-8')).hexdigest()[:12]
+
+# 文章之间的分隔符（不会出现在正文中）
+_DOC_SEPARATOR = '\x00'
+
+
+class SentimentLexicon:
+    """编译后的情感词典"""
+
+    def __init__(
+        self,
+        words: Optional[Dict[str, float]] = None,
+        negations: Optional[Iterable[str]] = None,
+        non_negations: Optional[Iterable[str]] = None,
+        intensifiers: Optional[Dict[str, float]] = None,
+        entities: Optional[Iterable[str]] = None
+    ):
+        """
+        初始化并编译词典
+
+        Args:
+            words: 情感词及权重
+            negations: 否定词列表
+            non_negations: 以否定字开头但不表示否定的词（匹配后忽略）
+            intensifiers: 程度副词及倍数
+            entities: 需要单独打分的实体（球队、球员）
+        """
+        words = SENTIMENT_WORDS if words is None else words
+        negations = NEGATION_WORDS if negations is None else negations
+        non_negations = NON_NEGATION_WORDS if non_negations is None else non_negations
+        intensifiers = INTENSIFIER_WORDS if intensifiers is None else intensifiers
+        entities = list(TEAM_DICTIONARY) + list(PLAYER_DICTIONARY) if entities is None else entities
+
+        # 词条 -> (类型, 数值)；同一词条出现在多个表中时，情感词优先
+        self.tokens: Dict[str, tuple] = {}
+        for entity in entities:
+            self.tokens[entity] = ('entity', 0.0)
+        for word, factor in intensifiers.items():
+            self.tokens[word] = ('intensifier', factor)
+        for word in negations:
+            self.tokens[word] = ('negation', 0.0)
+        for word in non_negations:
+            self.tokens[word] = ('plain', 0.0)
+        for word, weight in words.items():
+            self.tokens[word] = ('word', weight)
+        for char in CLAUSE_BREAKS + _DOC_SEPARATOR:
+            self.tokens[char] = ('break', 0.0)
+
+        # 长词优先，保证"未能"优先于"未"、"不敌"和"不断"优先于"不"
+        ordered = sorted(self.tokens, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(_BREAK_PATTERNS.get(token, re.escape(token)) for token in ordered))
+
+
+DEFAULT_LEXICON = SentimentLexicon()
+
+
+def _normalize(total: float) -> float:
+    """将原始得分归一化到(-1, 1)"""
+    if total == 0:
+        return 0.0
+    return total / math.sqrt(total * total + NORMALIZE_ALPHA)
+
+
+def _label(score: float) -> str:
+    """根据归一化得分给出情感标签"""
+    if score >= LABEL_THRESHOLD:
+        return "正面"
+    if score <= -LABEL_THRESHOLD:
+        return "负面"
+    return "中性"
+
+
+def _new_state() -> Dict:
+    return {"total": 0.0, "positive": 0, "negative": 0, "entities": {}}
+
+
+def _finish_state(state: Dict) -> Dict:
+    """将累加状态转换为对外的结果格式"""
+    score = _normalize(state["total"])
+    entities = {
+        name: {
+            "score": round(_normalize(value["total"]), 4),
+            "label": _label(_normalize(value["total"])),
+            "mentions": value["mentions"]
+        }
+        for name, value in state["entities"].items()
+    }
+    return {
+        "score": round(score, 4),
+        "label": _label(score),
+        "positive": state["positive"],
+        "negative": state["negative"],
+        "entities": entities
+    }
+
+
+def _article_text(article) -> str:
+    """获取文章的待分析文本（支持字典或纯文本）"""
+    if isinstance(article, str):
+        text = article
+    else:
+        text = f"{article.get('title') or ''}。{article.get('content') or ''}"
+    # 分隔符仅用于文章边界
+    return text.replace(_DOC_SEPARATOR, ' ')
+
+
+def score_articles(articles: List, lexicon: SentimentLexicon = DEFAULT_LEXICON) -> List[Dict]:
+    """
+    批量计算文章情感分（所有文章拼接后只做一次正则扫描）
+
+    Args:
+        articles: 文章列表（字典需包含title/content，也可以直接传入字符串）
+        lexicon: 编译后的词典
+
+    Returns:
+        与输入顺序一致的结果列表，每项格式：
+        {"score": -1~1, "label": 正面/负面/中性, "positive": 正面词数, "negative": 负面词数,
+         "entities": {实体: {"score", "label", "mentions"}}}
+    """
+    if not articles:
+        return []
+
+    texts = [_article_text(article) for article in articles]
+    joined = _DOC_SEPARATOR.join(texts)
+
+    states = [_new_state() for _ in texts]
+    tokens = lexicon.tokens
+
+    # 当前分句的修饰状态
+    doc_index = 0
+    negated = False
+    intensity = 1.0
+    modifier_end = -1
+    clause_total = 0.0
+    clause_entities = set()
+
+    def close_clause():
+        state = states[doc_index]
+        for entity in clause_entities:
+            entity_state = state["entities"].setdefault(entity, {"total": 0.0, "mentions": 0})
+            entity_state["total"] += clause_total
+            entity_state["mentions"] += 1
+
+    for match in lexicon.pattern.finditer(joined):
+        token = match.group()
+        kind, value = tokens[token]
+
+        if kind == 'plain':
+            continue
+        if kind == 'break':
+            close_clause()
+            negated, intensity, modifier_end = False, 1.0, -1
+            clause_total, clause_entities = 0.0, set()
+            if token == _DOC_SEPARATOR:
+                # 进入下一篇文章
+                doc_index += 1
+            continue
+
+        # 修饰词距离过远则失效
+        if modifier_end >= 0 and match.start() - modifier_end > MODIFIER_WINDOW:
+            negated, intensity, modifier_end = False, 1.0, -1
+
+        if kind == 'entity':
+            clause_entities.add(token)
+        elif kind == 'negation':
+            negated = not negated
+            modifier_end = match.end()
+        elif kind == 'intensifier':
+            intensity *= value
+            modifier_end = match.end()
+        else:
+            weight = value * intensity
+            if negated:
+                weight *= NEGATION_FACTOR
+            state = states[doc_index]
+            state["total"] += weight
+            if weight > 0:
+                state["positive"] += 1
+            elif weight < 0:
+                state["negative"] += 1
+            clause_total += weight
+            negated, intensity, modifier_end = False, 1.0, -1
+
+    close_clause()
+    return [_finish_state(state) for state in states]
+
+
+def score_text(text: str, lexicon: SentimentLexicon = DEFAULT_LEXICON) -> Dict:
+    """计算单段文本的情感分"""
+    return score_articles([text or ""], lexicon)[0]
+
+
+def aggregate_sentiment(article_scores: List[Dict], top_entities: int = 20) -> Dict:
+    """
+    汇总多篇文章的情感分，生成报告级情感分析结果
+
+    Args:
+        article_scores: score_articles返回的结果列表（可包含None，会被忽略）
+        top_entities: 保留提及次数最多的实体数量
+
+    Returns:
+        {"sentiment", "score", "positive_score", "negative_score", "distribution",
+         "article_count", "entities"}
+    """
+    scores = [item for item in article_scores if item]
+    distribution = {"正面": 0, "负面": 0, "中性": 0}
+    entity_totals: Dict[str, Dict] = {}
+
+    for item in scores:
+        distribution[item.get("label", "中性")] = distribution.get(item.get("label", "中性"), 0) + 1
+        for name, value in (item.get("entities") or {}).items():
+            total = entity_totals.setdefault(name, {"score_sum": 0.0, "mentions": 0, "articles": 0})
+            total["score_sum"] += value.get("score", 0.0)
+            total["mentions"] += value.get("mentions", 0)
+            total["articles"] += 1
+
+    mean_score = sum(item.get("score", 0.0) for item in scores) / len(scores) if scores else 0.0
+
+    ranked = sorted(entity_totals.items(), key=lambda kv: kv[1]["mentions"], reverse=True)[:top_entities]
+    entities = {
+        name: {
+            "score": round(total["score_sum"] / total["articles"], 4),
+            "label": _label(total["score_sum"] / total["articles"]),
+            "mentions": total["mentions"]
+        }
+        for name, total in ranked
+    }
+
+    return {
+        "sentiment": _label(mean_score),
+        "score": round(mean_score, 4),
+        "positive_score": sum(item.get("positive", 0) for item in scores),
+        "negative_score": sum(item.get("negative", 0) for item in scores),
+        "distribution": distribution,
+        "article_count": len(scores),
+        "entities": entities
+    }
@@ -1,71 +1,105 @@
-from langchain.tools import tool
 from typing import List, Dict
+import hashlib
 import re
 
-@tool
-def text_clean_tool(text: str) -> str:
-    """清洗文本，去除广告、重复内容等。输入：原始文本。返回：清洗后的文本。"""
+# 预编译正则，避免每次调用重复编译（批量处理时调用量很大）
+_WHITESPACE_RE = re.compile(r'\s+')
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_SPECIAL_CHAR_RE = re.compile(r'[^\w\s\u4e00-\u9fff，。！？：；、]')
+_SCORE_RE = re.compile(r'(\d+)[:：](\d+)')
+_DATE_RES = [
+    re.compile(r'\d{4}年\d{1,2}月\d{1,2}日'),
+    re.compile(r'\d{4}-\d{1,2}-\d{1,2}'),
+    re.compile(r'\d{1,2}月\d{1,2}日')
+]
+
+# 常见广告关键词
+AD_KEYWORDS = ['广告', '推广', '点击查看', '立即购买', '立即下载', '免费领取']
+
+# 常见球队名称（简化版，实际应该使用NER模型）
+TEAM_DICTIONARY = ['湖人', '勇士', '凯尔特人', '热火', '篮网', '皇马', '巴萨', '曼联', '利物浦', '切尔西']
+
+# 常见球员名称（简化版）
+PLAYER_DICTIONARY = ['詹姆斯', '库里', '杜兰特', '梅西', 'C罗', '内马尔']
+
+_AD_RE = re.compile('|'.join(re.escape(k) for k in AD_KEYWORDS))
+
+
+def _compile_dictionary(words: List[str]) -> re.Pattern:
+    """将词典编译为单个正则（长词优先），一次扫描即可找出所有命中词"""
+    ordered = sorted(set(words), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(w) for w in ordered))
+
+
+_TEAM_RE = _compile_dictionary(TEAM_DICTIONARY)
+_PLAYER_RE = _compile_dictionary(PLAYER_DICTIONARY)
+
+# 词典版本号：词典变化后，批量重新标注时可据此识别过期数据
+DICTIONARY_VERSION = hashlib.sha1(
+    '|'.join(sorted(TEAM_DICTIONARY) + ['#'] + sorted(PLAYER_DICTIONARY)).encode('utf-8')
+).hexdigest()[:12]
+
+
+def clean_text(text: str) -> str:
+    """清洗文本，去除广告、HTML标签残留和特殊字符"""
     if not text:
         return ""
-    
+
     # 去除多余空白
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     # 去除常见广告关键词
-    ad_keywords = ['广告', '推广', '点击查看', '立即购买', '立即下载', '免费领取']
-    for keyword in ad_keywords:
-        text = text.replace(keyword, '')
-    
+    text = _AD_RE.sub('', text)
     # 去除HTML标签残留
-    text = re.sub(r'<[^>]+>', '', text)
-    
+    text = _HTML_TAG_RE.sub('', text)
     # 去除特殊字符
-    text = re.sub(r'[^\w\s\u4e00-\u9fff，。！？：；、]', '', text)
-    
+    text = _SPECIAL_CHAR_RE.sub('', text)
+
     return text.strip()
 
-@tool
-def extract_entities_tool(text: str) -> Dict:
-    """提取新闻核心要素（赛事名称、时间、参赛方、结果、关键人物）。输入：新闻文本。返回：包含实体信息的字典。"""
+
+def extract_entities(text: str) -> Dict:
+    """提取新闻核心要素（球队、球员、日期、比分）"""
     if not text:
         return {"teams": [], "players": [], "dates": [], "scores": []}
-    
-    entities = {
-        'teams': [],
-        'players': [],
-        'dates': [],
-        'scores': []
+
+    dates = []
+    for pattern in _DATE_RES:
+        dates.extend(pattern.findall(text))
+
+    return {
+        # 去重并保持出现顺序
+        'teams': list(dict.fromkeys(_TEAM_RE.findall(text))),
+        'players': list(dict.fromkeys(_PLAYER_RE.findall(text))),
+        'dates': list(dict.fromkeys(dates)),
+        'scores': [f"{s[0]}:{s[1]}" for s in _SCORE_RE.findall(text)]
     }
-    
-    # 提取日期
-    date_patterns = [
-        r'\d{4}年\d{1,2}月\d{1,2}日',
-        r'\d{4}-\d{1,2}-\d{1,2}',
-        r'\d{1,2}月\d{1,2}日'
-    ]
-    for pattern in date_patterns:
-        dates = re.findall(pattern, text)
-        entities['dates'].extend(dates)
-    
-    # 提取比分（简化版）
-    score_pattern = r'(\d+)[:：](\d+)'
-    scores = re.findall(score_pattern, text)
-    entities['scores'] = [f"{s[0]}:{s[1]}" for s in scores]
-    
-    # 常见球队名称（简化版，实际应该使用NER模型）
-    common_teams = ['湖人', '勇士', '凯尔特人', '热火', '篮网', '皇马', '巴萨', '曼联', '利物浦', '切尔西']
-    for team in common_teams:
-        if team in text:
-            entities['teams'].append(team)
-    
-    # 常见球员名称（简化版）
-    common_players = ['詹姆斯', '库里', '杜兰特', '梅西', 'C罗', '内马尔']
-    for player in common_players:
-        if player in text:
-            entities['players'].append(player)
-    
-    # 去重
-    entities['teams'] = list(set(entities['teams']))
-    entities['players'] = list(set(entities['players']))
-    entities['dates'] = list(set(entities['dates']))
-    
-    return entities
+
+
+def _build_tools() -> Dict:
+    """构建LangChain工具（延迟导入LangChain，仅Agent使用时才加载）"""
+    from langchain.tools import tool
+
+    @tool
+    def text_clean_tool(text: str) -> str:
+        """清洗文本，去除广告、重复内容等。输入：原始文本。返回：清洗后的文本。"""
+        return clean_text(text)
+
+    @tool
+    def extract_entities_tool(text: str) -> Dict:
+        """提取新闻核心要素（赛事名称、时间、参赛方、结果、关键人物）。输入：新闻文本。返回：包含实体信息的字典。"""
+        return extract_entities(text)
+
+    return {"text_clean_tool": text_clean_tool, "extract_entities_tool": extract_entities_tool}
+
+
+_tools = None
+
+
+def __getattr__(name: str):
+    """text_clean_tool / extract_entities_tool 在首次访问时构建"""
+    global _tools
+    if name in ("text_clean_tool", "extract_entities_tool"):
+        if _tools is None:
+            _tools = _build_tools()
+        return _tools[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,11 @@
+import logging
 import requests
 from bs4 import BeautifulSoup
 from typing import Dict, List, Optional
 from langchain.tools import tool
+from app.tools.http_fetch import timed_request
+
+logger = logging.getLogger(__name__)
 
 @tool
 def requests_get_tool(url: str, headers: Optional[Dict] = None) -> str:
@@ -31,7 +35,8 @@ def requests_get_tool(url: str, headers: Optional[Dict] = None) -> str:
     for attempt in range(max_retries):
         try:
             # 增加超时时间到30秒
-            response = requests.get(
+            response = timed_request(
+                "GET",
                 url, 
                 headers=default_headers, 
                 timeout=30,
@@ -58,14 +63,14 @@ def requests_get_tool(url: str, headers: Optional[Dict] = None) -> str:
             
         except requests.exceptions.Timeout:
             if attempt < max_retries - 1:
-                print(f"⚠️ 请求超时，{retry_delay}秒后重试 ({attempt + 1}/{max_retries})...")
+                logger.warning("请求超时，%s秒后重试 (%d/%d)...", retry_delay, attempt + 1, max_retries)
                 time.sleep(retry_delay)
                 continue
             return f"错误：访问 {url} 超时（30秒）。可能是网络问题或网站响应慢。"
             
         except requests.exceptions.ConnectionError as e:
             if attempt < max_retries - 1:
-                print(f"⚠️ 连接错误，{retry_delay}秒后重试 ({attempt + 1}/{max_retries})...")
+                logger.warning("连接错误，%s秒后重试 (%d/%d)...", retry_delay, attempt + 1, max_retries)
                 time.sleep(retry_delay)
                 continue
             return f"错误：无法连接到 {url}。连接被中断或拒绝。详细错误：{str(e)}"
@@ -76,7 +81,7 @@ def requests_get_tool(url: str, headers: Optional[Dict] = None) -> str:
             
         except Exception as e:
             if attempt < max_retries - 1:
-                print(f"⚠️ 请求失败，{retry_delay}秒后重试 ({attempt + 1}/{max_retries})...")
+                logger.warning("请求失败，%s秒后重试 (%d/%d)...", retry_delay, attempt + 1, max_retries)
                 time.sleep(retry_delay)
                 continue
             return f"错误：访问 {url} 时发生未知错误：{str(e)}"
@@ -97,11 +102,11 @@ def beautifulsoup_parse_tool(html: str, selector: str) -> str:
 def check_url_accessible(url: str) -> bool:
     """检查URL是否可访问。输入：url字符串。返回：True如果可访问，False如果不可访问。"""
     try:
-        response = requests.head(url, timeout=5, allow_redirects=True)
+        response = timed_request("HEAD", url, timeout=5, allow_redirects=True)
         return response.status_code == 200
     except:
         try:
-            response = requests.get(url, timeout=5, allow_redirects=True)
+            response = timed_request("GET", url, timeout=5, allow_redirects=True)
             return response.status_code == 200
         except:
             return False
@@ -1,14 +1,15 @@
 """
 工具函数模块
+（LLM调用封装按需导入，避免导入app.utils子模块时连带加载dashscope和LangChain）
 """
-from .llm_config import (
-    call_llm_native,
-    acall_llm_native,
-    NativeDashScopeLLM
-)
+from app.utils.lazy_import import lazy_exports
 
 __all__ = [
     'call_llm_native',
     'acall_llm_native',
+    'stream_llm_native',
+    'astream_llm_native',
     'NativeDashScopeLLM'
 ]
+
+__getattr__ = lazy_exports(__name__, {name: 'app.utils.llm_config' for name in __all__})
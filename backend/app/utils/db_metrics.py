@@ -0,0 +1,281 @@
+"""
+数据库连接池与SQL执行监控
+- InstrumentedQueuePool：统计连接借出次数、等待次数/耗时、超时次数、溢出连接使用峰值
+- 慢查询日志：执行耗时超过阈值的SQL记录到有界队列（并输出警告）
+- 语句超时：在新建连接时设置会话级超时（MySQL max_execution_time / PostgreSQL statement_timeout）
+通过 /api/internal/db/pool 和 /api/internal/db/slow-queries 查看，同时导出到 /api/internal/metrics
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app.utils.metrics import Counter, Gauge, record_query, registry
+from app.utils.tracing import current_trace_id
+
+logger = logging.getLogger(__name__)
+
+# 借出连接耗时超过该值（秒）视为发生了等待（连接池内没有空闲连接）
+WAIT_THRESHOLD = 0.001
+# 慢查询记录保留条数
+SLOW_QUERY_LOG_SIZE = 100
+# 慢查询记录中SQL的最大长度
+SLOW_QUERY_SQL_LENGTH = 500
+
+
+class PoolMetrics:
+    """连接池统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.waits = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.timeouts = 0
+            self.peak_checked_out = 0
+            self.peak_overflow = 0
+
+    def record_checkout(self, elapsed: float, checked_out: int, overflow: int):
+        with self._lock:
+            self.checkouts += 1
+            if elapsed >= WAIT_THRESHOLD:
+                self.waits += 1
+                self.wait_time_total += elapsed
+                self.wait_time_max = max(self.wait_time_max, elapsed)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self, elapsed: float):
+        with self._lock:
+            self.timeouts += 1
+            self.waits += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 2),
+                "wait_time_avg_ms": round(self.wait_time_total * 1000 / self.waits, 2) if self.waits else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 2),
+                "timeouts": self.timeouts,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """带统计的QueuePool（借出连接时计时）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - started)
+            raise
+        self.metrics.record_checkout(
+            time.perf_counter() - started,
+            self.checkedout(),
+            max(self.overflow(), 0)
+        )
+        return connection
+
+    def recreate(self):
+        # 连接池重建（如dispose后）时保留统计对象
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class QueryMetrics:
+    """SQL执行统计与慢查询日志"""
+
+    def __init__(self, slow_threshold_ms: float):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._lock = threading.Lock()
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = 0
+            self.slow_count = 0
+            self.total_time = 0.0
+            self.slow_queries.clear()
+
+    def record(self, statement: str, elapsed_ms: float):
+        slow = self.slow_threshold_ms > 0 and elapsed_ms >= self.slow_threshold_ms
+        trace_id = current_trace_id() if slow else None
+        with self._lock:
+            self.queries += 1
+            self.total_time += elapsed_ms
+            if slow:
+                self.slow_count += 1
+                self.slow_queries.append({
+                    "sql": " ".join(statement.split())[:SLOW_QUERY_SQL_LENGTH],
+                    "ms": round(elapsed_ms, 2),
+                    "at": datetime.now().isoformat(timespec="seconds"),
+                    "trace_id": trace_id
+                })
+        if slow:
+            logger.warning("慢查询 %.0fms: %s", elapsed_ms, " ".join(statement.split())[:200])
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "slow_queries": self.slow_count,
+                "slow_threshold_ms": self.slow_threshold_ms,
+                "avg_ms": round(self.total_time / self.queries, 3) if self.queries else 0.0
+            }
+
+    def recent_slow_queries(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            return list(self.slow_queries)[-limit:][::-1]
+
+
+# 已注册监控的引擎及其SQL统计：名称 -> 引擎 / QueryMetrics
+_engines: Dict[str, Engine] = {}
+_query_metrics: Dict[str, QueryMetrics] = {}
+
+
+def _set_statement_timeout(engine: Engine, timeout_ms: int):
+    """新建连接时设置会话级语句超时"""
+    dialect = engine.dialect.name
+    if dialect == "mysql":
+        sql = f"SET SESSION max_execution_time = {int(timeout_ms)}"  # 仅对SELECT生效
+    elif dialect == "postgresql":
+        sql = f"SET statement_timeout = {int(timeout_ms)}"
+    else:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+
+
+def instrument_engine(engine: Engine, name: str, slow_query_ms: float = 0, statement_timeout_ms: int = 0) -> Engine:
+    """
+    为引擎注册监控（慢查询日志、语句超时）
+
+    Args:
+        engine: 数据库引擎
+        name: 引擎名称（如primary、replica-0）
+        slow_query_ms: 慢查询阈值（毫秒，0表示不记录慢查询，仅统计）
+        statement_timeout_ms: 语句超时（毫秒，0表示不限制）
+
+    Returns:
+        传入的引擎
+    """
+    metrics = QueryMetrics(slow_query_ms)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        metrics.record(statement, (time.perf_counter() - started) * 1000)
+        record_query()
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        # 执行失败时after_cursor_execute不会触发，弹出计时避免栈泄漏
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+    if statement_timeout_ms:
+        _set_statement_timeout(engine, statement_timeout_ms)
+
+    _engines[name] = engine
+    _query_metrics[name] = metrics
+    return engine
+
+
+def pool_status(name: str) -> Dict:
+    """单个引擎的连接池状态与统计"""
+    pool = _engines[name].pool
+    data = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        data.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout()
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        data.update(metrics.snapshot())
+    data.update(_query_metrics[name].snapshot())
+    return data
+
+
+def all_pool_status() -> Dict[str, Dict]:
+    """全部已注册引擎的连接池状态"""
+    return {name: pool_status(name) for name in _engines}
+
+
+def recent_slow_queries(limit: int = 50) -> Dict[str, List[Dict]]:
+    """全部已注册引擎最近的慢查询（新的在前）"""
+    return {name: metrics.recent_slow_queries(limit) for name, metrics in _query_metrics.items()}
+
+
+def reset_metrics(name: Optional[str] = None):
+    """重置统计（不影响连接池本身）"""
+    for engine_name, engine in _engines.items():
+        if name is not None and engine_name != name:
+            continue
+        metrics = getattr(engine.pool, "metrics", None)
+        if metrics is not None:
+            metrics.reset()
+        _query_metrics[engine_name].reset()
+
+
+# 抓取指标时导出的连接池与SQL统计
+_DB_QUERIES = Counter("db_queries", "SQL执行条数", ("engine",))
+_DB_SLOW_QUERIES = Counter("db_slow_queries", "慢查询条数", ("engine",))
+_DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "连接池已借出连接数", ("engine",))
+_DB_POOL_WAITS = Counter("db_pool_waits", "借出连接时发生等待的次数", ("engine",))
+_DB_POOL_TIMEOUTS = Counter("db_pool_timeouts", "借出连接超时次数", ("engine",))
+
+
+def _collect_db_metrics():
+    groups = {metric: [] for metric in (_DB_QUERIES, _DB_SLOW_QUERIES, _DB_POOL_CHECKED_OUT, _DB_POOL_WAITS, _DB_POOL_TIMEOUTS)}
+    for name, status in all_pool_status().items():
+        labels = {"engine": name}
+        groups[_DB_QUERIES].append(("_total", labels, status.get("queries", 0)))
+        groups[_DB_SLOW_QUERIES].append(("_total", labels, status.get("slow_queries", 0)))
+        if "checked_out" in status:
+            groups[_DB_POOL_CHECKED_OUT].append(("", labels, status["checked_out"]))
+        if "waits" in status:
+            groups[_DB_POOL_WAITS].append(("_total", labels, status["waits"]))
+            groups[_DB_POOL_TIMEOUTS].append(("_total", labels, status["timeouts"]))
+    return list(groups.items())
+
+
+registry.add_collector(_collect_db_metrics)
@@ -0,0 +1,115 @@
+"""
+文本向量化（Embedding）工具
+提供可插拔的向量化函数：
+- hash：本地确定性向量化（字符n-gram特征哈希），无需网络，用于测试和离线环境
+- dashscope：DashScope文本向量模型（text-embedding-v2等）
+通过Settings.EMBEDDING_PROVIDER选择
+"""
+import hashlib
+import importlib.util
+import re
+from typing import Callable, Dict, List
+import numpy as np
+from app.config import settings
+
+# dashscope导入较慢，使用时才导入
+DASHSCOPE_EMBEDDING_AVAILABLE = importlib.util.find_spec("dashscope") is not None
+
+_NORMALIZE_RE = re.compile(r'\s+')
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2归一化（归一化后内积即余弦相似度）"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashEmbedding:
+    """
+    本地确定性向量化：字符1-gram/2-gram特征哈希到固定维度
+    相同输入在任何进程中都得到相同向量，适合单元测试和离线部署
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+        # 缓存n-gram的(维度, 符号)，高频字符无需重复哈希
+        self._feature_cache: Dict[str, tuple] = {}
+
+    def _feature(self, gram: str) -> tuple:
+        cached = self._feature_cache.get(gram)
+        if cached is None:
+            digest = int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+            cached = (digest % self.dim, 1.0 if digest >> 63 else -1.0)
+            if len(self._feature_cache) < 200000:
+                self._feature_cache[gram] = cached
+        return cached
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = _NORMALIZE_RE.sub('', (text or '').lower())
+            for i, char in enumerate(text):
+                index, sign = self._feature(char)
+                vectors[row, index] += 0.5 * sign
+                if i + 1 < len(text):
+                    index, sign = self._feature(text[i:i + 2])
+                    vectors[row, index] += sign
+        return _normalize_rows(vectors)
+
+
+class DashScopeEmbedding:
+    """DashScope文本向量模型"""
+
+    # DashScope单次请求最多支持的文本条数
+    BATCH_SIZE = 25
+
+    def __init__(self, model: str = None):
+        if not DASHSCOPE_EMBEDDING_AVAILABLE:
+            raise ImportError("dashscope未安装，请运行: pip install dashscope")
+        self.model = model or settings.EMBEDDING_MODEL
+        self.name = f"dashscope-{self.model}"
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        from dashscope import TextEmbedding
+        vectors = []
+        for start in range(0, len(texts), self.BATCH_SIZE):
+            batch = [text or ' ' for text in texts[start:start + self.BATCH_SIZE]]
+            response = TextEmbedding.call(model=self.model, input=batch, api_key=settings.LLM_API_KEY)
+            if response.status_code != 200:
+                raise Exception(
+                    f"DashScope向量化调用失败: HTTP {response.status_code}, "
+                    f"错误码: {response.code}, 错误信息: {response.message}"
+                )
+            embeddings = sorted(response.output['embeddings'], key=lambda item: item['text_index'])
+            vectors.extend(item['embedding'] for item in embeddings)
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+
+
+_embedding_function = None
+
+
+def get_embedding_function() -> Callable[[List[str]], np.ndarray]:
+    """
+    获取当前配置的向量化函数（进程内单例）
+
+    Returns:
+        可调用对象：输入文本列表，返回L2归一化的float32矩阵；具有name属性标识模型
+    """
+    global _embedding_function
+    if _embedding_function is None:
+        provider = settings.EMBEDDING_PROVIDER.lower()
+        if provider == "dashscope":
+            _embedding_function = DashScopeEmbedding()
+        elif provider == "hash":
+            _embedding_function = HashEmbedding(settings.EMBEDDING_DIM)
+        else:
+            raise ValueError(f"不支持的向量化提供方: {settings.EMBEDDING_PROVIDER}")
+    return _embedding_function
+
+
+def set_embedding_function(function: Callable[[List[str]], np.ndarray]):
+    """替换向量化函数（测试或自定义模型时使用）"""
+    global _embedding_function
+    _embedding_function = function
@@ -0,0 +1,58 @@
+"""
+延迟导入工具
+LangChain Agent、dashscope、BeautifulSoup等依赖导入耗时较长，应用启动时不应加载，
+在首次使用时导入，或由启动后的后台预热任务提前导入
+"""
+import importlib
+import sys
+import time
+from typing import Callable, Dict, Iterable, List
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Callable[[str], object]:
+    """
+    生成包级别的__getattr__（PEP 562），首次访问属性时才导入对应子模块
+
+    Args:
+        package: 包名（通常传入__name__）
+        exports: 属性名 -> 定义该属性的模块名
+
+    Returns:
+        模块级__getattr__函数
+    """
+    def __getattr__(name: str):
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name), name)
+        # 缓存到包命名空间，之后的访问不再经过__getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
+
+
+def warm_up(modules: Iterable[str]) -> List[Dict]:
+    """
+    预先导入耗时模块（在后台线程中执行，避免首个请求承担导入开销）
+
+    Args:
+        modules: 模块名列表
+
+    Returns:
+        每个模块的导入结果 [{"module", "ms", "error"}]
+    """
+    results = []
+    for module_name in modules:
+        started = time.perf_counter()
+        error = None
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            error = str(e)
+        results.append({
+            "module": module_name,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": error
+        })
+    return results
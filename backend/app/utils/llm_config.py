@@ -2,20 +2,42 @@
 LLM配置工具函数
 确保base_url配置正确，避免路径重复问题
 提供原生SDK调用封装，支持enable_search参数
+模型提供方可插拔（Settings.LLM_PROVIDER）：
+- dashscope_http：DashScope的OpenAI兼容接口（LLM_API_URL），httpx连接池，异步调用不占用线程
+- dashscope：DashScope原生SDK（同步，异步调用在线程池中执行）
+- fake：本地确定性假模型，可配置延迟、流式输出、工具调用和错误（额度用完、限流等），用于压测和CI
+每次调用按任务类型（task）选择模型，失败时换用备选模型（见model_router）
 """
-from typing import List, Dict, Optional, Union
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import random
+import re
+import threading
+import time
+import weakref
+from functools import partial
+from typing import AsyncIterator, List, Dict, Iterator, Optional, Union
 from app.config import settings
+from app.utils.llm_resilience import (
+    LLMCircuitOpenError, LLMError, acall_with_retry, as_llm_error, call_with_retry, classify_result, get_breaker
+)
+from app.utils.metrics import llm_fallbacks, llm_requests, record_llm_call, record_llm_task
+from app.utils.model_router import TASK_REPORT, estimate_cost, model_chain, should_fall_back
+from app.utils.tracing import KIND_CLIENT, span
 
-try:
-    from dashscope import Generation
-    DASHSCOPE_AVAILABLE = True
-except ImportError:
-    DASHSCOPE_AVAILABLE = False
-    print("⚠️ dashscope未安装，请运行: pip install dashscope")
+logger = logging.getLogger(__name__)
+
+# dashscope导入较慢，这里只检查是否安装，首次调用时才导入
+DASHSCOPE_AVAILABLE = importlib.util.find_spec("dashscope") is not None
+if not DASHSCOPE_AVAILABLE:
+    logger.warning("dashscope未安装，请运行: pip install dashscope")
 
 # LangChain消息类型和Runnable基类
 try:
-    from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
+    from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage, ToolMessage
     from langchain_core.runnables import Runnable
     LANGCHAIN_AVAILABLE = True
 except ImportError:
@@ -24,6 +46,7 @@ except ImportError:
     SystemMessage = None
     HumanMessage = None
     AIMessage = None
+    ToolMessage = None
     Runnable = object  # 如果LangChain不可用，使用object作为基类
 
 
@@ -51,9 +74,19 @@ def convert_langchain_messages_to_dashscope(messages: List[BaseMessage]) -> List
                 'content': msg.content
             })
         elif isinstance(msg, AIMessage):
-            dashscope_messages.append({
+            message = {
                 'role': 'assistant',
                 'content': msg.content
+            }
+            # Agent的上一轮工具调用（OpenAI格式，与DashScope一致）
+            if msg.additional_kwargs.get('tool_calls'):
+                message['tool_calls'] = msg.additional_kwargs['tool_calls']
+            dashscope_messages.append(message)
+        elif isinstance(msg, ToolMessage):
+            dashscope_messages.append({
+                'role': 'tool',
+                'content': msg.content,
+                'tool_call_id': msg.tool_call_id
             })
         else:
             # 其他类型消息，尝试获取content
@@ -82,10 +115,14 @@ def convert_dict_messages_to_dashscope(messages: List[Dict]) -> List[Dict[str, s
         if isinstance(msg, dict):
             role = msg.get('role', 'user')
             content = msg.get('content', '')
-            dashscope_messages.append({
+            message = {
                 'role': role,
                 'content': content
-            })
+            }
+            for key in ('tool_calls', 'tool_call_id'):
+                if msg.get(key):
+                    message[key] = msg[key]
+            dashscope_messages.append(message)
         else:
             # 如果不是字典，尝试转换为字符串
             dashscope_messages.append({
@@ -98,93 +135,947 @@ def convert_dict_messages_to_dashscope(messages: List[Dict]) -> List[Dict[str, s
 
 class LLMResponse:
     """封装LLM响应，保持与LangChain兼容的接口"""
-    def __init__(self, content: str):
+    def __init__(self, content: str, tool_calls: Optional[List[Dict]] = None, model: str = "",
+                 input_tokens: int = 0, output_tokens: int = 0):
         self.content = content
+        self.tool_calls = tool_calls or []  # 模型请求的工具调用（OpenAI格式）
+        self.model = model  # 实际返回结果的模型（按任务路由或换用备选模型后可能与LLM_MODEL不同）
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+class LLMResult:
+    """
+    提供方的一次返回（非流式为完整结果，流式为一个分片）
+
+    Args:
+        content: 文本（流式时为增量内容）
+        status_code: HTTP状态码，非200表示调用失败（code/message为错误码和错误信息）
+        input_tokens / output_tokens: token用量（流式时为截至当前分片的累计值）
+        tool_calls: 工具调用列表（OpenAI格式：id/type/function.name/function.arguments）
+    """
+    def __init__(
+        self,
+        content: str = "",
+        status_code: int = 200,
+        code: str = "",
+        message: str = "",
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        tool_calls: Optional[List[Dict]] = None
+    ):
+        self.content = content
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.tool_calls = tool_calls or []
+
+
+class DashScopeProvider:
+    """DashScope原生SDK（同步调用，异步场景由acall_llm_native放到线程中执行）"""
+
+    name = "dashscope"
+    label = "DashScope"
+
+    def __init__(self, model: str = None):
+        if not DASHSCOPE_AVAILABLE:
+            raise ImportError("dashscope未安装，请运行: pip install dashscope")
+        self.model = model or settings.LLM_MODEL
+
+    def resolve_model(self, model: str) -> str:
+        return model
+
+    def _call(self, messages: List[Dict], temperature: float, enable_search: bool, tools: Optional[List[Dict]],
+              model: Optional[str], **kwargs):
+        from dashscope import Generation
+        if tools:
+            kwargs["tools"] = tools
+        return Generation.call(
+            api_key=settings.LLM_API_KEY,
+            model=model or self.model,
+            messages=messages,
+            temperature=temperature,
+            enable_search=enable_search,
+            result_format="message",
+            **kwargs
+        )
+
+    @staticmethod
+    def _result(response) -> LLMResult:
+        if response.status_code != 200:
+            return LLMResult(status_code=response.status_code, code=response.code, message=response.message)
+        usage = getattr(response, "usage", None) or {}
+        message = response.output.choices[0].message
+        tool_calls = message.get("tool_calls") if isinstance(message, dict) else getattr(message, "tool_calls", None)
+        return LLMResult(
+            content=message.content or "",
+            input_tokens=_usage_value(usage, "input_tokens"),
+            output_tokens=_usage_value(usage, "output_tokens"),
+            tool_calls=tool_calls
+        )
+
+    def generate(self, messages: List[Dict], temperature: float, enable_search: bool,
+                 tools: Optional[List[Dict]] = None, model: Optional[str] = None) -> LLMResult:
+        return self._result(self._call(messages, temperature, enable_search, tools, model))
+
+    def stream(self, messages: List[Dict], temperature: float, enable_search: bool,
+               model: Optional[str] = None) -> Iterator[LLMResult]:
+        # incremental_output：每个分片只包含新增内容
+        for response in self._call(messages, temperature, enable_search, None, model, stream=True, incremental_output=True):
+            result = self._result(response)
+            yield result
+            if result.status_code != 200:
+                return
+
+
+class DashScopeHTTPProvider:
+    """
+    DashScope的OpenAI兼容接口（Settings.LLM_API_URL + /chat/completions）
+    同步和异步调用分别使用httpx.Client / httpx.AsyncClient连接池，异步调用等待模型输出时只占用连接、不占用线程；
+    AsyncClient与事件循环绑定，每个事件循环各用一个（进程内worker、基准测试等可能运行在不同的事件循环中）
+    """
+
+    name = "dashscope_http"
+    label = "DashScope"
+
+    def __init__(self, model: str = None):
+        import httpx
+
+        self.model = model or settings.LLM_MODEL
+        self.url = settings.LLM_API_URL.rstrip("/") + "/chat/completions"
+        self._limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE
+        )
+        # 读超时是两次收到数据之间的最长等待：非流式调用等于整个生成耗时，流式调用为分片间隔
+        self._timeout = httpx.Timeout(settings.LLM_READ_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+        self._headers = {"Authorization": f"Bearer {settings.LLM_API_KEY}"}
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def resolve_model(self, model: str) -> str:
+        return model
+
+    def _sync_client(self):
+        import httpx
+
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(limits=self._limits, timeout=self._timeout, headers=self._headers)
+            return self._client
+
+    def _async_client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self._limits, timeout=self._timeout, headers=self._headers)
+            self._async_clients[loop] = client
+        return client
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        """关闭当前事件循环的连接池（应用关闭时调用）"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _payload(self, messages: List[Dict], temperature: float, enable_search: bool,
+                 tools: Optional[List[Dict]], model: Optional[str], stream: bool = False) -> Dict:
+        payload = {"model": model or self.model, "messages": messages, "temperature": temperature}
+        # 联网搜索是DashScope的扩展参数，兼容接口同样支持
+        if enable_search:
+            payload["enable_search"] = True
+        if tools:
+            payload["tools"] = tools
+        if stream:
+            # 最后一个分片返回token用量
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    @staticmethod
+    def _error(status_code: int, body: bytes) -> LLMResult:
+        """错误响应 {"error": {"code", "message"}}（错误码与原生SDK一致，如AllocationQuota.FreeTierOnly）"""
+        try:
+            error = json.loads(body).get("error") or {}
+        except (ValueError, AttributeError):
+            error = {}
+        return LLMResult(
+            status_code=status_code,
+            code=error.get("code") or error.get("type") or "",
+            message=error.get("message") or body.decode("utf-8", errors="replace")[:200]
+        )
+
+    def _response_result(self, response) -> LLMResult:
+        if response.status_code != 200:
+            return self._error(response.status_code, response.content)
+        data = response.json()
+        usage = data.get("usage") or {}
+        message = (data.get("choices") or [{}])[0].get("message") or {}
+        return LLMResult(
+            content=message.get("content") or "",
+            input_tokens=_usage_value(usage, "prompt_tokens"),
+            output_tokens=_usage_value(usage, "completion_tokens"),
+            tool_calls=message.get("tool_calls")
+        )
+
+    @staticmethod
+    def _chunk_result(line: str) -> Optional[LLMResult]:
+        """解析一行SSE（data: {...}），返回增量结果；空行、注释和结束标记[DONE]返回None"""
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            return None
+        chunk = json.loads(data)
+        if chunk.get("error"):
+            error = chunk["error"]
+            return LLMResult(status_code=500, code=error.get("code") or "", message=error.get("message") or "")
+        usage = chunk.get("usage") or {}
+        choices = chunk.get("choices") or []
+        delta = (choices[0].get("delta") or {}) if choices else {}
+        return LLMResult(
+            content=delta.get("content") or "",
+            input_tokens=_usage_value(usage, "prompt_tokens"),
+            output_tokens=_usage_value(usage, "completion_tokens")
+        )
+
+    @staticmethod
+    def _transport_error(e: Exception) -> OSError:
+        """httpx的超时和网络错误转换为内置的TimeoutError / ConnectionError（重试策略按类型判断）"""
+        import httpx
+
+        if isinstance(e, httpx.TimeoutException):
+            return TimeoutError(f"请求超时: {type(e).__name__}")
+        return ConnectionError(f"{type(e).__name__}: {e}")
+
+    def generate(self, messages: List[Dict], temperature: float, enable_search: bool,
+                 tools: Optional[List[Dict]] = None, model: Optional[str] = None) -> LLMResult:
+        import httpx
+
+        try:
+            response = self._sync_client().post(
+                self.url, json=self._payload(messages, temperature, enable_search, tools, model)
+            )
+        except httpx.TransportError as e:
+            raise self._transport_error(e) from e
+        return self._response_result(response)
+
+    async def agenerate(self, messages: List[Dict], temperature: float, enable_search: bool,
+                        tools: Optional[List[Dict]] = None, model: Optional[str] = None) -> LLMResult:
+        import httpx
+
+        try:
+            response = await self._async_client().post(
+                self.url, json=self._payload(messages, temperature, enable_search, tools, model)
+            )
+        except httpx.TransportError as e:
+            raise self._transport_error(e) from e
+        return self._response_result(response)
+
+    def stream(self, messages: List[Dict], temperature: float, enable_search: bool,
+               model: Optional[str] = None) -> Iterator[LLMResult]:
+        import httpx
+
+        payload = self._payload(messages, temperature, enable_search, None, model, stream=True)
+        try:
+            with self._sync_client().stream("POST", self.url, json=payload) as response:
+                if response.status_code != 200:
+                    yield self._error(response.status_code, response.read())
+                    return
+                for line in response.iter_lines():
+                    result = self._chunk_result(line)
+                    if result is not None:
+                        yield result
+                        if result.status_code != 200:
+                            return
+        except httpx.TransportError as e:
+            raise self._transport_error(e) from e
+
+    async def astream(self, messages: List[Dict], temperature: float, enable_search: bool,
+                      model: Optional[str] = None) -> AsyncIterator[LLMResult]:
+        import httpx
+
+        payload = self._payload(messages, temperature, enable_search, None, model, stream=True)
+        try:
+            async with self._async_client().stream("POST", self.url, json=payload) as response:
+                if response.status_code != 200:
+                    yield self._error(response.status_code, await response.aread())
+                    return
+                async for line in response.aiter_lines():
+                    result = self._chunk_result(line)
+                    if result is not None:
+                        yield result
+                        if result.status_code != 200:
+                            return
+        except httpx.TransportError as e:
+            raise self._transport_error(e) from e
+
+
+# 模拟的DashScope错误（状态码、错误码、错误信息与线上一致，describe_llm_error可以识别）
+FAKE_ERRORS = {
+    "quota": (403, "AllocationQuota.FreeTierOnly", "The free tier of the model has been exhausted."),
+    "throttle": (429, "Throttling.RateQuota", "Requests rate limit exceeded, please try again later."),
+    "server": (500, "InternalError", "An internal error has occured, please try again later or contact service support."),
+}
+
+_TITLE_RE = re.compile(r'标题：(.+)')
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估计token数（中文约每1.5个字符一个token）"""
+    return max(1, int(len(text) / 1.5))
+
+
+class FakeLLMProvider:
+    """
+    本地确定性假模型：输出只取决于输入消息，不访问网络
+    - 输入包含新闻列表（"标题："行）时生成带"今日新闻综述"的Markdown分析报告，其他输入生成简短回复
+    - tool_call模式下，绑定了工具且对话中还没有工具结果时先返回一次工具调用（走通Agent的工具循环）
+    - 可配置固定延迟和抖动、流式分片大小，以及按比例出现的错误（额度用完、限流、服务端错误、超时）
+    参数为None时使用Settings中LLM_FAKE_*的配置
+    """
+
+    name = "fake"
+    label = "Fake LLM"
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        jitter_ms: Optional[float] = None,
+        mode: Optional[str] = None,
+        error: Optional[str] = None,
+        error_rate: Optional[float] = None,
+        stream_chunk: Optional[int] = None,
+        seed: Optional[int] = None
+    ):
+        self.model = f"fake-{settings.LLM_MODEL}"
+        self.latency = (settings.LLM_FAKE_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+        self.jitter = (settings.LLM_FAKE_JITTER_MS if jitter_ms is None else jitter_ms) / 1000
+        self.mode = (settings.LLM_FAKE_MODE if mode is None else mode).lower()
+        self.error = (settings.LLM_FAKE_ERROR if error is None else error).lower()
+        self.error_rate = settings.LLM_FAKE_ERROR_RATE if error_rate is None else error_rate
+        self.stream_chunk = max(1, settings.LLM_FAKE_STREAM_CHUNK if stream_chunk is None else stream_chunk)
+        if self.mode not in ("text", "tool_call"):
+            raise ValueError(f"不支持的假模型模式: {self.mode}")
+        if self.error and self.error not in FAKE_ERRORS and self.error != "timeout":
+            raise ValueError(f"不支持的模拟错误: {self.error}")
+        self.calls = 0
+        self._random = random.Random(settings.LLM_FAKE_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+
+    def resolve_model(self, model: str) -> str:
+        """路由选出的模型加fake-前缀（指标中与真实模型区分）"""
+        return f"fake-{model}"
+
+    def _next_call(self) -> bool:
+        """计数并决定本次调用是否出错（按种子生成的确定序列）"""
+        with self._lock:
+            self.calls += 1
+            return bool(self.error) and self._random.random() < self.error_rate
+
+    def _delay(self, text: str) -> float:
+        if not self.jitter:
+            return self.latency
+        fraction = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return self.latency + self.jitter * fraction
+
+    def _failure(self) -> LLMResult:
+        if self.error == "timeout":
+            raise TimeoutError("Fake LLM request timeout")
+        status_code, code, message = FAKE_ERRORS[self.error]
+        return LLMResult(status_code=status_code, code=code, message=message)
+
+    def _tool_calls(self, messages: List[Dict], tools: Optional[List[Dict]]) -> List[Dict]:
+        if self.mode != "tool_call" or not tools or any(message.get("role") == "tool" for message in messages):
+            return []
+        function = tools[0].get("function", {})
+        properties = list((function.get("parameters") or {}).get("properties") or {})
+        argument = properties[0] if properties else "__arg1"
+        question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        call_id = "call_" + hashlib.md5(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+        return [{
+            "id": call_id,
+            "type": "function",
+            "function": {"name": function.get("name", ""), "arguments": json.dumps({argument: question[:500]}, ensure_ascii=False)}
+        }]
+
+    @staticmethod
+    def report(titles: List[str]) -> str:
+        """新闻分析报告（含"今日新闻综述"段落，摘要提取可以命中）"""
+        titles = [title.strip() for title in titles]
+        lines = [
+            "# 今日体育新闻分析",
+            "",
+            "今日新闻综述：" + "；".join(titles[:5]) +
+            f"。今日共{len(titles)}条新闻，涉及多项赛事，整体来看各队状态分化明显，关键球员的表现直接影响比赛走势，"
+            "后续赛程中的伤病情况和轮换安排值得持续关注。",
+            ""
+        ]
+        for index, title in enumerate(titles, 1):
+            lines.extend([
+                f"## {index}. {title}",
+                f"**核心内容**：{title}。",
+                "**专业点评**：比赛节奏和关键回合的处理决定了最终结果，球队需要在防守端保持专注，轮换阵容的稳定性仍有提升空间。",
+                ""
+            ])
+        return "\n".join(lines)
+
+    def _content(self, messages: List[Dict], text: str) -> str:
+        titles = _TITLE_RE.findall(text)
+        if titles:
+            return self.report(titles)
+        question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        digest = hashlib.md5(text.encode("utf-8")).hexdigest()[:8]
+        return f"关于“{question[:50]}”：根据今日资料，相关比赛和球队动态如下。（{digest}）"
+
+    def _begin(self, messages: List[Dict]):
+        """开始一次调用：(是否出错, 输入文本, 延迟秒数)"""
+        failed = self._next_call()
+        text = "\n".join(str(message.get("content") or "") for message in messages)
+        return failed, text, self._delay(text)
+
+    def _complete(self, failed: bool, messages: List[Dict], text: str, tools: Optional[List[Dict]]) -> LLMResult:
+        if failed:
+            return self._failure()
+        tool_calls = self._tool_calls(messages, tools)
+        content = "" if tool_calls else self._content(messages, text)
+        return LLMResult(
+            content=content,
+            input_tokens=_estimate_tokens(text),
+            output_tokens=_estimate_tokens(content or json.dumps(tool_calls, ensure_ascii=False)),
+            tool_calls=tool_calls
+        )
+
+    def generate(self, messages: List[Dict], temperature: float, enable_search: bool,
+                 tools: Optional[List[Dict]] = None, model: Optional[str] = None) -> LLMResult:
+        failed, text, delay = self._begin(messages)
+        if delay:
+            time.sleep(delay)
+        return self._complete(failed, messages, text, tools)
+
+    async def agenerate(self, messages: List[Dict], temperature: float, enable_search: bool,
+                        tools: Optional[List[Dict]] = None, model: Optional[str] = None) -> LLMResult:
+        failed, text, delay = self._begin(messages)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._complete(failed, messages, text, tools)
+
+    def _stream_steps(self, messages: List[Dict]) -> Iterator:
+        """流式输出的每一步：(等待秒数, 分片结果)，分片结果为None表示本次调用出错"""
+        failed, text, delay = self._begin(messages)
+        content = self._content(messages, text)
+        chunks = [content[i:i + self.stream_chunk] for i in range(0, len(content), self.stream_chunk)]
+        # 延迟平均分摊到各分片（首个分片前等待一份）
+        interval = delay / max(1, len(chunks))
+        if failed:
+            yield interval, None
+            return
+        input_tokens = _estimate_tokens(text)
+        emitted = ""
+        for chunk in chunks:
+            emitted += chunk
+            yield interval, LLMResult(content=chunk, input_tokens=input_tokens, output_tokens=_estimate_tokens(emitted))
+
+    def stream(self, messages: List[Dict], temperature: float, enable_search: bool,
+               model: Optional[str] = None) -> Iterator[LLMResult]:
+        for interval, result in self._stream_steps(messages):
+            if interval:
+                time.sleep(interval)
+            yield result if result is not None else self._failure()
+
+    async def astream(self, messages: List[Dict], temperature: float, enable_search: bool,
+                      model: Optional[str] = None) -> AsyncIterator[LLMResult]:
+        for interval, result in self._stream_steps(messages):
+            if interval:
+                await asyncio.sleep(interval)
+            yield result if result is not None else self._failure()
+
+
+_llm_provider = None
+
+
+def get_llm_provider():
+    """
+    获取当前配置的模型提供方（进程内单例）
+
+    Returns:
+        具有name/label/model属性和generate/stream/resolve_model方法的提供方对象（可选的agenerate/astream为原生异步实现）；
+        调用时通过model参数指定模型（按任务路由），为空时使用提供方的默认模型
+    """
+    global _llm_provider
+    if _llm_provider is None:
+        provider = settings.LLM_PROVIDER.lower()
+        if provider == "dashscope_http":
+            _llm_provider = DashScopeHTTPProvider()
+        elif provider == "dashscope":
+            _llm_provider = DashScopeProvider()
+        elif provider == "fake":
+            _llm_provider = FakeLLMProvider()
+        else:
+            raise ValueError(f"不支持的LLM提供方: {settings.LLM_PROVIDER}")
+    return _llm_provider
+
+
+def set_llm_provider(provider):
+    """替换模型提供方（测试、压测或自定义模型时使用；传入None时下次调用按配置重新创建）"""
+    global _llm_provider
+    _llm_provider = provider
+
+
+async def aclose_llm_provider():
+    """关闭当前提供方在本事件循环中的连接池（应用关闭时调用）"""
+    if _llm_provider is not None and hasattr(_llm_provider, "aclose"):
+        await _llm_provider.aclose()
+
+
+def _to_dashscope_messages(messages: Union[List[BaseMessage], List[Dict]]) -> List[Dict]:
+    """LangChain消息或字典消息统一转换为DashScope格式"""
+    if messages and isinstance(messages[0], dict):
+        return convert_dict_messages_to_dashscope(messages)
+    if LANGCHAIN_AVAILABLE and messages and isinstance(messages[0], BaseMessage):
+        return convert_langchain_messages_to_dashscope(messages)
+    # 尝试自动转换
+    try:
+        return convert_langchain_messages_to_dashscope(messages)
+    except:
+        return convert_dict_messages_to_dashscope(messages)
+
+
+def _raise_for_result(provider, result: LLMResult):
+    error = classify_result(provider.label, result.status_code, result.code, result.message)
+    logger.warning("%s", error)
+    raise error
+
+
+class _Route:
+    """一次按任务路由的调用：任务的模型链和当前使用的模型，结束时记录按任务的耗时、token和费用"""
+
+    def __init__(self, provider, task: str, model: Optional[str]):
+        self.task = task
+        self.routed = model_chain(task, model)  # 路由配置中的模型名（按单价估算费用）
+        self.models = [provider.resolve_model(name) for name in self.routed]  # 提供方中的模型名（指标和熔断）
+        self.index = 0
+        self.started = time.perf_counter()
+
+    @property
+    def model(self) -> str:
+        return self.models[self.index]
+
+    def fall_back(self, error: LLMError, deadline: Optional[float] = None) -> bool:
+        """当前模型失败后换用下一个备选模型；没有备选模型、错误与模型无关或已超过期限时返回False"""
+        if self.index + 1 >= len(self.models) or not should_fall_back(error):
+            return False
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        logger.warning("模型%s调用失败（%s），%s任务改用备选模型%s", self.model, error.outcome, self.task, self.models[self.index + 1])
+        llm_fallbacks.inc(task=self.task, from_model=self.model, to_model=self.models[self.index + 1])
+        self.index += 1
+        return True
+
+    def finish(self, outcome: str = "success", input_tokens: int = 0, output_tokens: int = 0):
+        record_llm_task(
+            self.task, self.model, time.perf_counter() - self.started, outcome=outcome,
+            input_tokens=input_tokens, output_tokens=output_tokens,
+            cost=estimate_cost(self.routed[self.index], input_tokens, output_tokens)
+        )
+
+
+def _span_attributes(provider, caller: str, route: _Route, enable_search: bool, messages: List[Dict],
+                     stream: bool = False) -> Dict:
+    attributes = {
+        "llm.caller": caller,
+        "llm.task": route.task,
+        "llm.provider": provider.name,
+        "llm.model": route.model,
+        "llm.enable_search": enable_search,
+        "llm.messages": len(messages)
+    }
+    if stream:
+        attributes["llm.stream"] = True
+    return attributes
+
+
+def _failed_attempt(provider, caller: str, model: str, started: float, error: BaseException) -> BaseException:
+    """记录一次失败的尝试，返回应抛出的异常（超时、连接失败转换为LLMError，其他异常原样返回）"""
+    llm_error = as_llm_error(error, provider.label)
+    outcome = llm_error.outcome if llm_error is not None else "exception"
+    record_llm_call(caller, model, time.perf_counter() - started, outcome=outcome)
+    return llm_error or error
+
+
+def _finish_call(provider, caller: str, model: str, item, elapsed: float, result: LLMResult) -> LLMResponse:
+    """记录一次非流式调用的指标和span属性，成功时返回LLMResponse，失败时抛出LLMError"""
+    item.set_attribute("llm.status_code", result.status_code)
+    if result.status_code == 200:
+        record_llm_call(caller, model, elapsed, input_tokens=result.input_tokens, output_tokens=result.output_tokens)
+        item.set_attributes({
+            "llm.input_tokens": result.input_tokens,
+            "llm.output_tokens": result.output_tokens,
+            "llm.tool_calls": len(result.tool_calls)
+        })
+        return LLMResponse(
+            content=result.content, tool_calls=result.tool_calls, model=model,
+            input_tokens=result.input_tokens, output_tokens=result.output_tokens
+        )
+    record_llm_call(caller, model, elapsed, outcome=f"http_{result.status_code}")
+    _raise_for_result(provider, result)
+
+
+def _finish_stream(provider, caller: str, model: str, item, elapsed: float, last: Optional[LLMResult],
+                   failure: Optional[LLMResult]):
+    """流式调用结束（或调用方提前停止读取）后记录指标，出错时抛出LLMError"""
+    if failure is not None:
+        item.set_attribute("llm.status_code", failure.status_code)
+        record_llm_call(caller, model, elapsed, outcome=f"http_{failure.status_code}")
+        _raise_for_result(provider, failure)
+    input_tokens = last.input_tokens if last else 0
+    output_tokens = last.output_tokens if last else 0
+    item.set_attributes({"llm.status_code": 200, "llm.input_tokens": input_tokens, "llm.output_tokens": output_tokens})
+    record_llm_call(caller, model, elapsed, input_tokens=input_tokens, output_tokens=output_tokens)
+
+
+def _open_stream(provider, caller: str, route: _Route, item):
+    """流式调用开始前检查熔断，首选模型熔断时换用备选模型（还没有输出，可以换），返回所用模型的熔断器"""
+    while True:
+        breaker = get_breaker(provider.name, route.model)
+        try:
+            breaker.before_call()
+        except LLMCircuitOpenError as e:
+            _rejected(caller, route.model, item, e)
+            if route.fall_back(e):
+                continue
+            route.finish(outcome=e.outcome)
+            raise
+        item.set_attributes({"llm.model": route.model, "llm.fallbacks": route.index})
+        return breaker
+
+
+def _raise_stream_error(provider, caller: str, route: _Route, breaker, started: float, e: Exception):
+    """流式调用中途出错：记录指标和熔断后抛出（超时、连接失败转换为LLMError）"""
+    error = _failed_attempt(provider, caller, route.model, started, e)
+    if isinstance(error, LLMError):
+        breaker.record_failure(error)
+        route.finish(outcome=error.outcome)
+    else:
+        breaker.release()
+        route.finish(outcome="exception")
+    if error is e:
+        raise e
+    raise error from e
+
+
+def _end_stream(provider, caller: str, route: _Route, item, breaker, elapsed: float, last: Optional[LLMResult],
+                failure: Optional[LLMResult]):
+    try:
+        _finish_stream(provider, caller, route.model, item, elapsed, last, failure)
+    except LLMError as e:
+        breaker.record_failure(e)
+        route.finish(outcome=e.outcome)
+        raise
+    breaker.record_success()
+    route.finish(input_tokens=last.input_tokens if last else 0, output_tokens=last.output_tokens if last else 0)
+
+
+def _rejected(caller: str, model: str, item, error: LLMError):
+    """熔断拒绝的调用只计数（没有发出请求，不记录耗时）"""
+    llm_requests.inc(caller=caller, model=model, outcome=error.outcome)
+    item.set_attribute("llm.circuit_open", True)
 
 
 def call_llm_native(
     messages: Union[List[BaseMessage], List[Dict]],
     temperature: float = 0.7,
-    enable_search: bool = True
+    enable_search: bool = True,
+    caller: str = "unknown",
+    tools: Optional[List[Dict]] = None,
+    deadline: Optional[float] = None,
+    task: str = TASK_REPORT,
+    model: Optional[str] = None
 ) -> LLMResponse:
     """
-    使用原生DashScope SDK同步调用LLM
+    同步调用LLM（提供方由Settings.LLM_PROVIDER选择，模型按任务路由，见model_router）
+    限流、服务端错误、超时和连接失败按退避策略重试，提供方连续失败或额度用完时熔断（见llm_resilience）；
+    当前模型重试后仍失败或已熔断时，在期限内换用任务的备选模型
     
     Args:
         messages: LangChain消息列表或字典消息列表
         temperature: 温度参数，控制随机性
         enable_search: 是否启用联网搜索功能
+        caller: 调用方名称（用于指标统计，如ChatAgent、NewsAnalyzerAgent）
+        tools: 可调用的工具（OpenAI格式），模型可能返回工具调用而不是文本
+        deadline: 整个调用（含重试和备选模型）的期限（秒），默认Settings.LLM_CALL_DEADLINE；同步调用无法中断进行中的请求，只在重试前检查
+        task: 任务类型（chat/extract/report），按LLM_TASK_MODELS选择模型
+        model: 指定模型（不按任务路由，也不换用备选模型）
     
     Returns:
-        LLMResponse对象，包含content属性（与LangChain兼容）
-    """
-    if not DASHSCOPE_AVAILABLE:
-        raise ImportError("dashscope未安装，请运行: pip install dashscope")
+        LLMResponse对象，包含content属性（与LangChain兼容）、tool_calls和实际使用的model
     
-    # 转换消息格式
-    if messages and isinstance(messages[0], dict):
-        dashscope_messages = convert_dict_messages_to_dashscope(messages)
-    elif LANGCHAIN_AVAILABLE and messages and isinstance(messages[0], BaseMessage):
-        dashscope_messages = convert_langchain_messages_to_dashscope(messages)
-    else:
-        # 尝试自动转换
+    Raises:
+        LLMError: 调用失败（LLMQuotaError、LLMRateLimitError、LLMTimeoutError、LLMCircuitOpenError等）
+    """
+    provider = get_llm_provider()
+    dashscope_messages = _to_dashscope_messages(messages)
+    route = _Route(provider, task, model)
+    expires = time.monotonic() + (deadline or settings.LLM_CALL_DEADLINE)
+    attempts = 0
+
+    def attempt(remaining: float, model: str) -> LLMResponse:
+        nonlocal attempts
+        attempts += 1
+        started = time.perf_counter()
+        try:
+            result = provider.generate(dashscope_messages, temperature, enable_search, tools, model=model)
+        except Exception as e:
+            error = _failed_attempt(provider, caller, model, started, e)
+            if error is e:
+                raise
+            raise error from e
+        return _finish_call(provider, caller, model, item, time.perf_counter() - started, result)
+
+    with span("llm.call", _span_attributes(provider, caller, route, enable_search, dashscope_messages),
+              kind=KIND_CLIENT) as item:
         try:
-            dashscope_messages = convert_langchain_messages_to_dashscope(messages)
-        except:
-            dashscope_messages = convert_dict_messages_to_dashscope(messages)
+            while True:
+                try:
+                    response = call_with_retry(partial(attempt, model=route.model), get_breaker(provider.name, route.model),
+                                               expires, caller, route.model)
+                except LLMError as e:
+                    if isinstance(e, LLMCircuitOpenError):
+                        _rejected(caller, route.model, item, e)
+                    if route.fall_back(e, expires):
+                        continue
+                    route.finish(outcome=e.outcome)
+                    raise
+                except Exception:
+                    route.finish(outcome="exception")
+                    raise
+                route.finish(input_tokens=response.input_tokens, output_tokens=response.output_tokens)
+                return response
+        finally:
+            item.set_attributes({"llm.attempts": attempts, "llm.model": route.model, "llm.fallbacks": route.index})
+
+
+def stream_llm_native(
+    messages: Union[List[BaseMessage], List[Dict]],
+    temperature: float = 0.7,
+    enable_search: bool = True,
+    caller: str = "unknown",
+    task: str = TASK_REPORT,
+    model: Optional[str] = None
+) -> Iterator[str]:
+    """
+    流式调用LLM，逐段返回新增文本（延迟和token数在输出结束后记录）
+    受熔断保护，但不重试（已输出的分片无法撤回）；只有开始前首选模型已熔断时换用备选模型
     
-    # 调用DashScope API
-    response = Generation.call(
-        api_key=settings.LLM_API_KEY,
-        model=settings.LLM_MODEL,
-        messages=dashscope_messages,
-        temperature=temperature,
-        enable_search=enable_search,
-        result_format="message"
-    )
+    Args:
+        同call_llm_native
     
-    # 处理响应
-    if response.status_code == 200:
-        content = response.output.choices[0].message.content
-        return LLMResponse(content=content)
-    else:
-        error_msg = f"DashScope API调用失败: HTTP {response.status_code}, 错误码: {response.code}, 错误信息: {response.message}"
-        print(f"✗ {error_msg}")
-        raise Exception(error_msg)
+    Returns:
+        文本分片的迭代器
+    """
+    provider = get_llm_provider()
+    dashscope_messages = _to_dashscope_messages(messages)
+    route = _Route(provider, task, model)
+    
+    with span("llm.call", _span_attributes(provider, caller, route, enable_search, dashscope_messages, stream=True),
+              kind=KIND_CLIENT) as item:
+        breaker = _open_stream(provider, caller, route, item)
+        started = time.perf_counter()
+        last = None
+        failure = None
+        try:
+            for result in provider.stream(dashscope_messages, temperature, enable_search, model=route.model):
+                if result.status_code != 200:
+                    failure = result
+                    break
+                last = result
+                if result.content:
+                    yield result.content
+        except GeneratorExit:
+            # 调用方提前停止读取：按已输出的部分记录
+            pass
+        except Exception as e:
+            _raise_stream_error(provider, caller, route, breaker, started, e)
+        _end_stream(provider, caller, route, item, breaker, time.perf_counter() - started, last, failure)
+
+
+def _usage_value(usage, key: str) -> int:
+    """读取DashScope响应中的token用量（usage可能是dict或对象）"""
+    try:
+        value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, 0)
+        return int(value or 0)
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return 0
 
 
 async def acall_llm_native(
     messages: Union[List[BaseMessage], List[Dict]],
     temperature: float = 0.7,
-    enable_search: bool = True
+    enable_search: bool = True,
+    caller: str = "unknown",
+    tools: Optional[List[Dict]] = None,
+    deadline: Optional[float] = None,
+    hedge_delay: Optional[float] = None,
+    task: str = TASK_REPORT,
+    model: Optional[str] = None
 ) -> LLMResponse:
     """
-    使用原生DashScope SDK异步调用LLM
+    异步调用LLM（提供方有原生异步实现时直接await，等待期间不占用线程）
+    重试、熔断和备选模型同call_llm_native；每次请求都受剩余期限约束，超过期限时取消请求并抛出LLMTimeoutError
     
     Args:
         messages: LangChain消息列表或字典消息列表
         temperature: 温度参数，控制随机性
         enable_search: 是否启用联网搜索功能
+        caller: 调用方名称（用于指标统计）
+        tools: 可调用的工具（OpenAI格式）
+        deadline: 整个调用（含重试和备选模型）的期限（秒），默认Settings.LLM_CALL_DEADLINE
+        hedge_delay: 对冲等待时间（秒）：超过该时间仍未返回时再发起一个相同请求，先成功的生效（为空或0时不对冲）
+        task: 任务类型（chat/extract/report），按LLM_TASK_MODELS选择模型
+        model: 指定模型（不按任务路由，也不换用备选模型）
     
     Returns:
-        LLMResponse对象，包含content属性（与LangChain兼容）
+        LLMResponse对象，包含content属性（与LangChain兼容）、tool_calls和实际使用的model
+    
+    Raises:
+        LLMError: 调用失败
+    """
+    provider = get_llm_provider()
+    dashscope_messages = _to_dashscope_messages(messages)
+    route = _Route(provider, task, model)
+    expires = time.monotonic() + (deadline or settings.LLM_CALL_DEADLINE)
+    attempts = 0
+
+    async def attempt(remaining: float, model: str) -> LLMResponse:
+        nonlocal attempts
+        attempts += 1
+        started = time.perf_counter()
+        try:
+            if hasattr(provider, "agenerate"):
+                result = await provider.agenerate(dashscope_messages, temperature, enable_search, tools, model=model)
+            else:
+                # 只有同步实现的提供方（原生SDK）在线程池中执行；超过期限时调用方不再等待，但线程要等请求结束才释放
+                result = await asyncio.to_thread(
+                    provider.generate, dashscope_messages, temperature, enable_search, tools, model=model
+                )
+        except asyncio.CancelledError:
+            # 超过期限或对冲请求中落后的一方
+            record_llm_call(caller, model, time.perf_counter() - started, outcome="cancelled")
+            raise
+        except Exception as e:
+            error = _failed_attempt(provider, caller, model, started, e)
+            if error is e:
+                raise
+            raise error from e
+        return _finish_call(provider, caller, model, item, time.perf_counter() - started, result)
+
+    with span("llm.call", _span_attributes(provider, caller, route, enable_search, dashscope_messages),
+              kind=KIND_CLIENT) as item:
+        try:
+            while True:
+                try:
+                    response = await acall_with_retry(
+                        partial(attempt, model=route.model), get_breaker(provider.name, route.model), expires, caller,
+                        route.model, hedge_delay=None if tools else hedge_delay
+                    )
+                except LLMError as e:
+                    if isinstance(e, LLMCircuitOpenError):
+                        _rejected(caller, route.model, item, e)
+                    if route.fall_back(e, expires):
+                        continue
+                    route.finish(outcome=e.outcome)
+                    raise
+                except asyncio.CancelledError:
+                    route.finish(outcome="cancelled")
+                    raise
+                except Exception:
+                    route.finish(outcome="exception")
+                    raise
+                route.finish(input_tokens=response.input_tokens, output_tokens=response.output_tokens)
+                return response
+        finally:
+            item.set_attributes({"llm.attempts": attempts, "llm.model": route.model, "llm.fallbacks": route.index})
+
+
+async def _iterate_in_thread(iterator: Iterator) -> AsyncIterator:
+    """在线程池中逐个读取同步迭代器（只有同步流式实现的提供方使用）"""
+    done = object()
+    try:
+        while True:
+            item = await asyncio.to_thread(next, iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        iterator.close()
+
+
+async def astream_llm_native(
+    messages: Union[List[BaseMessage], List[Dict]],
+    temperature: float = 0.7,
+    enable_search: bool = True,
+    caller: str = "unknown",
+    task: str = TASK_REPORT,
+    model: Optional[str] = None
+) -> AsyncIterator[str]:
     """
-    import asyncio
+    异步流式调用LLM，逐段返回新增文本（延迟和token数在输出结束后记录）
+    受熔断保护，但不重试（已输出的分片无法撤回）；只有开始前首选模型已熔断时换用备选模型
     
-    # DashScope SDK本身是同步的，使用asyncio在线程池中执行
-    loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(
-        None,
-        lambda: call_llm_native(messages, temperature, enable_search)
-    )
-    return response
+    Args:
+        同call_llm_native
+    
+    Returns:
+        文本分片的异步迭代器
+    """
+    provider = get_llm_provider()
+    dashscope_messages = _to_dashscope_messages(messages)
+    route = _Route(provider, task, model)
+    
+    with span("llm.call", _span_attributes(provider, caller, route, enable_search, dashscope_messages, stream=True),
+              kind=KIND_CLIENT) as item:
+        breaker = _open_stream(provider, caller, route, item)
+        started = time.perf_counter()
+        last = None
+        failure = None
+        if hasattr(provider, "astream"):
+            results = provider.astream(dashscope_messages, temperature, enable_search, model=route.model)
+        else:
+            results = _iterate_in_thread(provider.stream(dashscope_messages, temperature, enable_search, model=route.model))
+        try:
+            async for result in results:
+                if result.status_code != 200:
+                    failure = result
+                    break
+                last = result
+                if result.content:
+                    yield result.content
+        except GeneratorExit:
+            # 调用方提前停止读取：按已输出的部分记录
+            pass
+        except Exception as e:
+            _raise_stream_error(provider, caller, route, breaker, started, e)
+        finally:
+            await results.aclose()
+        _end_stream(provider, caller, route, item, breaker, time.perf_counter() - started, last, failure)
 
 
 class NativeDashScopeLLM(Runnable):
     """
-    兼容LangChain ChatOpenAI接口的原生SDK包装类
+    兼容LangChain ChatOpenAI接口的LLM包装类
     保留LangChain Agent的对话管理和上下文处理逻辑
-    内部使用原生DashScope SDK调用（带enable_search=True）
+    内部通过call_llm_native / acall_llm_native调用当前提供方（带enable_search=True），ainvoke不占用线程
     继承Runnable基类，使其能被LangChain识别为Runnable对象
     """
     def __init__(
@@ -192,15 +1083,19 @@ class NativeDashScopeLLM(Runnable):
         model: str = None,
         temperature: float = 0.7,
         enable_search: bool = True,
+        caller: str = "unknown",
+        task: str = TASK_REPORT,
         **kwargs
     ):
         """
         初始化原生SDK LLM包装类
         
         Args:
-            model: 模型名称（如果为None，使用settings中的配置）
+            model: 指定模型名称（如果为None，按task路由，见model_router）
             temperature: 温度参数
             enable_search: 是否启用联网搜索
+            caller: 调用方名称（用于指标统计）
+            task: 任务类型（chat/extract/report）
             **kwargs: 其他参数（兼容LangChain接口）
         """
         # 调用父类初始化（如果Runnable有__init__方法）
@@ -210,9 +1105,11 @@ class NativeDashScopeLLM(Runnable):
             # 如果父类不接受这些参数，忽略错误
             pass
         
-        self.model = model or settings.LLM_MODEL
+        self.model = model
         self.temperature = temperature
         self.enable_search = enable_search
+        self.caller = caller
+        self.task = task
         self.kwargs = kwargs
         
         # 兼容LangChain的属性
@@ -235,6 +1132,8 @@ class NativeDashScopeLLM(Runnable):
             model=self.model,
             temperature=self.temperature,
             enable_search=self.enable_search,
+            caller=self.caller,
+            task=self.task,
             **self.kwargs
         )
         # 绑定工具
@@ -257,66 +1156,58 @@ class NativeDashScopeLLM(Runnable):
         """
         return self.bind(tools=tools, **kwargs)
         
-    async def ainvoke(self, messages, **kwargs):
+    def _prepare(self, input, kwargs):
+        """Agent传入的是PromptValue（提示模板的输出），转换为消息列表；合并kwargs中的temperature和enable_search"""
+        messages = input.to_messages() if hasattr(input, 'to_messages') else input
+        return {
+            "messages": messages,
+            "temperature": kwargs.get('temperature', self.temperature),
+            "enable_search": kwargs.get('enable_search', self.enable_search),
+            "caller": self.caller,
+            "tools": self.bound_tools,
+            "task": self.task,
+            "model": self.model
+        }
+
+    @staticmethod
+    def _to_message(response: LLMResponse):
+        # 返回兼容LangChain的AIMessage对象（工具调用放在additional_kwargs，与OpenAI工具Agent的解析方式一致）
+        if LANGCHAIN_AVAILABLE:
+            additional_kwargs = {"tool_calls": response.tool_calls} if response.tool_calls else {}
+            return AIMessage(content=response.content, additional_kwargs=additional_kwargs)
+        else:
+            # 如果LangChain不可用，返回简单的响应对象
+            class SimpleAIMessage:
+                def __init__(self, content):
+                    self.content = content
+            return SimpleAIMessage(content=response.content)
+        
+    async def ainvoke(self, input, config=None, **kwargs):
         """
         异步调用LLM（兼容LangChain接口）
         
         Args:
-            messages: LangChain消息列表
+            input: LangChain消息列表或PromptValue
+            config: Runnable配置（Agent链式调用时传入，这里不使用）
             **kwargs: 其他参数
         
         Returns:
             AIMessage对象（兼容LangChain）
         """
-        # 合并kwargs中的temperature和enable_search
-        temp = kwargs.get('temperature', self.temperature)
-        search = kwargs.get('enable_search', self.enable_search)
-        
-        # 调用原生SDK
-        response = await acall_llm_native(
-            messages=messages,
-            temperature=temp,
-            enable_search=search
-        )
-        
-        # 返回兼容LangChain的AIMessage对象
-        if LANGCHAIN_AVAILABLE:
-            return AIMessage(content=response.content)
-        else:
-            # 如果LangChain不可用，返回简单的响应对象
-            class SimpleAIMessage:
-                def __init__(self, content):
-                    self.content = content
-            return SimpleAIMessage(content=response.content)
+        response = await acall_llm_native(**self._prepare(input, kwargs))
+        return self._to_message(response)
     
-    def invoke(self, messages, **kwargs):
+    def invoke(self, input, config=None, **kwargs):
         """
         同步调用LLM（兼容LangChain接口）
         
         Args:
-            messages: LangChain消息列表
+            input: LangChain消息列表或PromptValue
+            config: Runnable配置（Agent链式调用时传入，这里不使用）
             **kwargs: 其他参数
         
         Returns:
             AIMessage对象（兼容LangChain）
         """
-        # 合并kwargs中的temperature和enable_search
-        temp = kwargs.get('temperature', self.temperature)
-        search = kwargs.get('enable_search', self.enable_search)
-        
-        # 调用原生SDK
-        response = call_llm_native(
-            messages=messages,
-            temperature=temp,
-            enable_search=search
-        )
-        
-        # 返回兼容LangChain的AIMessage对象
-        if LANGCHAIN_AVAILABLE:
-            return AIMessage(content=response.content)
-        else:
-            # 如果LangChain不可用，返回简单的响应对象
-            class SimpleAIMessage:
-                def __init__(self, content):
-                    self.content = content
-            return SimpleAIMessage(content=response.content)
+        response = call_llm_native(**self._prepare(input, kwargs))
+        return self._to_message(response)
@@ -0,0 +1,407 @@
+"""
+LLM调用的容错策略
+- 类型化的错误：按状态码和错误码区分额度用完、认证失败、限流、服务端错误、超时、连接失败、熔断
+- 重试：只重试可重试的错误（限流、服务端错误、超时、连接失败），指数退避加随机抖动，不超过整个调用的期限
+- 熔断：按提供方和模型统计连续失败，达到阈值后在一段时间内直接失败（额度用完时立即熔断），到期后放行一个试探请求
+- 对冲：延迟敏感的调用（聊天）在等待超过一定时间后再发起一个相同请求，先成功的结果生效，另一个取消
+call_llm_native / acall_llm_native 使用这里的策略，调用方只需要处理LLMError
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from app.config import settings
+from app.utils.metrics import Counter, Gauge, llm_hedges, llm_retries, registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# ---------- 错误类型 ----------
+
+class LLMError(Exception):
+    """
+    LLM调用失败
+
+    Attributes:
+        status_code: HTTP状态码（非HTTP错误为None）
+        code: 提供方错误码
+        retryable: 是否值得重试
+        trips_breaker: 是否计入熔断的连续失败
+        outcome: 指标中的结果标签（llm_requests_total的outcome）
+    """
+
+    retryable = False
+    trips_breaker = False
+    user_message = "AI模型调用失败，请稍后重试。"
+
+    def __init__(self, message: str, status_code: Optional[int] = None, code: str = ""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+    @property
+    def outcome(self) -> str:
+        return f"http_{self.status_code}" if self.status_code else "exception"
+
+
+class LLMQuotaError(LLMError):
+    """额度用完（免费额度用尽、欠费），充值或关闭"仅使用免费额度"前不会恢复"""
+    user_message = "API免费额度已用完。请在DashScope管理控制台关闭'仅使用免费额度'模式，或充值后继续使用。"
+
+
+class LLMAuthError(LLMError):
+    """API密钥无效或无权限"""
+    user_message = "API认证失败，请检查API密钥是否正确。"
+
+
+class LLMBadRequestError(LLMError):
+    """请求参数错误或内容审核未通过（重试也不会成功）"""
+
+
+class LLMRateLimitError(LLMError):
+    """请求频率超限"""
+    retryable = True
+    trips_breaker = True
+    user_message = "AI模型请求过于频繁，请稍后重试。"
+
+
+class LLMServerError(LLMError):
+    """提供方服务端错误"""
+    retryable = True
+    trips_breaker = True
+
+
+class LLMTimeoutError(LLMError, TimeoutError):
+    """单次请求超时或超过整个调用的期限"""
+    retryable = True
+    trips_breaker = True
+    user_message = "请求超时，请稍后重试。"
+
+    @property
+    def outcome(self) -> str:
+        return "timeout"
+
+
+class LLMConnectionError(LLMError, ConnectionError):
+    """无法连接提供方"""
+    retryable = True
+    trips_breaker = True
+
+
+class LLMCircuitOpenError(LLMError):
+    """熔断中，未发起请求"""
+    user_message = "AI模型服务暂时不可用（连续调用失败），请稍后重试。"
+
+    @property
+    def outcome(self) -> str:
+        return "circuit_open"
+
+
+def classify_result(label: str, status_code: int, code: str, message: str) -> LLMError:
+    """按状态码和错误码把失败的响应转换为对应的LLMError（错误信息格式与之前的通用异常一致）"""
+    text = f"{label} API调用失败: HTTP {status_code}, 错误码: {code}, 错误信息: {message}"
+    code = code or ""
+    lowered = f"{code} {message}".lower()
+    if status_code == 429 or code.startswith("Throttling"):
+        return LLMRateLimitError(text, status_code, code)
+    if "AllocationQuota" in code or code == "Arrearage" or "free tier" in lowered or "quota" in lowered:
+        return LLMQuotaError(text, status_code, code)
+    if status_code in (401, 403):
+        return LLMAuthError(text, status_code, code)
+    # 网关超时（504）也是5xx，需在服务端错误之前判断
+    if status_code in (408, 504):
+        return LLMTimeoutError(text, status_code, code)
+    if status_code >= 500:
+        return LLMServerError(text, status_code, code)
+    if 400 <= status_code < 500:
+        return LLMBadRequestError(text, status_code, code)
+    return LLMError(text, status_code, code)
+
+
+def as_llm_error(error: BaseException, label: str) -> Optional[LLMError]:
+    """把提供方抛出的异常转换为LLMError（超时、连接失败）；无法识别的异常返回None（原样抛出，不重试）"""
+    if isinstance(error, LLMError):
+        return error
+    if isinstance(error, TimeoutError):
+        return LLMTimeoutError(f"{label}请求超时: {error}")
+    if isinstance(error, (ConnectionError, OSError)):
+        return LLMConnectionError(f"{label}连接失败: {error}")
+    return None
+
+
+# ---------- 熔断 ----------
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    熔断器（线程安全，同步和异步调用共用）
+
+    Args:
+        name: 名称（提供方:模型）
+        failure_threshold: 连续失败多少次后熔断
+        reset_timeout: 熔断持续时间（秒），到期后放行一个试探请求
+        quota_cooldown: 额度用完时的熔断持续时间（秒）
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, quota_cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.quota_cooldown = quota_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_until = 0.0
+        self.last_error: Optional[str] = None
+        self.stats = {"opened": 0, "rejected": 0}
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        发起请求前调用
+
+        Raises:
+            LLMCircuitOpenError: 熔断中，或半开状态下已有试探请求在执行
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.stats["rejected"] += 1
+            retry_in = max(0.0, self.open_until - time.monotonic())
+        raise LLMCircuitOpenError(f"LLM熔断中（{self.name}），约{retry_in:.0f}秒后重试，最近错误: {self.last_error}")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("LLM熔断恢复: %s", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, error: LLMError):
+        """记录失败：额度用完立即熔断；可重试的错误累计到阈值后熔断；其他错误（参数错误等）不影响"""
+        quota = isinstance(error, LLMQuotaError)
+        if not quota and not error.trips_breaker:
+            self.release()
+            return
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            if quota or self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats["opened"] += 1
+                    logger.warning("LLM熔断: %s（连续失败%d次）: %s", self.name, self.failures, self.last_error)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.open_until = self.opened_at + (self.quota_cooldown if quota else self.reset_timeout)
+                self._probing = False
+
+    def release(self):
+        """试探请求以不影响熔断的方式结束（取消、参数错误等）时，允许下一个请求继续试探"""
+        with self._lock:
+            self._probing = False
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "retry_in": round(max(0.0, self.open_until - time.monotonic()), 1) if self.state == OPEN else 0,
+                "last_error": self.last_error,
+                **self.stats
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str, model: str) -> CircuitBreaker:
+    """按提供方和模型获取熔断器（不同模型的故障互不影响）"""
+    name = f"{provider}:{model}"
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name, settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS, settings.LLM_QUOTA_COOLDOWN
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def all_breaker_status() -> Dict[str, Dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.status() for breaker in breakers}
+
+
+def reset_breakers(name: Optional[str] = None):
+    """手动恢复熔断（如充值后不必等待冷却结束）"""
+    with _breakers_lock:
+        breakers = [breaker for key, breaker in _breakers.items() if name is None or key == name]
+    for breaker in breakers:
+        breaker.reset()
+
+
+_CIRCUIT_STATE = Gauge("llm_circuit_state", "LLM熔断状态（0关闭，1半开，2熔断）", ("breaker",))
+_CIRCUIT_REJECTED = Counter("llm_circuit_rejected", "熔断期间直接失败的调用次数", ("breaker",))
+
+
+def _collect_breaker_metrics():
+    states, rejected = [], []
+    for name, status in all_breaker_status().items():
+        states.append(("", {"breaker": name}, _STATE_VALUES[status["state"]]))
+        rejected.append(("_total", {"breaker": name}, status["rejected"]))
+    return [(_CIRCUIT_STATE, states), (_CIRCUIT_REJECTED, rejected)]
+
+
+registry.add_collector(_collect_breaker_metrics)
+
+
+# ---------- 重试 ----------
+
+def backoff_delay(retry: int) -> float:
+    """第retry次重试前的等待时间（指数退避，full jitter）"""
+    ceiling = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * (2 ** retry))
+    return random.uniform(0, ceiling)
+
+
+def _next_delay(error: LLMError, retry: int, deadline: float) -> Optional[float]:
+    """是否继续重试：返回等待时间，不重试时返回None"""
+    if not error.retryable or retry >= settings.LLM_MAX_RETRIES:
+        return None
+    delay = backoff_delay(retry)
+    # 等待之后至少还要留出一点时间发起请求
+    if time.monotonic() + delay >= deadline - 1:
+        return None
+    return delay
+
+
+def call_with_retry(attempt: Callable[[float], T], breaker: CircuitBreaker, deadline: float,
+                    caller: str, model: str) -> T:
+    """
+    同步执行attempt，失败时按策略重试
+
+    Args:
+        attempt: 执行一次调用，参数为本次剩余的期限（秒）；失败时抛出LLMError
+        breaker: 熔断器
+        deadline: 整个调用（含重试）的截止时间（time.monotonic()）
+        caller / model: 指标标签
+
+    Returns:
+        attempt的返回值
+    """
+    retry = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = attempt(deadline - time.monotonic())
+        except LLMError as e:
+            breaker.record_failure(e)
+            delay = _next_delay(e, retry, deadline)
+            if delay is None:
+                raise
+            error = e
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
+        llm_retries.inc(caller=caller, model=model, reason=type(error).__name__)
+        logger.warning("LLM调用失败，%.1f秒后第%d次重试: %s", delay, retry + 1, error)
+        time.sleep(delay)
+        retry += 1
+
+
+async def _hedged(attempt: Callable[[float], Awaitable[T]], timeout: float, hedge_delay: float,
+                  caller: str, model: str) -> T:
+    """等待hedge_delay后仍未返回时再发起一个相同请求，先成功的结果生效，另一个取消"""
+    first = asyncio.ensure_future(attempt(timeout))
+    tasks = {first: "primary"}
+    try:
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+        if not done:
+            tasks[asyncio.ensure_future(attempt(timeout - hedge_delay))] = "hedge"
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if len(tasks) > 1:
+                        llm_hedges.inc(caller=caller, model=model, winner=tasks[task])
+                    return task.result()
+                error = error or task.exception()
+        if len(tasks) > 1:
+            llm_hedges.inc(caller=caller, model=model, winner="none")
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def acall_with_retry(attempt: Callable[[float], Awaitable[T]], breaker: CircuitBreaker, deadline: float,
+                           caller: str, model: str, hedge_delay: Optional[float] = None) -> T:
+    """
+    异步执行attempt，失败时按策略重试；每次执行都受剩余期限约束（超过期限时取消并抛出LLMTimeoutError）
+
+    Args:
+        同call_with_retry
+        hedge_delay: 对冲等待时间（秒），为空或0时不对冲
+    """
+    retry = 0
+    while True:
+        breaker.before_call()
+        remaining = deadline - time.monotonic()
+        try:
+            if hedge_delay and hedge_delay < remaining:
+                awaitable = _hedged(attempt, remaining, hedge_delay, caller, model)
+            else:
+                awaitable = attempt(remaining)
+            try:
+                result = await asyncio.wait_for(awaitable, timeout=max(0.0, remaining))
+            except asyncio.TimeoutError as e:
+                if isinstance(e, LLMError):
+                    raise
+                raise LLMTimeoutError(f"LLM调用超过期限（{caller}）") from e
+        except LLMError as e:
+            breaker.record_failure(e)
+            delay = _next_delay(e, retry, deadline)
+            if delay is None:
+                raise
+            error = e
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
+        llm_retries.inc(caller=caller, model=model, reason=type(error).__name__)
+        logger.warning("LLM调用失败，%.1f秒后第%d次重试: %s", delay, retry + 1, error)
+        await asyncio.sleep(delay)
+        retry += 1
@@ -0,0 +1,287 @@
+"""
+日志配置
+- 结构化日志：每条记录一行JSON（LOG_FORMAT=text时输出便于本地阅读的单行文本）
+- 非阻塞：业务线程和事件循环只把记录放入有界队列，由后台线程写出；队列满时丢弃并计数，不阻塞请求
+- 自动附带上下文：request_id（RequestContextMiddleware）、user_id（认证后）、job_id（worker执行任务时）、
+  当前trace_id/span_id（见app.utils.tracing）
+- 按模块设置级别（LOG_LEVELS，如 app.tools.hupu_scraper=WARNING,sqlalchemy.engine=INFO）
+- 高频日志采样：带extra={"sample": 键}的记录每个键在LOG_SAMPLE_INTERVAL秒内最多输出LOG_SAMPLE_BURST条，
+  其余丢弃，下一个窗口输出的第一条记录带suppressed（被丢弃的条数）
+
+使用：logger = logging.getLogger(__name__)，异常使用logger.exception记录堆栈
+"""
+import copy
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from app.config import settings
+from app.utils.metrics import Counter, registry
+from app.utils.tracing import current_span
+
+# 日志上下文（request_id、user_id、job_id等），只整体替换不原地修改
+_context: ContextVar[Dict] = ContextVar("log_context", default={})
+
+# LogRecord的标准属性（其余属性视为extra字段输出）
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "context"}
+
+# 请求头X-Request-ID的最大长度（超长或含非法字符时重新生成）
+MAX_REQUEST_ID_LENGTH = 64
+
+
+def bind_context(**fields) -> Token:
+    """向当前上下文追加日志字段（返回token，可用reset_context恢复）"""
+    return _context.set({**_context.get(), **fields})
+
+
+def reset_context(token: Token):
+    _context.reset(token)
+
+
+@contextmanager
+def log_context(**fields):
+    """在代码块内为日志追加字段"""
+    token = bind_context(**fields)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def get_context() -> Dict:
+    return dict(_context.get())
+
+
+class ContextFilter(logging.Filter):
+    """在产生日志的线程中附加上下文字段（contextvars只在当前线程/协程可见）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = dict(_context.get())
+        span = current_span()
+        if span is not None:
+            context["trace_id"] = span.trace_id
+            context["span_id"] = span.span_id
+        record.context = context
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """按sample键限流：每个窗口内最多输出burst条"""
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.suppressed_total: Dict[str, int] = {}
+        self._windows: Dict[str, list] = {}  # 键 -> [窗口开始时间, 已输出条数, 已丢弃条数]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if not key:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed_total[key] = self.suppressed_total.get(key, 0) + 1
+            return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """放入有界队列，队列满时丢弃（写出由QueueListener的后台线程完成）"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 在当前线程合并消息参数和异常堆栈（后台线程只做序列化和写出）
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict:
+    return {key: value for key, value in record.__dict__.items() if key not in _STANDARD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """一行一个JSON对象：time、level、logger、message、上下文字段、extra字段、exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        data.update(getattr(record, "context", None) or {})
+        data.update(_extra_fields(record))
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """本地调试用的单行文本格式（上下文字段以key=value附在末尾）"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.message = record.getMessage()
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}: {record.message}"
+        fields = {**(getattr(record, "context", None) or {}), **_extra_fields(record)}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def parse_levels(value: str) -> Dict[str, int]:
+    """解析LOG_LEVELS（逗号分隔的 模块=级别），级别名称不合法时忽略该项"""
+    levels = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        name, level = (part.strip() for part in item.split("=", 1))
+        resolved = logging.getLevelName(level.upper())
+        if name and isinstance(resolved, int):
+            levels[name] = resolved
+    return levels
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_sampling: Optional[SamplingFilter] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(force: bool = False):
+    """
+    配置根日志（API进程和各命令行入口启动时调用，重复调用无副作用）
+
+    Args:
+        force: 重新配置（修改设置后使用）
+    """
+    global _listener, _queue_handler, _sampling
+    with _setup_lock:
+        if _listener is not None and not force:
+            return
+        if _listener is not None:
+            _listener.stop()
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(TextFormatter() if settings.LOG_FORMAT.lower() == "text" else JsonFormatter())
+
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _sampling = SamplingFilter(settings.LOG_SAMPLE_BURST, settings.LOG_SAMPLE_INTERVAL)
+        _queue_handler.addFilter(_sampling)
+        _queue_handler.addFilter(ContextFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(logging.getLevelName(settings.LOG_LEVEL.upper()))
+
+        levels = {}
+        if settings.DB_ECHO:
+            # 输出全部SQL（经由日志队列，不使用SQLAlchemy自带的同步输出）
+            levels["sqlalchemy.engine"] = logging.INFO
+        levels.update(parse_levels(settings.LOG_LEVELS))
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+
+
+def shutdown_logging():
+    """写出队列中剩余的日志（进程退出前调用）"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class RequestContextMiddleware:
+    """
+    请求上下文中间件（纯ASGI实现）：为每个请求分配request_id（或沿用请求头X-Request-ID），
+    附加到该请求产生的全部日志，并通过响应头X-Request-ID返回
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH or not request_id.replace("-", "").isalnum():
+            request_id = uuid.uuid4().hex
+        header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+
+        token = bind_context(request_id=request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _context.reset(token)
+
+
+# 抓取指标时导出的日志丢弃统计
+_LOG_DROPPED = Counter("log_records_dropped", "日志队列已满而丢弃的记录数")
+_LOG_SAMPLED_OUT = Counter("log_records_sampled_out", "高频日志采样丢弃的记录数", ("key",))
+
+
+def _collect_log_metrics():
+    groups = [(_LOG_DROPPED, [("_total", {}, _queue_handler.dropped if _queue_handler else 0)])]
+    if _sampling is not None:
+        groups.append((_LOG_SAMPLED_OUT, [
+            ("_total", {"key": key}, count) for key, count in sorted(_sampling.suppressed_total.items())
+        ]))
+    return groups
+
+
+registry.add_collector(_collect_log_metrics)
@@ -0,0 +1,393 @@
+"""
+运行指标（Prometheus文本格式，通过 /api/internal/metrics 抓取）
+- 计数器/仪表/直方图均为进程内、线程安全，不依赖prometheus_client
+- 请求级：各路由的延迟直方图、进行中请求数、每个请求的SQL条数
+- 热点路径：LLM调用（按调用方统计延迟、token数、错误）、采集请求（按域名和状态码）、缓存命中
+- 连接池、相同请求合并等已有统计在抓取时通过collector导出
+多进程部署时每个进程单独统计（按实例抓取后在Prometheus中汇总）
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认延迟分桶（秒）：覆盖毫秒级接口到分钟级LLM调用
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# 每个请求的SQL条数分桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# 一行样本：(后缀, 标签, 值)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类（按标签值分组保存数据）"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """只增计数器"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [("_total", self._labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """可增可减的仪表"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [("", self._labels(key), value) for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """直方图（累计分桶 + 总和 + 次数）"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各分桶计数..., 总和, 次数]
+                state = [0] * len(self.buckets) + [0.0, 0]
+                self._values[key] = state
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> List[Sample]:
+        result = []
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                result.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            result.append(("_bucket", {**labels, "le": "+Inf"}, state[-1]))
+            result.append(("_sum", labels, state[-2]))
+            result.append(("_count", labels, state[-1]))
+        return result
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[Metric, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标重复注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[Metric, List[Sample]]]]):
+        """注册抓取时调用的collector（返回(指标描述, 样本)列表，用于导出已有的统计对象）"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """生成Prometheus文本格式（0.0.4）"""
+        with self._lock:
+            groups = [(metric, metric.samples()) for metric in self._metrics.values()]
+        for collector in self._collectors:
+            try:
+                groups.extend(collector())
+            except Exception as e:
+                logger.warning("指标collector执行失败: %s", e)
+
+        lines = []
+        for metric, samples in groups:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for suffix, labels, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """清空全部指标数据（不影响注册）"""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.clear()
+
+
+# 进程内全局注册表
+registry = MetricsRegistry()
+
+# 请求
+http_requests = registry.counter(
+    "http_requests", "HTTP请求数", ("method", "route", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP请求耗时（到响应结束，SSE接口见http_stream_duration_seconds）", ("method", "route"))
+http_stream_duration = registry.histogram(
+    "http_stream_duration_seconds", "SSE流式响应持续时间", ("method", "route"))
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "进行中的HTTP请求数", ("method", "route"))
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "每个HTTP请求执行的SQL条数", ("method", "route"), buckets=QUERY_COUNT_BUCKETS)
+
+# LLM调用
+llm_requests = registry.counter(
+    "llm_requests", "LLM调用次数", ("caller", "model", "outcome"))
+llm_request_duration = registry.histogram(
+    "llm_request_duration_seconds", "LLM调用耗时", ("caller", "model"))
+llm_tokens = registry.counter(
+    "llm_tokens", "LLM消耗的token数", ("caller", "model", "type"))
+llm_retries = registry.counter(
+    "llm_retries", "LLM调用重试次数（reason为触发重试的错误类型）", ("caller", "model", "reason"))
+llm_hedges = registry.counter(
+    "llm_hedged_requests", "LLM对冲请求次数（winner: primary/hedge/none）", ("caller", "model", "winner"))
+llm_task_requests = registry.counter(
+    "llm_task_requests", "按任务统计的LLM调用次数（含重试和备选模型，model为最后使用的模型）", ("task", "model", "outcome"))
+llm_task_duration = registry.histogram(
+    "llm_task_duration_seconds", "按任务统计的LLM调用总耗时（含重试和备选模型）", ("task", "model"))
+llm_task_tokens = registry.counter(
+    "llm_task_tokens", "按任务统计的token数", ("task", "model", "type"))
+llm_task_cost = registry.counter(
+    "llm_task_cost_yuan", "按任务估算的LLM费用（元，单价见LLM_MODEL_PRICES）", ("task", "model"))
+llm_fallbacks = registry.counter(
+    "llm_model_fallbacks", "模型调用失败后换用备选模型的次数", ("task", "from_model", "to_model"))
+
+# 采集请求
+scraper_fetch_duration = registry.histogram(
+    "scraper_fetch_duration_seconds", "采集HTTP请求耗时", ("host", "status"))
+
+# 缓存
+cache_requests = registry.counter(
+    "cache_requests", "缓存查询次数", ("cache", "result"))
+
+
+# ---------- 每个请求的SQL条数 ----------
+
+_request_queries: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("request_queries", default=None)
+
+
+def start_query_count():
+    """开始统计当前请求的SQL条数（返回token，结束时传给stop_query_count）"""
+    return _request_queries.set([0])
+
+
+def stop_query_count(token) -> int:
+    counter = _request_queries.get()
+    _request_queries.reset(token)
+    return counter[0] if counter else 0
+
+
+def record_query():
+    """SQL执行后调用（由db_metrics在after_cursor_execute中调用；线程池中执行的查询通过复制的上下文计入）"""
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# ---------- 便捷记录函数 ----------
+
+def record_llm_call(caller: str, model: str, elapsed: float, outcome: str = "success",
+                    input_tokens: int = 0, output_tokens: int = 0):
+    """记录一次LLM调用"""
+    llm_requests.inc(caller=caller, model=model, outcome=outcome)
+    llm_request_duration.observe(elapsed, caller=caller, model=model)
+    if input_tokens:
+        llm_tokens.inc(input_tokens, caller=caller, model=model, type="input")
+    if output_tokens:
+        llm_tokens.inc(output_tokens, caller=caller, model=model, type="output")
+
+
+def record_llm_task(task: str, model: str, elapsed: float, outcome: str = "success",
+                    input_tokens: int = 0, output_tokens: int = 0, cost: Optional[float] = None):
+    """记录一次按任务路由的LLM调用（含重试和备选模型的总耗时）"""
+    llm_task_requests.inc(task=task, model=model, outcome=outcome)
+    llm_task_duration.observe(elapsed, task=task, model=model)
+    if input_tokens:
+        llm_task_tokens.inc(input_tokens, task=task, model=model, type="input")
+    if output_tokens:
+        llm_task_tokens.inc(output_tokens, task=task, model=model, type="output")
+    if cost:
+        llm_task_cost.inc(cost, task=task, model=model)
+
+
+def record_fetch(url: str, elapsed: float, status):
+    """记录一次采集请求（status为HTTP状态码或timeout/error）"""
+    from urllib.parse import urlsplit
+    scraper_fetch_duration.observe(elapsed, host=urlsplit(url).hostname or "unknown", status=str(status))
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# ---------- 中间件 ----------
+
+class MetricsMiddleware:
+    """
+    请求指标中间件（纯ASGI实现，不缓冲响应体，SSE可正常流式输出）
+    route标签使用路由模板（如/api/report/{report_id}），未匹配的请求统一为unmatched，避免标签基数膨胀
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        route = route_template(scope)
+        started = time.perf_counter()
+        state = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        state["stream"] = True
+            await send(message)
+
+        http_requests_in_flight.inc(method=method, route=route)
+        token = start_query_count()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            queries = stop_query_count(token)
+            http_requests_in_flight.dec(method=method, route=route)
+            elapsed = time.perf_counter() - started
+            histogram = http_stream_duration if state["stream"] else http_request_duration
+            histogram.observe(elapsed, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=str(state["status"]))
+            http_request_db_queries.observe(queries, method=method, route=route)
+
+
+def route_template(scope) -> str:
+    """按应用路由表匹配请求路径，返回路由模板"""
+    app = scope.get("app")
+    routes = getattr(getattr(app, "router", None), "routes", None) or []
+    return _match_routes(routes, scope) or "unmatched"
+
+
+def _match_routes(routes, scope) -> Optional[str]:
+    from starlette.routing import Match
+
+    partial = None
+    for route in routes:
+        try:
+            match, _ = route.matches(scope)
+        except Exception:
+            continue
+        if match == Match.NONE:
+            continue
+        # 新版FastAPI的include_router保留子路由表（original_router），需要继续匹配到具体路由
+        nested = getattr(route, "original_router", None)
+        if nested is not None:
+            path = _match_routes(getattr(nested, "routes", []), scope)
+            if path:
+                return path
+            continue
+        if match == Match.FULL:
+            return getattr(route, "path", None)
+        if partial is None:
+            partial = getattr(route, "path", None)
+    return partial
+
+
+def render_metrics() -> str:
+    return registry.render()
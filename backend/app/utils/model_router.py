@@ -0,0 +1,108 @@
+"""
+按任务选择模型
+不同任务对模型能力的要求不同：聊天和采集（工具调用、要素提取）使用更快更便宜的模型，分析报告（最终点评）使用大模型
+- LLM_TASK_MODELS：任务 -> 模型链（首选模型和备选模型），未配置的任务使用LLM_MODEL
+- LLM_MODEL是所有任务最后的备选：小模型熔断、额度用完或重试后仍失败时逐级改用备选模型
+- LLM_MODEL_PRICES：按token用量估算每个任务的费用（llm_task_cost_yuan指标）
+call_llm_native / acall_llm_native 按task参数选择模型
+"""
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.utils.llm_resilience import LLMAuthError, LLMError
+
+logger = logging.getLogger(__name__)
+
+TASK_CHAT = "chat"  # 聊天问答（延迟敏感）
+TASK_EXTRACT = "extract"  # 采集、清洗和要素提取（工具调用为主）
+TASK_REPORT = "report"  # 新闻分析报告（最终点评，需要大模型）
+TASKS = (TASK_CHAT, TASK_EXTRACT, TASK_REPORT)
+
+
+@lru_cache(maxsize=8)
+def _parse_task_models(value: str) -> Dict[str, Tuple[str, ...]]:
+    """解析LLM_TASK_MODELS（逗号分隔的 任务=模型|备选模型），未知任务和空模型忽略"""
+    routes = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        task, models = (part.strip() for part in item.split("=", 1))
+        if task not in TASKS:
+            logger.warning("LLM_TASK_MODELS中的任务未知，已忽略: %s", task)
+            continue
+        chain = tuple(model.strip() for model in models.split("|") if model.strip())
+        if chain:
+            routes[task] = chain
+    return routes
+
+
+@lru_cache(maxsize=8)
+def _parse_prices(value: str) -> Dict[str, Tuple[float, float]]:
+    """解析LLM_MODEL_PRICES（逗号分隔的 模型=输入单价/输出单价，元/千token），格式不正确的项忽略"""
+    prices = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        model, price = (part.strip() for part in item.split("=", 1))
+        try:
+            input_price, output_price = (float(part) for part in price.split("/", 1))
+        except ValueError:
+            logger.warning("LLM_MODEL_PRICES格式不正确，已忽略: %s", item.strip())
+            continue
+        prices[model] = (input_price, output_price)
+    return prices
+
+
+def model_chain(task: str, model: Optional[str] = None) -> List[str]:
+    """
+    任务使用的模型链（按顺序尝试）
+
+    Args:
+        task: 任务类型（TASKS之一）
+        model: 指定模型时只使用该模型（不路由、不换用备选模型）
+
+    Returns:
+        模型名称列表，首个为首选模型，最后一个通常是LLM_MODEL
+
+    Raises:
+        ValueError: 任务类型未知
+    """
+    if task not in TASKS:
+        raise ValueError(f"未知的LLM任务类型: {task}")
+    if model:
+        return [model]
+    chain = list(_parse_task_models(settings.LLM_TASK_MODELS).get(task, ()))
+    if settings.LLM_MODEL not in chain:
+        chain.append(settings.LLM_MODEL)
+    return chain
+
+
+def primary_model(task: str) -> str:
+    """任务的首选模型（结果缓存和相同请求合并的键使用，换了模型的结果不复用）"""
+    return model_chain(task)[0]
+
+
+def should_fall_back(error: LLMError) -> bool:
+    """模型调用失败后是否换用备选模型：认证失败与模型无关，换模型也不会成功；其余错误（熔断、额度、限流等）按模型区分"""
+    return not isinstance(error, LLMAuthError)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+    """按LLM_MODEL_PRICES估算一次调用的费用（元），未配置单价的模型返回None"""
+    price = _parse_prices(settings.LLM_MODEL_PRICES).get(model)
+    if price is None:
+        return None
+    return (input_tokens * price[0] + output_tokens * price[1]) / 1000
+
+
+def route_table() -> Dict:
+    """当前的任务路由和单价（内部接口展示）"""
+    return {
+        "default_model": settings.LLM_MODEL,
+        "tasks": {task: model_chain(task) for task in TASKS},
+        "prices": {
+            model: {"input": price[0], "output": price[1]}
+            for model, price in _parse_prices(settings.LLM_MODEL_PRICES).items()
+        }
+    }
@@ -0,0 +1,325 @@
+"""
+按请求开启的性能剖析
+满足以下任一条件的请求在处理期间采集CPU剖析和内存分配快照，结果保存到PROFILING_DIR：
+- 请求头X-Profile携带内部接口令牌（INTERNAL_API_TOKEN，只有运维人员持有）
+- 按PROFILING_SAMPLE_RATE随机采样（可用PROFILING_ROUTES限定路由模板）
+CPU剖析两种方式（PROFILING_MODE）：
+- cprofile：确定性剖析，保存pstats文件（python -m pstats / snakeviz查看），只覆盖事件循环线程
+- sampling：后台线程按间隔采样全部线程的调用栈，保存折叠栈文本（flamegraph.pl / speedscope查看），包含线程池中的LLM调用和采集
+事件循环上同时运行的其他请求和后台任务也会计入剖析结果；同一进程同时只剖析一个请求（其余请求照常处理，不剖析）。
+结果通过 /api/internal/profiles 列出和下载。
+"""
+import asyncio
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+# 剖析结果文件：类型 -> 扩展名
+PROFILE_FILES = {
+    "cpu": ".prof",
+    "stacks": ".folded",
+    "alloc": ".alloc.txt",
+    "snapshot": ".tracemalloc",
+}
+_PROFILE_ID_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+
+# 同一进程同时只剖析一个请求（cProfile和tracemalloc都是进程/线程级的）
+_active_lock = threading.Lock()
+
+
+def _sampled_routes() -> List[str]:
+    return [route.strip() for route in settings.PROFILING_ROUTES.split(",") if route.strip()]
+
+
+def should_profile(headers: Dict[bytes, bytes], route: str) -> Optional[str]:
+    """
+    判断请求是否需要剖析
+
+    Returns:
+        触发原因（header / sampled），不剖析时返回None
+    """
+    token = headers.get(PROFILE_HEADER, b"").decode("latin-1")
+    if token and settings.INTERNAL_API_TOKEN and hmac.compare_digest(token, settings.INTERNAL_API_TOKEN):
+        return "header"
+    if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+        routes = _sampled_routes()
+        if not routes or route in routes:
+            return "sampled"
+    return None
+
+
+class _StackSampler:
+    """后台线程定时采样全部线程的调用栈，汇总为折叠栈（线程名;外层函数;...;内层函数 次数）"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                # 只记录代码对象（函数粒度），结束后再格式化：开启tracemalloc时每次分配都要记录调用栈，采样线程分配越少对请求影响越小
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                self.counts[(ident, tuple(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        lines = []
+        for (ident, stack), count in self.counts.most_common():
+            frames = [names.get(ident, str(ident))]
+            frames.extend(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})" for code in reversed(stack)
+            )
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestProfile:
+    """一次请求的剖析（start/stop之间的CPU剖析和内存分配）"""
+
+    def __init__(self, method: str, path: str, route: str, reason: str):
+        self.id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.route = route
+        self.reason = reason
+        self.mode = settings.PROFILING_MODE.lower()
+        self.status_code: Optional[int] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_StackSampler] = None
+        self._started_tracemalloc = False
+        self._baseline = None
+        self._snapshot = None
+        self._started = 0.0
+        self.duration_ms = 0.0
+        self.request_id: Optional[str] = None
+        self.trace_id: Optional[str] = None
+
+    def start(self):
+        if settings.PROFILING_TRACEMALLOC:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+        if self.mode == "sampling":
+            self._sampler = _StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+            self._sampler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        from app.utils.logging_config import get_context
+        from app.utils.tracing import current_trace_id
+
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        self.request_id = get_context().get("request_id")
+        self.trace_id = current_trace_id()
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._baseline is not None:
+            self._snapshot = tracemalloc.take_snapshot()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+    def _allocation_report(self) -> str:
+        """按代码行汇总请求期间新增的内存分配（与开始时的快照比较）"""
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        snapshot = self._snapshot.filter_traces(filters)
+        baseline = self._baseline.filter_traces(filters)
+        stats = snapshot.compare_to(baseline, "lineno")
+        total = sum(stat.size_diff for stat in stats)
+        lines = [
+            f"{self.method} {self.path}（{self.route}） {self.duration_ms}ms",
+            f"新增分配合计: {total / 1024:.1f} KiB",
+            ""
+        ]
+        for stat in stats[:settings.PROFILING_TOP_ALLOCATIONS]:
+            lines.append(str(stat))
+        return "\n".join(lines) + "\n"
+
+    def save(self, directory: str) -> Dict:
+        """写出剖析结果和元数据（在线程中调用，避免阻塞事件循环）"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        files = {}
+        if self._profiler is not None:
+            self._profiler.dump_stats(base + PROFILE_FILES["cpu"])
+            files["cpu"] = self.id + PROFILE_FILES["cpu"]
+        if self._sampler is not None:
+            with open(base + PROFILE_FILES["stacks"], "w", encoding="utf-8") as handle:
+                handle.write(self._sampler.folded())
+            files["stacks"] = self.id + PROFILE_FILES["stacks"]
+        if self._snapshot is not None:
+            with open(base + PROFILE_FILES["alloc"], "w", encoding="utf-8") as handle:
+                handle.write(self._allocation_report())
+            files["alloc"] = self.id + PROFILE_FILES["alloc"]
+            self._snapshot.dump(base + PROFILE_FILES["snapshot"])
+            files["snapshot"] = self.id + PROFILE_FILES["snapshot"]
+
+        meta = {
+            "id": self.id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "reason": self.reason,
+            "mode": self.mode,
+            "samples": self._sampler.samples if self._sampler is not None else None,
+            "request_id": self.request_id,
+            "trace_id": self.trace_id,
+            "files": files,
+        }
+        with open(base + ".json", "w", encoding="utf-8") as handle:
+            json.dump(meta, handle, ensure_ascii=False, indent=2)
+        _prune(directory, settings.PROFILING_MAX_PROFILES)
+        return meta
+
+
+def _prune(directory: str, keep: int):
+    """只保留最近keep个剖析结果"""
+    profile_ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+    for profile_id in profile_ids[:-keep] if keep > 0 else []:
+        for suffix in list(PROFILE_FILES.values()) + [".json"]:
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(limit: int = 50, route: Optional[str] = None) -> List[Dict]:
+    """已保存的剖析结果（新的在前）"""
+    directory = settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    results = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        if route and meta.get("route") != route:
+            continue
+        results.append(meta)
+        if len(results) >= limit:
+            break
+    return results
+
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(settings.PROFILING_DIR, profile_id + ".json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def profile_file_path(profile_id: str, kind: str) -> Optional[str]:
+    """剖析结果文件路径（ID或类型不合法、文件不存在时返回None）"""
+    if kind not in PROFILE_FILES or not _PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(settings.PROFILING_DIR, profile_id + PROFILE_FILES[kind])
+    return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    请求剖析中间件（纯ASGI实现）：剖析到响应体发送完毕为止（SSE等流式响应覆盖整个流），
+    被剖析的请求响应头返回X-Profile-Id
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from app.utils.metrics import route_template
+
+        route = route_template(scope)
+        reason = should_profile(dict(scope.get("headers") or []), route)
+        if reason is None or not _active_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope.get("method", "GET"), scope.get("path", ""), route, reason)
+        stopped = False
+
+        def finish():
+            nonlocal stopped
+            if not stopped:
+                stopped = True
+                profile.stop()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode("latin-1"))]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+            await send(message)
+
+        try:
+            profile.start()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _active_lock.release()
+            # 在线程池中写文件，不等待写完（请求被取消时也能保存）
+            asyncio.get_running_loop().run_in_executor(None, _save_profile, profile)
+
+
+def _save_profile(profile: RequestProfile):
+    try:
+        meta = profile.save(settings.PROFILING_DIR)
+        logger.info("请求剖析已保存: %s %s %.0fms", meta["id"], profile.route, profile.duration_ms)
+    except Exception as e:
+        logger.warning("保存请求剖析失败: %s", e)
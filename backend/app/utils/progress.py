@@ -0,0 +1,274 @@
+"""
+进度事件发布/订阅（用于SSE推送长时间操作的进度）
+- 每个操作一个ProgressChannel，事件带自增ID，保存在固定大小的环形缓冲区中；
+  订阅者只持有读取位置，不各自排队，慢客户端不会占用额外内存（落后超过缓冲区时跳到最新事件）
+- 发布时唤醒等待中的订阅者，没有新事件时不轮询；空闲时按心跳间隔发送注释行保活
+- 支持Last-Event-ID断线续传：从缓冲区中该ID之后的事件继续推送，缓冲区已不包含时从最新事件开始
+- 检测客户端断开，由调用方决定中止操作还是让操作在后台继续执行
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+
+
+class ProgressEvent:
+    """一条进度事件"""
+
+    __slots__ = ("id", "data", "event")
+
+    def __init__(self, event_id: int, data: Dict, event: Optional[str] = None):
+        self.id = event_id
+        self.data = data
+        self.event = event
+
+    def to_sse(self) -> str:
+        return format_sse(self.data, self.id, self.event)
+
+
+def format_sse(data: Dict, event_id: Optional[int] = None, event: Optional[str] = None) -> str:
+    """格式化为SSE消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+SSE_HEARTBEAT = ": ping\n\n"
+
+
+class ProgressChannel:
+    """单个操作的进度通道"""
+
+    def __init__(self, key: str, buffer_size: int):
+        self.key = key
+        self.closed = False
+        self.subscribers = 0
+        self.updated_at = time.monotonic()
+        self._events: deque = deque(maxlen=max(1, buffer_size))
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    @property
+    def last_event_id(self) -> int:
+        return self._next_id - 1
+
+    def latest(self) -> Optional[ProgressEvent]:
+        with self._lock:
+            return self._events[-1] if self._events else None
+
+    def publish(self, data: Dict, event: Optional[str] = None, dedupe: bool = True) -> Optional[int]:
+        """
+        发布事件（线程安全）
+
+        Args:
+            data: 事件数据（需可JSON序列化）
+            event: SSE事件类型（None表示默认message）
+            dedupe: 与最新事件内容相同时不发布
+
+        Returns:
+            事件ID（通道已关闭或被去重时返回None）
+        """
+        with self._lock:
+            if self.closed:
+                return None
+            if dedupe and self._events and self._events[-1].data == data and self._events[-1].event == event:
+                return None
+            item = ProgressEvent(self._next_id, data, event)
+            self._next_id += 1
+            self._events.append(item)
+            self.updated_at = time.monotonic()
+        self._wake()
+        return item.id
+
+    def close(self, data: Optional[Dict] = None, event: Optional[str] = None):
+        """发布最后一条事件并关闭通道（订阅者收完缓冲区后结束）"""
+        if data is not None:
+            self.publish(data, event)
+        with self._lock:
+            self.closed = True
+            self.updated_at = time.monotonic()
+        self._wake()
+
+    def _wake(self):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._resolve_waiter()
+        else:
+            loop.call_soon_threadsafe(self._resolve_waiter)
+
+    def _resolve_waiter(self):
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _events_after(self, cursor: int) -> List[ProgressEvent]:
+        with self._lock:
+            return [item for item in self._events if item.id > cursor]
+
+    def _start_cursor(self, last_event_id: Optional[int]) -> int:
+        """计算订阅起点：续传时从last_event_id之后开始，否则（或已不在缓冲区内）从最新事件开始"""
+        with self._lock:
+            if not self._events:
+                return 0
+            oldest = self._events[0].id
+            latest = self._events[-1].id
+        if last_event_id is not None and oldest - 1 <= last_event_id <= latest:
+            return last_event_id
+        return latest - 1
+
+    async def subscribe(
+        self,
+        last_event_id: Optional[int] = None,
+        heartbeat: Optional[float] = None
+    ) -> AsyncIterator[Optional[ProgressEvent]]:
+        """
+        订阅事件，通道关闭且事件发送完后结束
+
+        Args:
+            last_event_id: 客户端已收到的最后一个事件ID（断线续传）
+            heartbeat: 空闲多久（秒）产出一次None，供调用方发送心跳和检查连接
+
+        Yields:
+            ProgressEvent，空闲超时时为None
+        """
+        self._loop = asyncio.get_running_loop()
+        cursor = self._start_cursor(last_event_id)
+        self.subscribers += 1
+        try:
+            while True:
+                events = self._events_after(cursor)
+                if events and events[0].id > cursor + 1:
+                    # 落后超过缓冲区：跳到最新事件
+                    events = events[-1:]
+                for item in events:
+                    cursor = item.id
+                    yield item
+                if events:
+                    continue
+                if self.closed:
+                    return
+
+                if self._waiter is None or self._waiter.done():
+                    self._waiter = self._loop.create_future()
+                waiter = self._waiter
+                # 创建等待后再检查一次，避免错过刚发布的事件
+                if self._events_after(cursor) or self.closed:
+                    continue
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.subscribers -= 1
+            self.updated_at = time.monotonic()
+
+
+class ProgressBroker:
+    """进度通道注册表（进程内），定期清理已结束或长时间无人使用的通道"""
+
+    def __init__(self, buffer_size: Optional[int] = None, retention_seconds: Optional[float] = None):
+        self.buffer_size = buffer_size or settings.PROGRESS_BUFFER_SIZE
+        self.retention_seconds = settings.PROGRESS_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        self._channels: Dict[str, ProgressChannel] = {}
+        self._lock = threading.Lock()
+
+    def channel(self, key: str, create: bool = True) -> Optional[ProgressChannel]:
+        """获取通道（不存在时按需创建；已关闭的通道在保留期内仍可用于续传）"""
+        with self._lock:
+            self._prune()
+            channel = self._channels.get(key)
+            if channel is None and create:
+                channel = ProgressChannel(key, self.buffer_size)
+                self._channels[key] = channel
+            return channel
+
+    def publish(self, key: str, data: Dict, event: Optional[str] = None) -> Optional[int]:
+        return self.channel(key).publish(data, event)
+
+    def close(self, key: str, data: Optional[Dict] = None, event: Optional[str] = None):
+        self.channel(key).close(data, event)
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            key for key, channel in self._channels.items()
+            if channel.subscribers == 0 and now - channel.updated_at > self.retention_seconds
+        ]
+        for key in expired:
+            del self._channels[key]
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "subscribers": sum(channel.subscribers for channel in self._channels.values())
+            }
+
+
+# 进程内全局进度通道
+broker = ProgressBroker()
+
+
+async def sse_stream(
+    channel: ProgressChannel,
+    request=None,
+    last_event_id: Optional[int] = None,
+    initial: Optional[List[Dict]] = None,
+    heartbeat: Optional[float] = None,
+    on_disconnect: Optional[Callable[[], Awaitable[None]]] = None
+) -> AsyncIterator[str]:
+    """
+    将进度通道转换为SSE消息流（用于StreamingResponse）
+
+    Args:
+        channel: 进度通道
+        request: 当前请求（心跳时检查客户端是否已断开）
+        last_event_id: 请求头Last-Event-ID（断线续传）
+        initial: 连接建立后首先发送的事件（不带ID，不参与续传）
+        heartbeat: 心跳间隔（秒，默认Settings.SSE_HEARTBEAT_SECONDS）
+        on_disconnect: 客户端在通道结束前断开时调用（如取消操作）；为None时操作在后台继续
+    """
+    heartbeat = heartbeat or settings.SSE_HEARTBEAT_SECONDS
+    finished = False
+    try:
+        for data in initial or []:
+            yield format_sse(data)
+        async for item in channel.subscribe(last_event_id, heartbeat=heartbeat):
+            if item is None:
+                if request is not None and await request.is_disconnected():
+                    break
+                yield SSE_HEARTBEAT
+                continue
+            yield item.to_sse()
+        else:
+            finished = True
+    finally:
+        # 客户端断开时服务器会取消/关闭生成器，同样走到这里
+        if not finished and on_disconnect is not None:
+            try:
+                await asyncio.shield(on_disconnect())
+            except BaseException:
+                pass
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    """解析请求头Last-Event-ID（非法值视为未提供）"""
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
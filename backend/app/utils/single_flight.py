@@ -0,0 +1,218 @@
+"""
+合并相同的并发请求（single-flight）
+同一输入（归一化后的键）同时只执行一次，其余调用等待并共享结果：
+- 进程内：同一个键正在执行时，后来的调用直接等待其结果
+- 跨进程：按键加文件锁（fcntl），持有锁的进程执行并把结果写入结果文件；
+  其他进程等待锁释放后读取结果文件，不再重复执行（结果需可JSON序列化）
+执行失败时不共享异常：进程内等待者收到同一异常，其他进程的等待者自行执行
+（Windows下没有fcntl，退化为仅进程内合并）
+"""
+import asyncio
+import concurrent.futures
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.config import settings
+from app.utils.metrics import Counter, Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 等待其他进程释放锁时的轮询间隔（秒）
+LOCK_POLL_INTERVAL = 0.2
+
+_registry: Dict[str, "SingleFlight"] = {}
+
+
+class _LeaderCancelled(Exception):
+    """执行中的调用被取消（等待者改为自行执行）"""
+
+
+def flight_key(*parts: Any) -> str:
+    """由输入参数生成合并键（参数需可JSON序列化，字典按键排序）"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class SingleFlight:
+    """按键合并并发执行的异步调用"""
+
+    def __init__(
+        self,
+        name: str,
+        lock_dir: Optional[str] = None,
+        result_ttl: Optional[float] = None,
+        wait_timeout: Optional[float] = None
+    ):
+        """
+        Args:
+            name: 名称（区分不同用途，也是锁文件子目录名）
+            lock_dir: 锁文件和结果文件目录（默认Settings.SINGLE_FLIGHT_DIR，为空时只做进程内合并）
+            result_ttl: 结果文件的复用时间（秒），刚执行完的结果在该时间内直接复用
+            wait_timeout: 等待其他进程的最长时间（秒），超时后自行执行
+        """
+        self.name = name
+        base_dir = settings.SINGLE_FLIGHT_DIR if lock_dir is None else lock_dir
+        self.directory = os.path.join(base_dir, name) if base_dir and fcntl else None
+        self.result_ttl = settings.SINGLE_FLIGHT_RESULT_TTL if result_ttl is None else result_ttl
+        self.wait_timeout = settings.SINGLE_FLIGHT_WAIT_TIMEOUT if wait_timeout is None else wait_timeout
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "shared_local": 0, "shared_remote": 0, "errors": 0}
+        _registry[name] = self
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        on_wait: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> Any:
+        """
+        执行func，相同key的并发调用只执行一次
+
+        Args:
+            key: 合并键（建议使用flight_key生成）
+            func: 无参异步函数
+            on_wait: 需要等待其他调用的结果时回调一次（如上报"等待相同任务完成"的进度）
+
+        Returns:
+            func的返回值（等待者拿到的是副本）
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+
+        if not leader:
+            if on_wait:
+                await on_wait()
+            try:
+                # shield：等待者被取消不影响正在执行的调用
+                result = await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                return await self.do(key, func, on_wait)
+            self.stats["shared_local"] += 1
+            return copy.deepcopy(result)
+
+        try:
+            result = await self._run_locked(key, func, on_wait)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _run_locked(self, key: str, func: Callable[[], Awaitable[Any]], on_wait) -> Any:
+        """跨进程合并：持有文件锁执行，或等待持有者写出结果"""
+        if not self.directory:
+            self.stats["executed"] += 1
+            return await func()
+
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        lock_path = os.path.join(self.directory, f"{digest}.lock")
+        result_path = os.path.join(self.directory, f"{digest}.json")
+
+        started = time.time()
+        waited = False
+        with open(lock_path, 'a+') as handle:
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.time() - started >= self.wait_timeout:
+                        logger.warning("[%s] 等待其他进程超时，自行执行", self.name)
+                        self.stats["executed"] += 1
+                        return await func()
+                    if not waited:
+                        waited = True
+                        if on_wait:
+                            await on_wait()
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+            try:
+                # 等待期间（或刚刚）其他进程已完成同样的调用，直接复用结果
+                cached = self._read_result(result_path, key, started if waited else None)
+                if cached is not None:
+                    self.stats["shared_remote"] += 1
+                    return cached["result"]
+
+                self.stats["executed"] += 1
+                result = await func()
+                self._write_result(result_path, key, result)
+                return result
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_result(self, path: str, key: str, waited_since: Optional[float]) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != key:
+            return None
+        created = data.get("created_at", 0)
+        fresh = time.time() - created <= self.result_ttl
+        if waited_since is not None and created >= waited_since:
+            fresh = True  # 在等待期间产生的结果
+        return data if fresh else None
+
+    def _write_result(self, path: str, key: str, result: Any):
+        """原子写入结果文件（先写临时文件再替换）"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"key": key, "created_at": time.time(), "result": result}, f,
+                          ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("[%s] 结果无法共享给其他进程: %s", self.name, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def status(self) -> Dict:
+        return {"name": self.name, "inflight": len(self._inflight), **self.stats}
+
+
+def all_flight_status() -> Dict[str, Dict]:
+    """各合并器的执行/共享次数（shared_*越高，节省的上游调用越多）"""
+    return {name: flight.status() for name, flight in _registry.items()}
+
+
+# 抓取指标时导出各合并器的统计（shared_*即命中已有结果的次数）
+_FLIGHT_CALLS = Counter("single_flight_calls", "相同请求合并调用次数（result: executed/shared_local/shared_remote/errors）", ("name", "result"))
+_FLIGHT_INFLIGHT = Gauge("single_flight_inflight", "进程内执行中的合并键数", ("name",))
+
+
+def _collect_flight_metrics():
+    calls, inflight = [], []
+    for name, status in all_flight_status().items():
+        for result in ("executed", "shared_local", "shared_remote", "errors"):
+            calls.append(("_total", {"name": name, "result": result}, status[result]))
+        inflight.append(("", {"name": name}, status["inflight"]))
+    return [(_FLIGHT_CALLS, calls), (_FLIGHT_INFLIGHT, inflight)]
+
+
+registry.add_collector(_collect_flight_metrics)
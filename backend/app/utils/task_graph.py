@@ -0,0 +1,175 @@
+"""
+子任务依赖图（DAG）执行器
+- 节点声明依赖后，依赖全部完成的节点立即开始，互不依赖的节点并发执行（并发数有上限）
+- 每个节点可单独设置超时；失败/超时的节点不影响无关分支
+- 依赖失败时节点默认跳过；allow_partial=True的节点（如汇总节点）只接收成功的依赖结果继续执行
+- 记录每个节点的开始时间、耗时和状态，便于分析瓶颈
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 节点状态
+NODE_SUCCEEDED = "succeeded"
+NODE_FAILED = "failed"
+NODE_TIMEOUT = "timeout"
+NODE_SKIPPED = "skipped"
+
+NodeFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class TaskGraphError(ValueError):
+    """任务图定义错误（依赖不存在、存在环、节点重名）"""
+
+
+class TaskNode:
+    """任务图节点"""
+
+    def __init__(
+        self,
+        name: str,
+        func: NodeFunc,
+        deps: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        allow_partial: bool = False
+    ):
+        """
+        Args:
+            name: 节点名称（结果和跟踪信息以此为键）
+            func: 异步函数，参数为依赖节点的结果字典 {依赖名: 结果}
+            deps: 依赖的节点名称
+            timeout: 超时时间（秒），None表示使用任务图默认值
+            allow_partial: 依赖部分失败时仍然执行（只传入成功的依赖结果）
+        """
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.timeout = timeout
+        self.allow_partial = allow_partial
+
+
+class TaskGraph:
+    """子任务依赖图"""
+
+    def __init__(self, max_parallel: int = 4, default_timeout: Optional[float] = None):
+        """
+        Args:
+            max_parallel: 同时执行的节点数上限
+            default_timeout: 节点默认超时时间（秒，None表示不限制）
+        """
+        self.max_parallel = max(1, max_parallel)
+        self.default_timeout = default_timeout
+        self.nodes: Dict[str, TaskNode] = {}
+
+    def add(
+        self,
+        name: str,
+        func: NodeFunc,
+        deps: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        allow_partial: bool = False
+    ) -> "TaskGraph":
+        """添加节点（返回自身，便于链式调用）"""
+        if name in self.nodes:
+            raise TaskGraphError(f"节点重名: {name}")
+        self.nodes[name] = TaskNode(name, func, deps, timeout, allow_partial)
+        return self
+
+    def validate(self):
+        """检查依赖是否存在以及是否有环"""
+        for node in self.nodes.values():
+            for dep in node.deps:
+                if dep not in self.nodes:
+                    raise TaskGraphError(f"节点 {node.name} 依赖不存在的节点 {dep}")
+
+        # 拓扑排序检测环
+        indegree = {name: len(node.deps) for name, node in self.nodes.items()}
+        ready = [name for name, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for node in self.nodes.values():
+                if current in node.deps:
+                    indegree[node.name] -= 1
+                    if indegree[node.name] == 0:
+                        ready.append(node.name)
+        if visited != len(self.nodes):
+            raise TaskGraphError("任务图存在循环依赖")
+
+    async def run(self) -> Dict:
+        """
+        执行任务图
+
+        Returns:
+            {"results": {节点: 结果}（只含成功的节点）,
+             "errors": {节点: 错误信息},
+             "trace": {"total_ms", "max_parallel", "nodes": [{name, status, deps, start_ms, duration_ms, error}]}}
+        """
+        self.validate()
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        started = time.perf_counter()
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        trace: Dict[str, Dict] = {}
+        done_events = {name: asyncio.Event() for name in self.nodes}
+
+        def elapsed_ms() -> float:
+            return round((time.perf_counter() - started) * 1000, 1)
+
+        async def run_node(node: TaskNode):
+            record = {"name": node.name, "status": None, "deps": node.deps,
+                      "start_ms": None, "duration_ms": None, "error": None}
+            trace[node.name] = record
+            try:
+                for dep in node.deps:
+                    await done_events[dep].wait()
+
+                failed_deps = [dep for dep in node.deps if dep not in results]
+                if failed_deps and (not node.allow_partial or len(failed_deps) == len(node.deps)):
+                    record["status"] = NODE_SKIPPED
+                    record["error"] = f"依赖未完成: {', '.join(failed_deps)}"
+                    errors[node.name] = record["error"]
+                    return
+
+                inputs = {dep: results[dep] for dep in node.deps if dep in results}
+                timeout = node.timeout if node.timeout is not None else self.default_timeout
+                async with semaphore:
+                    record["start_ms"] = elapsed_ms()
+                    node_started = time.perf_counter()
+                    try:
+                        results[node.name] = await asyncio.wait_for(node.func(inputs), timeout=timeout)
+                        record["status"] = NODE_SUCCEEDED
+                    except asyncio.TimeoutError:
+                        record["status"] = NODE_TIMEOUT
+                        record["error"] = f"超时（{timeout}秒）"
+                    except Exception as e:
+                        record["status"] = NODE_FAILED
+                        record["error"] = str(e) or type(e).__name__
+                    finally:
+                        record["duration_ms"] = round((time.perf_counter() - node_started) * 1000, 1)
+                if record["error"]:
+                    errors[node.name] = record["error"]
+                    logger.warning("子任务 %s %s: %s", node.name, record['status'], record['error'])
+            finally:
+                done_events[node.name].set()
+
+        await asyncio.gather(*(run_node(node) for node in self.nodes.values()))
+
+        return {
+            "results": results,
+            "errors": errors,
+            "trace": {
+                "total_ms": elapsed_ms(),
+                "max_parallel": self.max_parallel,
+                # 按开始时间排序，跳过的节点排在最后
+                "nodes": sorted(
+                    trace.values(),
+                    key=lambda item: (item["start_ms"] is None, item["start_ms"] or 0)
+                )
+            }
+        }
+
@@ -0,0 +1,532 @@
+"""
+链路追踪（span）
+- 安装了opentelemetry-sdk时使用OpenTelemetry（可导出到console、本地文件或OTLP），否则使用内置实现（console或本地JSONL文件）
+- 埋点：HTTP请求（TracingMiddleware）、后台任务执行、LLM调用、采集HTTP请求、SQL语句和会话提交
+- trace_id随请求头traceparent（W3C Trace Context）传入、写入响应头X-Trace-Id，并通过任务记录传递到worker，
+  出现在SSE进度事件中，用于把一次报告生成的耗时按采集/LLM/数据库拆开
+- TRACING_EXPORTER为空时只生成trace_id用于关联，不记录span（开销可忽略）
+"""
+import asyncio
+import functools
+import importlib.util
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OTEL_AVAILABLE = importlib.util.find_spec("opentelemetry") is not None and \
+    importlib.util.find_spec("opentelemetry.sdk") is not None
+
+# span类型（与OpenTelemetry SpanKind对应）
+KIND_INTERNAL = "internal"
+KIND_SERVER = "server"
+KIND_CLIENT = "client"
+KIND_CONSUMER = "consumer"
+
+# SQL语句在span属性中的最大长度
+STATEMENT_MAX_LENGTH = 500
+# 内置导出队列长度（满时丢弃，不阻塞业务）
+EXPORT_QUEUE_SIZE = 10000
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """解析W3C traceparent（00-{trace_id}-{span_id}-{flags}），返回(trace_id, span_id, sampled)，非法时返回None"""
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+# ---------- 内置实现 ----------
+
+class Span:
+    """内置span（接口与OpenTelemetry span的常用方法一致）"""
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "sampled", "attributes",
+                 "start_time", "_started", "duration_ms", "status", "error", "_exporter")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 attributes: Optional[Dict] = None, exporter=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = dict(attributes) if attributes and sampled else {}
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._exporter = exporter
+
+    @property
+    def traceparent(self) -> str:
+        return format_traceparent(self.trace_id, self.span_id, self.sampled)
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict):
+        if self.sampled:
+            self.attributes.update(attributes)
+
+    def record_exception(self, error: BaseException):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"[:1000]
+
+    def end(self):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        if self.sampled and self._exporter is not None:
+            self._exporter.export(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": datetime.fromtimestamp(self.start_time, tz=timezone.utc).isoformat(timespec="microseconds"),
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "pid": os.getpid()
+        }
+
+
+class _QueueExporter:
+    """后台线程批量写出span（业务线程只入队，队列满时丢弃）"""
+
+    def __init__(self, target: str, path: Optional[str] = None):
+        self.target = target
+        self.path = path
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        handle = None
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = ''.join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n' for span in batch if span is not None)
+            try:
+                if self.target == "file":
+                    if handle is None:
+                        directory = os.path.dirname(self.path)
+                        if directory:
+                            os.makedirs(directory, exist_ok=True)
+                        handle = open(self.path, 'a', encoding='utf-8')
+                    handle.write(lines)
+                    handle.flush()
+                else:
+                    sys.stderr.write(lines)
+                    sys.stderr.flush()
+            except Exception as e:
+                logger.warning("写出追踪数据失败: %s", e)
+            if stop:
+                if handle is not None:
+                    handle.close()
+                return
+
+    def shutdown(self, timeout: float = 5):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+class _BuiltinBackend:
+    """内置追踪实现"""
+
+    def __init__(self, exporter: Optional[_QueueExporter], sample_rate: float):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    def start_span(self, name: str, attributes: Optional[Dict] = None, kind: str = KIND_INTERNAL,
+                   parent: Optional[str] = None) -> Span:
+        remote = parse_traceparent(parent)
+        current = self._current.get()
+        if remote is not None:
+            trace_id, parent_id, sampled = remote
+            sampled = sampled and self.exporter is not None
+        elif current is not None:
+            trace_id, parent_id, sampled = current.trace_id, current.span_id, current.sampled
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = self.exporter is not None and random.random() < self.sample_rate
+        return Span(name, kind, trace_id, parent_id, sampled, attributes, self.exporter)
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict] = None, kind: str = KIND_INTERNAL,
+             parent: Optional[str] = None) -> Iterator[Span]:
+        item = self.start_span(name, attributes, kind, parent)
+        token = self._current.set(item)
+        try:
+            yield item
+        except BaseException as e:
+            if not isinstance(e, (GeneratorExit, asyncio.CancelledError)):
+                item.record_exception(e)
+            raise
+        finally:
+            self._current.reset(token)
+            item.end()
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+# ---------- OpenTelemetry实现 ----------
+
+class _OTelSpan:
+    """OpenTelemetry span适配（提供与内置Span相同的属性）"""
+
+    __slots__ = ("_span",)
+
+    def __init__(self, span):
+        self._span = span
+
+    @property
+    def trace_id(self) -> str:
+        return f"{self._span.get_span_context().trace_id:032x}"
+
+    @property
+    def span_id(self) -> str:
+        return f"{self._span.get_span_context().span_id:016x}"
+
+    @property
+    def sampled(self) -> bool:
+        return self._span.get_span_context().trace_flags.sampled
+
+    @property
+    def traceparent(self) -> str:
+        return format_traceparent(self.trace_id, self.span_id, self.sampled)
+
+    def set_attribute(self, key: str, value: Any):
+        self._span.set_attribute(key, value)
+
+    def set_attributes(self, attributes: Dict):
+        self._span.set_attributes(attributes)
+
+    def record_exception(self, error: BaseException):
+        from opentelemetry.trace import Status, StatusCode
+        self._span.record_exception(error)
+        self._span.set_status(Status(StatusCode.ERROR, str(error)))
+
+    def end(self):
+        self._span.end()
+
+
+class _OTelBackend:
+    """使用OpenTelemetry SDK（导出器：console / file / otlp）"""
+
+    def __init__(self, target: str, path: str, sample_rate: float):
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        self._trace = trace
+        self.provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(sample_rate)))
+        if target == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter()  # 地址等通过OTEL_EXPORTER_OTLP_*环境变量配置
+        elif target == "file":
+            exporter = _otel_file_exporter(path)
+        else:
+            exporter = ConsoleSpanExporter()
+        self.provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(self.provider)
+        self.tracer = self.provider.get_tracer("sports-news")
+
+    def current(self) -> Optional[_OTelSpan]:
+        span = self._trace.get_current_span()
+        return _OTelSpan(span) if span.get_span_context().is_valid else None
+
+    def _context(self, parent: Optional[str]):
+        if not parse_traceparent(parent):
+            return None
+        from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+        return TraceContextTextMapPropagator().extract({"traceparent": parent})
+
+    def _kind(self, kind: str):
+        from opentelemetry.trace import SpanKind
+        return getattr(SpanKind, kind.upper(), SpanKind.INTERNAL)
+
+    def start_span(self, name: str, attributes: Optional[Dict] = None, kind: str = KIND_INTERNAL,
+                   parent: Optional[str] = None) -> _OTelSpan:
+        return _OTelSpan(self.tracer.start_span(
+            name, context=self._context(parent), kind=self._kind(kind), attributes=attributes
+        ))
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict] = None, kind: str = KIND_INTERNAL,
+             parent: Optional[str] = None) -> Iterator[_OTelSpan]:
+        with self.tracer.start_as_current_span(
+            name, context=self._context(parent), kind=self._kind(kind), attributes=attributes
+        ) as span:
+            yield _OTelSpan(span)
+
+    def shutdown(self):
+        self.provider.shutdown()
+
+
+def _otel_file_exporter(path: str):
+    """OpenTelemetry的JSONL文件导出器"""
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class FileSpanExporter(SpanExporter):
+        def __init__(self):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._handle = open(path, 'a', encoding='utf-8')
+            self._lock = threading.Lock()
+
+        def export(self, spans):
+            with self._lock:
+                for span in spans:
+                    self._handle.write(span.to_json(indent=None) + '\n')
+                self._handle.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            self._handle.close()
+
+    return FileSpanExporter()
+
+
+# ---------- 全局入口 ----------
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                target = (settings.TRACING_EXPORTER or "").lower()
+                rate = max(0.0, min(1.0, settings.TRACING_SAMPLE_RATE))
+                if target in ("console", "file", "otlp") and OTEL_AVAILABLE:
+                    _backend = _OTelBackend(target, settings.TRACING_FILE, rate)
+                elif target in ("console", "file"):
+                    _backend = _BuiltinBackend(_QueueExporter(target, settings.TRACING_FILE), rate)
+                else:
+                    if target:
+                        logger.warning("追踪导出器 %s 不可用（otlp需要安装opentelemetry-sdk），只生成trace_id", target)
+                    _backend = _BuiltinBackend(None, rate)
+    return _backend
+
+
+def span(name: str, attributes: Optional[Dict] = None, kind: str = KIND_INTERNAL, parent: Optional[str] = None):
+    """
+    创建span并设为当前span（上下文管理器，同步/异步代码均可使用；异常会记录到span后继续抛出）
+
+    Args:
+        name: span名称（如llm.call、http.fetch）
+        attributes: 属性
+        kind: span类型（internal/server/client/consumer）
+        parent: 远程父span的traceparent（如请求头、任务记录中保存的值），为空时以当前span为父
+    """
+    return _get_backend().span(name, attributes, kind, parent)
+
+
+def start_span(name: str, attributes: Optional[Dict] = None, kind: str = KIND_INTERNAL):
+    """创建子span但不设为当前span（用于回调式埋点，如SQL执行前后事件），需要调用end()"""
+    return _get_backend().start_span(name, attributes, kind)
+
+
+def current_span():
+    return _get_backend().current()
+
+
+def current_trace_id() -> Optional[str]:
+    item = current_span()
+    return item.trace_id if item is not None else None
+
+
+def current_traceparent() -> Optional[str]:
+    item = current_span()
+    return item.traceparent if item is not None else None
+
+
+def is_recording() -> bool:
+    """当前span是否会被导出（未采样时跳过高频的SQL等埋点）"""
+    item = current_span()
+    return item is not None and item.sampled
+
+
+def traced(name: Optional[str] = None, kind: str = KIND_INTERNAL):
+    """函数级span装饰器（支持同步和异步函数）"""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind=kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind=kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def shutdown_tracing():
+    """写出尚未导出的span（应用关闭时调用）"""
+    if _backend is not None:
+        _backend.shutdown()
+
+
+# ---------- SQLAlchemy埋点 ----------
+
+def instrument_engine_tracing(engine, name: str):
+    """为引擎的每条SQL创建子span（仅在当前请求/任务被采样时）"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        item = None
+        if is_recording():
+            item = start_span("db.query", {
+                "db.system": engine.dialect.name,
+                "db.engine": name,
+                "db.statement": " ".join(statement.split())[:STATEMENT_MAX_LENGTH]
+            }, kind=KIND_CLIENT)
+        conn.info.setdefault("trace_spans", []).append(item)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("trace_spans")
+        item = stack.pop() if stack else None
+        if item is not None:
+            item.set_attribute("db.rowcount", getattr(cursor, "rowcount", -1))
+            item.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        stack = context.connection.info.get("trace_spans") if context.connection is not None else None
+        item = stack.pop() if stack else None
+        if item is not None:
+            item.record_exception(context.original_exception)
+            item.end()
+
+    return engine
+
+
+def instrument_session_tracing(session_class):
+    """会话提交（flush + commit）的span"""
+    from sqlalchemy import event
+
+    @event.listens_for(session_class, "before_commit")
+    def _before_commit(session):
+        if is_recording():
+            session.info["trace_commit_span"] = start_span("db.commit", kind=KIND_CLIENT)
+
+    def _finish(session, error: Optional[str] = None):
+        item = session.info.pop("trace_commit_span", None)
+        if item is not None:
+            if error:
+                item.set_attribute("db.rollback", True)
+            item.end()
+
+    @event.listens_for(session_class, "after_commit")
+    def _after_commit(session):
+        _finish(session)
+
+    @event.listens_for(session_class, "after_soft_rollback")
+    def _after_rollback(session, previous_transaction):
+        _finish(session, "rollback")
+
+
+# ---------- HTTP中间件 ----------
+
+class TracingMiddleware:
+    """
+    请求span中间件（纯ASGI实现）：继续请求头traceparent中的链路，响应头返回X-Trace-Id
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from app.utils.metrics import route_template
+
+        method = scope.get("method", "GET")
+        route = route_template(scope)
+        headers = dict(scope.get("headers") or [])
+        parent = headers.get(b"traceparent", b"").decode("latin-1") or None
+
+        with span(f"{method} {route}", {
+            "http.method": method,
+            "http.route": route,
+            "http.target": scope.get("path", "")
+        }, kind=KIND_SERVER, parent=parent) as item:
+            trace_header = item.trace_id.encode("latin-1")
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    item.set_attribute("http.status_code", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace_header)]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
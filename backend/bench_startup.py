@@ -0,0 +1,120 @@
+"""
+应用启动耗时基准测试
+在全新的Python进程中多次导入app.main，统计导入耗时，并检查耗时依赖是否被提前加载
+框架本身（FastAPI、SQLAlchemy、pydantic）的导入耗时与机器性能相关且无法优化，单独统计；
+预算只约束应用自身代码的导入耗时。超出预算或加载了不应在启动时导入的模块时返回非0退出码（可用于CI）
+
+用法：
+    python bench_startup.py
+    python bench_startup.py --runs 10 --budget-ms 800 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 应用自身导入耗时预算（毫秒，不含框架）
+DEFAULT_BUDGET_MS = 400
+
+# 框架基础依赖（先单独导入，计时作为基线）
+FRAMEWORK_MODULES = ["fastapi", "fastapi.middleware.cors", "sqlalchemy.orm", "pydantic_settings"]
+
+# 启动时不应加载的耗时模块（应在首次使用或后台预热时导入）
+LAZY_MODULES = ["langchain", "langchain.agents", "langchain_core", "dashscope", "bs4", "pandas", "numpy"]
+
+_MEASURE_SNIPPET = """
+import importlib, json, sys, time
+started = time.perf_counter()
+for name in %r:
+    importlib.import_module(name)
+framework = (time.perf_counter() - started) * 1000
+started = time.perf_counter()
+import app.main
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({"framework_ms": framework, "app_ms": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (FRAMEWORK_MODULES, LAZY_MODULES)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _run(args, env_extra=None):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    env.update(env_extra or {})
+    return subprocess.run(
+        [sys.executable] + args,
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+
+
+def measure_import(runs: int):
+    """多次在新进程中导入app.main，返回(框架耗时列表, 应用耗时列表, 被提前加载的模块)"""
+    framework = []
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        result = _run(["-c", _MEASURE_SNIPPET])
+        if result.returncode != 0:
+            raise RuntimeError(f"导入app.main失败:\n{result.stderr}")
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        framework.append(data["framework_ms"])
+        timings.append(data["app_ms"])
+        loaded.update(data["loaded"])
+    return framework, timings, sorted(loaded)
+
+
+def top_imports(limit: int):
+    """使用 -X importtime 统计累计耗时最高的模块"""
+    result = _run(["-X", "importtime", "-c", "import app.main"])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue  # 表头
+        rows.append((cumulative / 1000, parts[2].strip()))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="测量应用冷启动（导入app.main）耗时")
+    parser.add_argument("--runs", type=int, default=5, help="测量次数（取中位数）")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="应用自身导入耗时预算（毫秒）")
+    parser.add_argument("--top", type=int, default=10, help="列出累计耗时最高的N个模块")
+    args = parser.parse_args(argv)
+
+    # 预热一次，生成字节码缓存，避免首次编译耗时影响结果
+    _run(["-c", "import app.main"])
+
+    framework, timings, loaded = measure_import(args.runs)
+    median = statistics.median(timings)
+    framework_median = statistics.median(framework)
+    print(f"框架导入耗时：中位数 {framework_median:.0f}ms")
+    print(f"应用导入耗时：中位数 {median:.0f}ms，最小 {min(timings):.0f}ms，最大 {max(timings):.0f}ms（{args.runs}次）")
+    print(f"冷启动合计：约 {framework_median + median:.0f}ms")
+
+    if args.top > 0:
+        print(f"\n累计耗时最高的{args.top}个模块：")
+        for ms, module in top_imports(args.top):
+            print(f"  {ms:8.1f}ms  {module}")
+        print()
+
+    ok = True
+    if loaded:
+        print(f"⚠️ 启动时加载了应延迟导入的模块: {', '.join(loaded)}")
+        ok = False
+    if median > args.budget_ms:
+        print(f"⚠️ 导入耗时超出预算（{median:.0f}ms > {args.budget_ms:.0f}ms）")
+        ok = False
+    if ok:
+        print(f"✓ 启动耗时在预算内（{median:.0f}ms <= {args.budget_ms:.0f}ms）")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
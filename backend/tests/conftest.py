@@ -0,0 +1,68 @@
+"""
+测试配置
+配置在导入app时读取：先设置环境变量（临时SQLite数据库、假LLM、本地向量化、不启动worker），再导入应用模块
+"""
+import os
+import tempfile
+
+_WORKDIR = tempfile.mkdtemp(prefix="backend_tests_")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_WORKDIR, 'test.db')}",
+    "DB_READ_REPLICA_URLS": "",
+    "AUTO_MIGRATE": "true",
+    "SECRET_KEY": "test-secret-key",
+    "LLM_PROVIDER": "fake",
+    "EMBEDDING_PROVIDER": "hash",
+    "VECTOR_INDEX_DIR": os.path.join(_WORKDIR, "vector_index"),
+    "SINGLE_FLIGHT_DIR": os.path.join(_WORKDIR, "single_flight"),
+    "PROFILING_DIR": os.path.join(_WORKDIR, "profiles"),
+    "JOB_WORKER_ENABLED": "false",
+    "STARTUP_WARMUP": "false",
+    "LOG_LEVEL": "WARNING",
+})
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def migrated_engine():
+    """已迁移到最新版本的测试数据库引擎"""
+    from app.database import engine
+    from app.migrations import migrate
+
+    migrate(engine)
+    return engine
+
+
+@pytest.fixture
+def db(migrated_engine):
+    """主库会话（测试结束时关闭）"""
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(migrated_engine):
+    """应用的测试客户端（不触发启动事件：不启动worker和后台预热）"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with_client = TestClient(app)
+    try:
+        yield with_client
+    finally:
+        app.dependency_overrides.clear()
+
+
+def register_user(client, username: str, password: str = "password123") -> dict:
+    """注册并登录，返回带令牌的请求头"""
+    client.post("/api/auth/register", json={"username": username, "email": f"{username}@example.com", "password": password})
+    response = client.post("/api/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
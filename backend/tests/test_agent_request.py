@@ -0,0 +1,37 @@
+"""
+多Agent任务请求：类别代码只接受已知类别（类别代码会拼入采集地址）
+"""
+import pytest
+from pydantic import ValidationError
+from app.schemas.agent import AgentTaskRequest
+from app.services.digest import DIGEST_CATEGORIES
+
+
+def test_categories_normalized():
+    request = AgentTaskRequest(task="采集新闻", categories=["NBA", "soccer", "nba"])
+    assert request.categories == ["nba", "soccer"]
+    assert AgentTaskRequest(task="采集新闻", categories=[]).categories is None
+
+
+@pytest.mark.parametrize("categories", [
+    ["nba/../../admin"],
+    ["nba", "unknown"],
+    ["nba"] * (len(DIGEST_CATEGORIES) + 1),
+])
+def test_invalid_categories_rejected(categories):
+    with pytest.raises(ValidationError):
+        AgentTaskRequest(task="采集新闻", categories=categories)
+
+
+def test_coordinator_categories_match_digest():
+    from app.agents.coordinator import CATEGORY_KEYWORDS
+
+    assert set(CATEGORY_KEYWORDS) == set(DIGEST_CATEGORIES)
+
+
+def test_execute_rejects_unknown_category(client):
+    from conftest import register_user
+
+    headers = register_user(client, "agent_caller")
+    response = client.post("/api/agents/execute", headers=headers, json={"task": "采集新闻", "categories": ["x?y=1"]})
+    assert response.status_code == 422
@@ -0,0 +1,89 @@
+"""
+文章批量处理：单进程与多进程结果一致且保持顺序、类别识别（空正文不重复计标题）、
+按块重新处理news_articles表（只处理过期文章、试运行不写回、按用户过滤）
+"""
+import uuid
+import pytest
+from app.models.news import NewsArticle
+from app.models.user import User
+from app.services.news_ingest import ingest_news
+from app.tools import batch_processor
+from app.tools.batch_processor import PROCESSING_VERSION, process_article, process_articles, reprocess_news_table
+
+ARTICLES = [
+    {"id": 1, "title": "湖人险胜掘金", "content": "詹姆斯砍下三双，湖人取得胜利", "category": "体育"},
+    {"id": 2, "title": "皇马逆转巴萨", "content": "西甲国家德比，皇马下半场连入两球", "category": "体育"},
+    {"id": 3, "title": "今日天气", "content": "晴朗", "category": "CBA"},
+    {"id": 4, "title": "勇士惨败", "content": None, "category": "体育"},
+]
+
+
+def test_process_article():
+    result = process_article(ARTICLES[0])
+    assert result["id"] == 1
+    assert result["category"] == "NBA"
+    assert result["entities"]["teams"] == ["湖人"]
+    assert result["entities"]["players"] == ["詹姆斯"]
+    assert result["sentiment"]["label"] == "正面"
+    assert result["dictionary_version"] == PROCESSING_VERSION
+    # 识别不出类别时保留原有类别
+    assert process_article(ARTICLES[2])["category"] == "CBA"
+
+
+def test_empty_content_not_scored_as_title(monkeypatch):
+    calls = []
+
+    def detect(title, content):
+        calls.append((title, content))
+        return "体育"
+
+    monkeypatch.setattr(batch_processor, "detect_category_from_content", detect)
+    process_article(ARTICLES[3])
+    assert calls == [("勇士惨败", "")]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_articles_keeps_order(workers):
+    results = list(process_articles(iter(ARTICLES), workers=workers, chunk_size=1))
+    assert [result["id"] for result in results] == [1, 2, 3, 4]
+    assert results == [process_article(article) for article in ARTICLES]
+    assert [result["category"] for result in results] == ["NBA", "足球", "CBA", "NBA"]
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(username=f"batch_{uuid.uuid4().hex[:8]}", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def _versions(db, user_id) -> list:
+    db.expire_all()
+    rows = db.query(NewsArticle).filter(NewsArticle.user_id == user_id).order_by(NewsArticle.id)
+    return [(row.article_metadata or {}).get("dictionary_version") for row in rows]
+
+
+def test_reprocess_news_table(db, user_id):
+    news = [
+        {"title": article["title"], "content": article["content"], "url": f"https://example.com/{article['id']}"}
+        for article in ARTICLES[:3]
+    ]
+    assert len(ingest_news(db, user_id, news)) == 3
+
+    stats = reprocess_news_table(db, chunk_size=2, user_id=user_id, dry_run=True)
+    assert stats["scanned"] == 3 and stats["processed"] == 3
+    assert _versions(db, user_id) == [None, None, None]
+
+    stats = reprocess_news_table(db, chunk_size=2, user_id=user_id)
+    assert stats["updated"] == 3
+    assert _versions(db, user_id) == [PROCESSING_VERSION] * 3
+    categories = [row.category for row in db.query(NewsArticle).filter(NewsArticle.user_id == user_id).order_by(NewsArticle.id)]
+    assert categories[:2] == ["NBA", "足球"]
+
+    # 已是当前版本的文章不再处理；--all时重新处理但没有变化
+    assert reprocess_news_table(db, user_id=user_id)["processed"] == 0
+    stats = reprocess_news_table(db, user_id=user_id, only_stale=False)
+    assert stats["processed"] == 3 and stats["updated"] == 0
+    # 按用户过滤
+    assert reprocess_news_table(db, user_id=user_id + 1000)["scanned"] == 0
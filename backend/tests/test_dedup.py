@@ -0,0 +1,78 @@
+"""
+新闻近似去重：相似度阈值、批次内去重、按用户和时间窗口与已入库文章比较
+"""
+import uuid
+import pytest
+from app.models.user import User
+from app.services.dedup_index import filter_new_articles
+from app.services.news_ingest import ingest_news
+from app.tools.dedup import article_signature, filter_near_duplicates, similarity
+
+ORIGINAL = {
+    "title": "湖人加时险胜掘金",
+    "content": "湖人主场加时险胜掘金，詹姆斯砍下三十分十二个篮板十一次助攻的三双数据，浓眉贡献二十五分",
+    "url": "https://example.com/lakers",
+}
+# 转载稿：标题多一个标点，正文改了一个字
+REPOST = {
+    "title": "湖人加时险胜掘金！",
+    "content": "湖人主场加时险胜掘金，詹姆斯砍下三十分十二个篮板十一次助攻的三双数据，浓眉贡献二十四分",
+    "url": "https://example.com/lakers-repost",
+}
+OTHER = {
+    "title": "勇士大胜国王",
+    "content": "库里三分雨，勇士客场大胜国王取得三连胜，维金斯贡献二十分",
+    "url": "https://example.com/warriors",
+}
+
+
+def _similarity(a, b) -> float:
+    return similarity(article_signature(a), article_signature(b))
+
+
+def test_similarity_estimates():
+    assert _similarity(ORIGINAL, ORIGINAL) == 1.0
+    assert 0.5 <= _similarity(ORIGINAL, REPOST) < 1.0
+    assert _similarity(ORIGINAL, OTHER) < 0.5
+
+
+def test_threshold_boundary():
+    """估计相似度不低于阈值视为重复，高于相似度的阈值不过滤"""
+    score = _similarity(ORIGINAL, REPOST)
+    assert filter_near_duplicates([ORIGINAL, REPOST], threshold=score) == [ORIGINAL]
+    assert filter_near_duplicates([ORIGINAL, REPOST], threshold=score + 0.01) == [ORIGINAL, REPOST]
+
+
+def test_filter_keeps_order_and_skips_existing():
+    assert filter_near_duplicates([OTHER, ORIGINAL, REPOST]) == [OTHER, ORIGINAL]
+    assert filter_near_duplicates([REPOST, OTHER], existing=[ORIGINAL]) == [OTHER]
+    # 相同标题直接视为重复
+    assert filter_near_duplicates([ORIGINAL, dict(OTHER, title=ORIGINAL["title"])]) == [ORIGINAL]
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(username=f"dedup_{uuid.uuid4().hex[:8]}", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def _titles(kept) -> list:
+    return [news["title"] for news, _ in kept]
+
+
+def test_filter_new_articles_against_stored(db, user_id):
+    assert len(ingest_news(db, user_id, [ORIGINAL])) == 1
+
+    assert _titles(filter_new_articles(db, user_id, [REPOST, OTHER])) == [OTHER["title"]]
+    # 阈值高于相似度时保留
+    assert _titles(filter_new_articles(db, user_id, [REPOST], threshold=1.0)) == [REPOST["title"]]
+    # 去重按用户隔离
+    assert _titles(filter_new_articles(db, user_id + 1000, [REPOST])) == [REPOST["title"]]
+
+
+def test_filter_new_articles_window(db, user_id):
+    ingest_news(db, user_id, [ORIGINAL])
+    # 窗口为负数天：已入库文章都在窗口之外
+    assert _titles(filter_new_articles(db, user_id, [REPOST], window_days=-1)) == [REPOST["title"]]
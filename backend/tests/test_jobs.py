@@ -0,0 +1,192 @@
+"""
+后台任务队列：认领与租约、租约过期后重新认领、超过执行次数、取消（条件UPDATE，不覆盖已结束的任务）、SSE断开时取消
+"""
+import asyncio
+import threading
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job
+from app.models.user import User
+from app.services import jobs
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(username=f"jobs_{uuid.uuid4().hex[:8]}", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+@pytest.fixture
+def job_type():
+    """每个测试注册独立的任务类型，认领时只认领本测试的任务"""
+    name = f"test.{uuid.uuid4().hex[:8]}"
+
+    @jobs.job_handler(name, max_attempts=2)
+    async def handler(ctx):
+        return {}
+
+    yield name
+    jobs._handlers.pop(name, None)
+
+
+def _expire_lease(job_id: int):
+    session = SessionLocal()
+    try:
+        session.query(Job).filter(Job.id == job_id).update(
+            {Job.lease_until: datetime.now() - timedelta(seconds=1)}, synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_enqueue_is_idempotent_until_finished(db, user_id, job_type):
+    job, created = jobs.enqueue_job(db, user_id, job_type, {"a": 1})
+    again, created_again = jobs.enqueue_job(db, user_id, job_type, {"a": 1})
+    assert created and not created_again
+    assert again.id == job.id
+
+    assert jobs.cancel_job(db, job)
+    _, created_after = jobs.enqueue_job(db, user_id, job_type, {"a": 1})
+    assert created_after
+
+
+def test_claim_holds_lease(db, user_id, job_type):
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    claimed = jobs.claim_job(db, "worker-a", 30, [job_type])
+    assert claimed.id == job.id
+    assert claimed.status == jobs.STATUS_RUNNING
+    assert claimed.attempts == 1
+    # 租约未过期，其他worker认领不到
+    assert jobs.claim_job(db, "worker-b", 30, [job_type]) is None
+    assert jobs.renew_lease(job.id, "worker-a", 30)
+    assert not jobs.renew_lease(job.id, "worker-b", 30)
+
+
+def test_expired_lease_is_reclaimed_then_fails_after_max_attempts(db, user_id, job_type):
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    jobs.claim_job(db, "worker-a", 30, [job_type])
+
+    _expire_lease(job.id)
+    reclaimed = jobs.claim_job(db, "worker-b", 30, [job_type])
+    assert reclaimed.id == job.id
+    assert reclaimed.worker_id == "worker-b"
+    assert reclaimed.attempts == 2
+    # 原worker续约失败（已被接管）
+    assert not jobs.renew_lease(job.id, "worker-a", 30)
+
+    _expire_lease(job.id)
+    assert jobs.claim_job(db, "worker-c", 30, [job_type]) is None
+    db.refresh(job)
+    assert job.status == jobs.STATUS_FAILED
+    assert job.active_key is None
+
+
+def test_release_job_returns_to_pending(db, user_id, job_type):
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    jobs.claim_job(db, "worker-a", 30, [job_type])
+    jobs.release_job(job.id, "worker-a")
+    db.refresh(job)
+    assert job.status == jobs.STATUS_PENDING
+    assert job.attempts == 0
+    assert jobs.claim_job(db, "worker-b", 30, [job_type]).id == job.id
+
+
+def test_cancel_running_job_stops_lease(db, user_id, job_type):
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    jobs.claim_job(db, "worker-a", 30, [job_type])
+    assert jobs.cancel_job(db, job)
+    assert job.status == jobs.STATUS_CANCELLED
+    # worker下次续约时发现任务已取消，中止执行；已取消的任务也不能再标记成功
+    assert not jobs.renew_lease(job.id, "worker-a", 30)
+    assert not jobs.complete_job(db, job.id, "worker-a", {})
+    assert not jobs.cancel_job(db, job)
+
+
+def test_cancel_does_not_overwrite_finished_job(db, user_id, job_type):
+    """取消方持有的任务状态已过期（读取后worker完成了任务），条件UPDATE不覆盖已写入的结果"""
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    jobs.claim_job(db, "worker-a", 30, [job_type])
+    stale = SessionLocal()
+    try:
+        stale_job = stale.get(Job, job.id)
+        assert stale_job.status == jobs.STATUS_RUNNING
+
+        assert jobs.complete_job(db, job.id, "worker-a", {"report": 1})
+        db.commit()
+
+        assert not jobs.cancel_job(stale, stale_job)
+        assert stale_job.status == jobs.STATUS_SUCCEEDED
+    finally:
+        stale.close()
+    db.refresh(job)
+    assert job.status == jobs.STATUS_SUCCEEDED
+    assert job.result == {"report": 1}
+
+
+class _DisconnectedRequest:
+    """已断开的客户端（SSE心跳时检查）"""
+
+    async def is_disconnected(self):
+        return True
+
+
+def _consume_until_disconnect(job: Job) -> list:
+    from app.routers.jobs import job_event_stream
+
+    async def consume():
+        return [message async for message in job_event_stream(job, _DisconnectedRequest(), cancel_on_disconnect=True)]
+
+    return asyncio.run(consume())
+
+
+def test_stream_disconnect_cancels_job(db, user_id, job_type, monkeypatch):
+    monkeypatch.setattr(settings, "SSE_HEARTBEAT_SECONDS", 0.05)
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    jobs.claim_job(db, "worker-a", 30, [job_type])
+
+    messages = _consume_until_disconnect(job)
+    assert messages and '"status": "loading"' in messages[0]
+    db.refresh(job)
+    assert job.status == jobs.STATUS_CANCELLED
+    assert not jobs.renew_lease(job.id, "worker-a", 30)
+
+
+def test_stream_disconnect_keeps_finished_result(db, user_id, job_type, monkeypatch):
+    """断开前任务已由worker完成（连接持有的任务状态已过期），断开时不覆盖结果"""
+    monkeypatch.setattr(settings, "SSE_HEARTBEAT_SECONDS", 0.05)
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    jobs.claim_job(db, "worker-a", 30, [job_type])
+    jobs.publish_job(job)  # 进度通道保留运行中的状态，连接不会立即结束
+
+    worker_db = SessionLocal()
+    try:
+        assert jobs.complete_job(worker_db, job.id, "worker-a", {"report": 1})
+        worker_db.commit()
+    finally:
+        worker_db.close()
+
+    _consume_until_disconnect(job)
+    db.refresh(job)
+    assert job.status == jobs.STATUS_SUCCEEDED
+    assert job.result == {"report": 1}
+
+
+def test_after_commit_runs_off_event_loop(db, user_id, job_type):
+    """提交后操作（向量索引等文件读写）在线程中执行，失败不影响任务"""
+    job, _ = jobs.enqueue_job(db, user_id, job_type)
+    ctx = jobs.JobContext(job, db, "worker-a")
+    calls = []
+
+    def fail():
+        raise RuntimeError("index unavailable")
+
+    ctx.after_commit(fail)
+    ctx.after_commit(lambda value: calls.append((value, threading.get_ident())), "done")
+    asyncio.run(ctx.run_after_commit())
+    assert calls and calls[0][0] == "done"
+    assert calls[0][1] != threading.get_ident()
@@ -0,0 +1,113 @@
+"""
+LLM调用容错：错误分类、熔断器状态变化（关闭 -> 熔断 -> 半开 -> 关闭/熔断）
+"""
+import time
+import pytest
+from app.utils.llm_resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMAuthError, LLMBadRequestError, LLMCircuitOpenError, LLMQuotaError,
+    LLMRateLimitError, LLMServerError, LLMTimeoutError, classify_result
+)
+
+
+@pytest.mark.parametrize("status_code, code, expected", [
+    (429, "", LLMRateLimitError),
+    (400, "Throttling.RateQuota", LLMRateLimitError),
+    (403, "AllocationQuota.FreeTierOnly", LLMQuotaError),
+    (401, "InvalidApiKey", LLMAuthError),
+    (408, "", LLMTimeoutError),
+    (504, "", LLMTimeoutError),
+    (500, "InternalError", LLMServerError),
+    (503, "", LLMServerError),
+    (400, "InvalidParameter", LLMBadRequestError),
+])
+def test_classify_result(status_code, code, expected):
+    error = classify_result("测试", status_code, code, "error")
+    assert type(error) is expected
+    assert error.status_code == status_code
+
+
+def _breaker(reset_timeout: float = 0.05, quota_cooldown: float = 60) -> CircuitBreaker:
+    return CircuitBreaker("test:model", failure_threshold=2, reset_timeout=reset_timeout, quota_cooldown=quota_cooldown)
+
+
+def _server_error() -> LLMServerError:
+    return LLMServerError("server", 500)
+
+
+def test_opens_after_consecutive_failures():
+    breaker = _breaker()
+    breaker.before_call()
+    breaker.record_failure(_server_error())
+    assert breaker.state == CLOSED
+    breaker.record_failure(_server_error())
+    assert breaker.state == OPEN
+    assert breaker.stats["opened"] == 1
+    with pytest.raises(LLMCircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats["rejected"] == 1
+
+
+def test_success_resets_failure_count():
+    breaker = _breaker()
+    breaker.record_failure(_server_error())
+    breaker.record_success()
+    breaker.record_failure(_server_error())
+    assert breaker.state == CLOSED
+    assert breaker.failures == 1
+
+
+def test_half_open_allows_single_probe_then_closes():
+    breaker = _breaker()
+    breaker.record_failure(_server_error())
+    breaker.record_failure(_server_error())
+    time.sleep(0.06)
+
+    breaker.before_call()  # 试探请求
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(LLMCircuitOpenError):
+        breaker.before_call()  # 试探期间其他请求直接失败
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = _breaker()
+    breaker.record_failure(_server_error())
+    breaker.record_failure(_server_error())
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure(_server_error())
+    assert breaker.state == OPEN
+    with pytest.raises(LLMCircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_probe_lets_next_request_probe():
+    """试探请求因参数错误结束（不计入熔断）时，下一个请求可以继续试探"""
+    breaker = _breaker()
+    breaker.record_failure(_server_error())
+    breaker.record_failure(_server_error())
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure(LLMBadRequestError("bad", 400))
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+
+
+def test_quota_error_opens_immediately_with_cooldown():
+    breaker = _breaker(quota_cooldown=60)
+    breaker.record_failure(LLMQuotaError("quota", 403, "Arrearage"))
+    assert breaker.state == OPEN
+    assert breaker.status()["retry_in"] > 50
+    breaker.reset()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_bad_request_does_not_count():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure(LLMBadRequestError("bad", 400))
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
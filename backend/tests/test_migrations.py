@@ -0,0 +1,104 @@
+"""
+数据库迁移：重复执行不变更、每个迁移脚本可重复执行（MySQL的DDL隐式提交，中断后会重新执行）、按版本分步升级、旧版表结构升级
+"""
+import pytest
+from sqlalchemy import inspect, text
+from app.database import create_db_engine
+from app.migrations import SchemaVersionError, latest_version, load_migrations, migrate, status, verify_schema
+from app.migrations.runner import column_names, current_version, schema_version_table
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'migrations.db'}", "test-migrations")
+    yield engine
+    engine.dispose()
+
+
+def _schema(engine) -> dict:
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table))
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def test_migrate_twice_is_noop(engine):
+    latest = latest_version()
+    assert migrate(engine) == list(range(1, latest + 1))
+    schema = _schema(engine)
+
+    assert migrate(engine) == []
+    assert _schema(engine) == schema
+    assert verify_schema(engine) == latest
+    with engine.connect() as conn:
+        assert len(conn.execute(schema_version_table.select()).all()) == latest
+
+
+def test_each_upgrade_can_rerun(engine):
+    """迁移已执行但版本未记录（中断）时再次执行不报错，表结构不变"""
+    migrate(engine)
+    schema = _schema(engine)
+    with engine.connect() as conn:
+        for migration in load_migrations():
+            with conn.begin():
+                migration.upgrade(conn)
+    assert _schema(engine) == schema
+
+
+def test_rerun_after_lost_version_rows(engine):
+    migrate(engine)
+    schema = _schema(engine)
+    with engine.begin() as conn:
+        conn.execute(schema_version_table.delete().where(schema_version_table.c.version > 3))
+
+    assert migrate(engine) == list(range(4, latest_version() + 1))
+    assert _schema(engine) == schema
+
+
+def test_stepwise_upgrade(engine):
+    assert migrate(engine, target=3) == [1, 2, 3]
+    with pytest.raises(SchemaVersionError):
+        verify_schema(engine)
+    assert status(engine)["current"] == 3
+    assert [version for version, _ in status(engine)["pending"]] == list(range(4, latest_version() + 1))
+
+    migrate(engine)
+    assert status(engine)["pending"] == []
+
+
+def test_upgrades_legacy_tables(engine):
+    """早期版本的users和news_articles表缺少认证字段和去重键"""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(100) NOT NULL, email VARCHAR(200))"))
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'legacy')"))
+        conn.execute(text(
+            "CREATE TABLE news_articles (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, title VARCHAR(500), content TEXT)"
+        ))
+
+    migrate(engine)
+    with engine.connect() as conn:
+        assert {"hashed_password", "is_active"} <= set(column_names(conn, "users"))
+        assert "dedup_key" in column_names(conn, "news_articles")
+        assert conn.execute(text("SELECT username FROM users WHERE id = 1")).scalar() == "legacy"
+        assert current_version(conn) == latest_version()
+
+
+def test_startup_fails_on_outdated_schema(engine, monkeypatch):
+    """启动时数据库版本落后则中止启动；数据库无法连接时只记录日志"""
+    from app import main
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "AUTO_MIGRATE", False)
+    migrate(engine, target=3)
+    monkeypatch.setattr(main, "engine", engine)
+    with pytest.raises(SchemaVersionError):
+        main.check_database_schema()
+
+    unreachable = create_db_engine("sqlite:////nonexistent-dir/unreachable.db", "test-unreachable")
+    monkeypatch.setattr(main, "engine", unreachable)
+    main.check_database_schema()
+    unreachable.dispose()
@@ -0,0 +1,111 @@
+"""
+按任务选择模型：模型链解析、费用估算，以及调用失败、熔断时换用备选模型
+"""
+import asyncio
+import uuid
+import pytest
+from app.config import settings
+from app.utils import llm_config
+from app.utils.llm_config import LLMResult, acall_llm_native, call_llm_native
+from app.utils.llm_resilience import LLMAuthError, LLMServerError, get_breaker
+from app.utils.model_router import TASK_CHAT, TASK_EXTRACT, TASK_REPORT, estimate_cost, model_chain, should_fall_back
+
+
+class ScriptedProvider:
+    """按模型返回预设结果的提供方（记录每次调用的模型）"""
+
+    label = "Scripted"
+    model = "default"
+
+    def __init__(self, failures=None):
+        self.name = f"scripted-{uuid.uuid4().hex[:8]}"  # 每个测试独立的熔断器
+        self.failures = failures or {}
+        self.calls = []
+
+    def resolve_model(self, model: str) -> str:
+        return model
+
+    def generate(self, messages, temperature, enable_search, tools=None, model=None):
+        self.calls.append(model)
+        if model in self.failures:
+            status_code, code = self.failures[model]
+            return LLMResult(status_code=status_code, code=code, message="failed")
+        return LLMResult(content=f"answer from {model}", input_tokens=10, output_tokens=5)
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MODEL", "big")
+    monkeypatch.setattr(settings, "LLM_TASK_MODELS", "chat=small|medium, extract=tiny, unknown=x")
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+
+
+@pytest.fixture
+def use_provider(monkeypatch):
+    def install(provider):
+        monkeypatch.setattr(llm_config, "_llm_provider", provider)
+        return provider
+    return install
+
+
+def test_model_chain(routes):
+    assert model_chain(TASK_CHAT) == ["small", "medium", "big"]
+    assert model_chain(TASK_EXTRACT) == ["tiny", "big"]
+    assert model_chain(TASK_REPORT) == ["big"]
+    # 指定模型时不路由、不换用备选模型
+    assert model_chain(TASK_CHAT, "custom") == ["custom"]
+    with pytest.raises(ValueError):
+        model_chain("unknown")
+
+
+def test_should_fall_back():
+    assert should_fall_back(LLMServerError("server", 500))
+    assert not should_fall_back(LLMAuthError("auth", 401))
+
+
+def test_estimate_cost(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MODEL_PRICES", "big=0.006/0.024, broken=abc")
+    assert estimate_cost("big", 1000, 500) == pytest.approx(0.018)
+    assert estimate_cost("broken", 1000, 500) is None
+    assert estimate_cost("other", 1000, 500) is None
+
+
+def test_falls_back_through_chain(routes, use_provider):
+    provider = use_provider(ScriptedProvider({"small": (500, "InternalError"), "medium": (429, "")}))
+    response = call_llm_native([{"role": "user", "content": "hi"}], caller="test", task=TASK_CHAT)
+    assert response.model == "big"
+    assert response.content == "answer from big"
+    assert provider.calls == ["small", "medium", "big"]
+
+
+def test_auth_error_does_not_fall_back(routes, use_provider):
+    provider = use_provider(ScriptedProvider({"small": (401, "InvalidApiKey")}))
+    with pytest.raises(LLMAuthError):
+        call_llm_native([{"role": "user", "content": "hi"}], caller="test", task=TASK_CHAT)
+    assert provider.calls == ["small"]
+
+
+def test_open_breaker_skips_model(routes, use_provider):
+    """首选模型已熔断时不发出请求，直接换用备选模型"""
+    provider = use_provider(ScriptedProvider())
+    breaker = get_breaker(provider.name, "small")
+    for _ in range(settings.LLM_BREAKER_FAILURES):
+        breaker.record_failure(LLMServerError("server", 500))
+
+    response = call_llm_native([{"role": "user", "content": "hi"}], caller="test", task=TASK_CHAT)
+    assert response.model == "medium"
+    assert provider.calls == ["medium"]
+
+
+def test_explicit_model_has_no_fallback(routes, use_provider):
+    provider = use_provider(ScriptedProvider({"custom": (500, "InternalError")}))
+    with pytest.raises(LLMServerError):
+        call_llm_native([{"role": "user", "content": "hi"}], caller="test", task=TASK_CHAT, model="custom")
+    assert provider.calls == ["custom"]
+
+
+def test_async_call_falls_back(routes, use_provider):
+    provider = use_provider(ScriptedProvider({"tiny": (503, "")}))
+    response = asyncio.run(acall_llm_native([{"role": "user", "content": "hi"}], caller="test", task=TASK_EXTRACT))
+    assert response.model == "big"
+    assert provider.calls == ["tiny", "big"]
@@ -0,0 +1,75 @@
+"""
+新闻批量入库：INSERT ... RETURNING与不支持RETURNING时的逐行插入结果一致（重复行跳过，ID与输入一一对应）；
+报告引用的文章ID包括之前已入库的重复新闻
+"""
+import uuid
+import pytest
+from app.models.news import NewsArticle
+from app.models.user import User
+from app.services.news_ingest import bulk_insert_articles, build_article_row, ingest_news, stored_article_ids
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(username=f"ingest_{uuid.uuid4().hex[:8]}", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+@pytest.fixture(params=["returning", "per_row"])
+def insert_mode(request, db, monkeypatch):
+    if request.param == "per_row":
+        # 模拟不支持RETURNING的数据库
+        monkeypatch.setattr(db.get_bind(NewsArticle).dialect, "insert_returning", False)
+    return request.param
+
+
+def _row(user_id: int, title: str) -> dict:
+    return build_article_row({"title": title, "content": f"{title}正文", "url": f"https://example.com/{title}"}, user_id)
+
+
+def test_bulk_insert_skips_duplicates(db, user_id, insert_mode):
+    first = bulk_insert_articles(db, [_row(user_id, "a")])
+    db.commit()
+    assert first[0] is not None
+
+    ids = bulk_insert_articles(db, [_row(user_id, "a"), _row(user_id, "b"), _row(user_id, "b"), _row(user_id, "c")])
+    db.commit()
+    assert ids[0] is None  # 已存在
+    assert ids[2] is None  # 本批次内重复
+    assert None not in (ids[1], ids[3])
+    titles = {article.id: article.title for article in db.query(NewsArticle).filter(NewsArticle.user_id == user_id)}
+    assert titles == {first[0]: "a", ids[1]: "b", ids[3]: "c"}
+
+
+def test_bulk_insert_isolated_by_user(db, user_id, insert_mode):
+    other = User(username=f"ingest_{uuid.uuid4().hex[:8]}", hashed_password="x")
+    db.add(other)
+    db.commit()
+
+    ids = bulk_insert_articles(db, [_row(user_id, "shared"), _row(other.id, "shared")])
+    db.commit()
+    assert None not in ids and ids[0] != ids[1]
+
+
+def test_stored_article_ids_include_existing(db, user_id):
+    contents = {
+        "湖人": "湖人主场加时险胜掘金，詹姆斯砍下三双",
+        "勇士": "库里三分雨，勇士客场大胜国王取得三连胜",
+        "凯尔特人": "凯尔特人防守强硬，塔图姆末节独得十五分锁定胜局",
+    }
+
+    def news(title):
+        return {"title": title, "content": contents[title], "url": f"https://example.com/{title}"}
+
+    first = ingest_news(db, user_id, [news("湖人"), news("勇士")])
+    assert len(first) == 2
+
+    batch = [news("勇士"), news("凯尔特人")]
+    added = ingest_news(db, user_id, batch, commit=False)
+    assert [article.title for article in added] == ["凯尔特人"]
+    ids = stored_article_ids(db, user_id, batch)
+    db.commit()
+    assert ids == [first[1].id, added[0].id]
+    assert stored_article_ids(db, user_id + 1000, batch) == []
@@ -0,0 +1,197 @@
+"""
+读写分离：两个SQLite文件分别作为主库和从库，校验只读会话的路由、读己之写和从库不可用时回退主库
+"""
+import asyncio
+import os
+import time
+import uuid
+import pytest
+from sqlalchemy import text
+from app import database
+from app.database import ReplicaRouter, SessionLocal, create_db_engine
+from app.models.user import User
+
+
+def _engine(path: str, name: str, value: str):
+    engine = create_db_engine(f"sqlite:///{path}", name)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE marker (value VARCHAR(20))"))
+        conn.execute(text("INSERT INTO marker (value) VALUES (:value)"), {"value": value})
+    return engine
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    """主库和从库各有一行不同的marker，查询marker即可知道会话实际使用的库"""
+    primary = _engine(str(tmp_path / "primary.db"), "test-primary", "primary")
+    replica = _engine(str(tmp_path / "replica.db"), "test-replica", "replica")
+    router = ReplicaRouter(primary, [replica], health_interval=60, sticky_seconds=0.5)
+    monkeypatch.setattr(database, "replica_router", router)
+    yield router
+    router.stop_monitor()
+    primary.dispose()
+    replica.dispose()
+
+
+def _read_marker(sticky_key=None) -> str:
+    session = SessionLocal(info={"read_only": True, "sticky_key": sticky_key})
+    try:
+        return session.execute(text("SELECT value FROM marker")).scalar()
+    finally:
+        session.close()
+
+
+def test_read_only_session_uses_replica(router):
+    assert _read_marker() == "replica"
+    assert _read_marker("alice") == "replica"
+
+
+def test_reads_fall_back_to_primary_after_write(router):
+    session = SessionLocal(bind=router.primary, info={"sticky_key": "alice"})
+    try:
+        session.execute(text("INSERT INTO marker (value) VALUES ('new')"))
+        # after_flush只在ORM刷新时触发，这里直接标记会话有写入
+        session.info["has_writes"] = True
+        session.commit()
+    finally:
+        session.close()
+
+    assert router.is_sticky("alice")
+    assert _read_marker("alice") == "primary"
+    # 其他用户不受影响
+    assert _read_marker("bob") == "replica"
+
+    time.sleep(0.6)
+    assert _read_marker("alice") == "replica"
+
+
+def test_rollback_does_not_mark_write(router):
+    session = SessionLocal(bind=router.primary, info={"sticky_key": "alice"})
+    try:
+        session.info["has_writes"] = True
+        session.rollback()
+    finally:
+        session.close()
+    assert not router.is_sticky("alice")
+
+
+def test_sticky_key_from_request_state(router):
+    """请求依赖创建的会话从request.state读取粘滞键（认证依赖写入）"""
+    class State:
+        db_sticky_key = "alice"
+
+    router.mark_write("alice")
+    session = SessionLocal(info={"read_only": True, "request_state": State()})
+    try:
+        assert session.execute(text("SELECT value FROM marker")).scalar() == "primary"
+    finally:
+        session.close()
+
+
+def test_unhealthy_replica_falls_back_to_primary(tmp_path, monkeypatch):
+    primary = _engine(str(tmp_path / "primary.db"), "test-primary", "primary")
+    # 目录不存在，连接失败
+    missing = create_db_engine(f"sqlite:///{os.path.join(str(tmp_path), 'missing', 'replica.db')}", "test-missing")
+    router = ReplicaRouter(primary, [missing], health_interval=60)
+    monkeypatch.setattr(database, "replica_router", router)
+    try:
+        router.start_monitor()
+        assert router.status() == [{"name": "replica-0", "healthy": False}]
+        assert _read_marker() == "primary"
+    finally:
+        router.stop_monitor()
+        primary.dispose()
+        missing.dispose()
+
+
+def test_health_check_runs_in_background(router):
+    """请求路径上不连接从库检查：首次选择从库时只启动后台线程，检查结果由线程写入"""
+    assert router.status() == [{"name": "replica-0", "healthy": None}]
+    assert router.read_engine() is router.replicas[0]
+    assert router._monitor is not None
+    router.mark_unhealthy(0)
+    assert router.read_engine() is router.primary
+    assert router.probe(0) is True
+    assert router.read_engine() is router.replicas[0]
+
+
+def test_no_replicas_uses_primary(tmp_path):
+    primary = _engine(str(tmp_path / "primary.db"), "test-primary", "primary")
+    router = ReplicaRouter(primary, [])
+    try:
+        assert router.read_engine("alice") is primary
+        router.start_monitor()
+        assert router._monitor is None
+    finally:
+        primary.dispose()
+
+
+def test_read_only_routes_do_not_open_primary_session(client):
+    """认证依赖在只读会话中查询用户：只读接口不依赖主库会话"""
+    from app.main import app
+    from conftest import register_user
+
+    headers = register_user(client, "replica_reader")
+
+    def no_primary():
+        raise AssertionError("只读接口不应打开主库会话")
+        yield  # pragma: no cover
+
+    app.dependency_overrides[database.get_db] = no_primary
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert client.get("/api/news/list", headers=headers).status_code == 200
+    assert client.get("/api/jobs", headers=headers).status_code == 200
+
+
+def test_write_route_updates_user_in_primary_session(client):
+    """认证依赖返回的用户属于只读会话，修改密码需要在主库会话中保存"""
+    from conftest import register_user
+
+    headers = register_user(client, "replica_writer", "password123")
+    response = client.post("/api/auth/change-password", headers=headers,
+                           json={"old_password": "password123", "new_password": "password456"})
+    assert response.status_code == 200, response.text
+    login = client.post("/api/auth/login", json={"username": "replica_writer", "password": "password456"})
+    assert login.status_code == 200
+
+
+def test_worker_commit_makes_next_request_read_primary(client, tmp_path, monkeypatch):
+    """后台任务提交后，该用户的下一个读请求走主库（worker与认证依赖使用相同的粘滞键）"""
+    from conftest import register_user
+    from app.services import jobs
+    from app.services.job_worker import JobWorker
+
+    username = f"sticky_{uuid.uuid4().hex[:8]}"
+    headers = register_user(client, username)
+    job_type = f"test.{uuid.uuid4().hex[:8]}"
+
+    @jobs.job_handler(job_type)
+    async def handler(ctx):
+        return {"ok": True}
+
+    # 从库里没有业务表：读请求落到从库会直接失败，只有走主库才能读到任务
+    replica = _engine(str(tmp_path / "replica.db"), "test-replica", "replica")
+    router = ReplicaRouter(database.engine, [replica], health_interval=60, sticky_seconds=30)
+    try:
+        db = SessionLocal()
+        try:
+            user_id = db.query(User.id).filter(User.username == username).scalar()
+            job, _ = jobs.enqueue_job(db, user_id, job_type)
+        finally:
+            db.close()
+        monkeypatch.setattr(database, "replica_router", router)
+        assert not router.is_sticky(username)
+
+        worker = JobWorker(job_types=[job_type])
+        job_id = worker._claim()
+        assert job_id == job.id
+        asyncio.run(worker.execute(job_id))
+
+        assert router.is_sticky(username)
+        response = client.get(f"/api/jobs/{job_id}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == jobs.STATUS_SUCCEEDED
+    finally:
+        jobs._handlers.pop(job_type, None)
+        router.stop_monitor()
+        replica.dispose()
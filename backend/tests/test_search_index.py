@@ -0,0 +1,110 @@
+"""
+全文检索：分词、BM25排序、单字检索（词首和词尾）、按用户隔离、删除文档、命中总数不含索引残留
+"""
+import uuid
+import pytest
+from app.models.user import User
+from app.services.news_ingest import ingest_news
+from app.services.search_index import DOC_NEWS, index_new_documents, remove_document, search
+from app.tools.search_tokenizer import is_single_char, query_terms, term_frequencies, tokenize
+
+
+def test_tokenize():
+    assert tokenize("湖人Lakers 2024") == ["湖人", "lakers", "2024"]
+    assert tokenize("凯尔特人") == ["凯尔", "尔特", "特人"]
+    assert tokenize("人，湖") == ["人", "湖"]
+    assert tokenize("") == []
+
+
+def test_term_frequencies_and_query_terms():
+    assert term_frequencies("湖人湖人", weight=2) == {"湖人": 4, "人湖": 2}
+    assert query_terms("湖人 湖人 nba") == ["湖人", "nba"]
+    assert is_single_char("人") and not is_single_char("湖人") and not is_single_char("a")
+
+
+def _user(db) -> int:
+    user = User(username=f"search_{uuid.uuid4().hex[:8]}", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+@pytest.fixture
+def user_id(db):
+    return _user(db)
+
+
+def _store(db, user_id: int, *articles) -> dict:
+    """入库并索引新闻，返回 标题 -> ID"""
+    news_list = [
+        {"title": title, "content": content, "url": f"https://example.com/{uuid.uuid4().hex}"}
+        for title, content in articles
+    ]
+    return {article.title: article.id for article in ingest_news(db, user_id, news_list)}
+
+
+def _titles(result) -> list:
+    return [item["title"] for item in result["results"]]
+
+
+def test_bm25_ranks_more_relevant_first(db, user_id):
+    _store(
+        db, user_id,
+        ("勇士大胜国王", "库里三分雨，维金斯贡献二十分，勇士取得三连胜"),
+        ("湖人险胜掘金", "湖人主场加时，詹姆斯三双，湖人替补也有出色发挥，湖人拿下关键一胜"),
+        ("西部排名变化", "掘金输球后排名下滑，湖人排名上升一位"),
+    )
+    result = search(db, user_id, "湖人")
+    assert _titles(result) == ["湖人险胜掘金", "西部排名变化"]
+    assert result["total"] == 2
+    assert result["results"][0]["score"] > result["results"][1]["score"]
+    assert "湖人" in result["results"][0]["snippet"]
+
+
+def test_multi_term_requires_coverage(db, user_id):
+    _store(
+        db, user_id,
+        ("湖人险胜掘金", "詹姆斯三双带队获胜"),
+        ("勇士大胜国王", "库里三分雨，维金斯贡献二十分"),
+    )
+    assert _titles(search(db, user_id, "湖人 掘金")) == ["湖人险胜掘金"]
+    assert _titles(search(db, user_id, "库里 nba 季后赛 总决赛")) == []
+
+
+def test_single_char_matches_word_start_and_end(db, user_id):
+    _store(
+        db, user_id,
+        ("掘金击败湖人", "约基奇三双带队获胜"),
+        ("总冠军：凯尔特人", "塔图姆当选总决赛最有价值球员"),
+        ("人气球星投票", "全明星首发名单出炉"),
+        ("勇士大胜国王", "库里三分雨，维金斯贡献二十分"),
+    )
+    # "人"在前两篇中只位于词尾
+    assert set(_titles(search(db, user_id, "人"))) == {"掘金击败湖人", "总冠军：凯尔特人", "人气球星投票"}
+
+
+def test_isolated_by_user(db, user_id):
+    other_id = _user(db)
+    _store(db, user_id, ("湖人险胜掘金", "詹姆斯三双带队获胜"))
+    _store(db, other_id, ("湖人交易传闻", "球队有意引进一名后卫"))
+    assert _titles(search(db, user_id, "湖人")) == ["湖人险胜掘金"]
+    assert _titles(search(db, other_id, "湖人")) == ["湖人交易传闻"]
+
+
+def test_remove_document(db, user_id):
+    ids = _store(db, user_id, ("湖人险胜掘金", "詹姆斯三双带队获胜"), ("湖人交易传闻", "球队有意引进一名后卫"))
+    remove_document(db, DOC_NEWS, ids["湖人交易传闻"])
+    db.commit()
+    result = search(db, user_id, "湖人")
+    assert _titles(result) == ["湖人险胜掘金"]
+    assert result["total"] == 1
+
+
+def test_total_excludes_stale_index_entries(db, user_id):
+    """索引中残留已不存在的文档时，命中总数与返回结果一致"""
+    _store(db, user_id, ("湖人险胜掘金", "詹姆斯三双带队获胜"))
+    index_new_documents(db, DOC_NEWS, [(user_id, 10 ** 9, "湖人旧新闻", "已删除的新闻")])
+    db.commit()
+    result = search(db, user_id, "湖人", limit=1)
+    assert result["total"] == 1
+    assert _titles(result) == ["湖人险胜掘金"]
@@ -0,0 +1,60 @@
+"""
+词典情感分析：否定词（不误判"不断"等复合词）、程度副词、按分句给实体打分（小数点不断句）、批量与逐篇结果一致
+"""
+import pytest
+from app.tools.sentiment import score_articles, score_text
+
+
+def test_negation_flips_polarity():
+    assert score_text("湖人取得胜利")["label"] == "正面"
+    negated = score_text("湖人未能取得胜利")
+    assert negated["label"] == "负面"
+    assert negated["negative"] == 1 and negated["positive"] == 0
+    # 双重否定
+    assert score_text("并非没有优势")["score"] > 0
+
+
+@pytest.mark.parametrize("text", ["湖人不断取得胜利", "湖人不仅取得胜利", "湖人无疑取得胜利"])
+def test_compounds_are_not_negations(text):
+    assert score_text(text) == score_text("湖人取得胜利")
+
+
+def test_negation_does_not_cross_clause():
+    assert score_text("湖人没有，取得胜利")["label"] == "正面"
+
+
+def test_intensifiers():
+    plain = score_text("表现出色")["score"]
+    assert score_text("表现非常出色")["score"] > plain
+    assert 0 < score_text("表现略出色")["score"] < plain
+    # 程度副词与情感词相距过远时失效
+    assert score_text("非常地地地地地地地地出色")["score"] == plain
+
+
+def test_entity_attribution_by_clause():
+    entities = score_text("湖人大胜，勇士惨败")["entities"]
+    assert entities["湖人"]["label"] == "正面"
+    assert entities["勇士"]["label"] == "负面"
+    assert entities["湖人"]["mentions"] == 1
+
+
+def test_decimal_point_does_not_break_clause():
+    entities = score_text("詹姆斯3.5秒绝杀")["entities"]
+    assert entities["詹姆斯"]["label"] == "正面"
+    # 句末的"."仍然断句
+    entities = score_text("詹姆斯.勇士惨败")["entities"]
+    assert entities["詹姆斯"]["label"] == "中性"
+
+
+def test_batch_matches_single():
+    articles = [
+        {"title": "湖人不断取得胜利", "content": "詹姆斯表现非常出色"},
+        "勇士惨败，库里受伤",
+        {"title": "", "content": None},
+    ]
+    assert score_articles(articles) == [
+        score_text("湖人不断取得胜利。詹姆斯表现非常出色"),
+        score_text("勇士惨败，库里受伤"),
+        score_text("。"),
+    ]
+    assert score_articles([]) == []
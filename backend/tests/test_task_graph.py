@@ -0,0 +1,133 @@
+"""
+子任务依赖图：并发数上限、节点超时、依赖失败时跳过、allow_partial只接收成功的依赖结果；
+协调器合并时采集Agent的新闻归入各类别并参与分析
+"""
+import asyncio
+import pytest
+from app.agents import coordinator as coordinator_module
+from app.agents.coordinator import MultiAgentCoordinator
+from app.utils.task_graph import NODE_FAILED, NODE_SKIPPED, NODE_SUCCEEDED, NODE_TIMEOUT, TaskGraph, TaskGraphError
+
+
+def _statuses(run) -> dict:
+    return {node["name"]: node["status"] for node in run["trace"]["nodes"]}
+
+
+def test_max_parallel_limits_concurrency():
+    running = 0
+    peak = 0
+
+    async def work(inputs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return True
+
+    graph = TaskGraph(max_parallel=2)
+    for index in range(5):
+        graph.add(f"n{index}", work)
+    run = asyncio.run(graph.run())
+    assert peak == 2
+    assert len(run["results"]) == 5 and run["errors"] == {}
+
+
+def test_node_timeout():
+    async def slow(inputs):
+        await asyncio.sleep(1)
+
+    async def fast(inputs):
+        return "ok"
+
+    graph = TaskGraph(default_timeout=5)
+    graph.add("slow", slow, timeout=0.05).add("fast", fast)
+    run = asyncio.run(graph.run())
+    assert _statuses(run) == {"slow": NODE_TIMEOUT, "fast": NODE_SUCCEEDED}
+    assert run["results"] == {"fast": "ok"}
+    assert "slow" in run["errors"]
+
+
+def test_failed_dependency_skips_node():
+    async def fail(inputs):
+        raise RuntimeError("boom")
+
+    async def ok(inputs):
+        return 1
+
+    async def child(inputs):
+        return inputs
+
+    graph = TaskGraph()
+    graph.add("a", fail).add("b", ok).add("child", child, deps=["a", "b"]).add("grandchild", child, deps=["child"])
+    run = asyncio.run(graph.run())
+    assert _statuses(run) == {"a": NODE_FAILED, "b": NODE_SUCCEEDED, "child": NODE_SKIPPED, "grandchild": NODE_SKIPPED}
+    assert run["errors"]["a"] == "boom"
+    assert run["results"] == {"b": 1}
+
+
+def test_allow_partial_receives_successful_deps():
+    async def fail(inputs):
+        raise RuntimeError("boom")
+
+    async def ok(inputs):
+        return 1
+
+    async def collect(inputs):
+        return sorted(inputs)
+
+    graph = TaskGraph()
+    graph.add("a", fail).add("b", ok).add("merge", collect, deps=["a", "b"], allow_partial=True)
+    graph.add("all_failed", collect, deps=["a"], allow_partial=True)
+    run = asyncio.run(graph.run())
+    assert run["results"]["merge"] == ["b"]
+    # 依赖全部失败时仍然跳过
+    assert _statuses(run)["all_failed"] == NODE_SKIPPED
+
+
+def test_invalid_graph():
+    async def noop(inputs):
+        return None
+
+    with pytest.raises(TaskGraphError):
+        TaskGraph().add("a", noop).add("a", noop)
+    with pytest.raises(TaskGraphError):
+        asyncio.run(TaskGraph().add("a", noop, deps=["missing"]).run())
+    with pytest.raises(TaskGraphError):
+        asyncio.run(TaskGraph().add("a", noop, deps=["b"]).add("b", noop, deps=["a"]).run())
+
+
+def test_coordinator_analyzes_agent_collected_news(monkeypatch):
+    """同时指定新闻源和类别时，采集Agent的新闻按内容归入类别并被分析"""
+    scraped = {
+        "nba": [{"title": "湖人险胜掘金", "content": "NBA常规赛，詹姆斯三双带队获胜"}],
+        "soccer": [{"title": "曼城客场取胜", "content": "英超第十轮，哈兰德梅开二度"}],
+    }
+    agent_news = [
+        {"title": "皇马逆转巴萨", "content": "西甲国家德比，足球比赛下半场皇马连入两球"},
+        {"title": "一则无法归类的新闻", "content": "今日天气晴朗"},
+    ]
+
+    async def fake_scrape(category, limit):
+        return scraped[category]
+
+    async def fake_collect(news_sources):
+        return agent_news
+
+    async def fake_analyze(self, articles, analysis_type):
+        return {"titles": [article["title"] for article in articles]}
+
+    monkeypatch.setattr(coordinator_module, "scrape_news", fake_scrape)
+    monkeypatch.setattr(coordinator_module, "collect_with_agent", fake_collect)
+    monkeypatch.setattr(MultiAgentCoordinator, "_analyze", fake_analyze)
+
+    result = asyncio.run(MultiAgentCoordinator().execute_task(
+        "采集并分析", news_sources=[{"name": "test"}], categories=["nba", "soccer"]
+    ))
+    assert result["status"] == "success"
+    by_category = result["results"]["collection_by_category"]
+    assert set(by_category) == {"nba", "soccer"}
+    analysis = result["results"]["analysis"]
+    assert analysis["nba"]["titles"] == ["湖人险胜掘金", "一则无法归类的新闻"]
+    assert analysis["soccer"]["titles"] == ["曼城客场取胜", "皇马逆转巴萨"]
+    assert len(result["results"]["collection"]) == 4